@@ -6,9 +6,11 @@ __version__ = "1.0.0"
 __author__ = "BarFlow Team"
 __description__ = "Gestione finanziaria per bar e ristoranti"
 
-from .ui.main_window import MainWindow
+from barflow.utils.lazy_exports import lazy_exports
 
+# MainWindow (e con lei Qt e i widget) viene importata solo al primo accesso
 __all__ = ['MainWindow']
+__getattr__, __dir__ = lazy_exports(__name__, {'MainWindow': '.ui.main_window'})
 
 def main():
     """Entry point principale per briefcase"""
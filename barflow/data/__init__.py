@@ -1,4 +1,7 @@
-from .db_manager import DatabaseManager
-from .temporary_db_manager import TemporaryDatabaseManager
+from barflow.utils.lazy_exports import lazy_exports
 
-__all__ = ['DatabaseManager', 'TemporaryDatabaseManager']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'TemporaryDatabaseManager']
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'DatabaseManager': '.db_manager',
+    'TemporaryDatabaseManager': '.temporary_db_manager',
+})
\ No newline at end of file
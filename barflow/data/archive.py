@@ -0,0 +1,483 @@
+"""
+Archivio a freddo degli anni chiusi dello storico.
+
+Un anno archiviato esce dal database (tabella principale e partizione per anno,
+vedi partitions) e viene salvato in file colonnari compressi nella cartella
+barflow_history_archive accanto al database:
+    - Parquet (zstd) se pyarrow è installato: <anno>/transactions.parquet;
+    - altrimenti un file NumPy compresso per colonna: <anno>/<colonna>.npz
+      (interi con la maschera dei NULL, testi codificati a dizionario, senza pickle).
+manifest.json descrive gli anni archiviati (formato, colonne, numero di righe,
+intervalli di date e di id, statistiche per sorgente): conteggi e statistiche
+non aprono i file.
+
+Gli anni archiviati sono in sola lettura e vengono letti solo dalle query che
+li richiedono (anno nel periodo richiesto), e solo per le colonne necessarie:
+    - read_archived_columns() legge le colonne di un anno; il Parquet viene
+      letto con memory map (i .npz compressi non si possono mappare in memoria:
+      vengono decompresse solo le colonne richieste);
+    - load_archive_table() copia le righe del periodo in una tabella temporanea
+      della connessione, che open_history unisce alla vista `transactions`:
+      esportazioni e report leggono gli anni archiviati senza modifiche.
+
+Un file elencato nel manifest mancante, illeggibile o con un numero di righe
+diverso da quello registrato solleva ArchiveError: lo storico non viene mai
+letto incompleto.
+
+Da riga di comando:
+    python -m barflow.data.archive list
+    python -m barflow.data.archive archive ANNO [--vacuum]
+    python -m barflow.data.archive restore ANNO
+"""
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+PARQUET_FILE = "transactions.parquet"
+
+# Tabella temporanea con le righe archiviate lette da una query
+ARCHIVE_TABLE = "archived_transactions"
+
+# Manifest letti, per percorso: (mtime_ns, size, anni)
+_manifest_cache = {}
+
+
+class ArchiveError(RuntimeError):
+    """Anno archiviato non leggibile: file mancante, danneggiato o diverso dal manifest."""
+
+    def __init__(self, year, problem):
+        self.year = year
+        super().__init__(
+            f"Archivio dell'anno {year} non valido: {problem}. "
+            f"Ripristina i file dell'archivio da un backup prima di leggere lo storico."
+        )
+
+
+def get_archive_directory(db_path) -> Path:
+    """Cartella dell'archivio di un database (es. barflow_history_archive)."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_archive")
+
+
+def parquet_supported():
+    """True se pyarrow è installato: i nuovi archivi vengono scritti in Parquet."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(
+            "L'archivio è in formato Parquet: serve il pacchetto pyarrow (pip install pyarrow)"
+        ) from e
+    return pa, pq
+
+
+def read_manifest(db_path):
+    """
+    Anni archiviati descritti dal manifest.
+
+    Returns:
+        Dizionario {anno: voce del manifest} (vuoto se non c'è un archivio)
+    """
+    manifest_path = get_archive_directory(db_path) / MANIFEST_NAME
+    try:
+        stat = manifest_path.stat()
+    except FileNotFoundError:
+        return {}
+    cached = _manifest_cache.get(manifest_path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        years = {int(year): entry for year, entry in json.load(manifest_file)["years"].items()}
+    _manifest_cache[manifest_path] = (stat.st_mtime_ns, stat.st_size, years)
+    return years
+
+
+def _write_manifest(db_path, years):
+    """Salva il manifest (scrittura atomica)."""
+    manifest_path = get_archive_directory(db_path) / MANIFEST_NAME
+    temp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "years": {str(year): years[year] for year in sorted(years)},
+        }, manifest_file, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+def archived_years(db_path, period=None, after_id=None):
+    """
+    Voci del manifest degli anni necessari a una query.
+
+    Args:
+        period: Tupla opzionale (inizio, fine) in secondi, fine esclusa e None per
+            un estremo aperto (vedi partitions.list_partitions)
+        after_id: Solo gli anni con transazioni di id maggiore
+
+    Returns:
+        Lista di (anno, voce del manifest) in ordine di anno
+    """
+    selected = []
+    for year, entry in sorted(read_manifest(db_path).items()):
+        if period is not None:
+            if (period[1] is not None and entry['min_ts'] >= period[1]) or \
+                    (period[0] is not None and entry['max_ts'] < period[0]):
+                continue
+        if after_id is not None and entry['max_id'] <= after_id:
+            continue
+        selected.append((year, entry))
+    return selected
+
+
+def archived_max_id(db_path):
+    """Id massimo tra le transazioni archiviate (0 se l'archivio è vuoto)."""
+    return max((entry['max_id'] for entry in read_manifest(db_path).values()), default=0)
+
+
+def _write_npz_columns(directory, columns, values_by_column):
+    import numpy as np
+    for column in columns:
+        values = values_by_column[column['name']]
+        path = directory / f"{column['name']}.npz"
+        if column['kind'] == 'int':
+            nulls = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+            data = np.fromiter((0 if value is None else value for value in values),
+                               dtype=np.int64, count=len(values))
+            arrays = {'values': data, 'nulls': nulls} if nulls.any() else {'values': data}
+        else:
+            # Codifica a dizionario: codici int32 (-1 per NULL) e valori distinti
+            index = {}
+            codes = np.fromiter(
+                (-1 if value is None else index.setdefault(str(value), len(index)) for value in values),
+                dtype=np.int32, count=len(values)
+            )
+            arrays = {'codes': codes, 'values': np.array(list(index), dtype=str) if index else np.array([], dtype='U1')}
+        np.savez_compressed(path, **arrays)
+
+
+def _write_parquet(directory, columns, values_by_column):
+    pa, pq = _import_pyarrow()
+    table = pa.table({
+        column['name']: pa.array(values_by_column[column['name']],
+                                 type=pa.int64() if column['kind'] == 'int' else pa.string())
+        for column in columns
+    })
+    pq.write_table(table, str(directory / PARQUET_FILE), compression='zstd')
+
+
+def read_archived_columns(db_path, entry, columns, period=None):
+    """
+    Legge alcune colonne di un anno archiviato.
+
+    Args:
+        db_path: Percorso del database storico
+        entry: Voce del manifest dell'anno (vedi archived_years)
+        columns: Nomi delle colonne (quelle non archiviate restituiscono solo NULL)
+        period: Periodo opzionale (inizio, fine) per filtrare le righe su data_ts
+
+    Returns:
+        Dizionario {colonna: (valori, maschera dei NULL o None)}: array numpy
+        int64 per le colonne intere, array di oggetti (str o None) per i testi
+
+    Raises:
+        ArchiveError: file mancante, illeggibile o con righe diverse dal manifest
+    """
+    import numpy as np
+    directory = get_archive_directory(db_path) / entry['path']
+    kinds = {column['name']: column['kind'] for column in entry['columns']}
+    wanted = [column for column in dict.fromkeys(list(columns) + ['data_ts']) if column in kinds]
+    year = entry['path']
+    if entry['format'] == 'parquet':
+        paths = [directory / PARQUET_FILE]
+    else:
+        paths = [directory / f"{column}.npz" for column in wanted]
+    for path in paths:
+        if not path.is_file():
+            raise ArchiveError(year, f"manca il file {path}")
+
+    result = {}
+    try:
+        if entry['format'] == 'parquet':
+            pa, pq = _import_pyarrow()
+            import pyarrow.compute as pc
+            # memory_map: le pagine del file vengono lette dal sistema solo quando servono
+            table = pq.read_table(str(paths[0]), columns=wanted, memory_map=True)
+            for column in wanted:
+                data = table.column(column)
+                if kinds[column] == 'int':
+                    nulls = data.is_null().to_numpy()
+                    values = pc.fill_null(data, 0).to_numpy().astype(np.int64, copy=False)
+                    result[column] = (values, nulls if nulls.any() else None)
+                else:
+                    result[column] = (data.to_numpy().astype(object, copy=False), None)
+        else:
+            for column, path in zip(wanted, paths):
+                with np.load(path) as saved:
+                    if kinds[column] == 'int':
+                        result[column] = (saved['values'], saved['nulls'] if 'nulls' in saved.files else None)
+                    else:
+                        codes = saved['codes']
+                        values = saved['values'].astype(object)[codes] if len(saved['values']) else \
+                            np.full(len(codes), None, dtype=object)
+                        values[codes < 0] = None
+                        result[column] = (values, None)
+    except (OSError, ValueError, KeyError, IndexError, zipfile.BadZipFile) as e:
+        raise ArchiveError(year, f"file illeggibile ({e})") from e
+
+    rows = entry['rows']
+    for column, (values, nulls) in result.items():
+        if len(values) != rows or (nulls is not None and len(nulls) != rows):
+            raise ArchiveError(year, f"la colonna {column} ha {len(values)} righe invece di {rows}")
+    if period is not None:
+        data_ts, data_ts_nulls = result['data_ts']
+        keep = np.ones(rows, dtype=bool) if data_ts_nulls is None else ~data_ts_nulls
+        if period[0] is not None:
+            keep &= data_ts >= period[0]
+        if period[1] is not None:
+            keep &= data_ts < period[1]
+        rows = int(keep.sum())
+        result = {column: (values[keep], None if nulls is None else nulls[keep])
+                  for column, (values, nulls) in result.items()}
+    for column in columns:
+        if column not in result:
+            result[column] = (np.full(rows, None, dtype=object), None)
+    return {column: result[column] for column in columns}
+
+
+def column_values(values, nulls):
+    """Valori di una colonna letta da read_archived_columns come lista Python (NULL -> None)."""
+    values = values.tolist()
+    if nulls is not None:
+        for position in nulls.nonzero()[0].tolist():
+            values[position] = None
+    return values
+
+
+def load_archive_table(conn, db_path, entries, period=None):
+    """
+    Copia le righe archiviate degli anni indicati (filtrate per periodo) nella
+    tabella temporanea ARCHIVE_TABLE, con le colonne della tabella principale.
+    Solleva ArchiveError se i file di un anno non corrispondono al manifest.
+    """
+    from .partitions import PARTITION_TABLE
+    conn.execute(f"CREATE TEMP TABLE {ARCHIVE_TABLE} AS SELECT * FROM main.{PARTITION_TABLE} WHERE 0")
+    columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({PARTITION_TABLE})")]
+    insert_sql = (f"INSERT INTO temp.{ARCHIVE_TABLE} ({', '.join(columns)}) "
+                  f"VALUES ({', '.join('?' * len(columns))})")
+    for _, entry in entries:
+        data = read_archived_columns(db_path, entry, columns, period)
+        conn.executemany(insert_sql, zip(*(column_values(*data[column]) for column in columns)))
+    # Solo la tabella temporanea è stata scritta: nessun lock resta sul database
+    conn.commit()
+
+
+def _year_stats(values_by_column):
+    """Statistiche per sorgente delle righe archiviate (stesso formato di table_stats)."""
+    sources = {}
+    for sorgente, net_cents, data_ts in zip(values_by_column['sorgente'], values_by_column['importo_netto_cents'],
+                                            values_by_column['data_ts']):
+        source = sources.setdefault(sorgente, {'total_records': 0, 'net_cents': 0, 'min_ts': None, 'max_ts': None})
+        source['total_records'] += 1
+        source['net_cents'] += net_cents or 0
+        if data_ts is not None:
+            source['min_ts'] = data_ts if source['min_ts'] is None else min(source['min_ts'], data_ts)
+            source['max_ts'] = data_ts if source['max_ts'] is None else max(source['max_ts'], data_ts)
+    return {'sources': dict(sorted(sources.items()))}
+
+
+def _remove_from_database(db_path, year):
+    """Elimina dal database (tabella principale e partizione) le transazioni dell'anno."""
+    from .partitions import PARTITIONS_TABLE, PARTITION_TABLE, connect, list_partitions, year_bounds
+    start, end = year_bounds(year)
+    conn = connect(db_path)
+    try:
+        partitions = [partition for partition in list_partitions(conn, db_path) if partition['year'] == year]
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"DELETE FROM main.{PARTITION_TABLE} WHERE data_ts >= ? AND data_ts < ?", (start, end))
+            conn.execute(f"DELETE FROM main.{PARTITIONS_TABLE} WHERE year = ?", (year,))
+    finally:
+        conn.close()
+    for partition in partitions:
+        partition['path'].unlink(missing_ok=True)
+
+
+def archive_year(db_path, year, vacuum=False):
+    """
+    Sposta le transazioni di un anno chiuso dal database all'archivio.
+
+    I file e il manifest vengono scritti prima di eliminare le righe dal
+    database: se l'operazione si interrompe, ripeterla completa l'eliminazione.
+
+    Args:
+        db_path: Percorso del database storico
+        year: Anno da archiviare (precedente all'anno in corso)
+        vacuum: Compatta il database al termine
+
+    Returns:
+        int: Numero di transazioni archiviate
+    """
+    from .partitions import connect, open_history, year_bounds
+    db_path = Path(db_path)
+    if year >= date.today().year:
+        raise ValueError(f"Solo gli anni chiusi possono essere archiviati (anno in corso: {date.today().year})")
+    years = read_manifest(db_path)
+    start, end = year_bounds(year)
+
+    conn = open_history(db_path, (start, end), include_archive=False)
+    try:
+        columns = [
+            {'name': name, 'kind': 'int' if column_type.upper() == 'INTEGER' else 'text'}
+            for _, name, column_type, *_ in conn.execute("PRAGMA table_info(transactions)")
+        ]
+        rows = conn.execute(
+            "SELECT * FROM transactions WHERE data_ts >= ? AND data_ts < ? ORDER BY data_ts, id", (start, end)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    if year in years:
+        if not rows:
+            raise ValueError(f"L'anno {year} è già archiviato")
+        # Archiviazione interrotta dopo la scrittura dei file: restano da eliminare le righe
+        _remove_from_database(db_path, year)
+        return years[year]['rows']
+    if not rows:
+        raise ValueError(f"Nessuna transazione da archiviare per l'anno {year}")
+
+    values_by_column = {column['name']: list(values) for column, values in zip(columns, zip(*rows))}
+    archive_format = "parquet" if parquet_supported() else "npz"
+    archive_dir = get_archive_directory(db_path)
+    final_dir = archive_dir / str(year)
+    temp_dir = archive_dir / f"{year}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    temp_dir.mkdir(parents=True)
+    try:
+        if archive_format == "parquet":
+            _write_parquet(temp_dir, columns, values_by_column)
+        else:
+            _write_npz_columns(temp_dir, columns, values_by_column)
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(temp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    timestamps = [value for value in values_by_column['data_ts'] if value is not None]
+    years = dict(years)
+    years[year] = {
+        'format': archive_format,
+        'path': final_dir.name,
+        'rows': len(rows),
+        'columns': columns,
+        'min_ts': min(timestamps),
+        'max_ts': max(timestamps),
+        'min_id': min(values_by_column['id']),
+        'max_id': max(values_by_column['id']),
+        'stats': _year_stats(values_by_column),
+        'archived_at': datetime.now().isoformat(timespec="seconds"),
+    }
+    _write_manifest(db_path, years)
+    _remove_from_database(db_path, year)
+    logger.info(f"Anno {year} archiviato ({archive_format}): {len(rows)} transazioni")
+    if vacuum:
+        vacuum_conn = connect(db_path)
+        vacuum_conn.execute("VACUUM")
+        vacuum_conn.close()
+    return len(rows)
+
+
+def restore_year(db_path, year):
+    """
+    Riporta nel database (tabella principale) le transazioni di un anno archiviato
+    ed elimina i suoi file dall'archivio.
+
+    Returns:
+        int: Numero di transazioni ripristinate
+    """
+    from .partitions import PARTITION_TABLE, connect
+    db_path = Path(db_path)
+    years = read_manifest(db_path)
+    if year not in years:
+        raise ValueError(f"L'anno {year} non è archiviato")
+    entry = years[year]
+    conn = connect(db_path)
+    try:
+        table_columns = {row[1] for row in conn.execute(f"PRAGMA main.table_info({PARTITION_TABLE})")}
+        columns = [column['name'] for column in entry['columns'] if column['name'] in table_columns]
+        data = read_archived_columns(db_path, entry, columns)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # OR IGNORE: ripetere un ripristino interrotto non duplica le righe
+            conn.executemany(
+                f"INSERT OR IGNORE INTO main.{PARTITION_TABLE} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                zip(*(column_values(*data[column]) for column in columns))
+            )
+    finally:
+        conn.close()
+    years = dict(years)
+    del years[year]
+    if years:
+        _write_manifest(db_path, years)
+        shutil.rmtree(get_archive_directory(db_path) / entry['path'], ignore_errors=True)
+    else:
+        # Ultimo anno ripristinato: l'archivio non serve più
+        shutil.rmtree(get_archive_directory(db_path), ignore_errors=True)
+    logger.info(f"Anno {year} ripristinato dall'archivio: {entry['rows']} transazioni")
+    return entry['rows']
+
+
+def main(argv=None):
+    """Gestione dell'archivio degli anni chiusi da riga di comando."""
+    import argparse
+    import sys
+    from .db_manager import get_db_path, initialize_and_migrate_db
+
+    parser = argparse.ArgumentParser(description="Archivio a freddo degli anni chiusi")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Elenca gli anni archiviati")
+    archive_parser = commands.add_parser("archive", help="Archivia un anno chiuso")
+    archive_parser.add_argument("--vacuum", action="store_true", help="Compatta il database al termine")
+    restore_parser = commands.add_parser("restore", help="Riporta un anno nel database")
+    for command_parser in (archive_parser, restore_parser):
+        command_parser.add_argument("year", type=int, help="Anno")
+    args = parser.parse_args(argv)
+
+    initialize_and_migrate_db()
+    db_path = get_db_path()
+    try:
+        if args.command == "archive":
+            archived = archive_year(db_path, args.year, vacuum=args.vacuum)
+            print(f"✓ Anno {args.year}: {archived} transazioni archiviate in {get_archive_directory(db_path)}")
+        elif args.command == "restore":
+            restored = restore_year(db_path, args.year)
+            print(f"✓ Anno {args.year}: {restored} transazioni riportate nel database")
+        else:
+            years = read_manifest(db_path)
+            if not years:
+                print("Nessun anno archiviato")
+            for year, entry in sorted(years.items()):
+                directory = get_archive_directory(db_path) / entry['path']
+                size_mb = sum(path.stat().st_size for path in directory.iterdir()) / 1024 / 1024
+                print(f"{year}: {entry['rows']} transazioni, {size_mb:.2f} MB ({entry['format']}), "
+                      f"archiviato il {entry['archived_at']}")
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Bus delle notifiche di modifica dei dati.
+
+I manager dei database pubblicano un DataChange dopo ogni scrittura confermata
+(inserimento, eliminazione, svuotamento) con gli id delle righe coinvolte e
+l'intervallo di date interessato. Le viste si iscrivono al bus e aggiornano solo
+ciò che è cambiato, invece di ricaricare tutto dopo ogni operazione.
+
+Il bus è Python puro (nessuna dipendenza da Qt): i callback vengono chiamati in
+modo sincrono nel thread che ha eseguito la scrittura.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DataChange:
+    """Descrizione di una modifica ai dati di una tabella."""
+
+    INSERT = "insert"
+    DELETE = "delete"
+    CLEAR = "clear"
+
+    def __init__(self, table, kind, row_ids=(), date_range=None):
+        """
+        Args:
+            table: Nome della tabella modificata
+            kind: Tipo di modifica (INSERT, DELETE, CLEAR)
+            row_ids: Id delle righe inserite o eliminate (vuoto per CLEAR)
+            date_range: Tupla (min, max) di data_ts delle righe coinvolte, o None
+        """
+        self.table = table
+        self.kind = kind
+        self.row_ids = tuple(row_ids)
+        self.date_range = date_range
+
+    @classmethod
+    def from_rows(cls, table, kind, rows):
+        """Crea la modifica a partire dalle righe (id, data_ts) coinvolte."""
+        row_ids = [row[0] for row in rows]
+        timestamps = [row[1] for row in rows if row[1] is not None]
+        date_range = (min(timestamps), max(timestamps)) if timestamps else None
+        return cls(table, kind, row_ids, date_range)
+
+    def __repr__(self):
+        return (f"DataChange(table={self.table!r}, kind={self.kind!r}, "
+                f"rows={len(self.row_ids)}, date_range={self.date_range!r})")
+
+
+class DataChangeBus:
+    """Registro dei sottoscrittori e invio delle notifiche di modifica."""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback, table=None):
+        """
+        Iscrive un callback(change) alle modifiche di una tabella (tutte se table è None).
+
+        Returns:
+            Il callback, da passare a unsubscribe()
+        """
+        self._subscribers.append((callback, table))
+        return callback
+
+    def unsubscribe(self, callback):
+        """Rimuove tutte le iscrizioni del callback."""
+        self._subscribers = [
+            (subscriber, table) for subscriber, table in self._subscribers if subscriber is not callback
+        ]
+
+    def emit(self, change):
+        """Notifica la modifica ai sottoscrittori interessati (un errore non blocca gli altri)."""
+        for callback, table in list(self._subscribers):
+            if table is not None and table != change.table:
+                continue
+            try:
+                callback(change)
+            except Exception as e:
+                logger.error(f"Errore nella gestione della modifica {change}: {e}")
+
+
+# Bus condiviso da tutti i manager dell'applicazione
+data_change_bus = DataChangeBus()
@@ -1,11 +1,27 @@
 from barflow.utils import get_app_data_directory
-from .py_sqlite_migrator import PySQLiteMigrator
+from barflow.utils.startup_trace import startup_trace
+from barflow.migrations import SCHEMA_VERSION
+from .py_sqlite_migrator import get_user_version
+from .change_bus import DataChange, data_change_bus
+from .hash_index import HashIndex
+from .result_cache import ResultCache
+from .table_stats import (check_table_stats, clear_table, merge_table_stats, read_table_stats,
+                          rebuild_table_stats, source_totals, stats_date_range)
+from .partitions import (PARTITION_STATS_TABLE, PARTITIONS_TABLE, ReadOnlyPartitionError,
+                         allocate_ids, attach_partitions, connect, existing_hashes,
+                         list_partitions, open_history, period_from_conditions,
+                         read_partition_stats, record_year)
+from .archive import (ARCHIVE_TABLE, archived_years, load_archive_table,
+                      read_archived_columns, read_manifest)
+from .record_hash import record_hash, record_hashes
+from .record_codec import (DATA_TS_SQL, DATE_TEXT_FORMAT, NET_CENTS_COLUMN,
+                           cents_to_amount, epoch_to_datetime,
+                           format_record_date, period_bounds, record_net_cents,
+                           to_cents)
 import shutil
-import importlib.resources
+from contextlib import closing
 from pathlib import Path
 import sqlite3
-import hashlib
-import pandas as pd
 import logging
 
 APP_NAME = "BarFlow"
@@ -13,17 +29,77 @@ APP_AUTHOR = "BarFlowTeam"
 
 logger = logging.getLogger(__name__)
 
+HISTORY_TABLE = "transactions"
+# Statistiche per sorgente mantenute dai trigger (migrazione 012)
+HISTORY_STATS_TABLE = "transaction_stats"
+
+# Inserimento di una transazione; {id_column}/{id_value} aggiungono l'id esplicito
+# per le righe delle partizioni (vedi partitions.allocate_ids)
+_INSERT_SQL = f"""
+    INSERT OR IGNORE INTO {{table}} 
+    ({{id_column}}data, data_ts, sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos, 
+     importo_lordo_pos_cents, commissione_pos_cents, importo_netto_cents, hash_record, file_origine)
+    VALUES ({{id_value}}?, {DATA_TS_SQL}, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Colonne lette dagli anni archiviati, con i nomi usati da _read_transactions_df
+_ARCHIVED_COLUMNS = {
+    'data_ts': 'DATA',
+    'sorgente': 'SORGENTE',
+    'descrizione': 'DESCRIZIONE',
+    'fornitore': 'FORNITORE',
+    'numero_fornitore': 'NUMERO FORNITORE',
+    'numero_operazione_pos': 'NUMERO OPERAZIONE POS',
+    'importo_lordo_pos_cents': 'IMPORTO LORDO POS',
+    'commissione_pos_cents': 'COMMISSIONE POS',
+    'importo_netto_cents': 'IMPORTO NETTO',
+}
+
 def get_db_path() -> Path:
     """Ottieni il percorso del database nell'area dati dell'applicazione"""
     # Utilizza il sistema di percorsi centralizzato per garantire la portabilità
     app_data_dir = get_app_data_directory()
     return app_data_dir / "barflow_history.db"
 
-def initialize_and_migrate_db():
-    """Inizializza e aggiorna il database"""
-    db_path = get_db_path()
+def is_schema_current(db_path) -> bool:
+    """
+    Verifica con una sola lettura di PRAGMA user_version se il database
+    esiste ed è già alla versione SCHEMA_VERSION.
+    """
+    if not Path(db_path).exists():
+        return False
+    conn = sqlite3.connect(db_path)
+    try:
+        return get_user_version(conn) == SCHEMA_VERSION
+    finally:
+        conn.close()
+
+# Ultimo decimo di avanzamento registrato per ogni migrazione a blocchi
+_migration_progress_logged = {}
+
+def _log_migration_progress(name, copied, total):
+    """Registra nel log l'avanzamento delle migrazioni a blocchi (ogni 10%)."""
+    step = copied * 10 // total if total else 10
+    if _migration_progress_logged.get(name) != step:
+        _migration_progress_logged[name] = step
+        logger.info(f"Migration {name}: {copied}/{total} rows copied")
+
+def initialize_and_migrate_db(db_path=None):
+    """
+    Inizializza e aggiorna il database (di default quello dell'applicazione)
+    fino alla versione SCHEMA_VERSION.
+    """
+    db_path = Path(db_path) if db_path else get_db_path()
     logger.info(f"Database path: {db_path}")
     
+    # Database già aggiornato: nessuna DDL e nessun controllo delle migrazioni
+    if is_schema_current(db_path):
+        logger.info(f"Database schema up-to-date (version {SCHEMA_VERSION})")
+        return
+    
+    import importlib.resources
+    from .py_sqlite_migrator import PySQLiteMigrator
+    
     if not db_path.exists():
         logger.info("Database not found. Initializing...")
         try:
@@ -57,262 +133,529 @@ def initialize_and_migrate_db():
             )
         """)
         
-        conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_data ON transactions(data);
-        """)
-        conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_sorgente ON transactions(sorgente);
-        """)
-        conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_hash ON transactions(hash_record);
-        """)
+        # Gli indici e le colonne successive (data_ts, importi in centesimi) sono gestiti dalle migrazioni
 
     # Applica le migrazioni solo se necessarie
     try:
-        migrator = PySQLiteMigrator(str(db_path), "barflow.migrations")
-        migrator.apply_migrations()
+        with startup_trace.phase("migrations"):
+            migrator = PySQLiteMigrator(str(db_path), "barflow.migrations")
+            version = migrator.apply_migrations(progress=_log_migration_progress)
         logger.info("Database migrations applied successfully")
+        if version != SCHEMA_VERSION:
+            logger.warning(f"Database at version {version}, expected SCHEMA_VERSION {SCHEMA_VERSION}: "
+                           f"update barflow.migrations.SCHEMA_VERSION together with the migrations")
     except Exception as e:
         logger.warning(f"Migration failed, but basic structure exists: {e}")
     
     logger.info("Database initialization complete")
 
 class DatabaseManager:
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, change_bus=None):
         # Usa lo stesso path del sistema di migrazione se non specificato
         self.db_path = Path(db_path) if db_path else get_db_path()
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hash_index = HashIndex(self.db_path, HISTORY_TABLE, HISTORY_STATS_TABLE)
+        self.result_cache = ResultCache(self.db_path)
+        # Bus su cui vengono notificate le modifiche (di default quello condiviso)
+        self.change_bus = change_bus if change_bus is not None else data_change_bus
         self._init_database()
     
     def _init_database(self):
         """Inizializza il database con le tabelle necessarie."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    data TEXT NOT NULL,
-                    sorgente TEXT NOT NULL,
-                    descrizione TEXT,
-                    fornitore TEXT,
-                    numero_fornitore TEXT,
-                    numero_operazione_pos TEXT,
-                    importo_lordo_pos REAL,
-                    commissione_pos REAL,
-                    importo_netto REAL NOT NULL,
-                    hash_record TEXT UNIQUE,
-                    data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    file_origine TEXT
-                )
-            """)
-            
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_data ON transactions(data);
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_sorgente ON transactions(sorgente);
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_hash ON transactions(hash_record);
-            """)
+        # Database già migrato all'avvio: la tabella esiste con lo schema corrente
+        if is_schema_current(self.db_path):
+            return
+        # Database nuovo o vecchio: stessa creazione e migrazioni dell'avvio
+        initialize_and_migrate_db(self.db_path)
     
     def _generate_record_hash(self, record):
         """Genera un hash univoco per il record per evitare duplicati."""
-        key = f"{record['DATA']}{record['SORGENTE']}{record.get('DESCRIZIONE', '')}{record.get('FORNITORE', '')}{record.get('NUMERO FORNITORE', '')}{record.get('NUMERO OPERAZIONE POS', '')}{record['IMPORTO NETTO']}"
-        return hashlib.md5(key.encode()).hexdigest()
+        return record_hash(record)
     
-    def save_transactions(self, transactions_data, file_origin=None):
-        """Salva le transazioni nel database, evitando duplicati."""
+    def _new_rows(self, conn, transactions_data, hashes, file_origin):
+        """
+        Prepara le righe da inserire scartando in blocco i duplicati.
+        
+        I record il cui hash è già nell'indice (o ripetuto nello stesso batch)
+        non arrivano alla INSERT.
+        
+        Returns:
+            tuple: (righe da inserire, hash delle righe)
+        """
+        self.hash_index.ensure_current(conn)
+        known = self.hash_index.contains(hashes)
+        rows = []
+        new_hashes = []
+        seen = set()
+        for record, hash_value, is_known in zip(transactions_data, hashes, known):
+            if is_known or hash_value in seen:
+                continue
+            seen.add(hash_value)
+            new_hashes.append(hash_value)
+            data_text = format_record_date(record['DATA'])
+            rows.append((
+                data_text,
+                data_text,
+                record['SORGENTE'],
+                record.get('DESCRIZIONE'),
+                record.get('FORNITORE'),
+                record.get('NUMERO FORNITORE'),
+                record.get('NUMERO OPERAZIONE POS'),
+                to_cents(record.get('IMPORTO LORDO POS')),
+                to_cents(record.get('COMMISSIONE POS')),
+                record_net_cents(record),
+                hash_value,
+                file_origin
+            ))
+        return rows, new_hashes
+    
+    def _update_hash_index(self, conn, new_hashes, inserted_count):
+        """Aggiorna l'indice degli hash dopo un inserimento."""
+        if inserted_count == len(new_hashes):
+            if inserted_count > 0:
+                self.hash_index.add(conn, new_hashes)
+        else:
+            # Alcuni record erano già nel database: l'indice non era allineato
+            self.hash_index.rebuild(conn)
+    
+    def _route_partition_rows(self, conn, rows, new_hashes):
+        """
+        Separa le righe degli anni partizionati e collega le loro partizioni.
+        
+        Negli anni chiusi e in quelli archiviati i record già presenti sono
+        duplicati; se ce ne sono di nuovi non viene salvato nulla.
+        
+        Returns:
+            tuple: (righe e hash per la tabella principale, [(partizione, righe)])
+        """
+        partitions = {partition['year']: partition for partition in list_partitions(conn, self.db_path)}
+        archived = read_manifest(self.db_path)
+        if not partitions and not archived:
+            return rows, new_hashes, []
+        main_rows, main_hashes, rows_by_year, archived_rows = [], [], {}, {}
+        for row, hash_value in zip(rows, new_hashes):
+            year = record_year(row[0])
+            if year in archived:
+                archived_rows.setdefault(year, []).append(hash_value)
+            elif year in partitions:
+                rows_by_year.setdefault(year, []).append(row)
+            else:
+                main_rows.append(row)
+                main_hashes.append(hash_value)
+        
+        closed_years = []
+        for year, year_hashes in archived_rows.items():
+            values, _ = read_archived_columns(self.db_path, archived[year], ['hash_record'])['hash_record']
+            if not set(year_hashes) <= set(values.tolist()):
+                closed_years.append(year)
+        used = [partitions[year] for year in rows_by_year]
+        attach_partitions(conn, used, writable=True)
+        partition_rows = []
+        for partition in used:
+            year_rows = rows_by_year[partition['year']]
+            if not partition['read_only']:
+                partition_rows.append((partition, year_rows))
+                continue
+            # hash_record è il penultimo valore della riga (vedi _new_rows)
+            known = existing_hashes(conn, partition, [row[-2] for row in year_rows])
+            if any(row[-2] not in known for row in year_rows):
+                closed_years.append(partition['year'])
+        if closed_years:
+            raise ReadOnlyPartitionError(closed_years)
+        return main_rows, main_hashes, partition_rows
+    
+    def _insert_partition_rows(self, conn, partition_rows):
+        """
+        Inserisce le righe nelle partizioni degli anni aperti, con id presi dalla
+        sequenza della tabella principale.
+        
+        Returns:
+            tuple: (righe inserite, [(id, data_ts)] delle righe inserite)
+        """
         saved_count = 0
-        duplicate_count = 0
+        inserted_rows = []
+        for partition, rows in partition_rows:
+            first_id = allocate_ids(conn, len(rows))
+            table = f"{partition['alias']}.{HISTORY_TABLE}"
+            saved_count += conn.executemany(
+                _INSERT_SQL.format(table=table, id_column="id, ", id_value="?, "),
+                [(first_id + offset,) + row for offset, row in enumerate(rows)]
+            ).rowcount
+            inserted_rows.extend(conn.execute(
+                f"SELECT id, data_ts FROM {table} WHERE id >= ? ORDER BY id", (first_id,)
+            ).fetchall())
+        return saved_count, inserted_rows
+    
+    def save_transactions(self, transactions_data, file_origin=None):
+        """
+        Salva le transazioni nel database, evitando duplicati.
         
-        with sqlite3.connect(self.db_path) as conn:
-            for record in transactions_data:
-                record_hash = self._generate_record_hash(record)
-                
-                try:
-                    conn.execute("""
-                        INSERT INTO transactions 
-                        (data, sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos, 
-                         importo_lordo_pos, commissione_pos, importo_netto, hash_record, file_origine)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        record['DATA'],
-                        record['SORGENTE'],
-                        record.get('DESCRIZIONE'),
-                        record.get('FORNITORE'),
-                        record.get('NUMERO FORNITORE'),
-                        record.get('NUMERO OPERAZIONE POS'),
-                        record.get('IMPORTO LORDO POS'),
-                        record.get('COMMISSIONE POS'),
-                        float(record['IMPORTO NETTO']),
-                        record_hash,
-                        file_origin
-                    ))
-                    saved_count += 1
-                except sqlite3.IntegrityError:
-                    # Record duplicato
-                    duplicate_count += 1
+        Le transazioni degli anni partizionati vanno nelle rispettive partizioni;
+        se qualcuna è nuova e appartiene a un anno chiuso non viene salvato nulla
+        (ReadOnlyPartitionError).
+        """
+        transactions_data = list(transactions_data)
+        # Hash calcolati in un unico batch prima dell'inserimento
+        hashes = record_hashes(transactions_data)
         
+        with closing(connect(self.db_path)) as conn, conn:
+            rows, new_hashes = self._new_rows(conn, transactions_data, hashes, file_origin)
+            rows, new_hashes, partition_rows = self._route_partition_rows(conn, rows, new_hashes)
+            # Con AUTOINCREMENT le righe inserite hanno id maggiore del massimo attuale
+            max_id_before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+            # INSERT OR IGNORE resta come garanzia se l'indice non è allineato;
+            # rowcount conta solo le righe inserite (non quelle scritte dai trigger delle statistiche)
+            saved_count = conn.executemany(
+                _INSERT_SQL.format(table=HISTORY_TABLE, id_column="", id_value=""), rows
+            ).rowcount
+            self._update_hash_index(conn, new_hashes, saved_count)
+            inserted_rows = []
+            if saved_count > 0:
+                inserted_rows = conn.execute(
+                    "SELECT id, data_ts FROM transactions WHERE id > ? ORDER BY id", (max_id_before,)
+                ).fetchall()
+            
+            partition_saved, partition_inserted = self._insert_partition_rows(conn, partition_rows)
+            saved_count += partition_saved
+            inserted_rows.extend(partition_inserted)
+            duplicate_count = len(transactions_data) - saved_count
+            if saved_count > 0:
+                # Aggiorna le statistiche del query planner dopo inserimenti consistenti
+                conn.execute("PRAGMA optimize")
+        
+        if saved_count > 0:
+            self.result_cache.invalidate(HISTORY_TABLE)
+            self.change_bus.emit(DataChange.from_rows(HISTORY_TABLE, DataChange.INSERT, inserted_rows))
         return saved_count, duplicate_count
     
-    def load_all_transactions(self):
-        """Carica tutte le transazioni dal database."""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_data_version(self):
+        """Versione dei dati storici: cambia a ogni scrittura sul database."""
+        return self.result_cache.version(HISTORY_TABLE)
+    
+    @staticmethod
+    def _cents_expression(column, existing_columns):
+        """Espressione SQL che legge un importo in centesimi (anche da database non migrati)."""
+        if f"{column}_cents" in existing_columns:
+            return f"{column}_cents"
+        if column in existing_columns:
+            return f"CAST(ROUND({column} * 100) AS INTEGER)"
+        return "NULL"
+    
+    def _build_select_clauses(self, existing_columns):
+        """
+        Costruisce la lista di colonne da leggere in base a quelle presenti nella tabella.
+        
+        Gli importi vengono letti in centesimi: la conversione in euro avviene
+        in _read_transactions_df.
+        """
+        # La data viene letta da data_ts (già normalizzata) quando la colonna esiste
+        if "data_ts" in existing_columns:
+            select_clauses = ["data_ts as DATA"]
+        else:
+            select_clauses = ["data as DATA"]
+        select_clauses.append("sorgente as SORGENTE")
+        
+        # Aggiungi DESCRIZIONE se esiste
+        if "descrizione" in existing_columns:
+            select_clauses.append("descrizione as DESCRIZIONE")
+        else:
+            select_clauses.append("NULL as DESCRIZIONE")
+            
+        # Aggiungi FORNITORE
+        select_clauses.append("fornitore as FORNITORE")
+        
+        # Aggiungi colonne opzionali solo se esistono
+        optional_columns = [
+            ("numero_fornitore", "NUMERO FORNITORE"),
+            ("numero_operazione_pos", "NUMERO OPERAZIONE POS")
+        ]
+        
+        for db_col, alias in optional_columns:
+            if db_col in existing_columns:
+                select_clauses.append(f"{db_col} as `{alias}`")
+            else:
+                # Aggiungi NULL come valore di default per colonne mancanti
+                select_clauses.append(f"NULL as `{alias}`")
+        
+        select_clauses.append(f"{self._cents_expression('importo_lordo_pos', existing_columns)} as `IMPORTO LORDO POS`")
+        select_clauses.append(f"{self._cents_expression('commissione_pos', existing_columns)} as `COMMISSIONE POS`")
+        
+        # La colonna dell'importo netto deve sempre esistere
+        select_clauses.append(f"{self._cents_expression('importo_netto', existing_columns)} as `IMPORTO NETTO`")
+        return select_clauses
+    
+    def _read_transactions_df(self, period=None):
+        """
+        Legge le transazioni in un DataFrame con la colonna DATA già in formato datetime64.
+        
+        Gli importi sono restituiti in euro (float) derivati dai centesimi; l'importo
+        netto è disponibile anche come int64 nella colonna NET_CENTS_COLUMN per
+        somme esatte.
+        
+        Args:
+            period: Tupla opzionale (inizio, fine) in secondi dall'epoch, fine esclusa
+        """
+        # Importato alla prima lettura: pandas non serve per aprire la finestra principale
+        import pandas as pd
+        
+        # Solo le partizioni degli anni del periodo vengono aperte
+        with closing(open_history(self.db_path, period, include_archive=False)) as conn:
             # Prima controlla quali colonne esistono nella tabella
             cursor = conn.cursor()
             cursor.execute("PRAGMA table_info(transactions)")
-            columns_info = cursor.fetchall()
-            existing_columns = [col[1] for col in columns_info]
+            existing_columns = [col[1] for col in cursor.fetchall()]
+            has_data_ts = "data_ts" in existing_columns
             
-            # Costruisci la query dinamicamente basandoti sulle colonne esistenti
-            select_clauses = [
-                "data as DATA",
-                "sorgente as SORGENTE"
-            ]
-            
-            # Aggiungi DESCRIZIONE se esiste
-            if "descrizione" in existing_columns:
-                select_clauses.append("descrizione as DESCRIZIONE")
-            else:
-                select_clauses.append("NULL as DESCRIZIONE")
-                
-            # Aggiungi FORNITORE
-            select_clauses.append("fornitore as FORNITORE")
-            
-            # Aggiungi colonne opzionali solo se esistono
-            optional_columns = [
-                ("numero_fornitore", "NUMERO FORNITORE"),
-                ("numero_operazione_pos", "NUMERO OPERAZIONE POS"),
-                ("importo_lordo_pos", "IMPORTO LORDO POS"),
-                ("commissione_pos", "COMMISSIONE POS")
-            ]
-            
-            for db_col, alias in optional_columns:
-                if db_col in existing_columns:
-                    select_clauses.append(f"{db_col} as `{alias}`")
+            where_clause = ""
+            params = ()
+            if period is not None:
+                if has_data_ts:
+                    where_clause = "WHERE data_ts >= ? AND data_ts < ?"
+                    params = period
                 else:
-                    # Aggiungi NULL come valore di default per colonne mancanti
-                    select_clauses.append(f"NULL as `{alias}`")
-            
-            # La colonna importo_netto deve sempre esistere
-            select_clauses.append("importo_netto as `IMPORTO NETTO`")
+                    # Database non migrato: confronta la data testuale
+                    where_clause = "WHERE data >= ? AND data < ?"
+                    params = tuple(
+                        epoch_to_datetime(ts).strftime(DATE_TEXT_FORMAT) for ts in period
+                    )
+            order_column = "data_ts" if has_data_ts else "data"
             
             query = f"""
-                SELECT {', '.join(select_clauses)}
+                SELECT {', '.join(self._build_select_clauses(existing_columns))}
                 FROM transactions 
-                ORDER BY data DESC
+                {where_clause}
+                ORDER BY {order_column} DESC
             """
             
             try:
-                df = pd.read_sql_query(query, conn)
-                return df.to_dict('records')
+                df = pd.read_sql_query(query, conn, params=params)
             except Exception as e:
                 logger.error(f"Errore nel caricamento transazioni: {e}")
                 # Fallback: carica solo le colonne essenziali
-                fallback_query = """
-                    SELECT data as DATA, sorgente as SORGENTE, 
+                fallback_query = f"""
+                    SELECT {"data_ts" if has_data_ts else "data"} as DATA, sorgente as SORGENTE, 
                            COALESCE(descrizione, '') as DESCRIZIONE,
                            fornitore as FORNITORE,
-                           importo_netto as `IMPORTO NETTO`,
+                           {self._cents_expression('importo_netto', existing_columns)} as `IMPORTO NETTO`,
                            NULL as `NUMERO FORNITORE`,
                            NULL as `NUMERO OPERAZIONE POS`,
                            NULL as `IMPORTO LORDO POS`,
                            NULL as `COMMISSIONE POS`
                     FROM transactions 
-                    ORDER BY data DESC
+                    {where_clause}
+                    ORDER BY {order_column} DESC
                 """
-                df = pd.read_sql_query(fallback_query, conn)
-                return df.to_dict('records')
+                df = pd.read_sql_query(fallback_query, conn, params=params)
+        
+        # Anni archiviati del periodo, letti direttamente dai file colonnari
+        archived = [self._read_archived_df(entry, period) for _, entry in archived_years(self.db_path, period)]
+        if has_data_ts and archived:
+            df = pd.concat(([df] if len(df) else []) + archived, ignore_index=True)
+            df = df.sort_values('DATA', ascending=False, kind='stable', ignore_index=True)
+        
+        if has_data_ts:
+            df['DATA'] = epoch_to_datetime(df['DATA'])
+        else:
+            df['DATA'] = pd.to_datetime(df['DATA'], errors='coerce')
+        
+        df[NET_CENTS_COLUMN] = df['IMPORTO NETTO'].fillna(0).astype('int64')
+        for amount_column in ('IMPORTO LORDO POS', 'COMMISSIONE POS', 'IMPORTO NETTO'):
+            df[amount_column] = cents_to_amount(df[amount_column])
+        return df
+    
+    def _read_archived_df(self, entry, period):
+        """Transazioni di un anno archiviato con le colonne di _read_transactions_df (centesimi)."""
+        import pandas as pd
+        data = read_archived_columns(self.db_path, entry, list(_ARCHIVED_COLUMNS), period)
+        columns = {}
+        for column, alias in _ARCHIVED_COLUMNS.items():
+            values, nulls = data[column]
+            if nulls is not None:
+                # Come pd.read_sql_query: interi con NULL diventano float con NaN
+                values = values.astype('float64')
+                values[nulls] = float('nan')
+            columns[alias] = values
+        return pd.DataFrame(columns)
+    
+    def _cached_transactions_df(self, period=None):
+        """DataFrame delle transazioni servito dalla cache finché il database non cambia."""
+        return self.result_cache.get_or_compute(
+            HISTORY_TABLE, ("df", period), lambda: self._read_transactions_df(period=period)
+        )
+    
+    def load_all_transactions_df(self):
+        """Carica tutte le transazioni dal database in un DataFrame (copia modificabile)."""
+        return self._cached_transactions_df().copy()
+    
+    def load_all_transactions(self):
+        """Carica tutte le transazioni dal database (lista condivisa in cache, da non modificare)."""
+        return self.result_cache.get_or_compute(
+            HISTORY_TABLE, ("records", None), lambda: self._cached_transactions_df().to_dict('records')
+        )
+    
+    def load_transactions_by_period_df(self, start_date, end_date):
+        """Carica in un DataFrame le transazioni di un periodo (data finale inclusa)."""
+        return self._cached_transactions_df(period_bounds(start_date, end_date)).copy()
     
     def load_transactions_by_period(self, start_date, end_date):
-        """Carica transazioni per un periodo specifico."""
-        with sqlite3.connect(self.db_path) as conn:
-            # Prima controlla quali colonne esistono nella tabella
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(transactions)")
-            columns_info = cursor.fetchall()
-            existing_columns = [col[1] for col in columns_info]
-            
-            # Costruisci la query dinamicamente basandoti sulle colonne esistenti
-            select_clauses = [
-                "data as DATA",
-                "sorgente as SORGENTE"
-            ]
-            
-            # Aggiungi DESCRIZIONE se esiste
-            if "descrizione" in existing_columns:
-                select_clauses.append("descrizione as DESCRIZIONE")
-            else:
-                select_clauses.append("NULL as DESCRIZIONE")
-                
-            # Aggiungi FORNITORE
-            select_clauses.append("fornitore as FORNITORE")
-            
-            # Aggiungi colonne opzionali solo se esistono
-            optional_columns = [
-                ("numero_fornitore", "NUMERO FORNITORE"),
-                ("numero_operazione_pos", "NUMERO OPERAZIONE POS"),
-                ("importo_lordo_pos", "IMPORTO LORDO POS"),
-                ("commissione_pos", "COMMISSIONE POS")
+        """Carica transazioni per un periodo specifico (lista condivisa in cache, da non modificare)."""
+        period = period_bounds(start_date, end_date)
+        return self.result_cache.get_or_compute(
+            HISTORY_TABLE, ("records", period), lambda: self._cached_transactions_df(period).to_dict('records')
+        )
+    
+    def count_transactions_where(self, conditions, params):
+        """
+        Conta le transazioni che soddisfano le condizioni SQL (unite in AND).
+        
+        Con un filtro su data_ts vengono lette solo le partizioni e gli anni
+        archiviati del periodo (vedi period_from_conditions).
+        """
+        where_clause = " AND ".join(conditions) if conditions else "1"
+        def count():
+            if not conditions:
+                stats, _ = self._read_stats()
+                return stats['total_records']
+            with closing(open_history(self.db_path, period_from_conditions(conditions, params))) as conn:
+                return conn.execute(f"SELECT COUNT(*) FROM transactions WHERE {where_clause}", params).fetchone()[0]
+        return self.result_cache.get_or_compute(HISTORY_TABLE, ("count", where_clause, tuple(params)), count)
+    
+    def delete_transactions_where(self, conditions, params):
+        """
+        Elimina le transazioni che soddisfano le condizioni SQL (unite in AND)
+        e ne rimuove gli hash dall'indice dei duplicati.
+        
+        Returns:
+            int: Numero di record eliminati
+        """
+        where_clause = " AND ".join(conditions) if conditions else "1"
+        # Fuori dal periodo del filtro nessuna riga può corrispondere: partizioni e archivi non servono
+        period = period_from_conditions(conditions, params)
+        with closing(connect(self.db_path)) as conn, conn:
+            partitions = list_partitions(conn, self.db_path, period)
+            attach_partitions(conn, partitions, writable=True)
+            # Negli anni chiusi non si elimina nulla: se il filtro li tocca l'operazione viene rifiutata
+            closed_years = [
+                partition['year'] for partition in partitions
+                if partition['read_only'] and conn.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {partition['alias']}.{HISTORY_TABLE} WHERE {where_clause})",
+                    params
+                ).fetchone()[0]
             ]
+            # Anche gli anni archiviati sono in sola lettura
+            archived = archived_years(self.db_path, period)
+            if archived:
+                load_archive_table(conn, self.db_path, archived, period)
+                for year, entry in archived:
+                    start_ts, end_ts = entry['min_ts'], entry['max_ts']
+                    if conn.execute(
+                        f"SELECT EXISTS (SELECT 1 FROM temp.{ARCHIVE_TABLE} "
+                        f"WHERE data_ts BETWEEN ? AND ? AND {where_clause})", (start_ts, end_ts, *params)
+                    ).fetchone()[0]:
+                        closed_years.append(year)
+            if closed_years:
+                raise ReadOnlyPartitionError(closed_years)
             
-            for db_col, alias in optional_columns:
-                if db_col in existing_columns:
-                    select_clauses.append(f"{db_col} as `{alias}`")
-                else:
-                    # Aggiungi NULL come valore di default per colonne mancanti
-                    select_clauses.append(f"NULL as `{alias}`")
-            
-            # La colonna importo_netto deve sempre esistere
-            select_clauses.append("importo_netto as `IMPORTO NETTO`")
-            
-            query = f"""
-                SELECT {', '.join(select_clauses)}
-                FROM transactions 
-                WHERE data BETWEEN ? AND ?
-                ORDER BY data DESC
-            """
-            
-            try:
-                df = pd.read_sql_query(query, conn, params=(start_date, end_date))
-                return df.to_dict('records')
-            except Exception as e:
-                logger.error(f"Errore nel caricamento transazioni per periodo: {e}")
-                # Fallback: carica solo le colonne essenziali
-                fallback_query = """
-                    SELECT data as DATA, sorgente as SORGENTE, fornitore as FORNITORE,
-                           importo_netto as `IMPORTO NETTO`,
-                           NULL as `DESCRIZIONE`,
-                           NULL as `NUMERO FORNITORE`,
-                           NULL as `NUMERO OPERAZIONE POS`,
-                           NULL as `IMPORTO LORDO POS`,
-                           NULL as `COMMISSIONE POS`
-                    FROM transactions 
-                    WHERE data BETWEEN ? AND ?
-                    ORDER BY data DESC
-                """
-                df = pd.read_sql_query(fallback_query, conn, params=(start_date, end_date))
-                return df.to_dict('records')
+            self.hash_index.ensure_current(conn)
+            deleted_rows = conn.execute(
+                f"SELECT id, data_ts, hash_record FROM transactions WHERE {where_clause}", params
+            ).fetchall()
+            deleted_count = conn.execute(f"DELETE FROM transactions WHERE {where_clause}", params).rowcount
+            self.hash_index.remove(conn, [row[2] for row in deleted_rows if row[2] is not None])
+            for partition in partitions:
+                if partition['read_only']:
+                    continue
+                table = f"{partition['alias']}.{HISTORY_TABLE}"
+                deleted_rows.extend(conn.execute(
+                    f"SELECT id, data_ts, hash_record FROM {table} WHERE {where_clause}", params
+                ).fetchall())
+                deleted_count += conn.execute(f"DELETE FROM {table} WHERE {where_clause}", params).rowcount
+        self.result_cache.invalidate(HISTORY_TABLE)
+        if deleted_count > 0:
+            self.change_bus.emit(DataChange.from_rows(HISTORY_TABLE, DataChange.DELETE, deleted_rows))
+        return deleted_count
+    
+    def delete_all_transactions(self):
+        """
+        Elimina tutte le transazioni e svuota l'indice dei duplicati.
+        
+        Le partizioni vengono eliminate; con anni chiusi l'operazione viene rifiutata.
+        """
+        conn = connect(self.db_path)
+        try:
+            partitions = list_partitions(conn, self.db_path)
+            closed_years = [partition['year'] for partition in partitions if partition['read_only']]
+            closed_years.extend(read_manifest(self.db_path))
+            if closed_years:
+                raise ReadOnlyPartitionError(closed_years)
+            attach_partitions(conn, partitions)
+            partition_count = sum(stats['total_records'] for stats in read_partition_stats(conn, partitions))
+            with conn:
+                deleted_count = clear_table(conn, HISTORY_TABLE, HISTORY_STATS_TABLE) + partition_count
+                conn.execute(f"DELETE FROM {PARTITIONS_TABLE}")
+        finally:
+            conn.close()
+        for partition in partitions:
+            partition['path'].unlink(missing_ok=True)
+        self.hash_index.clear()
+        self.result_cache.invalidate(HISTORY_TABLE)
+        self.change_bus.emit(DataChange(HISTORY_TABLE, DataChange.CLEAR))
+        return deleted_count
     
     def get_database_stats(self):
         """Ottieni statistiche del database."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Conteggio totale
-            total = cursor.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
-            
-            # Prima e ultima data
-            date_range = cursor.execute("""
-                SELECT MIN(data) as min_date, MAX(data) as max_date 
-                FROM transactions
-            """).fetchone()
-            
-            # Dimensione database
-            db_size = self.db_path.stat().st_size / 1024 / 1024  # MB
-            
-            return {
-                'total_records': total,
-                'date_range': date_range,
-                'db_size_mb': round(db_size, 2)
-            }
\ No newline at end of file
+        return dict(self.result_cache.get_or_compute(HISTORY_TABLE, "stats", self._compute_database_stats))
+    
+    def _read_stats(self):
+        """Statistiche della tabella principale e delle partizioni, unite."""
+        with closing(connect(self.db_path)) as conn:
+            partitions = list_partitions(conn, self.db_path)
+            attach_partitions(conn, partitions)
+            stats = merge_table_stats(
+                [read_table_stats(conn, HISTORY_STATS_TABLE)] + read_partition_stats(conn, partitions)
+                # Gli anni archiviati hanno le statistiche nel manifest
+                + [entry['stats'] for entry in read_manifest(self.db_path).values()]
+            )
+        return stats, partitions
+    
+    def _compute_database_stats(self):
+        """Legge le statistiche del database storico (mantenute dai trigger)."""
+        stats, partitions = self._read_stats()
+        
+        # Dimensione database (con i file delle partizioni)
+        db_size = sum(path.stat().st_size for path in [self.db_path] + [p['path'] for p in partitions])
+        db_size = db_size / 1024 / 1024  # MB
+        
+        return {
+            'total_records': stats['total_records'],
+            'date_range': stats_date_range(stats),
+            'db_size_mb': round(db_size, 2),
+            'sources': source_totals(stats)
+        }
+    
+    def check_stats(self):
+        """Differenze tra le statistiche salvate e i dati (lista vuota se coerenti)."""
+        with closing(connect(self.db_path)) as conn:
+            partitions = list_partitions(conn, self.db_path)
+            attach_partitions(conn, partitions)
+            differences = check_table_stats(conn, HISTORY_TABLE, HISTORY_STATS_TABLE)
+            for partition in partitions:
+                # Le differenze delle partizioni riportano anche l'anno (es. "2023/pos")
+                differences.extend(
+                    (f"{partition['year']}/{sorgente}", stored, computed)
+                    for sorgente, stored, computed in check_table_stats(
+                        conn, f"{partition['alias']}.{HISTORY_TABLE}",
+                        f"{partition['alias']}.{PARTITION_STATS_TABLE}"
+                    )
+                )
+        return differences
+    
+    def rebuild_stats(self):
+        """Ricalcola le statistiche dai dati (anche quelle delle partizioni chiuse)."""
+        with closing(connect(self.db_path)) as conn, conn:
+            partitions = list_partitions(conn, self.db_path)
+            rebuild_table_stats(conn, HISTORY_TABLE, HISTORY_STATS_TABLE)
+        for partition in partitions:
+            with closing(sqlite3.connect(partition['path'])) as partition_conn, partition_conn:
+                rebuild_table_stats(partition_conn, HISTORY_TABLE, PARTITION_STATS_TABLE)
+        self.result_cache.invalidate(HISTORY_TABLE)
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Indice in memoria degli hash dei record già salvati, per scartare i duplicati
+prima di eseguire qualsiasi INSERT.
+
+Gli hash (interi a 64 bit, vedi record_hash) sono tenuti in un array numpy
+ordinato: la ricerca di un batch è un'unica np.searchsorted ed è esatta (nessun
+falso positivo, a differenza di un Bloom filter). L'array viene costruito alla
+prima richiesta, salvato accanto al database e considerato valido finché il
+numero di righe e l'id massimo della tabella coincidono con quelli salvati.
+numpy viene importato solo quando l'indice viene usato, non all'avvio.
+"""
+import logging
+import os
+import sqlite3
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def get_hash_index_path(db_path) -> Path:
+    """File dell'indice degli hash associato a un database (es. barflow_history.hashes.npz)."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.hashes.npz")
+
+
+class HashIndex:
+    """Array ordinato degli hash di una tabella, persistito su file."""
+
+    def __init__(self, db_path, table_name, stats_table=None):
+        self.table_name = table_name
+        # Tabella delle statistiche mantenute dai trigger (vedi table_stats), se presente
+        self.stats_table = stats_table
+        self.index_path = get_hash_index_path(db_path)
+        self._hashes = None
+        self._signature = None
+
+    def _table_signature(self, conn):
+        """Numero di righe e id massimo della tabella: cambiano a ogni inserimento o eliminazione."""
+        max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table_name}").fetchone()[0]
+        count = None
+        if self.stats_table is not None:
+            # Conteggio letto dalle statistiche invece di un COUNT(*) sull'intera tabella
+            try:
+                count = conn.execute(
+                    f"SELECT COALESCE(SUM(row_count), 0) FROM {self.stats_table}"
+                ).fetchone()[0]
+            except sqlite3.OperationalError:
+                count = None
+        if count is None:
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table_name}").fetchone()[0]
+        return int(count), int(max_id)
+
+    def _load_from_file(self, signature):
+        """Carica l'indice salvato se corrisponde allo stato attuale della tabella."""
+        import numpy as np
+        if not self.index_path.exists():
+            return False
+        try:
+            with np.load(self.index_path) as saved:
+                if tuple(int(value) for value in saved["signature"]) != signature:
+                    return False
+                self._hashes = saved["hashes"].astype(np.int64, copy=False)
+        except Exception as e:
+            logger.warning(f"Indice degli hash non leggibile, verrà ricostruito: {e}")
+            return False
+        self._signature = signature
+        return True
+
+    def rebuild(self, conn):
+        """Ricostruisce l'indice dalla tabella anche se la firma non è cambiata."""
+        self._rebuild(conn, self._table_signature(conn))
+
+    def _rebuild(self, conn, signature):
+        """Ricostruisce l'indice leggendo gli hash dalla tabella."""
+        import numpy as np
+        hashes = np.fromiter(
+            (row[0] for row in conn.execute(
+                f"SELECT hash_record FROM {self.table_name} WHERE hash_record IS NOT NULL"
+            )),
+            dtype=np.int64,
+        )
+        self._hashes = np.unique(hashes)
+        self._signature = signature
+        self._save()
+        logger.info(f"Indice degli hash ricostruito: {len(self._hashes)} hash ({self.table_name})")
+
+    def _save(self):
+        """Salva l'indice su file (scrittura atomica)."""
+        import numpy as np
+        temp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(f, hashes=self._hashes, signature=np.array(self._signature, dtype=np.int64))
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Impossibile salvare l'indice degli hash: {e}")
+
+    def ensure_current(self, conn):
+        """Carica o ricostruisce l'indice se non corrisponde più alla tabella."""
+        signature = self._table_signature(conn)
+        if self._hashes is not None and self._signature == signature:
+            return
+        if not self._load_from_file(signature):
+            self._rebuild(conn, signature)
+
+    def contains(self, hashes):
+        """Restituisce un array booleano: True per gli hash già presenti nella tabella."""
+        import numpy as np
+        hashes = np.asarray(hashes, dtype=np.int64)
+        if self._hashes is None or len(self._hashes) == 0 or len(hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(self._hashes, hashes)
+        positions[positions == len(self._hashes)] = 0
+        return self._hashes[positions] == hashes
+
+    def add(self, conn, hashes):
+        """Aggiunge gli hash appena inseriti e aggiorna la firma della tabella."""
+        import numpy as np
+        self._hashes = np.union1d(self._hashes, np.asarray(hashes, dtype=np.int64))
+        self._signature = self._table_signature(conn)
+        self._save()
+
+    def remove(self, conn, hashes):
+        """Rimuove gli hash dei record eliminati e aggiorna la firma della tabella."""
+        import numpy as np
+        self._hashes = np.setdiff1d(self._hashes, np.asarray(hashes, dtype=np.int64), assume_unique=True)
+        self._signature = self._table_signature(conn)
+        self._save()
+
+    def clear(self):
+        """Svuota l'indice ed elimina il file salvato."""
+        self._hashes = None
+        self._signature = None
+        try:
+            self.index_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Impossibile eliminare l'indice degli hash: {e}")
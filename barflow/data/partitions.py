@@ -0,0 +1,452 @@
+"""
+Partizionamento per anno dello storico delle transazioni.
+
+Il partizionamento è opzionale: finché nessun anno viene partizionato tutto
+resta nella tabella transactions di barflow_history.db e nulla cambia.
+Partizionando un anno le sue transazioni vengono spostate in un file a parte
+(barflow_history_partitions/transactions_AAAA.db, stessa struttura della
+tabella, con indici e statistiche propri) registrato nella tabella
+history_partitions (migrazione 013). Scansioni, VACUUM e backup del database
+principale non toccano più gli anni partizionati. Gli id restano unici su
+tutto lo storico: anche le righe inserite nelle partizioni prendono l'id dalla
+sequenza AUTOINCREMENT di transactions.
+
+Lettura: open_history() apre il database storico, collega (ATTACH) solo le
+partizioni degli anni che si sovrappongono al periodo richiesto e crea la vista
+temporanea `transactions` (UNION ALL), che nasconde la tabella principale:
+le query esistenti (caricamento, esportazioni, report) leggono tutto lo
+storico senza modifiche, e le partizioni fuori dal periodo non vengono aperte.
+Anche gli anni archiviati (vedi archive) del periodo entrano nella vista.
+Le connessioni di scrittura non hanno la vista e usano main.transactions e le
+partizioni collegate con attach_partitions().
+
+Un anno chiuso (read_only) viene collegato sempre in sola lettura (mode=ro):
+inserimenti ed eliminazioni che lo toccano vengono rifiutati con
+ReadOnlyPartitionError finché l'anno non viene riaperto. SQLite collega al
+massimo 10 database per connessione (SQLITE_MAX_ATTACHED): split_year rifiuta
+l'undicesima partizione, gli anni più vecchi vanno prima archiviati (vedi archive).
+
+Da riga di comando:
+    python -m barflow.data.partitions list
+    python -m barflow.data.partitions split ANNO [--read-only] [--vacuum]
+    python -m barflow.data.partitions close ANNO | reopen ANNO | merge ANNO [--vacuum]
+"""
+import calendar
+import logging
+import re
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from .table_stats import install_table_stats, read_table_stats
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_TABLE = "history_partitions"
+# Tabella e statistiche, con lo stesso nome nel database principale e nelle partizioni
+PARTITION_TABLE = "transactions"
+PARTITION_STATS_TABLE = "transaction_stats"
+
+# Righe per query IN (...) nel controllo degli hash (limite dei parametri SQLite)
+HASH_QUERY_BATCH = 500
+
+# Database collegabili con ATTACH a una connessione (limite predefinito di SQLite):
+# una lettura dell'intero storico collega tutte le partizioni
+SQLITE_MAX_ATTACHED = 10
+
+# Confronto di data_ts con un parametro, es. "data_ts >= ?" (vedi period_from_conditions)
+_DATA_TS_CONDITION = re.compile(r"^\s*data_ts\s*(>=|<=|>|<|=)\s*\?\s*$")
+
+
+class ReadOnlyPartitionError(ValueError):
+    """Modifica rifiutata perché tocca anni chiusi (partizioni in sola lettura)."""
+
+    def __init__(self, years):
+        self.years = sorted(years)
+        super().__init__(
+            f"Anni chiusi in sola lettura: {', '.join(str(year) for year in self.years)}. "
+            f"Riaprili (python -m barflow.data.partitions reopen ANNO) o ripristinali "
+            f"dall'archivio (python -m barflow.data.archive restore ANNO) prima di modificarli."
+        )
+
+
+def get_partitions_directory(db_path) -> Path:
+    """Cartella dei file delle partizioni di un database (es. barflow_history_partitions)."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_partitions")
+
+
+def year_bounds(year):
+    """Estremi [inizio, fine) dell'anno in secondi dall'epoch, come data_ts."""
+    return calendar.timegm((year, 1, 1, 0, 0, 0)), calendar.timegm((year + 1, 1, 1, 0, 0, 0))
+
+
+def period_from_conditions(conditions, params):
+    """
+    Periodo di data_ts ricavato dalle condizioni SQL di un filtro (unite in AND).
+
+    Vengono considerati solo i confronti semplici "data_ts >= ?", "data_ts < ?" e
+    simili, anche uniti in AND nella stessa condizione; le condizioni con OR o
+    parentesi non restringono il periodo.
+
+    Returns:
+        Tupla (inizio, fine) in secondi con fine esclusa (None per un estremo
+        aperto), o None se il filtro non limita data_ts
+    """
+    start = end = None
+    position = 0
+    for condition in conditions:
+        simple = "(" not in condition and not re.search(r"\bOR\b", condition, re.IGNORECASE)
+        for part in re.split(r"\bAND\b", condition, flags=re.IGNORECASE) if simple else [condition]:
+            # I parametri seguono l'ordine dei "?" nelle condizioni
+            count = part.count("?")
+            value = params[position] if count == 1 and position < len(params) else None
+            position += count
+            match = _DATA_TS_CONDITION.match(part) if simple else None
+            if match is None or not isinstance(value, (int, float)):
+                continue
+            operator = match.group(1)
+            low = value if operator in (">=", "=") else int(value) + 1 if operator == ">" else None
+            high = int(value) + 1 if operator in ("<=", "=") else value if operator == "<" else None
+            if low is not None:
+                start = low if start is None else max(start, low)
+            if high is not None:
+                end = high if end is None else min(end, high)
+    if start is None and end is None:
+        return None
+    return start, end
+
+
+def record_year(data_text):
+    """Anno di una data in formato testo 'AAAA-MM-GG...' (None se non riconoscibile)."""
+    if data_text and len(data_text) >= 10 and data_text[:4].isdigit() and data_text[4] == '-':
+        return int(data_text[:4])
+    return None
+
+
+def connect(db_path):
+    """
+    Connessione al database storico che permette di collegare le partizioni in sola lettura.
+
+    `with conn:` gestisce solo la transazione: la connessione (e i file delle
+    partizioni collegate) va chiusa, es. con contextlib.closing.
+    """
+    return sqlite3.connect(Path(db_path).resolve().as_uri(), uri=True)
+
+
+def list_partitions(conn, db_path, period=None):
+    """
+    Partizioni registrate nel database, in ordine di anno.
+
+    Args:
+        conn: Connessione al database storico
+        db_path: Percorso del database (per trovare i file delle partizioni)
+        period: Tupla opzionale (inizio, fine) in secondi, fine esclusa e None per
+            un estremo aperto: solo le partizioni degli anni che si sovrappongono
+
+    Returns:
+        Lista di dizionari con year, path, read_only e alias (nome del database collegato)
+    """
+    try:
+        rows = conn.execute(
+            f"SELECT year, file_name, read_only FROM main.{PARTITIONS_TABLE} ORDER BY year"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Database non ancora migrato alla versione 13: nessuna partizione
+        return []
+    directory = get_partitions_directory(db_path)
+    partitions = []
+    for year, file_name, read_only in rows:
+        if period is not None:
+            start, end = year_bounds(year)
+            if (period[1] is not None and start >= period[1]) or (period[0] is not None and end <= period[0]):
+                continue
+        partitions.append({
+            'year': year,
+            'path': directory / file_name,
+            'read_only': bool(read_only),
+            'alias': f"p{year}",
+        })
+    return partitions
+
+
+def attach_partitions(conn, partitions, writable=False):
+    """
+    Collega le partizioni alla connessione (fuori da una transazione).
+
+    Con writable=True gli anni aperti vengono collegati in lettura e scrittura;
+    gli anni chiusi sono sempre in sola lettura.
+    """
+    for partition in partitions:
+        mode = "rw" if writable and not partition['read_only'] else "ro"
+        conn.execute(f"ATTACH DATABASE ? AS {partition['alias']}",
+                     (f"{partition['path'].resolve().as_uri()}?mode={mode}",))
+
+
+def _table_columns(conn, schema):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({PARTITION_TABLE})")]
+
+
+def create_history_view(conn, partitions, archive_table=None):
+    """
+    Crea la vista temporanea `transactions` con la tabella principale, le
+    partizioni collegate e l'eventuale tabella temporanea degli anni archiviati.
+    Le colonne sono quelle della tabella principale: una partizione creata prima
+    di una migrazione restituisce NULL per le colonne nuove.
+    """
+    columns = _table_columns(conn, "main")
+    selects = [f"SELECT {', '.join(columns)} FROM main.{PARTITION_TABLE}"]
+    for partition in partitions:
+        existing = set(_table_columns(conn, partition['alias']))
+        select_list = ", ".join(column if column in existing else f"NULL AS {column}" for column in columns)
+        selects.append(f"SELECT {select_list} FROM {partition['alias']}.{PARTITION_TABLE}")
+    if archive_table is not None:
+        selects.append(f"SELECT {', '.join(columns)} FROM temp.{archive_table}")
+    conn.execute(f"CREATE TEMP VIEW {PARTITION_TABLE} AS " + " UNION ALL ".join(selects))
+
+
+def open_history(db_path, period=None, after_id=None, include_archive=True):
+    """
+    Apre il database storico in lettura su tutte le partizioni del periodo.
+    La connessione va chiusa dal chiamante (vedi connect).
+
+    Senza partizioni né anni archiviati è una normale connessione; altrimenti
+    `transactions` è la vista sulla tabella principale e sulle sole partizioni
+    e sui soli anni archiviati che si sovrappongono al periodo (vedi
+    list_partitions e archive.archived_years).
+
+    Args:
+        db_path: Percorso del database storico
+        period: Tupla opzionale (inizio, fine) in secondi, None per un estremo aperto
+        after_id: La query legge solo id maggiori: gli anni archiviati con id
+            minori non vengono caricati
+        include_archive: False per non leggere gli anni archiviati
+    """
+    from .archive import ARCHIVE_TABLE, archived_years, load_archive_table
+    conn = connect(db_path)
+    partitions = list_partitions(conn, db_path, period)
+    archived = archived_years(db_path, period, after_id) if include_archive else []
+    if partitions:
+        attach_partitions(conn, partitions)
+    if archived:
+        load_archive_table(conn, db_path, archived, period)
+    if partitions or archived:
+        create_history_view(conn, partitions, ARCHIVE_TABLE if archived else None)
+    return conn
+
+
+def allocate_ids(conn, count):
+    """
+    Riserva count id dalla sequenza AUTOINCREMENT di transactions, per le righe
+    inserite nelle partizioni.
+
+    Returns:
+        Il primo id riservato
+    """
+    last_id = conn.execute(f"""
+        SELECT MAX(
+            COALESCE((SELECT seq FROM main.sqlite_sequence WHERE name = '{PARTITION_TABLE}'), 0),
+            (SELECT COALESCE(MAX(id), 0) FROM main.{PARTITION_TABLE})
+        )
+    """).fetchone()[0]
+    updated = conn.execute(
+        "UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?", (last_id + count, PARTITION_TABLE)
+    ).rowcount
+    if not updated:
+        conn.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)", (PARTITION_TABLE, last_id + count))
+    return last_id + 1
+
+
+def existing_hashes(conn, partition, hashes):
+    """Hash già presenti nella partizione (collegata) tra quelli indicati."""
+    hashes = list(hashes)
+    found = set()
+    for start in range(0, len(hashes), HASH_QUERY_BATCH):
+        batch = hashes[start:start + HASH_QUERY_BATCH]
+        found.update(row[0] for row in conn.execute(
+            f"SELECT hash_record FROM {partition['alias']}.{PARTITION_TABLE} "
+            f"WHERE hash_record IN ({', '.join('?' * len(batch))})", batch
+        ))
+    return found
+
+
+def read_partition_stats(conn, partitions):
+    """Statistiche (vedi table_stats.read_table_stats) delle partizioni collegate."""
+    return [read_table_stats(conn, f"{partition['alias']}.{PARTITION_STATS_TABLE}") for partition in partitions]
+
+
+def _find_partition(conn, db_path, year):
+    for partition in list_partitions(conn, db_path):
+        if partition['year'] == year:
+            return partition
+    raise ValueError(f"L'anno {year} non è partizionato")
+
+
+def _create_partition_file(path, schema):
+    """Crea il file della partizione con la struttura della tabella principale."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(path)) as partition_conn, partition_conn:
+        for sql in schema:
+            partition_conn.execute(sql)
+        install_table_stats(partition_conn, PARTITION_TABLE, PARTITION_STATS_TABLE)
+
+
+def split_year(db_path, year, read_only=False, vacuum=False):
+    """
+    Sposta le transazioni di un anno dalla tabella principale a una partizione.
+
+    Copia ed eliminazione avvengono in un'unica transazione sui due file.
+
+    Args:
+        db_path: Percorso del database storico
+        year: Anno da partizionare
+        read_only: Chiude subito l'anno (partizione in sola lettura)
+        vacuum: Compatta il database principale dopo lo spostamento
+
+    Returns:
+        int: Numero di transazioni spostate
+    """
+    db_path = Path(db_path)
+    conn = connect(db_path)
+    created_path = None
+    try:
+        partitions = list_partitions(conn, db_path)
+        if any(partition['year'] == year for partition in partitions):
+            raise ValueError(f"L'anno {year} è già partizionato")
+        if len(partitions) >= SQLITE_MAX_ATTACHED:
+            raise ValueError(
+                f"Già {len(partitions)} anni partizionati: SQLite collega al massimo "
+                f"{SQLITE_MAX_ATTACHED} database per connessione. Archiviare prima gli anni più "
+                f"vecchi (python -m barflow.data.archive archive ANNO)"
+            )
+        path = get_partitions_directory(db_path) / f"{PARTITION_TABLE}_{year}.db"
+        if path.exists():
+            raise ValueError(f"Il file della partizione esiste già: {path}")
+        schema = [row[0] for row in conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') "
+            "AND sql IS NOT NULL ORDER BY type DESC", (PARTITION_TABLE,)
+        )]
+        _create_partition_file(path, schema)
+        created_path = path
+
+        partition = {'year': year, 'path': path, 'read_only': False, 'alias': "target"}
+        attach_partitions(conn, [partition], writable=True)
+        start, end = year_bounds(year)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            moved = conn.execute(
+                f"INSERT INTO target.{PARTITION_TABLE} SELECT * FROM main.{PARTITION_TABLE} "
+                f"WHERE data_ts >= ? AND data_ts < ?", (start, end)
+            ).rowcount
+            conn.execute(f"DELETE FROM main.{PARTITION_TABLE} WHERE data_ts >= ? AND data_ts < ?", (start, end))
+            conn.execute(f"INSERT INTO main.{PARTITIONS_TABLE} (year, file_name, read_only) VALUES (?, ?, ?)",
+                         (year, path.name, int(read_only)))
+        conn.execute("DETACH DATABASE target")
+        created_path = None
+        logger.info(f"Anno {year} partizionato: {moved} transazioni spostate")
+        if vacuum:
+            conn.execute("VACUUM")
+        return moved
+    finally:
+        conn.close()
+        # Spostamento non riuscito (transazione annullata): il file creato viene rimosso
+        if created_path is not None:
+            created_path.unlink(missing_ok=True)
+
+
+def merge_year(db_path, year, vacuum=False):
+    """
+    Riporta le transazioni di una partizione (anche chiusa) nella tabella
+    principale ed elimina il file della partizione.
+
+    Returns:
+        int: Numero di transazioni riportate
+    """
+    db_path = Path(db_path)
+    conn = connect(db_path)
+    try:
+        partition = _find_partition(conn, db_path, year)
+        attach_partitions(conn, [partition])
+        columns = set(_table_columns(conn, partition['alias']))
+        column_list = ", ".join(column for column in _table_columns(conn, "main") if column in columns)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            merged = conn.execute(
+                f"INSERT INTO main.{PARTITION_TABLE} ({column_list}) "
+                f"SELECT {column_list} FROM {partition['alias']}.{PARTITION_TABLE}"
+            ).rowcount
+            conn.execute(f"DELETE FROM main.{PARTITIONS_TABLE} WHERE year = ?", (year,))
+        conn.execute(f"DETACH DATABASE {partition['alias']}")
+        partition['path'].unlink()
+        logger.info(f"Partizione {year} riportata nel database principale: {merged} transazioni")
+        if vacuum:
+            conn.execute("VACUUM")
+        return merged
+    finally:
+        conn.close()
+
+
+def set_read_only(db_path, year, read_only):
+    """Chiude (sola lettura) o riapre un anno partizionato."""
+    with closing(connect(db_path)) as conn, conn:
+        updated = conn.execute(
+            f"UPDATE main.{PARTITIONS_TABLE} SET read_only = ? WHERE year = ?", (int(read_only), year)
+        ).rowcount
+    if not updated:
+        raise ValueError(f"L'anno {year} non è partizionato")
+
+
+def main(argv=None):
+    """Gestione delle partizioni del database storico da riga di comando."""
+    import argparse
+    import sys
+    from .db_manager import get_db_path, initialize_and_migrate_db
+
+    parser = argparse.ArgumentParser(description="Partizionamento per anno dello storico")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Elenca gli anni partizionati")
+    split_parser = commands.add_parser("split", help="Sposta un anno in una partizione")
+    split_parser.add_argument("--read-only", action="store_true", help="Chiude subito l'anno")
+    merge_parser = commands.add_parser("merge", help="Riporta un anno nel database principale")
+    for command_parser in (split_parser, merge_parser):
+        command_parser.add_argument("--vacuum", action="store_true",
+                                    help="Compatta il database principale al termine")
+    commands.add_parser("close", help="Chiude un anno (sola lettura)")
+    commands.add_parser("reopen", help="Riapre un anno chiuso")
+    for name in ("split", "merge", "close", "reopen"):
+        commands.choices[name].add_argument("year", type=int, help="Anno")
+    args = parser.parse_args(argv)
+
+    initialize_and_migrate_db()
+    db_path = get_db_path()
+    try:
+        if args.command == "split":
+            moved = split_year(db_path, args.year, read_only=args.read_only, vacuum=args.vacuum)
+            print(f"✓ Anno {args.year}: {moved} transazioni spostate nella partizione")
+        elif args.command == "merge":
+            merged = merge_year(db_path, args.year, vacuum=args.vacuum)
+            print(f"✓ Anno {args.year}: {merged} transazioni riportate nel database principale")
+        elif args.command in ("close", "reopen"):
+            set_read_only(db_path, args.year, args.command == "close")
+            print(f"✓ Anno {args.year} {'chiuso in sola lettura' if args.command == 'close' else 'riaperto'}")
+        else:
+            conn = connect(db_path)
+            try:
+                partitions = list_partitions(conn, db_path)
+                attach_partitions(conn, partitions)
+                if not partitions:
+                    print("Nessun anno partizionato")
+                for partition, stats in zip(partitions, read_partition_stats(conn, partitions)):
+                    size_mb = partition['path'].stat().st_size / 1024 / 1024
+                    state = "🔒 chiuso" if partition['read_only'] else "aperto"
+                    print(f"{partition['year']}: {stats['total_records']} transazioni, "
+                          f"{size_mb:.2f} MB, {state} ({partition['path']})")
+            finally:
+                conn.close()
+    except (ValueError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
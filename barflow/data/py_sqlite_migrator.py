@@ -1,13 +1,178 @@
+"""
+Migrazioni dello schema SQLite.
+
+Le migrazioni sono file NNN_nome.sql o NNN_nome.py di un package, applicati in
+ordine di numero. Ognuna viene eseguita in una transazione esplicita (BEGIN
+IMMEDIATE) insieme all'aggiornamento della versione: se fallisce non resta
+applicata a metà.
+
+Le migrazioni Python possono definire:
+    upgrade(cursor)          modifiche dello schema, eseguite nella transazione
+    copy_batches(migration)  copia dei dati a blocchi, eseguita prima di upgrade
+
+copy_batches riceve un MigrationRun: ogni blocco viene confermato nella sua
+transazione insieme al punto raggiunto (salvato in _migration_log), quindi una
+copia interrotta (chiusura dell'applicazione, MigrationInterrupted) riprende
+dal blocco successivo al prossimo avvio. _migration_log registra anche stato e
+durata di ogni migrazione.
+"""
 import sqlite3
 import os
 import re
-import importlib.resources
+import importlib
+import time
 from pathlib import Path
 import logging
 import sys
 
 logger = logging.getLogger(__name__)
 
+# Righe copiate in ogni transazione dalle migrazioni a blocchi
+MIGRATION_BATCH_SIZE = 20000
+
+_LOG_TABLE = """
+    CREATE TABLE IF NOT EXISTS _migration_log (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        duration_ms REAL NOT NULL DEFAULT 0,
+        rows_copied INTEGER NOT NULL DEFAULT 0,
+        checkpoint INTEGER
+    )
+"""
+
+
+class MigrationInterrupted(Exception):
+    """Migrazione interrotta tra due blocchi: riprende dal punto raggiunto al prossimo avvio."""
+
+
+def table_exists(cursor, table_name) -> bool:
+    """Verifica se una tabella esiste nel database."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+    return cursor.fetchone() is not None
+
+
+def get_user_version(conn) -> int:
+    """Versione dello schema registrata nell'intestazione del file (PRAGMA user_version)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_user_version(conn, version: int):
+    """Registra la versione dello schema nell'intestazione del file."""
+    # PRAGMA non accetta parametri: il valore viene convertito a intero
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+class MigrationRun:
+    """
+    Contesto passato a copy_batches(migration) di una migrazione Python.
+
+    Copia le righe di una tabella in un'altra a blocchi di id crescenti. Ogni
+    blocco è una transazione che aggiorna anche il punto raggiunto in
+    _migration_log: dopo un'interruzione la copia riprende da lì.
+    """
+
+    def __init__(self, conn, version, name, progress=None, is_cancelled=None,
+                 batch_size=MIGRATION_BATCH_SIZE):
+        self.conn = conn
+        self.version = version
+        self.name = name
+        self.batch_size = batch_size
+        self._progress = progress
+        self._is_cancelled = is_cancelled
+
+    def copy_table(self, source, target, create_target, insert_columns, select_columns,
+                   transform=None, or_ignore=False):
+        """
+        Copia le righe di source in target a blocchi di batch_size.
+
+        Senza transform ogni blocco viene copiato da SQLite con INSERT ... SELECT;
+        con transform le righe lette vengono trasformate in Python e inserite
+        con executemany.
+
+        Args:
+            source: Tabella di origine (con chiave id)
+            target: Tabella di destinazione
+            create_target: CREATE TABLE della destinazione, eseguita all'inizio della copia
+            insert_columns: Colonne di target da valorizzare
+            select_columns: Espressioni lette da source, nello stesso ordine
+            transform: Funzione opzionale righe lette -> righe da inserire
+            or_ignore: Usa INSERT OR IGNORE (righe che violano un vincolo scartate)
+
+        Returns:
+            Numero di righe di source copiate (anche nelle esecuzioni precedenti)
+        """
+        conn = self.conn
+        checkpoint, copied = conn.execute(
+            "SELECT checkpoint, rows_copied FROM _migration_log WHERE version = ?", (self.version,)
+        ).fetchone()
+        if checkpoint is None:
+            # Prima esecuzione: la destinazione viene (ri)creata vuota insieme al punto di partenza
+            self._begin()
+            conn.execute(f"DROP TABLE IF EXISTS {target}")
+            conn.execute(create_target)
+            checkpoint, copied = 0, 0
+            self._save_checkpoint(checkpoint, copied)
+            conn.commit()
+        elif copied:
+            logger.info(f"Ripresa della migrazione {self.name} da {copied} righe copiate")
+
+        total = copied + conn.execute(f"SELECT COUNT(*) FROM {source} WHERE id > ?", (checkpoint,)).fetchone()[0]
+        insert = f"INSERT {'OR IGNORE ' if or_ignore else ''}INTO {target} ({insert_columns})"
+        select = f"SELECT {select_columns} FROM {source} WHERE id > ? AND id <= ? ORDER BY id"
+        self._notify(copied, total)
+
+        while True:
+            if self._is_cancelled is not None and self._is_cancelled():
+                raise MigrationInterrupted(f"Migrazione {self.name} interrotta dopo {copied} righe")
+            # Ultimo id del blocco: con id univoci l'intervallo contiene batch_size righe
+            row = conn.execute(
+                f"SELECT id FROM {source} WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                (checkpoint, self.batch_size - 1)
+            ).fetchone()
+            if row is not None:
+                last_id, batch_rows = row[0], self.batch_size
+            else:
+                batch_rows, last_id = conn.execute(
+                    f"SELECT COUNT(*), MAX(id) FROM {source} WHERE id > ?", (checkpoint,)
+                ).fetchone()
+                if not batch_rows:
+                    break
+
+            self._begin()
+            try:
+                if transform is None:
+                    conn.execute(f"{insert} {select}", (checkpoint, last_id))
+                else:
+                    rows = transform(conn.execute(select, (checkpoint, last_id)).fetchall())
+                    if rows:
+                        placeholders = ", ".join("?" * len(rows[0]))
+                        conn.executemany(f"{insert} VALUES ({placeholders})", rows)
+                checkpoint, copied = last_id, copied + batch_rows
+                self._save_checkpoint(checkpoint, copied)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self._notify(copied, total)
+        return copied
+
+    def _begin(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def _save_checkpoint(self, checkpoint, copied):
+        self.conn.execute(
+            "UPDATE _migration_log SET checkpoint = ?, rows_copied = ? WHERE version = ?",
+            (checkpoint, copied, self.version)
+        )
+
+    def _notify(self, copied, total):
+        if self._progress is not None:
+            self._progress(self.name, copied, total)
+
+
 class PySQLiteMigrator:
     def __init__(self, db_path: str, migrations_package: str):
         self.db_path = db_path
@@ -39,6 +204,8 @@ class PySQLiteMigrator:
             raise
 
     def _get_migration_scripts(self) -> list:
+        # importlib.resources serve solo quando le migrazioni vanno controllate
+        import importlib.resources
         scripts = []
         try:
             # Usa importlib.resources per accedere ai file nelle migrazioni
@@ -52,38 +219,107 @@ class PySQLiteMigrator:
             logger.warning(f"No migration scripts found: {e}")
         return sorted(scripts, key=lambda x: x[0])
 
-    def apply_migrations(self):
+    def _start_log(self, conn, version, name):
+        """Registra l'inizio (o la ripresa) di una migrazione in _migration_log."""
+        conn.execute(
+            "INSERT OR IGNORE INTO _migration_log (version, name, status) VALUES (?, ?, 'running')",
+            (version, name)
+        )
+        # Una migrazione già completata e ora ripetuta (versione riportata indietro) riparte da zero
+        conn.execute(
+            """UPDATE _migration_log
+               SET checkpoint = CASE WHEN status = 'done' THEN NULL ELSE checkpoint END,
+                   rows_copied = CASE WHEN status = 'done' THEN 0 ELSE rows_copied END,
+                   duration_ms = CASE WHEN status = 'done' THEN 0 ELSE duration_ms END,
+                   status = 'running', started_at = CURRENT_TIMESTAMP
+               WHERE version = ?""",
+            (version,)
+        )
+        conn.commit()
+
+    def _finish_log(self, conn, version, status, elapsed):
+        """Aggiorna stato e durata (sommata alle esecuzioni precedenti) di una migrazione."""
+        conn.execute(
+            """UPDATE _migration_log
+               SET status = ?, duration_ms = duration_ms + ?,
+                   finished_at = CASE WHEN ? = 'done' THEN CURRENT_TIMESTAMP END
+               WHERE version = ?""",
+            (status, round(elapsed * 1000, 3), status, version)
+        )
+
+    def _run_migration(self, conn, version, script_ref, name, progress, is_cancelled, batch_size):
+        """Esegue una migrazione; la transazione finale resta aperta per il chiamante."""
+        cursor = conn.cursor()
+        if script_ref.name.endswith(".sql"):
+            # executescript conferma la transazione in corso: la BEGIN è parte dello script,
+            # così tutte le istruzioni restano in un'unica transazione
+            cursor.executescript("BEGIN IMMEDIATE;\n" + script_ref.read_text(encoding="utf-8"))
+        elif script_ref.name.endswith(".py"):
+            module_name = f"{self.migrations_package}.{script_ref.stem}"
+            migration_module = importlib.import_module(module_name)
+            if hasattr(migration_module, 'copy_batches'):
+                migration_module.copy_batches(
+                    MigrationRun(conn, version, name, progress, is_cancelled, batch_size)
+                )
+            conn.execute("BEGIN IMMEDIATE")
+            if hasattr(migration_module, 'upgrade'):
+                migration_module.upgrade(cursor)
+        self._set_db_version(cursor, version)
+
+    def apply_migrations(self, progress=None, is_cancelled=None, batch_size=MIGRATION_BATCH_SIZE) -> int:
+        """
+        Applica le migrazioni non ancora eseguite.
+
+        Al termine la versione raggiunta viene registrata anche in
+        PRAGMA user_version, che all'avvio permette di riconoscere un database
+        aggiornato senza elencare le migrazioni.
+
+        Args:
+            progress: Callback opzionale progress(nome migrazione, righe copiate, totale)
+                      chiamato dalle migrazioni a blocchi
+            is_cancelled: Callback opzionale controllato prima di ogni blocco;
+                          se restituisce True viene sollevata MigrationInterrupted
+            batch_size: Righe copiate in ogni transazione
+
+        Returns:
+            La versione dello schema dopo le migrazioni
+        """
         conn = None
         try:
             conn = sqlite3.connect(self.db_path)
+            # Cache più ampia per le copie a blocchi (lettura e scrittura si alternano)
+            conn.execute("PRAGMA cache_size = -65536")
             cursor = conn.cursor()
             current_version = self._get_db_version(cursor)
+            conn.execute(_LOG_TABLE)
+            conn.commit()
             migrations = self._get_migration_scripts()
 
             for version, script_ref, name in migrations:
                 if version > current_version:
                     logger.info(f"Applying migration: {name} (v{version})")
+                    self._start_log(conn, version, name)
+                    start = time.perf_counter()
                     try:
-                        # Non usiamo BEGIN/COMMIT esplicite, lasciamo che SQLite gestisca
-                        # le transazioni automaticamente
-                        if script_ref.name.endswith(".sql"):
-                            cursor.executescript(script_ref.read_text(encoding="utf-8"))
-                        elif script_ref.name.endswith(".py"):
-                            module_name = f"{self.migrations_package}.{script_ref.stem}"
-                            migration_module = importlib.import_module(module_name)
-                            if hasattr(migration_module, 'upgrade'):
-                                migration_module.upgrade(cursor)
-
-                        self._set_db_version(cursor, version)
-                        conn.commit()  # Commit esplicito dopo ogni migrazione
+                        self._run_migration(conn, version, script_ref, name, progress, is_cancelled, batch_size)
+                        self._finish_log(conn, version, "done", time.perf_counter() - start)
+                        conn.commit()  # Migrazione, versione e registro confermati insieme
                         current_version = version
-                        logger.info(f"Successfully applied migration: {name}")
-                    except Exception as e:
+                        logger.info(f"Successfully applied migration: {name} "
+                                    f"({time.perf_counter() - start:.2f}s)")
+                    except BaseException as e:
                         conn.rollback()
+                        # I blocchi già copiati restano confermati: la migrazione riprenderà da lì
+                        status = "interrupted" if isinstance(e, (MigrationInterrupted, KeyboardInterrupt)) else "failed"
+                        self._finish_log(conn, version, status, time.perf_counter() - start)
+                        conn.commit()
                         logger.error(f"Error applying migration {name}: {e}")
                         raise
 
+            set_user_version(conn, current_version)
+            conn.commit()
             logger.info(f"Database schema up-to-date (version {current_version})")
+            return current_version
         finally:
             if conn:
-                conn.close()
\ No newline at end of file
+                conn.close()
@@ -0,0 +1,162 @@
+"""
+Conversioni condivise per i campi delle transazioni salvati su SQLite.
+
+La colonna testuale `data` resta quella mostrata all'utente, mentre `data_ts`
+contiene la stessa data come secondi dall'epoch (senza fuso orario): è la
+colonna usata per filtri, ordinamenti e per restituire date già tipizzate.
+
+Gli importi sono salvati come centesimi interi (colonne *_cents): la
+conversione avviene una sola volta all'inserimento, così somme e hash
+non dipendono dalla rappresentazione dei float.
+
+pandas viene importato solo dalle funzioni che lo usano: il modulo è caricato
+all'avvio dai manager dei database e non deve rallentare l'apertura della finestra.
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Formato canonico del testo salvato nella colonna `data`
+DATE_TEXT_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Espressione SQL che calcola `data_ts` dal testo della data (NULL se non valida)
+DATA_TS_SQL = "CAST(strftime('%s', ?) AS INTEGER)"
+
+# Colonna interna (int64) con l'importo netto in centesimi restituita dalle API di caricamento
+NET_CENTS_COLUMN = '_IMPORTO_NETTO_CENTS'
+
+# Campi importo del record e relative colonne in centesimi nel database
+AMOUNT_CENTS_COLUMNS = {
+    'IMPORTO LORDO POS': 'importo_lordo_pos_cents',
+    'COMMISSIONE POS': 'commissione_pos_cents',
+    'IMPORTO NETTO': 'importo_netto_cents',
+}
+
+_ONE_DAY = 24 * 60 * 60
+
+
+def is_missing(value):
+    """
+    True se il valore scalare è assente (None, NaN, NaT, pd.NA), come pd.isna.
+
+    None, float (anche numpy.float64), interi e stringhe non richiedono pandas:
+    sono i casi più frequenti nei record importati.
+    """
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return value != value
+    if isinstance(value, (int, str)):
+        return False
+    import pandas as pd
+    return bool(pd.isna(value))
+
+
+def format_record_date(value):
+    """
+    Restituisce il testo canonico della data di un record.
+
+    Le stringhe vengono lasciate invariate (sono già il formato di import),
+    mentre datetime e Timestamp vengono riportati al formato canonico.
+    """
+    if is_missing(value):
+        return None
+    if isinstance(value, datetime):
+        return value.strftime(DATE_TEXT_FORMAT)
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return str(value).strip()
+
+
+def to_epoch_seconds(value):
+    """Converte una data (stringa, date, datetime o Timestamp) in secondi dall'epoch."""
+    import pandas as pd
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return int((timestamp - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+
+
+def _is_date_only(value):
+    """True se il valore indica un giorno intero e non un istante preciso."""
+    if isinstance(value, str):
+        return len(value.strip()) <= 10
+    return isinstance(value, date) and not isinstance(value, datetime)
+
+
+def period_bounds(start_date, end_date):
+    """
+    Calcola gli estremi [inizio, fine) in secondi per un filtro su `data_ts`.
+
+    Una data finale senza orario include l'intera giornata, così un periodo
+    '2025-03-01' - '2025-03-31' comprende anche le transazioni del 31 con orario.
+    """
+    start_ts = to_epoch_seconds(start_date)
+    end_ts = to_epoch_seconds(end_date)
+    end_ts += _ONE_DAY if _is_date_only(end_date) else 1
+    return start_ts, end_ts
+
+
+def epoch_to_datetime(values):
+    """Converte una colonna di secondi dall'epoch in datetime64 (NULL -> NaT)."""
+    import pandas as pd
+    return pd.to_datetime(values, unit='s', errors='coerce')
+
+
+def _amount_text(value):
+    """
+    Testo di un importo con il punto come separatore decimale.
+
+    Accetta anche la virgola decimale ("10,00", "1.234,56"): con entrambi i
+    separatori quello più a destra è il decimale e l'altro separa le migliaia.
+    """
+    text = str(value).strip()
+    if "," not in text:
+        return text
+    if "." in text and text.rindex(".") > text.rindex(","):
+        return text.replace(",", "")
+    return text.replace(".", "").replace(",", ".")
+
+
+def to_cents(value):
+    """
+    Converte un importo in centesimi interi (None se assente o non valido).
+
+    Passa dalla rappresentazione decimale più breve del float, così 10, 10.0
+    e 1.005 diventano rispettivamente 1000, 1000 e 101 senza errori di arrotondamento.
+    Le stringhe possono usare la virgola decimale (vedi _amount_text).
+    """
+    if isinstance(value, float) and abs(value) < 1e13:
+        # Percorso veloce: l'arrotondamento dei float è esatto se non si è a metà centesimo
+        # (NaN e infiniti non superano il confronto e passano al percorso Decimal)
+        scaled = value * 100
+        nearest = round(scaled)
+        if abs(abs(scaled - nearest) - 0.5) > 1e-6:
+            return int(nearest)
+    if is_missing(value):
+        return None
+    try:
+        amount = Decimal(_amount_text(value))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite():
+        return None
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def record_net_cents(record):
+    """Importo netto del record in centesimi, riusando la colonna interna se già presente."""
+    cents = record.get(NET_CENTS_COLUMN)
+    if not is_missing(cents):
+        return int(cents)
+    return to_cents(record['IMPORTO NETTO'])
+
+
+def cents_to_amount(values):
+    """Converte centesimi (scalare o colonna) nell'importo in euro come float."""
+    import pandas as pd
+    if isinstance(values, pd.Series):
+        return values.astype('float64') / 100
+    if is_missing(values):
+        return None
+    return values / 100
+
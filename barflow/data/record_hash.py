@@ -0,0 +1,112 @@
+"""
+Hash dei record delle transazioni usato per riconoscere i duplicati.
+
+L'hash è un BLAKE2b a 64 bit calcolato su una codifica canonica in byte dei
+campi identificativi del record, salvato come INTEGER (con segno) nella colonna
+`hash_record`: l'indice UNIQUE è molto più piccolo di quello sulle stringhe
+esadecimali MD5 e i confronti avvengono tra interi.
+
+Codifica canonica (campi separati da \\x1f, UTF-8):
+    data in secondi dall'epoch (testo originale se non interpretabile),
+    sorgente, descrizione, fornitore, numero fornitore, numero operazione POS,
+    importo netto in centesimi.
+None, NaN e stringa vuota sono codificati allo stesso modo, così un campo
+mancante o vuoto non genera hash diversi tra import e database.
+"""
+from datetime import datetime
+from hashlib import blake2b
+from numbers import Real
+from .record_codec import format_record_date, is_missing, record_net_cents
+
+# Dimensione del digest in byte: 8 byte entrano in un INTEGER di SQLite
+HASH_DIGEST_SIZE = 8
+
+_FIELD_SEPARATOR = "\x1f"
+_EPOCH = datetime(1970, 1, 1)
+_ONE_SECOND = datetime(1970, 1, 1, 0, 0, 1) - _EPOCH
+
+# Campi testuali del record, nell'ordine della codifica
+_TEXT_FIELDS = ('SORGENTE', 'DESCRIZIONE', 'FORNITORE', 'NUMERO FORNITORE', 'NUMERO OPERAZIONE POS')
+
+
+def _text_key(value):
+    """Testo canonico di un campo: None, NaN e stringa vuota diventano ''."""
+    if isinstance(value, str):
+        return value.strip()
+    if is_missing(value):
+        return ""
+    return str(value).strip()
+
+
+def _date_key(value):
+    """Data come secondi dall'epoch, stesso valore della colonna data_ts."""
+    if isinstance(value, Real) and not is_missing(value):
+        # Valore già in secondi (es. data_ts letto dal database)
+        return str(int(value))
+    text = format_record_date(value)
+    if not text:
+        return ""
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return text
+    if moment.tzinfo is not None:
+        moment = moment.replace(tzinfo=None)
+    return str((moment - _EPOCH) // _ONE_SECOND)
+
+
+def _digest(key):
+    """Digest BLAKE2b della chiave canonica come intero a 64 bit con segno."""
+    digest = blake2b(key.encode("utf-8"), digest_size=HASH_DIGEST_SIZE).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def hash_columns(dates, sorgenti, descrizioni, fornitori, numeri_fornitore, numeri_pos, net_cents):
+    """
+    Calcola gli hash di un batch di record passato per colonne.
+
+    Tutte le colonne devono avere la stessa lunghezza; le date possono essere
+    testi, datetime/Timestamp o già secondi dall'epoch.
+
+    Returns:
+        list[int]: Hash a 64 bit con segno, nell'ordine delle righe
+    """
+    separator = _FIELD_SEPARATOR
+    # Le stesse date si ripetono molto: la conversione in secondi viene memorizzata
+    date_keys = {}
+    hashes = []
+    for data, sorgente, descrizione, fornitore, numero_fornitore, numero_pos, cents in zip(
+            dates, sorgenti, descrizioni, fornitori, numeri_fornitore, numeri_pos, net_cents):
+        try:
+            date_key = date_keys[data]
+        except KeyError:
+            date_key = date_keys[data] = _date_key(data)
+        except TypeError:
+            # Valore non hashable (raro): nessuna memoizzazione
+            date_key = _date_key(data)
+        key = separator.join((
+            date_key,
+            _text_key(sorgente),
+            _text_key(descrizione),
+            _text_key(fornitore),
+            _text_key(numero_fornitore),
+            _text_key(numero_pos),
+            "" if is_missing(cents) else str(int(cents)),
+        ))
+        hashes.append(_digest(key))
+    return hashes
+
+
+def record_hashes(records):
+    """Calcola gli hash di una lista di record (dizionari con i campi dell'import)."""
+    columns = [[record.get(field) for record in records] for field in _TEXT_FIELDS]
+    return hash_columns(
+        [record['DATA'] for record in records],
+        *columns,
+        [record_net_cents(record) for record in records],
+    )
+
+
+def record_hash(record):
+    """Calcola l'hash di un singolo record."""
+    return record_hashes([record])[0]
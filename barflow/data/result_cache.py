@@ -0,0 +1,77 @@
+"""
+Cache in memoria dei risultati delle letture (transazioni caricate, statistiche,
+aggregati), valida finché il database non viene modificato.
+
+Ogni risultato è salvato con la versione dei dati al momento della lettura:
+    (PRAGMA data_version, contatore delle modifiche della tabella)
+`PRAGMA data_version` viene letto da una connessione dedicata sempre aperta e
+cambia a ogni commit fatto da qualsiasi altra connessione, anche di un altro
+processo. Il contatore della tabella viene incrementato dai manager dopo ogni
+scrittura (e copre i casi che data_version non vede, come l'eliminazione del
+file). Se la versione non è cambiata il risultato viene servito dalla memoria
+senza interrogare il database.
+
+I risultati in cache sono condivisi: chi li riceve non deve modificarli.
+"""
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Cache dei risultati di un database, invalidata dalle scritture."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._watch_conn = None
+        self._counters = defaultdict(int)
+        self._entries = {}
+
+    def _data_version(self):
+        """PRAGMA data_version letto dalla connessione di controllo (aperta alla prima richiesta)."""
+        if self._watch_conn is None:
+            self._watch_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def version(self, table):
+        """Versione corrente dei dati di una tabella."""
+        with self._lock:
+            return self._data_version(), self._counters[table]
+
+    def get_or_compute(self, table, key, compute):
+        """
+        Restituisce il risultato in cache per (tabella, chiave) se i dati non sono
+        cambiati, altrimenti lo calcola con compute() e lo salva.
+        """
+        version = self.version(table)
+        entry = self._entries.get((table, key))
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = compute()
+        with self._lock:
+            # Una scrittura durante il calcolo rende il risultato già vecchio: non salvarlo
+            if self._counters[table] == version[1]:
+                self._entries[(table, key)] = (version, value)
+        return value
+
+    def invalidate(self, table):
+        """Segnala una scrittura sulla tabella: i risultati in cache non sono più validi."""
+        with self._lock:
+            self._counters[table] += 1
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == table]:
+                del self._entries[entry_key]
+
+    def reset(self):
+        """Svuota la cache e chiude la connessione di controllo (es. file del database eliminato)."""
+        with self._lock:
+            for table in list(self._counters):
+                self._counters[table] += 1
+            self._entries.clear()
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
@@ -0,0 +1,236 @@
+"""
+Statistiche delle tabelle delle transazioni mantenute da trigger.
+
+Per ogni sorgente una riga con numero di transazioni, totale netto in centesimi
+e prima/ultima data (data_ts). I trigger di INSERT, DELETE e UPDATE la tengono
+aggiornata nella stessa transazione della modifica, quindi conteggi e periodo
+si leggono da poche righe invece di scorrere tutta la tabella. Eliminando la
+riga con la data minima o massima di una sorgente, il nuovo estremo viene
+cercato sull'indice (sorgente, data_ts).
+
+Verifica e ricostruzione da riga di comando (database storico e temporaneo):
+    python -m barflow.data.table_stats [--rebuild]
+"""
+from .record_codec import cents_to_amount, epoch_to_datetime
+
+_CREATE_STATS = """
+    CREATE TABLE IF NOT EXISTS {stats} (
+        sorgente TEXT PRIMARY KEY,
+        row_count INTEGER NOT NULL,
+        net_cents INTEGER NOT NULL,
+        min_ts INTEGER,
+        max_ts INTEGER
+    )
+"""
+
+# Corpo dei trigger: aggiunta di NEW e rimozione di OLD dalle statistiche
+_ADD_NEW = """
+        INSERT INTO {stats} (sorgente, row_count, net_cents, min_ts, max_ts)
+        VALUES (NEW.sorgente, 1, NEW.importo_netto_cents, NEW.data_ts, NEW.data_ts)
+        ON CONFLICT (sorgente) DO UPDATE SET
+            row_count = row_count + 1,
+            net_cents = net_cents + excluded.net_cents,
+            min_ts = COALESCE(MIN(min_ts, excluded.min_ts), min_ts, excluded.min_ts),
+            max_ts = COALESCE(MAX(max_ts, excluded.max_ts), max_ts, excluded.max_ts);
+"""
+
+_REMOVE_OLD = """
+        UPDATE {stats}
+        SET row_count = row_count - 1, net_cents = net_cents - OLD.importo_netto_cents
+        WHERE sorgente = OLD.sorgente;
+        UPDATE {stats}
+        SET min_ts = (SELECT MIN(data_ts) FROM {table} WHERE sorgente = OLD.sorgente),
+            max_ts = (SELECT MAX(data_ts) FROM {table} WHERE sorgente = OLD.sorgente)
+        WHERE sorgente = OLD.sorgente AND (min_ts = OLD.data_ts OR max_ts = OLD.data_ts);
+        DELETE FROM {stats} WHERE sorgente = OLD.sorgente AND row_count = 0;
+"""
+
+_TRIGGERS = {
+    "insert": "AFTER INSERT ON {table} BEGIN" + _ADD_NEW + "END",
+    "delete": "AFTER DELETE ON {table} BEGIN" + _REMOVE_OLD + "END",
+    "update": ("AFTER UPDATE OF sorgente, data_ts, importo_netto_cents ON {table} BEGIN"
+               + _REMOVE_OLD + _ADD_NEW + "END"),
+}
+
+_COMPUTE_STATS = """
+    SELECT sorgente, COUNT(*), COALESCE(SUM(importo_netto_cents), 0), MIN(data_ts), MAX(data_ts)
+    FROM {table}
+    GROUP BY sorgente
+"""
+
+
+def _trigger_name(table, event):
+    return f"{table}_stats_{event}"
+
+
+def create_stats_triggers(conn, table, stats_table):
+    """Crea i trigger che mantengono stats_table aggiornata sulle modifiche di table."""
+    for event, body in _TRIGGERS.items():
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {_trigger_name(table, event)} "
+            + body.format(table=table, stats=stats_table)
+        )
+
+
+def drop_stats_triggers(conn, table):
+    """Elimina i trigger delle statistiche di table."""
+    for event in _TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {_trigger_name(table, event)}")
+
+
+def install_table_stats(conn, table, stats_table):
+    """Crea tabella e trigger delle statistiche e le calcola dai dati esistenti."""
+    conn.execute(_CREATE_STATS.format(stats=stats_table))
+    create_stats_triggers(conn, table, stats_table)
+    rebuild_table_stats(conn, table, stats_table)
+
+
+def rebuild_table_stats(conn, table, stats_table):
+    """Ricalcola le statistiche leggendo tutta la tabella."""
+    conn.execute(f"DELETE FROM {stats_table}")
+    conn.execute(f"INSERT INTO {stats_table} (sorgente, row_count, net_cents, min_ts, max_ts) "
+                 + _COMPUTE_STATS.format(table=table))
+
+
+def clear_table(conn, table, stats_table):
+    """
+    Svuota table e le sue statistiche.
+
+    I trigger vengono sospesi durante l'eliminazione (nella stessa transazione):
+    senza trigger SQLite svuota la tabella in un colpo solo invece di
+    aggiornare le statistiche riga per riga.
+
+    Returns:
+        Numero di righe eliminate
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    deleted = conn.execute(f"SELECT COALESCE(SUM(row_count), 0) FROM {stats_table}").fetchone()[0]
+    drop_stats_triggers(conn, table)
+    conn.execute(f"DELETE FROM {table}")
+    conn.execute(f"DELETE FROM {stats_table}")
+    create_stats_triggers(conn, table, stats_table)
+    return deleted
+
+
+def read_table_stats(conn, stats_table):
+    """
+    Legge le statistiche mantenute dai trigger.
+
+    Returns:
+        Dizionario con total_records, min_ts, max_ts e sources
+        ({sorgente: {'total_records', 'net_cents', 'min_ts', 'max_ts'}})
+    """
+    sources = {
+        sorgente: {'total_records': count, 'net_cents': net_cents, 'min_ts': min_ts, 'max_ts': max_ts}
+        for sorgente, count, net_cents, min_ts, max_ts in conn.execute(
+            f"SELECT sorgente, row_count, net_cents, min_ts, max_ts FROM {stats_table} ORDER BY sorgente"
+        )
+    }
+    return _with_totals(sources)
+
+
+def merge_table_stats(stats_list):
+    """Unisce le statistiche di più tabelle (es. tabella principale e partizioni per anno)."""
+    sources = {}
+    for stats in stats_list:
+        for sorgente, source in stats['sources'].items():
+            merged = sources.setdefault(
+                sorgente, {'total_records': 0, 'net_cents': 0, 'min_ts': None, 'max_ts': None}
+            )
+            merged['total_records'] += source['total_records']
+            merged['net_cents'] += source['net_cents']
+            for key, pick in (('min_ts', min), ('max_ts', max)):
+                values = [value for value in (merged[key], source[key]) if value is not None]
+                merged[key] = pick(values) if values else None
+    return _with_totals(dict(sorted(sources.items())))
+
+
+def _with_totals(sources):
+    """Statistiche complessive a partire da quelle per sorgente."""
+    min_values = [source['min_ts'] for source in sources.values() if source['min_ts'] is not None]
+    max_values = [source['max_ts'] for source in sources.values() if source['max_ts'] is not None]
+    return {
+        'total_records': sum(source['total_records'] for source in sources.values()),
+        'min_ts': min(min_values) if min_values else None,
+        'max_ts': max(max_values) if max_values else None,
+        'sources': sources,
+    }
+
+
+def stats_date_range(stats):
+    """Prima e ultima data delle statistiche come datetime (None se assenti)."""
+    return tuple(
+        epoch_to_datetime(ts) if ts is not None else None
+        for ts in (stats['min_ts'], stats['max_ts'])
+    )
+
+
+def source_totals(stats):
+    """Totali per sorgente: {sorgente: {'total_records', 'net_amount', 'date_range'}}."""
+    return {
+        sorgente: {
+            'total_records': source['total_records'],
+            'net_amount': cents_to_amount(source['net_cents']),
+            'date_range': stats_date_range(source),
+        }
+        for sorgente, source in stats['sources'].items()
+    }
+
+
+def count_rows(conn, stats_table):
+    """Numero di righe della tabella letto dalle statistiche."""
+    return conn.execute(f"SELECT COALESCE(SUM(row_count), 0) FROM {stats_table}").fetchone()[0]
+
+
+def check_table_stats(conn, table, stats_table):
+    """
+    Confronta le statistiche salvate con quelle calcolate dalla tabella.
+
+    Returns:
+        Lista di differenze (vuota se le statistiche sono coerenti), una per
+        sorgente: (sorgente, valori salvati, valori calcolati)
+    """
+    stored = {row[0]: row[1:] for row in conn.execute(
+        f"SELECT sorgente, row_count, net_cents, min_ts, max_ts FROM {stats_table}"
+    )}
+    computed = {row[0]: row[1:] for row in conn.execute(_COMPUTE_STATS.format(table=table))}
+    return [
+        (sorgente, stored.get(sorgente), computed.get(sorgente))
+        for sorgente in sorted(set(stored) | set(computed))
+        if stored.get(sorgente) != computed.get(sorgente)
+    ]
+
+
+def main(argv=None):
+    """Verifica (ed eventualmente ricostruisce) le statistiche dei database dell'applicazione."""
+    import argparse
+    import sys
+    from .db_manager import DatabaseManager, initialize_and_migrate_db
+    from .temporary_db_manager import TemporaryDatabaseManager
+
+    parser = argparse.ArgumentParser(description="Verifica delle statistiche delle transazioni")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ricalcola le statistiche che non corrispondono ai dati")
+    args = parser.parse_args(argv)
+
+    initialize_and_migrate_db()
+    inconsistent = False
+    for label, manager in (("storico", DatabaseManager()), ("temporaneo", TemporaryDatabaseManager())):
+        differences = manager.check_stats()
+        if not differences:
+            print(f"✅ Statistiche del database {label} coerenti")
+            continue
+        print(f"⚠️  Statistiche del database {label} non coerenti:")
+        for sorgente, stored, computed in differences:
+            print(f"   - {sorgente}: salvate {stored}, calcolate {computed}")
+        if args.rebuild:
+            manager.rebuild_stats()
+            print(f"✓ Statistiche del database {label} ricostruite")
+        else:
+            inconsistent = True
+    sys.exit(1 if inconsistent else 0)
+
+
+if __name__ == "__main__":
+    main()
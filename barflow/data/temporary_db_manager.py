@@ -2,15 +2,34 @@
 Manager per il database temporaneo delle transazioni
 """
 import sqlite3
-import hashlib
-import pandas as pd
 import logging
 import os
 from pathlib import Path
 from barflow.utils import get_data_directory
+from .record_codec import (DATA_TS_SQL, NET_CENTS_COLUMN, cents_to_amount,
+                           epoch_to_datetime, format_record_date, record_net_cents,
+                           to_cents)
+from .change_bus import DataChange, data_change_bus
+from .hash_index import HashIndex
+from .result_cache import ResultCache
+from .record_hash import hash_columns, record_hash, record_hashes
+from .py_sqlite_migrator import get_user_version, set_user_version
+from .table_stats import (check_table_stats, clear_table, count_rows, install_table_stats,
+                          read_table_stats, rebuild_table_stats, source_totals, stats_date_range)
 
 logger = logging.getLogger(__name__)
 
+TEMP_TABLE = "temporary_transactions"
+# Statistiche per sorgente mantenute dai trigger (vedi table_stats)
+TEMP_STATS_TABLE = "temporary_transaction_stats"
+
+# Versione dello schema della tabella temporanea (PRAGMA user_version):
+# da incrementare quando _init_database cambia la struttura
+TEMP_SCHEMA_VERSION = 2
+
+# Numero massimo di id per query nelle letture per id (limite dei parametri SQLite)
+ID_QUERY_BATCH = 500
+
 def get_temp_db_path() -> Path:
     """Ottieni il percorso del database temporaneo nella cartella historical_data dell'applicazione"""
     # Utilizza il sistema di percorsi centralizzato per garantire la portabilità
@@ -20,158 +39,312 @@ def get_temp_db_path() -> Path:
 class TemporaryDatabaseManager:
     """Manager per il database temporaneo delle transazioni importate dall'utente."""
     
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, change_bus=None):
         # Usa il path specifico per il database temporaneo
         self.db_path = Path(db_path) if db_path else get_temp_db_path()
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hash_index = HashIndex(self.db_path, TEMP_TABLE, TEMP_STATS_TABLE)
+        self.result_cache = ResultCache(self.db_path)
+        # Bus su cui vengono notificate le modifiche (di default quello condiviso)
+        self.change_bus = change_bus if change_bus is not None else data_change_bus
         self._init_database()
     
+    def _create_table(self, conn, table_name="temporary_transactions"):
+        """Crea la tabella delle transazioni temporanee con lo schema corrente."""
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL,
+                data_ts INTEGER,
+                sorgente TEXT NOT NULL,
+                descrizione TEXT,
+                fornitore TEXT,
+                numero_fornitore TEXT,
+                numero_operazione_pos TEXT,
+                importo_lordo_pos_cents INTEGER,
+                commissione_pos_cents INTEGER,
+                importo_netto_cents INTEGER NOT NULL,
+                hash_record INTEGER UNIQUE,
+                data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                import_timestamp REAL NOT NULL
+            )
+        """)
+    
+    def _rebuild_legacy_table(self, conn, existing_columns):
+        """
+        Ricostruisce una tabella temporanea creata con uno schema precedente
+        (importi REAL, hash MD5 testuali, senza data_ts) nello schema corrente.
+        """
+        self._create_table(conn, "temporary_transactions_new")
+        data_ts_column = "data_ts" if "data_ts" in existing_columns else "CAST(strftime('%s', data) AS INTEGER)"
+        if "importo_netto_cents" in existing_columns:
+            amount_columns = "importo_lordo_pos_cents, commissione_pos_cents, importo_netto_cents"
+            convert_amount = lambda value: value
+        else:
+            amount_columns = "importo_lordo_pos, commissione_pos, importo_netto"
+            convert_amount = to_cents
+        rows = conn.execute(f"""
+            SELECT id, data, {data_ts_column}, sorgente, descrizione, fornitore, numero_fornitore,
+                   numero_operazione_pos, {amount_columns}, data_inserimento, import_timestamp
+            FROM temporary_transactions
+            ORDER BY id
+        """).fetchall()
+        
+        if rows:
+            new_rows = [
+                row[:8] + (convert_amount(row[8]), convert_amount(row[9]), convert_amount(row[10]) or 0) + row[11:]
+                for row in rows
+            ]
+            columns = list(zip(*new_rows))
+            dates = [data_ts if data_ts is not None else data for data, data_ts in zip(columns[1], columns[2])]
+            hashes = hash_columns(dates, columns[3], columns[4], columns[5], columns[6], columns[7], columns[10])
+            conn.executemany("""
+                INSERT OR IGNORE INTO temporary_transactions_new (
+                    id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+                    numero_operazione_pos, importo_lordo_pos_cents, commissione_pos_cents,
+                    importo_netto_cents, hash_record, data_inserimento, import_timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [row[:11] + (hash_value,) + row[11:] for row, hash_value in zip(new_rows, hashes)])
+        
+        conn.execute("DROP TABLE temporary_transactions")
+        conn.execute("ALTER TABLE temporary_transactions_new RENAME TO temporary_transactions")
+    
     def _init_database(self):
         """Inizializza il database temporaneo con le tabelle necessarie."""
         with sqlite3.connect(self.db_path) as conn:
+            # Schema già aggiornato: basta la lettura di PRAGMA user_version
+            if get_user_version(conn) == TEMP_SCHEMA_VERSION:
+                return
+            self._create_table(conn)
+            
+            # Database temporanei creati con uno schema precedente (importi REAL, hash TEXT)
+            column_types = {col[1]: col[2].upper() for col in conn.execute("PRAGMA table_info(temporary_transactions)")}
+            if "importo_netto_cents" not in column_types or column_types.get("hash_record") != "INTEGER":
+                self._rebuild_legacy_table(conn, column_types)
+                self.hash_index.clear()
+            
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS temporary_transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    data TEXT NOT NULL,
-                    sorgente TEXT NOT NULL,
-                    descrizione TEXT,
-                    fornitore TEXT,
-                    numero_fornitore TEXT,
-                    numero_operazione_pos TEXT,
-                    importo_lordo_pos REAL,
-                    commissione_pos REAL,
-                    importo_netto REAL NOT NULL,
-                    hash_record TEXT UNIQUE,
-                    data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    import_timestamp REAL NOT NULL
-                )
+                DROP INDEX IF EXISTS idx_temp_data;
             """)
-            
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_temp_data ON temporary_transactions(data);
+                CREATE INDEX IF NOT EXISTS idx_temp_data_ts ON temporary_transactions(data_ts);
             """)
+            # (sorgente, data_ts): i trigger delle statistiche cercano qui la prima/ultima data
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_temp_sorgente ON temporary_transactions(sorgente);
+                DROP INDEX IF EXISTS idx_temp_sorgente;
             """)
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_temp_hash ON temporary_transactions(hash_record);
+                CREATE INDEX IF NOT EXISTS idx_temp_sorgente_data_ts ON temporary_transactions(sorgente, data_ts);
+            """)
+            # hash_record (intero a 64 bit) è UNIQUE e ha già il suo indice automatico
+            conn.execute("""
+                DROP INDEX IF EXISTS idx_temp_hash;
             """)
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_temp_import_timestamp ON temporary_transactions(import_timestamp);
             """)
+            # La ricostruzione di una tabella precedente elimina anche i trigger: vengono ricreati qui
+            install_table_stats(conn, TEMP_TABLE, TEMP_STATS_TABLE)
+            set_user_version(conn, TEMP_SCHEMA_VERSION)
     
     def _generate_record_hash(self, record):
         """Genera un hash univoco per il record per evitare duplicati."""
-        key = f"{record['DATA']}{record['SORGENTE']}{record.get('DESCRIZIONE', '')}{record.get('FORNITORE', '')}{record.get('NUMERO FORNITORE', '')}{record.get('NUMERO OPERAZIONE POS', '')}{record['IMPORTO NETTO']}"
-        return hashlib.md5(key.encode()).hexdigest()
+        return record_hash(record)
     
     def add_transactions(self, transactions_data, import_timestamp):
-        """Aggiunge le transazioni al database temporaneo."""
-        added_count = 0
-        duplicate_count = 0
+        """
+        Aggiunge le transazioni al database temporaneo.
+        
+        Returns:
+            Tupla (aggiunte, duplicati, id delle righe inserite in ordine di inserimento)
+        """
+        transactions_data = list(transactions_data)
+        # Hash calcolati in un unico batch prima dell'inserimento
+        hashes = record_hashes(transactions_data)
         
         with sqlite3.connect(self.db_path) as conn:
-            for record in transactions_data:
-                record_hash = self._generate_record_hash(record)
-                
-                try:
-                    conn.execute("""
-                        INSERT INTO temporary_transactions 
-                        (data, sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos, 
-                         importo_lordo_pos, commissione_pos, importo_netto, hash_record, import_timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        record['DATA'],
-                        record['SORGENTE'],
-                        record.get('DESCRIZIONE'),
-                        record.get('FORNITORE'),
-                        record.get('NUMERO FORNITORE'),
-                        record.get('NUMERO OPERAZIONE POS'),
-                        record.get('IMPORTO LORDO POS'),
-                        record.get('COMMISSIONE POS'),
-                        float(record['IMPORTO NETTO']),
-                        record_hash,
-                        import_timestamp
-                    ))
-                    added_count += 1
-                except sqlite3.IntegrityError:
-                    # Record duplicato
-                    duplicate_count += 1
+            # Scarta in blocco i duplicati già noti: solo i record nuovi arrivano alla INSERT
+            self.hash_index.ensure_current(conn)
+            known = self.hash_index.contains(hashes)
+            rows = []
+            new_hashes = []
+            seen = set()
+            for record, hash_value, is_known in zip(transactions_data, hashes, known):
+                if is_known or hash_value in seen:
+                    continue
+                seen.add(hash_value)
+                new_hashes.append(hash_value)
+                data_text = format_record_date(record['DATA'])
+                rows.append((
+                    data_text,
+                    data_text,
+                    record['SORGENTE'],
+                    record.get('DESCRIZIONE'),
+                    record.get('FORNITORE'),
+                    record.get('NUMERO FORNITORE'),
+                    record.get('NUMERO OPERAZIONE POS'),
+                    to_cents(record.get('IMPORTO LORDO POS')),
+                    to_cents(record.get('COMMISSIONE POS')),
+                    record_net_cents(record),
+                    hash_value,
+                    import_timestamp
+                ))
+            
+            # Con AUTOINCREMENT le righe inserite hanno id maggiore del massimo attuale
+            max_id_before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM temporary_transactions").fetchone()[0]
+            # INSERT OR IGNORE resta come garanzia se l'indice non è allineato;
+            # rowcount conta solo le righe inserite (non quelle scritte dai trigger delle statistiche)
+            added_count = conn.executemany(f"""
+                INSERT OR IGNORE INTO temporary_transactions 
+                (data, data_ts, sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos, 
+                 importo_lordo_pos_cents, commissione_pos_cents, importo_netto_cents, hash_record, import_timestamp)
+                VALUES (?, {DATA_TS_SQL}, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows).rowcount
+            duplicate_count = len(transactions_data) - added_count
+            
+            if added_count == len(new_hashes):
+                if added_count > 0:
+                    self.hash_index.add(conn, new_hashes)
+            else:
+                # Alcuni record erano già nel database: l'indice non era allineato
+                self.hash_index.rebuild(conn)
+            
+            inserted_rows = conn.execute(
+                "SELECT id, data_ts FROM temporary_transactions WHERE id > ? ORDER BY id", (max_id_before,)
+            ).fetchall() if added_count > 0 else []
         
-        return added_count, duplicate_count
+        if added_count > 0:
+            self.result_cache.invalidate(TEMP_TABLE)
+            self.change_bus.emit(DataChange.from_rows(TEMP_TABLE, DataChange.INSERT, inserted_rows))
+        return added_count, duplicate_count, [row[0] for row in inserted_rows]
+    
+    def get_data_version(self):
+        """Versione dei dati temporanei: cambia a ogni scrittura sul database."""
+        return self.result_cache.version(TEMP_TABLE)
     
     def load_all_temporary_transactions(self):
-        """Carica tutte le transazioni temporanee dal database."""
+        """
+        Carica tutte le transazioni temporanee dal database.
+        
+        Il risultato resta in memoria finché il database non cambia: la lista e i
+        dizionari sono condivisi e non vanno modificati.
+        """
+        try:
+            return self.result_cache.get_or_compute(TEMP_TABLE, "all", self._read_all_temporary_transactions)
+        except Exception as e:
+            logger.error(f"Errore nel caricamento transazioni temporanee: {e}")
+            return []
+    
+    def load_temporary_transactions_by_ids(self, row_ids):
+        """
+        Carica solo le transazioni temporanee con gli id indicati (es. quelle
+        appena inserite), nello stesso formato di load_all_temporary_transactions.
+        """
+        row_ids = list(row_ids)
+        records = []
+        try:
+            for start in range(0, len(row_ids), ID_QUERY_BATCH):
+                batch = row_ids[start:start + ID_QUERY_BATCH]
+                placeholders = ", ".join("?" * len(batch))
+                records.extend(self._read_temporary_transactions(f"WHERE id IN ({placeholders})", batch))
+            return records
+        except Exception as e:
+            logger.error(f"Errore nel caricamento transazioni temporanee per id: {e}")
+            return []
+    
+    def _read_all_temporary_transactions(self):
+        """Legge tutte le transazioni temporanee come lista di dizionari."""
+        return self._read_temporary_transactions()
+    
+    def _read_temporary_transactions(self, where_clause="", params=()):
+        """Legge le transazioni temporanee (filtrate da where_clause) come lista di dizionari."""
+        # Importato alla prima lettura: pandas non serve per aprire la finestra principale
+        import pandas as pd
+        
         with sqlite3.connect(self.db_path) as conn:
-            try:
-                query = """
-                    SELECT data as DATA,
-                           sorgente as SORGENTE,
-                           descrizione as DESCRIZIONE,
-                           fornitore as FORNITORE,
-                           numero_fornitore as 'NUMERO FORNITORE',
-                           numero_operazione_pos as 'NUMERO OPERAZIONE POS',
-                           importo_lordo_pos as 'IMPORTO LORDO POS',
-                           commissione_pos as 'COMMISSIONE POS',
-                           importo_netto as 'IMPORTO NETTO',
-                           import_timestamp as '_IMPORT_TIMESTAMP'
-                    FROM temporary_transactions 
-                    ORDER BY import_timestamp DESC, data DESC
-                """
-                
-                df = pd.read_sql_query(query, conn)
-                return df.to_dict('records')
-            except Exception as e:
-                logger.error(f"Errore nel caricamento transazioni temporanee: {e}")
-                return []
+            query = f"""
+                SELECT data_ts as DATA,
+                       sorgente as SORGENTE,
+                       descrizione as DESCRIZIONE,
+                       fornitore as FORNITORE,
+                       numero_fornitore as 'NUMERO FORNITORE',
+                       numero_operazione_pos as 'NUMERO OPERAZIONE POS',
+                       importo_lordo_pos_cents as 'IMPORTO LORDO POS',
+                       commissione_pos_cents as 'COMMISSIONE POS',
+                       importo_netto_cents as 'IMPORTO NETTO',
+                       import_timestamp as '_IMPORT_TIMESTAMP'
+                FROM temporary_transactions 
+                {where_clause}
+                ORDER BY import_timestamp DESC, data_ts DESC
+            """
+            
+            df = pd.read_sql_query(query, conn, params=list(params))
+            df['DATA'] = epoch_to_datetime(df['DATA'])
+            # Importi letti in centesimi: il netto resta disponibile come int64
+            df[NET_CENTS_COLUMN] = df['IMPORTO NETTO'].astype('int64')
+            for amount_column in ('IMPORTO LORDO POS', 'COMMISSIONE POS', 'IMPORTO NETTO'):
+                df[amount_column] = cents_to_amount(df[amount_column])
+            return df.to_dict('records')
     
     def get_temporary_transactions_count(self):
         """Restituisce il numero di transazioni temporanee."""
+        return self.result_cache.get_or_compute(TEMP_TABLE, "count", self._count_temporary_transactions)
+    
+    def _count_temporary_transactions(self):
+        """Conta le transazioni temporanee nel database."""
         with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            count = cursor.execute("SELECT COUNT(*) FROM temporary_transactions").fetchone()[0]
-            return count
+            return count_rows(conn, TEMP_STATS_TABLE)
     
     def clear_all_temporary_transactions(self):
         """Pulisce completamente tutte le transazioni temporanee (mantiene lo schema)."""
         with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM temporary_transactions")
+            clear_table(conn, TEMP_TABLE, TEMP_STATS_TABLE)
             # Reset dell'autoincrement per ricominciare da 1
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='temporary_transactions'")
+            conn.execute("DELETE FROM sqlite_sequence WHERE name='temporary_transactions'")
             conn.commit()
+        self.hash_index.clear()
+        self.result_cache.invalidate(TEMP_TABLE)
+        self.change_bus.emit(DataChange(TEMP_TABLE, DataChange.CLEAR))
         
         logger.info("Database temporaneo pulito completamente")
     
     def get_temporary_database_stats(self):
         """Ottieni statistiche del database temporaneo."""
+        return dict(self.result_cache.get_or_compute(TEMP_TABLE, "stats", self._compute_temporary_database_stats))
+    
+    def _compute_temporary_database_stats(self):
+        """Legge le statistiche del database temporaneo (mantenute dai trigger)."""
         with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Conteggio totale
-            total = cursor.execute("SELECT COUNT(*) FROM temporary_transactions").fetchone()[0]
-            
-            if total == 0:
-                return {
-                    'total_records': 0,
-                    'date_range': (None, None),
-                    'db_size_mb': 0
-                }
-            
-            # Prima e ultima data
-            date_range = cursor.execute("""
-                SELECT MIN(data) as min_date, MAX(data) as max_date 
-                FROM temporary_transactions
-            """).fetchone()
-            
-            # Dimensione database
-            db_size = self.db_path.stat().st_size / 1024 / 1024  # MB
-            
+            stats = read_table_stats(conn, TEMP_STATS_TABLE)
+        
+        if stats['total_records'] == 0:
             return {
-                'total_records': total,
-                'date_range': date_range,
-                'db_size_mb': round(db_size, 2)
+                'total_records': 0,
+                'date_range': (None, None),
+                'db_size_mb': 0,
+                'sources': {}
             }
+        
+        # Dimensione database
+        db_size = self.db_path.stat().st_size / 1024 / 1024  # MB
+        
+        return {
+            'total_records': stats['total_records'],
+            'date_range': stats_date_range(stats),
+            'db_size_mb': round(db_size, 2),
+            'sources': source_totals(stats)
+        }
+    
+    def check_stats(self):
+        """Differenze tra le statistiche salvate e i dati (lista vuota se coerenti)."""
+        with sqlite3.connect(self.db_path) as conn:
+            return check_table_stats(conn, TEMP_TABLE, TEMP_STATS_TABLE)
+    
+    def rebuild_stats(self):
+        """Ricalcola le statistiche dai dati."""
+        with sqlite3.connect(self.db_path) as conn:
+            rebuild_table_stats(conn, TEMP_TABLE, TEMP_STATS_TABLE)
+        self.result_cache.invalidate(TEMP_TABLE)
     
     def database_exists(self):
         """Verifica se il database temporaneo esiste."""
@@ -181,7 +354,10 @@ class TemporaryDatabaseManager:
         """Elimina completamente il file del database temporaneo."""
         try:
             if self.db_path.exists():
+                self.result_cache.reset()
                 self.db_path.unlink()
+                self.hash_index.clear()
+                self.change_bus.emit(DataChange(TEMP_TABLE, DataChange.CLEAR))
                 logger.info(f"Database temporaneo eliminato: {self.db_path}")
             return True
         except Exception as e:
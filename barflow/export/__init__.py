@@ -0,0 +1,45 @@
+"""
+Esportazione dello storico delle transazioni.
+
+Le righe vengono lette dal database a blocchi con un cursore SQLite e scritte
+direttamente nel file di destinazione: la memoria usata non dipende dal numero
+di transazioni esportate. I formati disponibili sono XLSX, CSV, JSON Lines e
+Parquet (se pyarrow è installato); filtri per periodo e sorgente vengono
+applicati nella query. Il report Excel (report_export.py) contiene invece solo
+aggregati calcolati da SQLite, con grafici nativi. Le esportazioni incrementali (delta_export.py) scrivono
+solo le transazioni nuove dall'ultima esportazione verso la stessa cartella.
+Le funzioni di esportazione accettano i callback di avanzamento e annullamento
+descritti in progress.py.
+
+I moduli vengono importati al primo accesso ai loro nomi (vedi
+barflow.utils.lazy_exports), così xlsxwriter e pyarrow non vengono caricati
+all'avvio dell'applicazione.
+"""
+from barflow.utils.lazy_exports import lazy_exports
+
+_EXPORTS = {
+    'EXPORT_COLUMNS': '.history_rows',
+    'build_history_filter': '.history_rows',
+    'count_history_rows': '.history_rows',
+    'iter_export_batches': '.history_rows',
+    'iter_history_batches': '.history_rows',
+    'ExportCancelled': '.progress',
+    'ExportProgress': '.progress',
+    'export_history_xlsx': '.xlsx_export',
+    'export_history_csv': '.text_export',
+    'export_history_jsonl': '.text_export',
+    'export_history_parquet': '.parquet_export',
+    'parquet_available': '.parquet_export',
+    'EXPORT_FORMATS': '.formats',
+    'available_export_formats': '.formats',
+    'export_history': '.formats',
+    'export_history_report': '.report_export',
+    'query_report_data': '.report_export',
+    'count_new_transactions': '.delta_export',
+    'delta_file_path': '.delta_export',
+    'export_history_delta': '.delta_export',
+    'get_watermark': '.delta_export',
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,126 @@
+"""
+Esportazioni incrementali: solo le transazioni inserite dopo l'ultima
+esportazione verso la stessa destinazione.
+
+Ogni destinazione (cartella + formato) ha un punto di arrivo salvato nella
+tabella export_watermarks (migrazione 011): l'id dell'ultima transazione
+esportata. Gli id sono AUTOINCREMENT, quindi le nuove transazioni hanno id
+maggiore e il costo dell'esportazione dipende solo da quante sono.
+
+I file delta sono datati (storico_delta_AAAA-MM-GG.<formato>): CSV e JSON Lines
+vengono aggiunti in coda al file del giorno se esiste già, gli altri formati
+creano ogni volta un nuovo file. Il punto di arrivo viene aggiornato solo dopo
+che il file è stato scritto completamente.
+"""
+import sqlite3
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from barflow.data.archive import archived_max_id
+from barflow.data.partitions import open_history
+from .formats import EXPORT_FORMATS
+from .history_rows import build_history_filter, count_history_rows
+
+# Formati a cui si possono aggiungere righe in coda a un file esistente
+APPENDABLE_FORMATS = {'csv', 'jsonl'}
+
+DELTA_FILE_PREFIX = "storico_delta"
+
+
+def delta_target(directory, extension):
+    """Chiave della destinazione di un'esportazione incrementale."""
+    return f"{Path(directory).resolve()}|{extension}"
+
+
+def get_watermark(db_path, target):
+    """
+    Punto di arrivo dell'ultima esportazione verso la destinazione.
+
+    Returns:
+        Dizionario con last_id, last_inserted_at ed exported_at, o None se la
+        destinazione non ha ancora ricevuto esportazioni
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT last_id, last_inserted_at, exported_at FROM export_watermarks WHERE target = ?",
+            (target,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {'last_id': row[0], 'last_inserted_at': row[1], 'exported_at': row[2]}
+
+
+def _save_watermark(db_path, target, last_id):
+    """Registra last_id come punto di arrivo della destinazione."""
+    # La transazione last_id può trovarsi in una partizione per anno
+    # (gli anni archiviati non vengono caricati: sono chiusi e già esportati)
+    with closing(open_history(db_path, include_archive=False)) as conn, conn:
+        conn.execute("""
+            INSERT INTO export_watermarks (target, last_id, last_inserted_at, exported_at)
+            VALUES (?, ?, (SELECT data_inserimento FROM transactions WHERE id = ?), CURRENT_TIMESTAMP)
+            ON CONFLICT(target) DO UPDATE SET
+                last_id = excluded.last_id,
+                last_inserted_at = excluded.last_inserted_at,
+                exported_at = excluded.exported_at
+        """, (target, last_id, last_id))
+
+
+def count_new_transactions(db_path, directory, extension):
+    """Numero di transazioni non ancora esportate verso la destinazione."""
+    watermark = get_watermark(db_path, delta_target(directory, extension))
+    last_id = watermark['last_id'] if watermark else 0
+    return count_history_rows(db_path, *build_history_filter(after_id=last_id), after_id=last_id)
+
+
+def delta_file_path(directory, extension, day=None):
+    """
+    Percorso del file delta del giorno.
+
+    Per i formati che non si possono aggiungere in coda viene scelto un nome
+    non ancora usato (storico_delta_AAAA-MM-GG_2.xlsx, ...).
+    """
+    base = Path(directory) / f"{DELTA_FILE_PREFIX}_{(day or date.today()).isoformat()}"
+    file_path = Path(f"{base}.{extension}")
+    counter = 2
+    while extension not in APPENDABLE_FORMATS and file_path.exists():
+        file_path = Path(f"{base}_{counter}.{extension}")
+        counter += 1
+    return file_path
+
+
+def export_history_delta(db_path, file_path, progress=None, is_cancelled=None):
+    """
+    Esporta in file_path le transazioni inserite dopo l'ultima esportazione
+    verso la stessa destinazione (cartella e formato di file_path).
+
+    Args:
+        db_path: Percorso del database storico
+        file_path: File delta (vedi delta_file_path); CSV e JSONL vengono estesi se esistono
+        progress: Callback opzionale progress(scritte, totale)
+        is_cancelled: Callback opzionale che restituisce True per annullare
+
+    Returns:
+        int: Numero di transazioni esportate (0 se non ce ne sono di nuove: nessun file creato)
+    """
+    file_path = Path(file_path)
+    extension = file_path.suffix.lower().lstrip('.')
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Formato di esportazione non supportato: .{extension}")
+    target = delta_target(file_path.parent, extension)
+    watermark = get_watermark(db_path, target)
+    last_id = watermark['last_id'] if watermark else 0
+
+    # Le transazioni inserite durante l'esportazione restano per la prossima
+    with closing(open_history(db_path, include_archive=False)) as conn:
+        until_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+    until_id = max(until_id, archived_max_id(db_path))
+    if until_id <= last_id:
+        return 0
+
+    options = {'append': True} if extension in APPENDABLE_FORMATS else {}
+    exported = EXPORT_FORMATS[extension][1](
+        db_path, file_path, progress=progress, is_cancelled=is_cancelled,
+        after_id=last_id, until_id=until_id, **options
+    )
+    _save_watermark(db_path, target, until_id)
+    return exported
@@ -0,0 +1,39 @@
+"""
+Registro dei formati di esportazione, scelti in base all'estensione del file.
+"""
+from pathlib import Path
+from .parquet_export import export_history_parquet, parquet_available
+from .text_export import export_history_csv, export_history_jsonl
+from .xlsx_export import export_history_xlsx
+
+# Estensione -> (descrizione per la finestra di salvataggio, funzione di esportazione)
+EXPORT_FORMATS = {
+    'xlsx': ("File Excel", export_history_xlsx),
+    'csv': ("CSV", export_history_csv),
+    'jsonl': ("JSON Lines", export_history_jsonl),
+    'parquet': ("Parquet", export_history_parquet),
+}
+
+
+def available_export_formats():
+    """Formati utilizzabili con le dipendenze installate (Parquet richiede pyarrow)."""
+    return {
+        extension: export_format for extension, export_format in EXPORT_FORMATS.items()
+        if extension != 'parquet' or parquet_available()
+    }
+
+
+def export_history(db_path, file_path, **kwargs):
+    """
+    Esporta lo storico nel formato indicato dall'estensione di file_path.
+
+    Accetta gli stessi argomenti delle funzioni dei singoli formati (filtri,
+    progress, is_cancelled).
+
+    Returns:
+        int: Numero di transazioni esportate
+    """
+    extension = Path(file_path).suffix.lower().lstrip('.')
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Formato di esportazione non supportato: .{extension}")
+    return EXPORT_FORMATS[extension][1](db_path, file_path, **kwargs)
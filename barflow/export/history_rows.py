@@ -0,0 +1,173 @@
+"""
+Lettura a blocchi delle transazioni storiche da esportare.
+
+Le righe vengono lette con un cursore SQLite (fetchmany), quindi la memoria
+usata non dipende dalla dimensione dello storico. I filtri per periodo e per
+sorgente vengono applicati direttamente nella query.
+
+Ogni formato sceglie le colonne da leggere: RAW_SELECT restituisce i valori
+come sono salvati (data in secondi dall'epoch, importi in centesimi) per i
+formati con tipi nativi; TEXT_SELECT li restituisce già formattati da SQLite
+per i formati testuali, senza conversioni riga per riga in Python.
+
+Lo storico viene aperto con open_history: con un filtro per periodo vengono
+lette solo le partizioni per anno e gli anni archiviati che lo intersecano.
+"""
+from contextlib import closing
+from barflow.data.partitions import open_history
+from barflow.data.record_codec import period_bounds
+from .progress import ExportProgress
+
+# Colonne esportate, nell'ordine del file
+EXPORT_COLUMNS = [
+    "DATA", "SORGENTE", "DESCRIZIONE", "FORNITORE", "NUMERO FORNITORE",
+    "NUMERO OPERAZIONE POS", "IMPORTO LORDO POS", "COMMISSIONE POS", "IMPORTO NETTO"
+]
+
+# Valori salvati: (data_ts, data, sorgente, descrizione, fornitore, numero_fornitore,
+# numero_operazione_pos, importo_lordo_pos_cents, commissione_pos_cents, importo_netto_cents)
+RAW_SELECT = """
+    data_ts, data, sorgente, descrizione, fornitore, numero_fornitore,
+    numero_operazione_pos, importo_lordo_pos_cents, commissione_pos_cents,
+    importo_netto_cents
+"""
+
+# Valori testuali nell'ordine di EXPORT_COLUMNS: data ISO (o il testo originale
+# se non valida) e importi in euro con due decimali e punto decimale (vuoti se assenti)
+TEXT_SELECT = """
+    COALESCE(strftime('%Y-%m-%d %H:%M:%S', data_ts, 'unixepoch'), data),
+    sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos,
+    CASE WHEN importo_lordo_pos_cents IS NOT NULL
+         THEN printf('%.2f', importo_lordo_pos_cents / 100.0) END,
+    CASE WHEN commissione_pos_cents IS NOT NULL
+         THEN printf('%.2f', commissione_pos_cents / 100.0) END,
+    printf('%.2f', importo_netto_cents / 100.0)
+"""
+
+_EXPORT_QUERY = """
+    SELECT {select}
+    FROM transactions
+    {where_clause}
+    ORDER BY data_ts DESC
+"""
+
+# Righe lette dal cursore a ogni blocco
+EXPORT_BATCH_SIZE = 5000
+
+
+def history_period(start_date=None, end_date=None):
+    """
+    Estremi in secondi del periodo (data finale inclusa) per il filtro su data_ts.
+
+    Returns:
+        Tupla (inizio, fine) con None per un estremo non indicato, o None senza periodo
+    """
+    if start_date is None and end_date is None:
+        return None
+    return (
+        period_bounds(start_date, start_date)[0] if start_date is not None else None,
+        period_bounds(end_date, end_date)[1] if end_date is not None else None,
+    )
+
+
+def build_history_filter(start_date=None, end_date=None, sources=None, after_id=None, until_id=None):
+    """
+    Costruisce il filtro SQL per periodo, sorgente e intervallo di id.
+
+    Args:
+        start_date: Data iniziale inclusa (opzionale)
+        end_date: Data finale inclusa, tutta la giornata se senza orario (opzionale)
+        sources: Elenco di sorgenti da esportare (es. ['pos', 'fornitore'])
+        after_id: Solo le transazioni con id maggiore (es. inserite dopo l'ultima esportazione)
+        until_id: Solo le transazioni con id minore o uguale
+
+    Returns:
+        Tupla (where_clause, params) da passare a iter_history_batches
+    """
+    conditions = []
+    params = []
+    period = history_period(start_date, end_date)
+    if period is not None:
+        start_ts, end_ts = period
+        if start_date is not None:
+            conditions.append("data_ts >= ?")
+            params.append(start_ts)
+        if end_date is not None:
+            conditions.append("data_ts < ?")
+            params.append(end_ts)
+    if sources:
+        sources = list(sources)
+        conditions.append(f"sorgente IN ({', '.join('?' * len(sources))})")
+        params.extend(sources)
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+    if until_id is not None:
+        conditions.append("id <= ?")
+        params.append(until_id)
+    if not conditions:
+        return "", ()
+    return "WHERE " + " AND ".join(conditions), tuple(params)
+
+
+def _count_rows(conn, where_clause, params):
+    return conn.execute(f"SELECT COUNT(*) FROM transactions {where_clause}", params).fetchone()[0]
+
+
+def _iter_batches(conn, where_clause, params, batch_size, select):
+    cursor = conn.execute(_EXPORT_QUERY.format(select=select, where_clause=where_clause), params)
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        yield batch
+
+
+def count_history_rows(db_path, where_clause="", params=(), period=None, after_id=None):
+    """Numero di transazioni che verranno esportate con lo stesso filtro."""
+    with closing(open_history(db_path, period, after_id)) as conn:
+        return _count_rows(conn, where_clause, params)
+
+
+def iter_history_batches(db_path, where_clause="", params=(), batch_size=EXPORT_BATCH_SIZE,
+                         select=RAW_SELECT, period=None, after_id=None):
+    """
+    Genera le transazioni storiche a blocchi di al massimo batch_size righe.
+
+    Args:
+        db_path: Percorso del database storico (già migrato)
+        where_clause: Filtro SQL opzionale (vedi build_history_filter)
+        params: Parametri del filtro
+        batch_size: Numero di righe per blocco
+        select: Colonne da leggere (RAW_SELECT, TEXT_SELECT o un'altra espressione)
+        period: Periodo del filtro (vedi history_period): solo le partizioni necessarie
+        after_id: Id minimo escluso del filtro: gli anni archiviati precedenti non vengono letti
+    """
+    with closing(open_history(db_path, period, after_id)) as conn:
+        yield from _iter_batches(conn, where_clause, params, batch_size, select)
+
+
+def iter_export_batches(db_path, progress=None, is_cancelled=None, batch_size=EXPORT_BATCH_SIZE,
+                        select=RAW_SELECT, **filters):
+    """
+    Come iter_history_batches, con filtri (argomenti di build_history_filter),
+    avanzamento e annullamento.
+
+    L'avanzamento viene notificato quando il chiamante richiede il blocco
+    successivo, cioè dopo aver scritto quello precedente; l'annullamento viene
+    controllato prima di ogni blocco (solleva ExportCancelled).
+    """
+    where_clause, params = build_history_filter(**filters)
+    period = history_period(filters.get('start_date'), filters.get('end_date'))
+    # Conteggio e lettura sulla stessa connessione: partizioni e anni archiviati
+    # vengono collegati e caricati una sola volta
+    with closing(open_history(db_path, period, filters.get('after_id'))) as conn:
+        tracker = ExportProgress(
+            _count_rows(conn, where_clause, params) if progress is not None else 0,
+            progress, is_cancelled
+        )
+        tracker.check_cancelled()
+        for batch in _iter_batches(conn, where_clause, params, batch_size, select):
+            yield batch
+            tracker.advance(len(batch))
+            tracker.check_cancelled()
@@ -0,0 +1,66 @@
+"""
+Esportazione dello storico in Parquet.
+
+pyarrow è una dipendenza opzionale: viene importato solo quando si esporta in
+questo formato e parquet_available() permette di nascondere l'opzione se non è
+installato. Ogni blocco letto dal database diventa un row group del file.
+"""
+import importlib.util
+from .history_rows import EXPORT_COLUMNS, iter_export_batches
+from .progress import discard_partial_output
+
+# Righe per row group (blocchi più grandi: compressione e lettura più efficienti)
+PARQUET_BATCH_SIZE = 65536
+
+# Date come secondi dall'epoch, importi in euro
+_PARQUET_SELECT = """
+    data_ts, sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos,
+    importo_lordo_pos_cents / 100.0, commissione_pos_cents / 100.0,
+    importo_netto_cents / 100.0
+"""
+
+
+def parquet_available():
+    """True se pyarrow è installato e l'esportazione Parquet è disponibile."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def export_history_parquet(db_path, file_path, progress=None, is_cancelled=None, **filters):
+    """
+    Esporta le transazioni storiche in un file Parquet (compressione zstd).
+
+    Le date non valide vengono esportate come valori nulli.
+
+    Args:
+        db_path: Percorso del database storico
+        file_path: Percorso del file Parquet da creare
+        progress: Callback opzionale progress(scritte, totale)
+        is_cancelled: Callback opzionale che restituisce True per annullare
+        **filters: Filtri opzionali (vedi build_history_filter)
+
+    Returns:
+        int: Numero di transazioni esportate
+
+    Raises:
+        RuntimeError: Se pyarrow non è installato
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(
+            "L'esportazione in Parquet richiede il pacchetto pyarrow (pip install pyarrow)"
+        ) from e
+
+    types = [pa.timestamp('s')] + [pa.string()] * 5 + [pa.float64()] * 3
+    schema = pa.schema(list(zip(EXPORT_COLUMNS, types)))
+    exported = 0
+    with discard_partial_output(file_path):
+        with pq.ParquetWriter(str(file_path), schema, compression='zstd') as writer:
+            for batch in iter_export_batches(db_path, progress, is_cancelled, batch_size=PARQUET_BATCH_SIZE,
+                                             select=_PARQUET_SELECT, **filters):
+                columns = [pa.array(values, type=column_type)
+                           for values, column_type in zip(zip(*batch), types)]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+                exported += len(batch)
+    return exported
@@ -0,0 +1,70 @@
+"""
+Avanzamento e annullamento delle esportazioni.
+
+Le funzioni di esportazione ricevono due callback opzionali:
+    progress(scritte, totale)  chiamato dopo ogni blocco di righe
+    is_cancelled()             controllato prima di ogni blocco
+Se l'esportazione viene annullata viene sollevata ExportCancelled e il file
+parziale viene eliminato (o riportato alla dimensione iniziale se le righe
+venivano aggiunte in coda).
+"""
+import logging
+import os
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ExportCancelled(Exception):
+    """Esportazione annullata prima del completamento."""
+
+
+class ExportProgress:
+    """Conteggio delle righe scritte con notifica dell'avanzamento."""
+
+    def __init__(self, total=0, progress=None, is_cancelled=None):
+        self.total = total
+        self.written = 0
+        self._progress = progress
+        self._is_cancelled = is_cancelled
+
+    def check_cancelled(self):
+        """Solleva ExportCancelled se l'annullamento è stato richiesto."""
+        if self._is_cancelled is not None and self._is_cancelled():
+            raise ExportCancelled()
+
+    def advance(self, rows):
+        """Registra altre righe scritte e notifica l'avanzamento."""
+        self.written += rows
+        if self._progress is not None:
+            self._progress(self.written, max(self.total, self.written))
+
+
+def remove_partial_file(file_path):
+    """Elimina il file di un'esportazione non completata (se esiste)."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Impossibile eliminare il file parziale {file_path}: {e}")
+
+
+@contextmanager
+def discard_partial_output(file_path, original_size=None):
+    """
+    Se il blocco termina con un errore o un annullamento elimina il file creato,
+    oppure lo riporta a original_size se le righe venivano aggiunte a un file esistente.
+    """
+    try:
+        yield
+    except BaseException:
+        if original_size is None:
+            remove_partial_file(file_path)
+        else:
+            try:
+                with open(file_path, 'r+b') as f:
+                    f.truncate(original_size)
+            except OSError as e:
+                logger.error(f"Impossibile ripristinare il file {file_path}: {e}")
+        raise
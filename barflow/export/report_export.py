@@ -0,0 +1,357 @@
+"""
+Report Excel dello storico con aggregati calcolati da SQLite e grafici nativi.
+
+Ogni foglio del report contiene una tabella già aggregata da SQLite (GROUP BY
+nel database): in Python arrivano solo poche centinaia di righe anche con molti
+anni di storico. I grafici sono grafici nativi di Excel (xlsxwriter) che puntano
+alle celle della tabella, quindi restano modificabili e si aggiornano se i valori
+vengono corretti a mano.
+
+Fogli del report:
+    Riepilogo Mensile   entrate, uscite e profitto per mese
+    Giorni Settimana    entrate medie per giorno della settimana e obiettivo pareggio
+    Fornitori           classifica dei fornitori per spesa totale
+    Commissioni POS     lordo, commissioni e netto POS per mese
+Le medie per giorno della settimana seguono la stessa metodologia dell'analisi
+storica: media dei totali giornalieri, contando solo i giorni con entrate (o con
+uscite per l'obiettivo pareggio).
+"""
+import xlsxwriter
+from barflow.data.partitions import open_history
+from .history_rows import build_history_filter, history_period, iter_export_batches
+from .progress import ExportProgress, remove_partial_file
+from .xlsx_export import write_transactions_sheet
+
+# Giorni tra l'epoch di Excel (sistema 1900) e il giorno giuliano 0
+_EXCEL_JULIAN_OFFSET = 2415018.5
+
+# Nomi dei giorni della settimana (0=Lunedì, 6=Domenica)
+_WEEKDAY_NAMES = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
+
+# Fornitori mostrati nel grafico della classifica
+TOP_SUPPLIERS = 10
+
+# Totali per giorno di calendario (data_ts / 86400), calcolati con una sola
+# lettura dello storico e salvati in una tabella temporanea: mesi, giorni della
+# settimana e commissioni POS vengono poi aggregati da poche migliaia di righe,
+# senza funzioni di data valutate per ogni transazione.
+_DAILY_TOTALS_QUERY = """
+    CREATE TEMP TABLE report_giorni AS
+    SELECT data_ts / 86400 AS giorno,
+           COUNT(*) AS transazioni,
+           SUM(CASE WHEN importo_netto_cents > 0 THEN importo_netto_cents END) AS entrate,
+           SUM(CASE WHEN importo_netto_cents < 0 THEN -importo_netto_cents END) AS uscite,
+           COUNT(importo_lordo_pos_cents) AS operazioni_pos,
+           SUM(importo_lordo_pos_cents) AS lordo_pos,
+           SUM(CASE WHEN importo_lordo_pos_cents IS NOT NULL
+                    THEN COALESCE(commissione_pos_cents, 0) END) AS commissioni_pos,
+           SUM(CASE WHEN importo_lordo_pos_cents IS NOT NULL
+                    THEN importo_netto_cents END) AS netto_pos
+    FROM transactions
+    {where_clause}
+    GROUP BY giorno
+"""
+
+# Primo giorno del mese come data Excel (sistema 1900)
+_MONTH_EXPRESSION = f"""
+    julianday(date(giorno * 86400, 'unixepoch', 'start of month')) - {_EXCEL_JULIAN_OFFSET}
+"""
+
+# Mese, entrate, uscite, profitto e numero di transazioni
+_MONTHLY_QUERY = f"""
+    SELECT {_MONTH_EXPRESSION} AS mese,
+           TOTAL(entrate), TOTAL(uscite), TOTAL(entrate) - TOTAL(uscite), SUM(transazioni)
+    FROM report_giorni
+    GROUP BY mese
+    ORDER BY mese
+"""
+
+# Medie dei totali giornalieri per giorno della settimana. Il giorno 0 dell'epoch
+# (1970-01-01) è un giovedì: (giorno + 3) % 7 dà 0=Lunedì.
+_WEEKDAY_QUERY = """
+    SELECT (giorno + 3) % 7 AS giorno_settimana,
+           COUNT(entrate), AVG(entrate), TOTAL(entrate), COUNT(uscite), AVG(uscite)
+    FROM report_giorni
+    GROUP BY giorno_settimana
+    ORDER BY giorno_settimana
+"""
+
+# Media delle uscite giornaliere sui soli giorni con uscite (obiettivo pareggio)
+_BREAK_EVEN_QUERY = "SELECT AVG(uscite) FROM report_giorni"
+
+# Mese, importo lordo, commissioni, netto e numero di operazioni POS
+_POS_QUERY = f"""
+    SELECT {_MONTH_EXPRESSION} AS mese,
+           TOTAL(lordo_pos), TOTAL(commissioni_pos), TOTAL(netto_pos), SUM(operazioni_pos)
+    FROM report_giorni
+    WHERE operazioni_pos > 0
+    GROUP BY mese
+    ORDER BY mese
+"""
+
+# Fornitore, spesa totale e numero di ordini (indice fornitore, importo senza
+# leggere le righe della tabella, se non ci sono filtri per periodo)
+_SUPPLIERS_QUERY = """
+    SELECT fornitore, -SUM(importo_netto_cents), COUNT(*)
+    FROM transactions
+    {where_clause}
+    GROUP BY fornitore
+    ORDER BY 2 DESC, fornitore
+"""
+
+
+def _with_condition(where_clause, condition):
+    """Aggiunge una condizione al filtro di build_history_filter."""
+    if where_clause:
+        return f"{where_clause} AND {condition}"
+    return f"WHERE {condition}"
+
+
+def query_report_data(db_path, **filters):
+    """
+    Calcola nel database gli aggregati del report.
+
+    Args:
+        db_path: Percorso del database storico
+        **filters: Filtri opzionali (vedi build_history_filter)
+
+    Returns:
+        dict con le righe di 'monthly', 'weekday', 'suppliers', 'pos' (importi in
+        centesimi, date come numeri seriali Excel) e 'break_even' (centesimi o None)
+    """
+    where_clause, params = build_history_filter(**filters)
+    conn = open_history(db_path, history_period(filters.get('start_date'), filters.get('end_date')))
+    try:
+        conn.execute(
+            _DAILY_TOTALS_QUERY.format(where_clause=_with_condition(where_clause, "data_ts IS NOT NULL")),
+            params
+        )
+        return {
+            'monthly': conn.execute(_MONTHLY_QUERY).fetchall(),
+            'weekday': conn.execute(_WEEKDAY_QUERY).fetchall(),
+            'break_even': conn.execute(_BREAK_EVEN_QUERY).fetchone()[0],
+            'suppliers': conn.execute(
+                _SUPPLIERS_QUERY.format(where_clause=_with_condition(
+                    where_clause, "importo_netto_cents < 0 AND fornitore > ''"
+                )), params
+            ).fetchall(),
+            'pos': conn.execute(_POS_QUERY).fetchall(),
+        }
+    finally:
+        # La tabella temporanea viene eliminata con la connessione
+        conn.close()
+
+
+class _ReportFormats:
+    """Formati di cella condivisi dai fogli del report."""
+
+    def __init__(self, workbook):
+        self.header = workbook.add_format({'bold': True, 'border': 1, 'align': 'center',
+                                           'bg_color': '#D9E1F2'})
+        self.month = workbook.add_format({'num_format': 'mm/yyyy', 'align': 'left'})
+        self.amount = workbook.add_format({'num_format': '#,##0.00'})
+        self.percent = workbook.add_format({'num_format': '0.00%'})
+        self.note = workbook.add_format({'italic': True, 'font_color': '#7F8C8D'})
+
+
+def _start_sheet(workbook, formats, name, columns):
+    """Aggiunge un foglio con intestazione e larghezze delle colonne [(titolo, larghezza)]."""
+    worksheet = workbook.add_worksheet(name)
+    for col, (title, width) in enumerate(columns):
+        worksheet.set_column(col, col, width)
+        worksheet.write_string(0, col, title, formats.header)
+    worksheet.freeze_panes(1, 0)
+    return worksheet
+
+
+def _series(sheet_name, col, first_row, last_row, **options):
+    """Serie di un grafico che punta a una colonna del foglio (righe incluse)."""
+    series = {
+        'name': [sheet_name, 0, col],
+        'categories': [sheet_name, first_row, 0, last_row, 0],
+        'values': [sheet_name, first_row, col, last_row, col],
+    }
+    series.update(options)
+    return series
+
+
+def _write_monthly_sheet(workbook, formats, rows):
+    name = 'Riepilogo Mensile'
+    worksheet = _start_sheet(workbook, formats, name, [
+        ("MESE", 10), ("ENTRATE", 14), ("USCITE", 14), ("PROFITTO", 14), ("TRANSAZIONI", 13)
+    ])
+    if not rows:
+        worksheet.write_string(1, 0, "Nessuna transazione nel periodo", formats.note)
+        return
+    for row, (month, income, expense, profit, count) in enumerate(rows, start=1):
+        worksheet.write_number(row, 0, month, formats.month)
+        worksheet.write_number(row, 1, income / 100, formats.amount)
+        worksheet.write_number(row, 2, expense / 100, formats.amount)
+        worksheet.write_number(row, 3, profit / 100, formats.amount)
+        worksheet.write_number(row, 4, count)
+    last_row = len(rows)
+
+    chart = workbook.add_chart({'type': 'column'})
+    chart.add_series(_series(name, 1, 1, last_row, fill={'color': '#27AE60'}))
+    chart.add_series(_series(name, 2, 1, last_row, fill={'color': '#E74C3C'}))
+    profit_line = workbook.add_chart({'type': 'line'})
+    profit_line.add_series(_series(name, 3, 1, last_row, line={'color': '#2C3E50', 'width': 2}))
+    chart.combine(profit_line)
+    chart.set_title({'name': 'Entrate vs Uscite Mensili'})
+    chart.set_x_axis({'num_format': 'mm/yyyy'})
+    chart.set_y_axis({'num_format': '#,##0', 'major_gridlines': {'visible': True}})
+    chart.set_legend({'position': 'bottom'})
+    chart.set_size({'width': 900, 'height': 420})
+    worksheet.insert_chart(1, 6, chart)
+
+
+def _write_weekday_sheet(workbook, formats, rows, break_even):
+    name = 'Giorni Settimana'
+    worksheet = _start_sheet(workbook, formats, name, [
+        ("GIORNO", 12), ("GIORNI CON ENTRATE", 19), ("ENTRATE MEDIE", 15), ("ENTRATE TOTALI", 16),
+        ("GIORNI CON USCITE", 18), ("USCITE MEDIE", 14), ("OBIETTIVO PAREGGIO", 19)
+    ])
+    # Solo i giorni della settimana con almeno un incasso, come nell'analisi storica
+    rows = [row for row in rows if row[1]]
+    if not rows:
+        worksheet.write_string(1, 0, "Nessuna entrata nel periodo", formats.note)
+        return
+    for row, (weekday, income_days, income_avg, income_total, expense_days, expense_avg) in enumerate(rows, start=1):
+        worksheet.write_string(row, 0, _WEEKDAY_NAMES[weekday])
+        worksheet.write_number(row, 1, income_days)
+        worksheet.write_number(row, 2, income_avg / 100, formats.amount)
+        worksheet.write_number(row, 3, income_total / 100, formats.amount)
+        worksheet.write_number(row, 4, expense_days)
+        if expense_avg is not None:
+            worksheet.write_number(row, 5, expense_avg / 100, formats.amount)
+        if break_even is not None:
+            worksheet.write_number(row, 6, break_even / 100, formats.amount)
+    last_row = len(rows)
+
+    chart = workbook.add_chart({'type': 'column'})
+    chart.add_series(_series(name, 2, 1, last_row, fill={'color': '#27AE60'},
+                             data_labels={'value': True, 'num_format': '#,##0'}))
+    if break_even is not None:
+        target_line = workbook.add_chart({'type': 'line'})
+        target_line.add_series(_series(name, 6, 1, last_row,
+                                       line={'color': '#E74C3C', 'width': 2, 'dash_type': 'dash'}))
+        chart.combine(target_line)
+    chart.set_title({'name': 'Entrate Medie per Giorno della Settimana'})
+    chart.set_y_axis({'num_format': '#,##0'})
+    chart.set_legend({'position': 'bottom'})
+    chart.set_size({'width': 720, 'height': 380})
+    worksheet.insert_chart(1, 8, chart)
+
+
+def _write_suppliers_sheet(workbook, formats, rows):
+    name = 'Fornitori'
+    worksheet = _start_sheet(workbook, formats, name, [
+        ("POSIZIONE", 10), ("FORNITORE", 32), ("SPESA TOTALE", 15), ("ORDINI", 9),
+        ("SPESA MEDIA", 13)
+    ])
+    if not rows:
+        worksheet.write_string(1, 0, "Nessuna spesa verso fornitori nel periodo", formats.note)
+        return
+    for row, (supplier, spent, orders) in enumerate(rows, start=1):
+        worksheet.write_number(row, 0, row)
+        worksheet.write_string(row, 1, supplier)
+        worksheet.write_number(row, 2, spent / 100, formats.amount)
+        worksheet.write_number(row, 3, orders)
+        worksheet.write_number(row, 4, spent / orders / 100, formats.amount)
+    last_row = min(len(rows), TOP_SUPPLIERS)
+
+    chart = workbook.add_chart({'type': 'bar'})
+    chart.add_series({
+        'name': [name, 0, 2],
+        'categories': [name, 1, 1, last_row, 1],
+        'values': [name, 1, 2, last_row, 2],
+        'fill': {'color': '#E74C3C'},
+        'data_labels': {'value': True, 'num_format': '#,##0'},
+    })
+    chart.set_title({'name': f'Top {TOP_SUPPLIERS} Fornitori per Spesa'})
+    # Il primo fornitore della classifica in alto
+    chart.set_y_axis({'reverse': True})
+    chart.set_x_axis({'num_format': '#,##0'})
+    chart.set_legend({'none': True})
+    chart.set_size({'width': 720, 'height': 420})
+    worksheet.insert_chart(1, 6, chart)
+
+
+def _write_pos_sheet(workbook, formats, rows):
+    name = 'Commissioni POS'
+    worksheet = _start_sheet(workbook, formats, name, [
+        ("MESE", 10), ("LORDO POS", 14), ("COMMISSIONI", 14), ("NETTO POS", 14),
+        ("OPERAZIONI", 11), ("% COMMISSIONE", 15)
+    ])
+    if not rows:
+        worksheet.write_string(1, 0, "Nessuna operazione POS nel periodo", formats.note)
+        return
+    for row, (month, gross, commission, net, count) in enumerate(rows, start=1):
+        worksheet.write_number(row, 0, month, formats.month)
+        worksheet.write_number(row, 1, gross / 100, formats.amount)
+        worksheet.write_number(row, 2, commission / 100, formats.amount)
+        worksheet.write_number(row, 3, net / 100, formats.amount)
+        worksheet.write_number(row, 4, count)
+        if gross:
+            worksheet.write_number(row, 5, commission / gross, formats.percent)
+    last_row = len(rows)
+
+    chart = workbook.add_chart({'type': 'column'})
+    chart.add_series(_series(name, 2, 1, last_row, fill={'color': '#E67E22'}))
+    rate_line = workbook.add_chart({'type': 'line'})
+    rate_line.add_series(_series(name, 5, 1, last_row, y2_axis=True,
+                                 line={'color': '#2C3E50', 'width': 2}))
+    chart.combine(rate_line)
+    chart.set_title({'name': 'Commissioni POS Mensili'})
+    chart.set_x_axis({'num_format': 'mm/yyyy'})
+    chart.set_y_axis({'num_format': '#,##0.00'})
+    rate_line.set_y2_axis({'num_format': '0.0%'})
+    chart.set_legend({'position': 'bottom'})
+    chart.set_size({'width': 900, 'height': 420})
+    worksheet.insert_chart(1, 7, chart)
+
+
+def export_history_report(db_path, file_path, progress=None, is_cancelled=None,
+                          include_transactions=False, **filters):
+    """
+    Esporta il report dello storico (aggregati e grafici) in un file XLSX.
+
+    Args:
+        db_path: Percorso del database storico
+        file_path: Percorso del file XLSX da creare
+        progress: Callback opzionale progress(scritte, totale), usato per il foglio delle transazioni
+        is_cancelled: Callback opzionale che restituisce True per annullare
+        include_transactions: Se True aggiunge in fondo il foglio con tutte le transazioni
+        **filters: Filtri opzionali (vedi build_history_filter)
+
+    Returns:
+        int: Numero di transazioni con data valida incluse nel report
+
+    Raises:
+        ExportCancelled: Se l'esportazione è stata annullata (il file viene eliminato)
+    """
+    tracker = ExportProgress(is_cancelled=is_cancelled)
+    tracker.check_cancelled()
+    data = query_report_data(db_path, **filters)
+    tracker.check_cancelled()
+
+    workbook = xlsxwriter.Workbook(str(file_path), {'constant_memory': True})
+    completed = False
+    try:
+        formats = _ReportFormats(workbook)
+        _write_monthly_sheet(workbook, formats, data['monthly'])
+        _write_weekday_sheet(workbook, formats, data['weekday'], data['break_even'])
+        _write_suppliers_sheet(workbook, formats, data['suppliers'])
+        _write_pos_sheet(workbook, formats, data['pos'])
+        if include_transactions:
+            write_transactions_sheet(
+                workbook, 'Transazioni Storico',
+                iter_export_batches(db_path, progress, is_cancelled, **filters)
+            )
+        tracker.check_cancelled()
+        completed = True
+    finally:
+        workbook.close()
+        if not completed:
+            remove_partial_file(file_path)
+    return sum(row[4] for row in data['monthly'])
@@ -0,0 +1,91 @@
+"""
+Esportazione dello storico in CSV e JSON Lines.
+
+I valori vengono formattati da SQLite nella query stessa (date ISO, importi
+con punto decimale, oggetti JSON con json_object), quindi Python si limita a
+scrivere i blocchi di righe già pronti sul file. Entrambi i formati possono
+essere aggiunti in coda a un file esistente (esportazioni incrementali).
+"""
+import csv
+import os
+from .history_rows import EXPORT_COLUMNS, TEXT_SELECT, iter_export_batches
+from .progress import discard_partial_output
+
+# Una riga JSON per transazione, con importi numerici (null se assenti)
+_JSONL_SELECT = """
+    json_object(
+        'DATA', COALESCE(strftime('%Y-%m-%d %H:%M:%S', data_ts, 'unixepoch'), data),
+        'SORGENTE', sorgente,
+        'DESCRIZIONE', descrizione,
+        'FORNITORE', fornitore,
+        'NUMERO FORNITORE', numero_fornitore,
+        'NUMERO OPERAZIONE POS', numero_operazione_pos,
+        'IMPORTO LORDO POS', importo_lordo_pos_cents / 100.0,
+        'COMMISSIONE POS', commissione_pos_cents / 100.0,
+        'IMPORTO NETTO', importo_netto_cents / 100.0
+    )
+"""
+
+
+def _existing_size(file_path, append):
+    """Dimensione del file a cui aggiungere le righe (None se il file viene creato)."""
+    if append and os.path.exists(file_path):
+        return os.path.getsize(file_path)
+    return None
+
+
+def export_history_csv(db_path, file_path, progress=None, is_cancelled=None,
+                       delimiter=',', append=False, **filters):
+    """
+    Esporta le transazioni storiche in un file CSV (UTF-8, punto come separatore decimale).
+
+    Args:
+        db_path: Percorso del database storico
+        file_path: Percorso del file CSV da creare
+        progress: Callback opzionale progress(scritte, totale)
+        is_cancelled: Callback opzionale che restituisce True per annullare
+        delimiter: Separatore dei campi
+        append: Aggiunge le righe in coda al file se esiste già (senza intestazione)
+        **filters: Filtri opzionali (vedi build_history_filter)
+
+    Returns:
+        int: Numero di transazioni esportate
+    """
+    original_size = _existing_size(file_path, append)
+    exported = 0
+    with discard_partial_output(file_path, original_size):
+        with open(file_path, 'a' if original_size is not None else 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            if original_size is None:
+                writer.writerow(EXPORT_COLUMNS)
+            for batch in iter_export_batches(db_path, progress, is_cancelled, select=TEXT_SELECT, **filters):
+                writer.writerows(batch)
+                exported += len(batch)
+    return exported
+
+
+def export_history_jsonl(db_path, file_path, progress=None, is_cancelled=None,
+                         append=False, **filters):
+    """
+    Esporta le transazioni storiche in JSON Lines (un oggetto JSON per riga).
+
+    Args:
+        db_path: Percorso del database storico
+        file_path: Percorso del file JSONL da creare
+        progress: Callback opzionale progress(scritte, totale)
+        is_cancelled: Callback opzionale che restituisce True per annullare
+        append: Aggiunge le righe in coda al file se esiste già
+        **filters: Filtri opzionali (vedi build_history_filter)
+
+    Returns:
+        int: Numero di transazioni esportate
+    """
+    original_size = _existing_size(file_path, append)
+    exported = 0
+    with discard_partial_output(file_path, original_size):
+        with open(file_path, 'a' if original_size is not None else 'w', encoding='utf-8') as f:
+            for batch in iter_export_batches(db_path, progress, is_cancelled, select=_JSONL_SELECT, **filters):
+                f.write("\n".join([row[0] for row in batch]))
+                f.write("\n")
+                exported += len(batch)
+    return exported
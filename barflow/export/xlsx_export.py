@@ -0,0 +1,100 @@
+"""
+Esportazione dello storico in Excel con xlsxwriter in modalità constant_memory.
+
+In constant_memory ogni riga viene scritta su disco appena completata, quindi
+il file viene prodotto in streaming dal cursore del database. Date e importi
+sono scritti come numeri con un formato di cella (non come testo già
+formattato), così restano ordinabili e utilizzabili nelle formule.
+"""
+import xlsxwriter
+from .history_rows import EXPORT_COLUMNS, iter_export_batches
+from .progress import remove_partial_file
+
+# Giorni tra l'epoch di Excel (sistema 1900) e l'epoch Unix
+_EXCEL_EPOCH_OFFSET = 25569
+_SECONDS_PER_DAY = 86400
+
+# Larghezza delle colonne nel foglio (in caratteri)
+_COLUMN_WIDTHS = [12, 11, 30, 28, 18, 22, 18, 16, 16]
+
+
+def export_history_xlsx(db_path, file_path, progress=None, is_cancelled=None,
+                        sheet_name='Transazioni Storico', **filters):
+    """
+    Esporta le transazioni storiche in un file XLSX.
+
+    Args:
+        db_path: Percorso del database storico
+        file_path: Percorso del file XLSX da creare
+        progress: Callback opzionale progress(scritte, totale)
+        is_cancelled: Callback opzionale che restituisce True per annullare
+        sheet_name: Nome del foglio
+        **filters: Filtri opzionali (vedi build_history_filter)
+
+    Returns:
+        int: Numero di transazioni esportate
+
+    Raises:
+        ExportCancelled: Se l'esportazione è stata annullata (il file viene eliminato)
+    """
+    workbook = xlsxwriter.Workbook(str(file_path), {'constant_memory': True})
+    completed = False
+    try:
+        row = write_transactions_sheet(
+            workbook, sheet_name, iter_export_batches(db_path, progress, is_cancelled, **filters)
+        )
+        completed = True
+    finally:
+        workbook.close()
+        if not completed:
+            remove_partial_file(file_path)
+    return row
+
+
+def write_transactions_sheet(workbook, sheet_name, batches):
+    """
+    Aggiunge al workbook un foglio con le transazioni lette a blocchi (RAW_SELECT).
+
+    Returns:
+        int: Numero di transazioni scritte
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    date_format = workbook.add_format({'num_format': 'dd-mm-yyyy'})
+    amount_format = workbook.add_format({'num_format': '#,##0.00'})
+
+    for col, width in enumerate(_COLUMN_WIDTHS):
+        worksheet.set_column(col, col, width)
+    worksheet.freeze_panes(1, 0)
+    for col, name in enumerate(EXPORT_COLUMNS):
+        worksheet.write_string(0, col, name, header_format)
+
+    # Metodi risolti una sola volta: il ciclo viene eseguito per ogni cella
+    write_number = worksheet.write_number
+    write_string = worksheet.write_string
+    row = 0
+    for batch in batches:
+        for (data_ts, data_text, sorgente, descrizione, fornitore, numero_fornitore,
+             numero_pos, lordo_cents, commissione_cents, netto_cents) in batch:
+            row += 1
+            if data_ts is not None:
+                write_number(row, 0, data_ts / _SECONDS_PER_DAY + _EXCEL_EPOCH_OFFSET, date_format)
+            else:
+                write_string(row, 0, f"Data non valida: {data_text}")
+            # Le celle vuote non vengono scritte
+            if sorgente:
+                write_string(row, 1, sorgente)
+            if descrizione:
+                write_string(row, 2, descrizione)
+            if fornitore:
+                write_string(row, 3, fornitore)
+            if numero_fornitore:
+                write_string(row, 4, numero_fornitore)
+            if numero_pos:
+                write_string(row, 5, numero_pos)
+            if lordo_cents is not None:
+                write_number(row, 6, lordo_cents / 100, amount_format)
+            if commissione_cents is not None:
+                write_number(row, 7, commissione_cents / 100, amount_format)
+            write_number(row, 8, netto_cents / 100, amount_format)
+    return row
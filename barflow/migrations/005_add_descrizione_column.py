@@ -0,0 +1,15 @@
+"""
+Migrazione per aggiungere la colonna DESCRIZIONE alla tabella transactions
+Versione: 5
+
+I database creati da zero hanno già la colonna descrizione: in quel caso
+la migrazione non fa nulla, così la catena delle migrazioni successive
+non si interrompe su un "duplicate column name".
+"""
+
+
+def upgrade(cursor):
+    cursor.execute("PRAGMA table_info(transactions)")
+    existing_columns = [col[1] for col in cursor.fetchall()]
+    if "descrizione" not in existing_columns:
+        cursor.execute("ALTER TABLE transactions ADD COLUMN descrizione TEXT DEFAULT NULL")
@@ -0,0 +1,43 @@
+"""
+Migrazione per riorganizzare la tabella transactions con la colonna descrizione nella posizione corretta
+Versione: 6
+
+La tabella viene copiata a blocchi in transactions_temp (con la struttura
+corretta) e poi sostituita: su database grandi la copia mostra l'avanzamento
+e, se interrotta, riprende dal blocco successivo.
+"""
+from barflow.data.py_sqlite_migrator import table_exists
+
+COLUMNS = """
+    id, data, sorgente, descrizione, fornitore, numero_fornitore, numero_operazione_pos,
+    importo_lordo_pos, commissione_pos, importo_netto, hash_record, data_inserimento, file_origine
+"""
+
+
+def copy_batches(migration):
+    # Crea una tabella temporanea con la struttura corretta e copia i dati dalla tabella originale
+    migration.copy_table("transactions", "transactions_temp", """
+        CREATE TABLE transactions_temp (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            sorgente TEXT NOT NULL,
+            descrizione TEXT,
+            fornitore TEXT,
+            numero_fornitore TEXT,
+            numero_operazione_pos TEXT,
+            importo_lordo_pos REAL,
+            commissione_pos REAL,
+            importo_netto REAL NOT NULL,
+            hash_record TEXT UNIQUE,
+            data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            file_origine TEXT
+        )
+    """, COLUMNS, COLUMNS)
+
+
+def upgrade(cursor):
+    if not table_exists(cursor, "transactions_temp"):
+        return
+    # Sostituisce la tabella originale con quella copiata
+    cursor.execute("DROP TABLE transactions")
+    cursor.execute("ALTER TABLE transactions_temp RENAME TO transactions")
@@ -0,0 +1,22 @@
+-- Migrazione per sostituire gli indici a colonna singola con indici composti/coprenti
+-- Versione: 7
+
+-- hash_record è già UNIQUE: SQLite mantiene un indice automatico, quello esplicito è un duplicato
+DROP INDEX IF EXISTS idx_hash;
+
+-- Sostituiti dagli indici composti qui sotto (ne sono un prefisso)
+DROP INDEX IF EXISTS idx_data;
+DROP INDEX IF EXISTS idx_sorgente;
+
+-- Totali per periodo: filtro su data e somma di importo_netto senza leggere la tabella
+CREATE INDEX IF NOT EXISTS idx_data_importo ON transactions(data, importo_netto);
+
+-- Filtri per sorgente ordinati per data
+CREATE INDEX IF NOT EXISTS idx_sorgente_data ON transactions(sorgente, data);
+
+-- Grafici fornitori: raggruppamento per fornitore e somma degli importi
+CREATE INDEX IF NOT EXISTS idx_fornitore_importo ON transactions(fornitore, importo_netto);
+
+-- Aggiorna le statistiche usate dal query planner
+ANALYZE;
+PRAGMA optimize;
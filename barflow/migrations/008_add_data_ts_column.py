@@ -0,0 +1,28 @@
+"""
+Migrazione per aggiungere la colonna data_ts (secondi dall'epoch) alla tabella transactions
+Versione: 8
+
+La colonna testuale `data` contiene sia 'YYYY-MM-DD' sia 'YYYY-MM-DD HH:MM:SS':
+data_ts normalizza entrambi in un intero indicizzato, usato per filtri per periodo
+e per restituire date già tipizzate senza parsing di stringhe.
+"""
+
+
+def upgrade(cursor):
+    cursor.execute("PRAGMA table_info(transactions)")
+    existing_columns = [col[1] for col in cursor.fetchall()]
+    if "data_ts" not in existing_columns:
+        cursor.execute("ALTER TABLE transactions ADD COLUMN data_ts INTEGER")
+
+    cursor.execute("""
+        UPDATE transactions
+        SET data_ts = CAST(strftime('%s', data) AS INTEGER)
+        WHERE data_ts IS NULL
+    """)
+
+    # Gli indici per periodo passano dalla data testuale a data_ts
+    cursor.execute("DROP INDEX IF EXISTS idx_data_importo")
+    cursor.execute("DROP INDEX IF EXISTS idx_sorgente_data")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_ts_importo ON transactions(data_ts, importo_netto)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sorgente_data_ts ON transactions(sorgente, data_ts)")
+    cursor.execute("ANALYZE")
@@ -0,0 +1,78 @@
+"""
+Migrazione per salvare gli importi come centesimi interi
+Versione: 9
+
+importo_netto, importo_lordo_pos e commissione_pos (REAL) vengono sostituiti da
+importo_netto_cents, importo_lordo_pos_cents e commissione_pos_cents (INTEGER):
+le somme diventano esatte e l'hash dei record non dipende più dalla forma del float.
+Gli hash vengono copiati così come sono: li ricalcola la migrazione 10 con la
+codifica canonica (che scarta anche i duplicati come 10 e 10.0).
+
+Le righe vengono convertite e copiate a blocchi in transactions_new (con
+avanzamento e ripresa dopo un'interruzione); upgrade sostituisce poi la tabella.
+"""
+from barflow.data.py_sqlite_migrator import table_exists
+from barflow.data.record_codec import to_cents
+
+
+def _needs_upgrade(cursor):
+    cursor.execute("PRAGMA table_info(transactions)")
+    existing_columns = [col[1] for col in cursor.fetchall()]
+    return "importo_netto_cents" not in existing_columns
+
+
+def _convert_amounts(rows):
+    return [
+        (row_id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+         numero_operazione_pos, to_cents(lordo), to_cents(commissione), to_cents(netto) or 0,
+         hash_record, data_inserimento, file_origine)
+        for (row_id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+             numero_operazione_pos, lordo, commissione, netto, hash_record, data_inserimento,
+             file_origine) in rows
+    ]
+
+
+def copy_batches(migration):
+    if not _needs_upgrade(migration.conn.cursor()):
+        return
+
+    migration.copy_table("transactions", "transactions_new", """
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            data_ts INTEGER,
+            sorgente TEXT NOT NULL,
+            descrizione TEXT,
+            fornitore TEXT,
+            numero_fornitore TEXT,
+            numero_operazione_pos TEXT,
+            importo_lordo_pos_cents INTEGER,
+            commissione_pos_cents INTEGER,
+            importo_netto_cents INTEGER NOT NULL,
+            hash_record TEXT UNIQUE,
+            data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            file_origine TEXT
+        )
+    """, """
+        id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+        numero_operazione_pos, importo_lordo_pos_cents, commissione_pos_cents,
+        importo_netto_cents, hash_record, data_inserimento, file_origine
+    """, """
+        id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+        numero_operazione_pos, importo_lordo_pos, commissione_pos, importo_netto,
+        hash_record, data_inserimento, file_origine
+    """, transform=_convert_amounts)
+
+
+def upgrade(cursor):
+    if not _needs_upgrade(cursor) or not table_exists(cursor, "transactions_new"):
+        return
+
+    cursor.execute("DROP TABLE transactions")
+    cursor.execute("ALTER TABLE transactions_new RENAME TO transactions")
+
+    # La ricostruzione elimina gli indici: vengono ricreati sulle colonne in centesimi
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_ts_importo ON transactions(data_ts, importo_netto_cents)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sorgente_data_ts ON transactions(sorgente, data_ts)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fornitore_importo ON transactions(fornitore, importo_netto_cents)")
+    cursor.execute("ANALYZE")
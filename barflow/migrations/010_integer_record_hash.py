@@ -0,0 +1,83 @@
+"""
+Migrazione per salvare hash_record come hash BLAKE2b a 64 bit (INTEGER)
+Versione: 10
+
+Gli hash MD5 esadecimali (TEXT) vengono sostituiti da interi calcolati con
+barflow.data.record_hash sulla codifica canonica dei record. La colonna cambia
+tipo, quindi la tabella viene ricostruita; i record che con la nuova codifica
+risultano duplicati (es. 10 e 10.0, descrizione NULL e vuota) vengono scartati.
+
+Gli hash vengono calcolati e le righe copiate a blocchi in transactions_new
+(con avanzamento e ripresa dopo un'interruzione); upgrade sostituisce poi la tabella.
+"""
+import logging
+from barflow.data.py_sqlite_migrator import table_exists
+from barflow.data.record_hash import hash_columns
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_upgrade(cursor):
+    cursor.execute("PRAGMA table_info(transactions)")
+    column_types = {col[1]: col[2].upper() for col in cursor.fetchall()}
+    return column_types.get("hash_record") != "INTEGER"
+
+
+def _add_hashes(rows):
+    if not rows:
+        return rows
+    columns = list(zip(*rows))
+    # La data entra nell'hash come data_ts; il testo solo se data_ts non è valorizzato
+    dates = [data_ts if data_ts is not None else data for data, data_ts in zip(columns[1], columns[2])]
+    hashes = hash_columns(dates, columns[3], columns[4], columns[5], columns[6], columns[7], columns[10])
+    return [row[:11] + (record_hash,) + row[11:] for row, record_hash in zip(rows, hashes)]
+
+
+def copy_batches(migration):
+    if not _needs_upgrade(migration.conn.cursor()):
+        return
+
+    copied = migration.copy_table("transactions", "transactions_new", """
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            data_ts INTEGER,
+            sorgente TEXT NOT NULL,
+            descrizione TEXT,
+            fornitore TEXT,
+            numero_fornitore TEXT,
+            numero_operazione_pos TEXT,
+            importo_lordo_pos_cents INTEGER,
+            commissione_pos_cents INTEGER,
+            importo_netto_cents INTEGER NOT NULL,
+            hash_record INTEGER UNIQUE,
+            data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            file_origine TEXT
+        )
+    """, """
+        id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+        numero_operazione_pos, importo_lordo_pos_cents, commissione_pos_cents,
+        importo_netto_cents, hash_record, data_inserimento, file_origine
+    """, """
+        id, data, data_ts, sorgente, descrizione, fornitore, numero_fornitore,
+        numero_operazione_pos, importo_lordo_pos_cents, commissione_pos_cents,
+        importo_netto_cents, data_inserimento, file_origine
+    """, transform=_add_hashes, or_ignore=True)
+
+    kept = migration.conn.execute("SELECT COUNT(*) FROM transactions_new").fetchone()[0]
+    if kept < copied:
+        logger.info(f"Scartati {copied - kept} record duplicati durante il ricalcolo degli hash")
+
+
+def upgrade(cursor):
+    if not _needs_upgrade(cursor) or not table_exists(cursor, "transactions_new"):
+        return
+
+    cursor.execute("DROP TABLE transactions")
+    cursor.execute("ALTER TABLE transactions_new RENAME TO transactions")
+
+    # La ricostruzione elimina gli indici
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_data_ts_importo ON transactions(data_ts, importo_netto_cents)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sorgente_data_ts ON transactions(sorgente, data_ts)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fornitore_importo ON transactions(fornitore, importo_netto_cents)")
+    cursor.execute("ANALYZE")
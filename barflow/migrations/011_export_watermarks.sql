@@ -0,0 +1,12 @@
+-- Migrazione per registrare il punto di arrivo delle esportazioni incrementali
+-- Versione: 11
+
+-- Per ogni destinazione (cartella + formato) l'id dell'ultima transazione esportata:
+-- l'esportazione "solo nuove transazioni" legge le righe con id maggiore
+-- (gli id sono AUTOINCREMENT, quindi crescono con l'inserimento)
+CREATE TABLE IF NOT EXISTS export_watermarks (
+    target TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    last_inserted_at TIMESTAMP,
+    exported_at TIMESTAMP NOT NULL
+);
@@ -0,0 +1,14 @@
+"""
+Migrazione per le statistiche delle transazioni mantenute da trigger
+Versione: 12
+
+La tabella transaction_stats (una riga per sorgente: numero di transazioni,
+totale netto, prima e ultima data) viene aggiornata dai trigger a ogni
+modifica di transactions: le statistiche del database non richiedono più un
+COUNT(*) su tutta la tabella. Vedi barflow.data.table_stats.
+"""
+from barflow.data.table_stats import install_table_stats
+
+
+def upgrade(cursor):
+    install_table_stats(cursor, "transactions", "transaction_stats")
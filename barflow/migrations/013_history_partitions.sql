@@ -0,0 +1,14 @@
+-- Migrazione per il partizionamento per anno dello storico
+-- Versione: 13
+
+-- Anni spostati dalla tabella transactions in file separati
+-- (vedi barflow.data.partitions). file_name è relativo alla cartella delle
+-- partizioni accanto al database; read_only = 1 per gli anni chiusi, che
+-- vengono aperti solo in lettura. Finché la tabella è vuota lo storico resta
+-- tutto in transactions.
+CREATE TABLE IF NOT EXISTS history_partitions (
+    year INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    read_only INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,10 @@
+"""
+Migrazioni dello schema del database storico.
+
+I file NNN_nome.sql / NNN_nome.py vengono applicati in ordine da
+PySQLiteMigrator. SCHEMA_VERSION è il numero dell'ultima migrazione: va
+aggiornato insieme a ogni nuova migrazione, perché all'avvio un database con
+PRAGMA user_version uguale a SCHEMA_VERSION viene aperto senza eseguirle.
+"""
+
+SCHEMA_VERSION = 13
@@ -1,21 +1,20 @@
 """
 Modulo interfaccia utente di BarFlow
+
+I widget vengono importati al primo accesso (vedi barflow.utils.lazy_exports):
+le sezioni con grafici e pandas non rallentano l'apertura della finestra.
 """
+from barflow.utils.lazy_exports import lazy_exports
 
-from .main_window import MainWindow
-from .transactions_widget import TransactionsWidget
-from .import_widget import ImportWidget
-from .welcome_widget import WelcomeWidget
-from .analysis_widget import AnalysisWidget
-from .history_management_widget import HistoryManagementWidget
-from .historical_analysis_widget import HistoricalAnalysisWidget
+_EXPORTS = {
+    'MainWindow': '.main_window',
+    'TransactionsWidget': '.transactions_widget',
+    'ImportWidget': '.import_widget',
+    'WelcomeWidget': '.welcome_widget',
+    'AnalysisWidget': '.analysis_widget',
+    'HistoryManagementWidget': '.history_management_widget',
+    'HistoricalAnalysisWidget': '.historical_analysis_widget',
+}
 
-__all__ = [
-    'MainWindow',
-    'TransactionsWidget',
-    'ImportWidget',
-    'WelcomeWidget',
-    'AnalysisWidget',
-    'HistoryManagementWidget',
-    'HistoricalAnalysisWidget'
-]
\ No newline at end of file
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
\ No newline at end of file
@@ -2,10 +2,13 @@
 Utility functions comuni per i widget di analisi
 """
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+import numpy as np
+import matplotlib.style
+from matplotlib.ticker import FuncFormatter
 from PySide6.QtWidgets import QLabel, QFrame, QVBoxLayout, QPushButton, QMessageBox
 from PySide6.QtCore import Qt
+from barflow.data.record_codec import NET_CENTS_COLUMN
+from .chart_renderer import ChartImageWidget, set_chart_style
 
 def parse_date_robust(date_str):
     """
@@ -30,6 +33,51 @@ def parse_date_robust(date_str):
             # Infine lascia che pandas provi a interpretare automaticamente
             return pd.to_datetime(date_str, errors='coerce')
 
+# Formati esatti provati in ordine sull'intera colonna prima del parsing automatico
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+def parse_dates_vectorized(values):
+    """
+    Parsing vettoriale delle date, equivalente a parse_date_robust su tutta la colonna.
+    
+    Il parsing avviene una sola volta per ogni valore distinto: i formati esatti
+    vengono provati sull'insieme dei valori, e il parsing automatico di pandas
+    viene applicato solo ai valori rimasti non interpretati.
+    
+    Args:
+        values: Serie (o sequenza) di stringhe, date o Timestamp
+        
+    Returns:
+        pd.Series: Serie datetime64 con pd.NaT per i valori non validi
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    
+    # Memoizza i valori distinti: le date si ripetono molto (stesso giorno/orario)
+    codes, uniques = pd.factorize(series)
+    unique_strings = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    parsed = np.full(len(unique_strings), np.datetime64('NaT', 'ns'), dtype='datetime64[ns]')
+    pending = np.ones(len(unique_strings), dtype=bool)
+    
+    for date_format in DATE_FORMATS:
+        if not pending.any():
+            break
+        attempt = pd.to_datetime(unique_strings[pending], format=date_format, errors='coerce')
+        matched = attempt.notna().to_numpy()
+        positions = np.flatnonzero(pending)[matched]
+        parsed[positions] = attempt[matched].to_numpy(dtype='datetime64[ns]')
+        pending[positions] = False
+    
+    if pending.any():
+        # Parsing automatico solo sul residuo non interpretato dai formati esatti
+        attempt = pd.to_datetime(unique_strings[pending], format='mixed', errors='coerce')
+        parsed[pending] = attempt.to_numpy(dtype='datetime64[ns]')
+    
+    result = parsed[codes]
+    result[codes == -1] = np.datetime64('NaT', 'ns')
+    return pd.Series(result, index=series.index, name=series.name)
+
 def create_metric_box(title, value, color):
     """
     Crea un box per una metrica specifica con stile uniforme.
@@ -86,36 +134,31 @@ def create_metric_box(title, value, color):
     
     return frame
 
+def _apply_chart_style():
+    """Imposta lo stile moderno per matplotlib (senza pyplot, eseguita nel worker di rendering)."""
+    for style_name in ('seaborn-v0_8-whitegrid', 'seaborn-whitegrid', 'default'):
+        try:
+            matplotlib.style.use(style_name)
+            break
+        except (OSError, ValueError):
+            continue
+
+set_chart_style(_apply_chart_style)
+
 def create_chart_canvas(figsize=(8, 3)):
     """
     Crea un'area di disegno per un grafico Matplotlib con stile moderno uniforme.
     
+    Il grafico viene renderizzato in background (vedi chart_renderer): per
+    disegnarlo si usa canvas.render_chart(builder, *args).
+    
     Args:
         figsize: Tupla con dimensioni della figura (width, height)
         
     Returns:
-        FigureCanvas: Canvas per il grafico matplotlib
+        ChartImageWidget: Widget che mostra il grafico renderizzato
     """
-    # Imposta lo stile moderno per matplotlib
-    try:
-        plt.style.use('seaborn-v0_8-whitegrid')
-    except:
-        try:
-            plt.style.use('seaborn-whitegrid')
-        except:
-            plt.style.use('default')
-    
-    fig, ax = plt.subplots(figsize=figsize)
-    fig.patch.set_facecolor('#FAFAFA')
-    ax.set_facecolor('#FFFFFF')
-    
-    # Rimuovi i bordi superiore e destro per un look più pulito
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['left'].set_color('#CCCCCC')
-    ax.spines['bottom'].set_color('#CCCCCC')
-    
-    canvas = FigureCanvas(fig)
+    canvas = ChartImageWidget(figsize=figsize, facecolor='#FAFAFA')
     canvas.setStyleSheet("""
         background-color: #FAFAFA; 
         border-radius: 15px;
@@ -123,6 +166,153 @@ def create_chart_canvas(figsize=(8, 3)):
     """)
     return canvas
 
+def prepare_chart_axes(figure):
+    """
+    Pulisce la figura e crea l'asse con i colori di sfondo standard.
+    
+    Args:
+        figure: Figura matplotlib da preparare
+        
+    Returns:
+        Axes: Il nuovo asse della figura
+    """
+    figure.clear()
+    figure.patch.set_facecolor('#FAFAFA')
+    ax = figure.add_subplot(111)
+    ax.set_facecolor('#FFFFFF')
+    return ax
+
+def build_message_chart(figure, message, color='#666666', fontsize=12):
+    """
+    Costruisce un grafico vuoto con un messaggio centrato (nessun dato, errori).
+    
+    Args:
+        figure: Figura matplotlib da disegnare
+        message: Testo da mostrare
+        color: Colore del testo
+        fontsize: Dimensione del testo
+    """
+    ax = prepare_chart_axes(figure)
+    ax.text(0.5, 0.5, message, 
+           ha='center', va='center', transform=ax.transAxes,
+           fontsize=fontsize, color=color, weight='bold')
+    style_empty_chart(ax)
+
+def create_bar_annotations(ax, bars, offset=3, fontsize=8):
+    """
+    Crea le etichette dei valori sopra le barre (il testo viene impostato da update_bar_values).
+    
+    Args:
+        ax: Asse del grafico
+        bars: Barre da etichettare
+        offset: Distanza verticale dell'etichetta in punti
+        fontsize: Dimensione del testo
+        
+    Returns:
+        list: Un'annotazione per ogni barra
+    """
+    return [
+        ax.annotate('',
+                   xy=(bar.get_x() + bar.get_width() / 2, 0),
+                   xytext=(0, offset),  # offset verticale in punti
+                   textcoords="offset points",
+                   ha='center', va='bottom',
+                   fontsize=fontsize, fontweight='bold', color='#333333')
+        for bar in bars
+    ]
+
+def update_bar_values(bars, annotations, values):
+    """
+    Aggiorna l'altezza delle barre e le relative etichette senza ricreare gli artisti.
+    
+    Args:
+        bars: Barre del grafico
+        annotations: Etichette create con create_bar_annotations
+        values: Nuovi valori, nell'ordine delle barre
+    """
+    for bar, annotation, value in zip(bars, annotations, values):
+        bar.set_height(value)
+        annotation.xy = (bar.get_x() + bar.get_width() / 2, value)
+        annotation.set_text(f'€{value:,.0f}')
+
+def lttb_indices(x, y, threshold):
+    """
+    Seleziona i punti di una serie con Largest-Triangle-Three-Buckets.
+    
+    I punti interni vengono divisi in threshold - 2 gruppi; per ogni gruppo si
+    tiene il punto che forma il triangolo più grande con il punto scelto nel
+    gruppo precedente e la media del gruppo successivo. Primo e ultimo punto
+    sono sempre inclusi, e la forma della curva (picchi e minimi) è preservata.
+    
+    Args:
+        x: Ascisse numeriche crescenti
+        y: Ordinate
+        threshold: Numero di punti da mantenere
+        
+    Returns:
+        np.ndarray: Indici crescenti dei punti selezionati
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    
+    # Confini dei gruppi sui punti interni [1, n - 1)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Media del gruppo successivo (per l'ultimo gruppo: l'ultimo punto)
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        
+        # Area (doppia) dei triangoli con il punto scelto in precedenza
+        point_x, point_y = x[selected], y[selected]
+        areas = np.abs(
+            (point_x - avg_x) * (y[start:end] - point_y)
+            - (point_x - x[start:end]) * (avg_y - point_y)
+        )
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    
+    return indices
+
+def downsample_series(x, y, max_points, x_range=None):
+    """
+    Riduce una serie al numero di punti visualizzabili mantenendone la forma (LTTB).
+    
+    Args:
+        x: Ascisse numeriche crescenti (es. date convertite con matplotlib.dates.date2num)
+        y: Ordinate
+        max_points: Punti massimi, di solito la larghezza in pixel del grafico
+        x_range: Intervallo (min, max) visibile: la riduzione avviene solo su quella
+            porzione, con un punto in più per lato così la linea arriva ai bordi
+        
+    Returns:
+        tuple: (x, y) ridotti come array numpy
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x_range is not None:
+        first = max(int(np.searchsorted(x, x_range[0], side='left')) - 1, 0)
+        last = min(int(np.searchsorted(x, x_range[1], side='right')) + 1, len(x))
+        x, y = x[first:last], y[first:last]
+    indices = lttb_indices(x, y, max(int(max_points), 3))
+    return x[indices], y[indices]
+
+# Formattazione degli assi in euro
+EURO_FORMATTER = FuncFormatter(lambda x, p: f'€{x:,.0f}')
+
 def style_empty_chart(ax):
     """
     Applica stile moderno ai grafici vuoti.
@@ -158,14 +348,33 @@ def prepare_dataframe_for_analysis(transactions_data):
     df = pd.DataFrame(transactions_data)
     df['IMPORTO NETTO'] = pd.to_numeric(df['IMPORTO NETTO'], errors='coerce')
     
-    # Applica parsing robusto delle date
-    df['DATA'] = df['DATA'].apply(parse_date_robust)
+    # Le date arrivano già tipizzate dal database: il parsing serve solo per le stringhe
+    df['DATA'] = parse_dates_vectorized(df['DATA'])
     
     # Rimuovi righe con valori non validi
     df = df.dropna(subset=['IMPORTO NETTO', 'DATA'])
     
     return df if len(df) > 0 else None
 
+def compute_net_totals(df):
+    """
+    Calcola entrate, uscite e profitto di un DataFrame di transazioni.
+    
+    Se presente, usa la colonna dei centesimi (int64) così le somme sono esatte.
+    
+    Returns:
+        tuple: (entrate, uscite, profitto) in euro
+    """
+    if NET_CENTS_COLUMN in df.columns and not df[NET_CENTS_COLUMN].isna().any():
+        cents = df[NET_CENTS_COLUMN].astype('int64')
+        gains_cents = int(cents[cents > 0].sum())
+        expenses_cents = -int(cents[cents < 0].sum())
+        return gains_cents / 100, expenses_cents / 100, (gains_cents - expenses_cents) / 100
+    
+    total_gains = df[df['IMPORTO NETTO'] > 0]['IMPORTO NETTO'].sum()
+    total_expenses = abs(df[df['IMPORTO NETTO'] < 0]['IMPORTO NETTO'].sum())
+    return total_gains, total_expenses, total_gains - total_expenses
+
 def update_metric_box_value(metric_box, new_value):
     """
     Aggiorna il valore in un metric box.
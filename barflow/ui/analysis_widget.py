@@ -1,19 +1,243 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QTabWidget
 from PySide6.QtCore import Qt
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.artist import setp
 import numpy as np
-from .historical_analysis_widget import HistoricalAnalysisWidget
+from .chart_renderer import PersistentChart
+from .historical_analysis_widget import HistoricalAnalysisWidget, GIORNI_SETTIMANA
 from .analysis_utils import (
     create_metric_box, 
     create_chart_canvas, 
-    style_empty_chart, 
+    prepare_chart_axes,
+    build_message_chart,
+    create_bar_annotations,
+    update_bar_values,
     prepare_dataframe_for_analysis,
     update_metric_box_value,
-    create_info_button
+    compute_net_totals,
+    create_info_button,
+    EURO_FORMATTER
 )
 
+# ---------------------------------------------------------------------------
+# Costruzione dei grafici: funzioni eseguite nei worker di rendering.
+# Ricevono la figura da disegnare e non modificano il DataFrame passato.
+# ---------------------------------------------------------------------------
+
+def _create_current_monthly_chart(figure, mese_labels):
+    """Crea assi, stile e artisti del grafico mensile (barre a zero)."""
+    ax = prepare_chart_axes(figure)
+
+    # Colori moderni e gradienti
+    colors_entrate = ['#27AE60', '#2ECC71', '#58D68D']  # Verde sfumato
+    colors_uscite = ['#E74C3C', '#EC7063', '#F1948A']   # Rosso sfumato
+    
+    bar_width = 0.35
+    index = np.arange(len(mese_labels))
+    zeros = np.zeros(len(mese_labels))
+
+    # Barre con effetti ombra e gradiente
+    bars1 = ax.bar(index - bar_width/2, zeros, bar_width, 
+                  label='Entrate', color=colors_entrate[0], alpha=0.9,
+                  edgecolor='white', linewidth=2)
+    bars2 = ax.bar(index + bar_width/2, zeros, bar_width, 
+                  label='Uscite', color=colors_uscite[0], alpha=0.9,
+                  edgecolor='white', linewidth=2)
+
+    # Etichette dei valori sopra le barre
+    labels1 = create_bar_annotations(ax, bars1, offset=5, fontsize=10)
+    labels2 = create_bar_annotations(ax, bars2, offset=5, fontsize=10)
+
+    # Styling moderno
+    ax.set_ylabel('Importo (€)', fontsize=12, color='#34495E', fontweight='bold')
+    ax.set_xlabel('Mese', fontsize=12, color='#34495E', fontweight='bold')
+    
+    ax.set_xticks(index)
+    ax.set_xticklabels(mese_labels, rotation=45, ha="right", 
+                      fontsize=11, color='#2C3E50')
+    
+    # Legenda in alto a sinistra con dimensioni ulteriormente ridotte
+    legend = ax.legend(loc='upper left', 
+                      frameon=True, fancybox=True, shadow=True, 
+                      fontsize=7, borderpad=0.1, handlelength=0.8, 
+                      handletextpad=0.2, columnspacing=0.3)
+    legend.get_frame().set_facecolor('#F8F9FA')
+    legend.get_frame().set_edgecolor('#BDC3C7')
+    legend.get_frame().set_linewidth(0.5)
+    legend.get_frame().set_alpha(0.9)
+    
+    # Griglia elegante
+    ax.grid(axis='y', linestyle='--', alpha=0.3, color='#BDC3C7')
+    ax.set_axisbelow(True)
+    
+    # Rimuovi bordi superiore e destro
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color('#BDC3C7')
+    ax.spines['bottom'].set_color('#BDC3C7')
+    
+    # Formattazione assi
+    ax.yaxis.set_major_formatter(EURO_FORMATTER)
+    ax.tick_params(colors='#2C3E50', which='both')
+
+    chart = PersistentChart(figure, ax, 'current_monthly', mese_labels)
+    chart.artists.update(entrate=bars1, uscite=bars2, entrate_labels=labels1, uscite_labels=labels2)
+    chart.set_dynamic([*bars1, *bars2, *labels1, *labels2, legend])
+    return chart
+
+def build_current_monthly_chart(figure, df):
+    """Costruisce (o aggiorna) il grafico a barre mensile con stile moderno ed elegante."""
+    mesi = df['DATA'].dt.to_period('M').rename('Mese')
+    monthly_summary = df.groupby(mesi)['IMPORTO NETTO'].agg(
+        entrate=lambda x: x[x > 0].sum(),
+        uscite=lambda x: abs(x[x < 0].sum())  # Valore assoluto per le uscite
+    ).reset_index()
+
+    if len(monthly_summary) == 0:
+        build_message_chart(figure, "Nessun dato mensile da visualizzare", fontsize=14)
+        return
+
+    # Converti il periodo in datetime per formattazione consistente
+    mese_labels = tuple(monthly_summary['Mese'].dt.to_timestamp().dt.strftime('%b %Y'))
+
+    # Stessi mesi dell'ultimo aggiornamento: si aggiornano solo le barre
+    chart = PersistentChart.get(figure, 'current_monthly', mese_labels)
+    if chart is None:
+        chart = _create_current_monthly_chart(figure, mese_labels)
+
+    update_bar_values(chart.artists['entrate'], chart.artists['entrate_labels'], monthly_summary['entrate'])
+    update_bar_values(chart.artists['uscite'], chart.artists['uscite_labels'], monthly_summary['uscite'])
+    chart.ax.relim()
+    chart.ax.autoscale_view()
+    chart.update_view(chart.ax.get_ylim(), pad=2.0)
+
+def _create_current_daily_performance_chart(figure, day_names, has_target):
+    """Crea assi, stile e artisti del grafico per giorno della settimana (barre a zero)."""
+    ax = prepare_chart_axes(figure)
+
+    # Crea il grafico a barre per giorni della settimana
+    bars = ax.bar(day_names, np.zeros(len(day_names)), 
+                 color='#27AE60', alpha=0.8, edgecolor='white', linewidth=2)
+
+    # Etichette dei valori sopra le barre
+    labels = create_bar_annotations(ax, bars, offset=5, fontsize=10)
+    dynamic = [*bars, *labels]
+
+    # Linea rossa orizzontale per la media uscite (obiettivo di pareggio, impostata all'aggiornamento)
+    if has_target:
+        target_line = ax.axhline(y=0, color='#E74C3C', linestyle='--', 
+                                linewidth=2, alpha=0.8, label='Obiettivo Pareggio')
+        dynamic.append(target_line)
+    else:
+        target_line = None
+
+    # Styling moderno
+    ax.set_ylabel('Media Entrate Giornaliere (€)', fontsize=12, color='#34495E', fontweight='bold')
+    ax.set_xlabel('Giorno della Settimana', fontsize=12, color='#34495E', fontweight='bold')
+
+    # Formattazione assi
+    ax.yaxis.set_major_formatter(EURO_FORMATTER)
+    ax.tick_params(colors='#2C3E50', which='both')
+    
+    # Ruota le etichette dell'asse X per una migliore leggibilità
+    setp(ax.get_xticklabels(), rotation=45, ha="right", color='#2C3E50', fontsize=11)
+
+    # Griglia elegante
+    ax.grid(axis='y', linestyle='--', alpha=0.3, color='#BDC3C7')
+    ax.set_axisbelow(True)
+
+    # Rimuovi bordi superiore e destro
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color('#BDC3C7')
+    ax.spines['bottom'].set_color('#BDC3C7')
+
+    # Legenda per la linea obiettivo
+    legend = None
+    if has_target:
+        legend = ax.legend(loc='upper left', frameon=True, fancybox=True, shadow=True, 
+                         fontsize=8, borderpad=0.1, handlelength=0.8)
+        legend.get_frame().set_facecolor('#F8F9FA')
+        legend.get_frame().set_edgecolor('#BDC3C7')
+        legend.get_frame().set_alpha(0.9)
+        dynamic.append(legend)
+
+    chart = PersistentChart(figure, ax, 'current_daily', (day_names, has_target))
+    chart.artists.update(bars=bars, labels=labels, target_line=target_line, legend=legend)
+    chart.set_dynamic(dynamic)
+    return chart
+
+def build_current_daily_performance_chart(figure, df):
+    """Costruisce (o aggiorna) il grafico delle performance giornaliere basato sui dati attuali."""
+    if len(df) == 0:
+        build_message_chart(figure, "Nessun dato da visualizzare", fontsize=14)
+        return
+
+    # CALCOLO CORRETTO della media uscite giornaliera
+    # Considera solo i giorni che hanno effettivamente uscite, non tutti i giorni del periodo
+    uscite_df = df[df['IMPORTO NETTO'] < 0]
+    if len(uscite_df) > 0:
+        # Raggruppa per data e somma le uscite giornaliere
+        uscite_per_giorno = uscite_df.groupby(uscite_df['DATA'].dt.date)['IMPORTO NETTO'].sum().abs()
+        media_uscite_giornaliera = uscite_per_giorno.mean()
+    else:
+        media_uscite_giornaliera = 0
+
+    # Filtra solo le entrate (importi positivi) 
+    entrate_df = df[df['IMPORTO NETTO'] > 0]
+
+    if len(entrate_df) == 0:
+        build_message_chart(figure, "Nessuna entrata da visualizzare", fontsize=14)
+        return
+
+    # ANALISI PERFORMANCE PER GIORNO DELLA SETTIMANA
+    # 1. Raggruppa le entrate per giorno specifico e giorno della settimana (0=Lunedì, 6=Domenica)
+    entrate_per_giorno = entrate_df.groupby([
+        entrate_df['DATA'].dt.date.rename('Giorno'),
+        entrate_df['DATA'].dt.dayofweek.rename('DayOfWeek')
+    ])['IMPORTO NETTO'].sum().reset_index()
+    
+    # 2. Calcola la media delle entrate per ogni giorno della settimana
+    # Questo ci dice quanto si guadagna in media ogni lunedì, martedì, ecc.
+    performance_settimanale = entrate_per_giorno.groupby('DayOfWeek')['IMPORTO NETTO'].mean().reset_index()
+    
+    # 3. Mappa i numeri dei giorni ai nomi in italiano
+    performance_settimanale['DayName'] = performance_settimanale['DayOfWeek'].map(GIORNI_SETTIMANA)
+    
+    # 4. Ordina per giorno della settimana (Lunedì = 0, Domenica = 6)
+    performance_settimanale = performance_settimanale.sort_values('DayOfWeek')
+    
+    if len(performance_settimanale) == 0:
+        build_message_chart(figure, "Nessun dato per l'analisi settimanale", fontsize=14)
+        return
+
+    day_names = tuple(performance_settimanale['DayName'])
+    has_target = media_uscite_giornaliera > 0
+    chart = PersistentChart.get(figure, 'current_daily', (day_names, has_target))
+    if chart is None:
+        chart = _create_current_daily_performance_chart(figure, day_names, has_target)
+
+    update_bar_values(chart.artists['bars'], chart.artists['labels'], performance_settimanale['IMPORTO NETTO'])
+
+    # Calcola il range appropriato per l'asse Y
+    max_entrate = performance_settimanale['IMPORTO NETTO'].max()
+    min_entrate = performance_settimanale['IMPORTO NETTO'].min()
+    
+    # Imposta i limiti dell'asse Y per rendere visibili le barre
+    # Usa un range che mostri bene sia le entrate che la linea obiettivo
+    y_max = max(max_entrate * 1.15, media_uscite_giornaliera * 1.1) if has_target else max_entrate * 1.2
+    y_min = min(0, min_entrate * 0.9)  # Inizia da 0 o poco sotto il minimo
+    chart.ax.set_ylim(y_min, y_max)
+    
+    # Aggiorna la linea della media uscite (obiettivo di pareggio) e la sua voce in legenda
+    if has_target:
+        target_label = f'Obiettivo Pareggio: €{media_uscite_giornaliera:,.0f}'
+        chart.artists['target_line'].set_ydata([media_uscite_giornaliera, media_uscite_giornaliera])
+        chart.artists['target_line'].set_label(target_label)
+        chart.artists['legend'].get_texts()[0].set_text(target_label)
+
+    chart.update_view(chart.ax.get_ylim(), pad=2.0)
+
 class AnalysisWidget(QWidget):
     """Widget per la sezione di analisi dei dati con tab per analisi attuale e storica."""
     
@@ -62,12 +286,16 @@ class AnalysisWidget(QWidget):
         # Crea il widget per l'analisi attuale (quello esistente)
         self.current_analysis_widget = self._create_current_analysis_widget()
         
-        # Crea il widget per l'analisi storica
-        self.historical_analysis_widget = HistoricalAnalysisWidget()
+        # L'analisi storica (con il suo DatabaseManager e i grafici) viene creata
+        # alla prima apertura del tab: qui c'è solo il contenitore
+        self.historical_analysis_widget = None
+        self.historical_tab = QWidget()
+        self._historical_layout = QVBoxLayout(self.historical_tab)
+        self._historical_layout.setContentsMargins(0, 0, 0, 0)
         
         # Aggiungi i tab
         self.tab_widget.addTab(self.current_analysis_widget, "📊 Analisi Attuale")
-        self.tab_widget.addTab(self.historical_analysis_widget, "📈 Analisi Storico")
+        self.tab_widget.addTab(self.historical_tab, "📈 Analisi Storico")
         
         # Connetti il cambio di tab per aggiornare dinamicamente l'analisi storica
         self.tab_widget.currentChanged.connect(self._on_tab_changed)
@@ -190,6 +418,9 @@ Questo grafico risulta estremamente utile per capire quali sono i giorni della s
         # Se viene selezionato il tab "Analisi Storico" (indice 1)
         if index == 1:
             try:
+                if self.historical_analysis_widget is None:
+                    self.historical_analysis_widget = HistoricalAnalysisWidget()
+                    self._historical_layout.addWidget(self.historical_analysis_widget)
                 # Aggiorna i dati storici caricandoli dal database al momento
                 self.historical_analysis_widget.update_data()
             except Exception as e:
@@ -247,32 +478,7 @@ Questo grafico risulta estremamente utile per capire quali sono i giorni della s
 
     def _create_chart_canvas(self):
         """Crea un'area di disegno per un grafico Matplotlib con stile moderno."""
-        # Imposta lo stile moderno per matplotlib
-        try:
-            plt.style.use('seaborn-v0_8-whitegrid')
-        except:
-            try:
-                plt.style.use('seaborn-whitegrid')
-            except:
-                plt.style.use('default')
-        
-        fig, ax = plt.subplots(figsize=(10, 7))
-        fig.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-        
-        # Rimuovi i bordi superiore e destro per un look più pulito
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#CCCCCC')
-        ax.spines['bottom'].set_color('#CCCCCC')
-        
-        canvas = FigureCanvas(fig)
-        canvas.setStyleSheet("""
-            background-color: #FAFAFA; 
-            border-radius: 15px;
-            border: 1px solid #E0E0E0;
-        """)
-        return canvas
+        return create_chart_canvas(figsize=(10, 7))
 
     def update_data(self, transactions_data):
         """Aggiorna i dati e ricalcola metriche e grafici per l'analisi attuale."""
@@ -284,18 +490,16 @@ Questo grafico risulta estremamente utile per capire quali sono i giorni della s
 
         try:
             # Calcola le metriche
-            total_gains = df[df['IMPORTO NETTO'] > 0]['IMPORTO NETTO'].sum()
-            total_expenses = abs(df[df['IMPORTO NETTO'] < 0]['IMPORTO NETTO'].sum())
-            profit = total_gains - total_expenses
+            total_gains, total_expenses, profit = compute_net_totals(df)
 
             # Aggiorna i label utilizzando le utility functions
             update_metric_box_value(self.total_gains_label, f"{total_gains:,.2f} €")
             update_metric_box_value(self.total_expenses_label, f"{total_expenses:,.2f} €")
             update_metric_box_value(self.profit_label, f"{profit:,.2f} €")
 
-            # Aggiorna i grafici
-            self._update_monthly_chart(df)
-            self._update_daily_performance_chart(df)
+            # Aggiorna i grafici: vengono costruiti e renderizzati fuori dalla GUI
+            self.monthly_chart_canvas.render_chart(build_current_monthly_chart, df)
+            self.cumulative_profit_canvas.render_chart(build_current_daily_performance_chart, df)
                 
         except Exception as e:
             print(f"Errore nell'aggiornamento dei dati: {e}")
@@ -303,240 +507,6 @@ Questo grafico risulta estremamente utile per capire quali sono i giorni della s
             traceback.print_exc()
             self._reset_view()
 
-    def _update_monthly_chart(self, df):
-        """Aggiorna il grafico a barre mensile con stile moderno ed elegante."""
-        # Pulisci la figura esistente
-        self.monthly_chart_canvas.figure.clear()
-        ax = self.monthly_chart_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.monthly_chart_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        df['Mese'] = df['DATA'].dt.to_period('M')
-        monthly_summary = df.groupby('Mese')['IMPORTO NETTO'].agg(
-            entrate=lambda x: x[x > 0].sum(),
-            uscite=lambda x: abs(x[x < 0].sum())  # Valore assoluto per le uscite
-        ).reset_index()
-
-        # Converti il periodo in datetime per formattazione consistente
-        monthly_summary['Mese_dt'] = monthly_summary['Mese'].dt.to_timestamp()
-        monthly_summary['Mese_label'] = monthly_summary['Mese_dt'].dt.strftime('%b %Y')
-
-        if len(monthly_summary) == 0:
-            ax.text(0.5, 0.5, "Nessun dato mensile da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=14, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.monthly_chart_canvas.draw()
-            return
-
-        # Colori moderni e gradienti
-        colors_entrate = ['#27AE60', '#2ECC71', '#58D68D']  # Verde sfumato
-        colors_uscite = ['#E74C3C', '#EC7063', '#F1948A']   # Rosso sfumato
-        
-        bar_width = 0.35
-        index = np.arange(len(monthly_summary['Mese_label']))
-
-        # Barre con effetti ombra e gradiente
-        bars1 = ax.bar(index - bar_width/2, monthly_summary['entrate'], bar_width, 
-                      label='Entrate', color=colors_entrate[0], alpha=0.9,
-                      edgecolor='white', linewidth=2)
-        bars2 = ax.bar(index + bar_width/2, monthly_summary['uscite'], bar_width, 
-                      label='Uscite', color=colors_uscite[0], alpha=0.9,
-                      edgecolor='white', linewidth=2)
-
-        # Aggiungi valori sopra le barre
-        def add_value_labels(bars, values):
-            for bar, value in zip(bars, values):
-                height = bar.get_height()
-                ax.annotate(f'€{value:,.0f}',
-                           xy=(bar.get_x() + bar.get_width() / 2, height),
-                           xytext=(0, 5),  # 5 points vertical offset
-                           textcoords="offset points",
-                           ha='center', va='bottom',
-                           fontsize=10, fontweight='bold', color='#333333')
-        
-        add_value_labels(bars1, monthly_summary['entrate'])
-        add_value_labels(bars2, monthly_summary['uscite'])
-
-        # Styling moderno
-        ax.set_ylabel('Importo (€)', fontsize=12, color='#34495E', fontweight='bold')
-        ax.set_xlabel('Mese', fontsize=12, color='#34495E', fontweight='bold')
-        
-        ax.set_xticks(index)
-        ax.set_xticklabels(monthly_summary['Mese_label'], rotation=45, ha="right", 
-                          fontsize=11, color='#2C3E50')
-        
-        # Aumenta il margine inferiore per le etichette inclinate
-        plt.subplots_adjust(bottom=0.15)
-        
-        # Legenda in alto a sinistra con dimensioni ulteriormente ridotte
-        legend = ax.legend(loc='upper left', 
-                          frameon=True, fancybox=True, shadow=True, 
-                          fontsize=7, borderpad=0.1, handlelength=0.8, 
-                          handletextpad=0.2, columnspacing=0.3)
-        legend.get_frame().set_facecolor('#F8F9FA')
-        legend.get_frame().set_edgecolor('#BDC3C7')
-        legend.get_frame().set_linewidth(0.5)
-        legend.get_frame().set_alpha(0.9)
-        
-        # Griglia elegante
-        ax.grid(axis='y', linestyle='--', alpha=0.3, color='#BDC3C7')
-        ax.set_axisbelow(True)
-        
-        # Rimuovi bordi superiore e destro
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#BDC3C7')
-        ax.spines['bottom'].set_color('#BDC3C7')
-        
-        # Formattazione assi
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        # Aggiusta il layout (rimuove la regolazione per legenda esterna)
-        self.monthly_chart_canvas.figure.subplots_adjust(bottom=0.15)
-        self.monthly_chart_canvas.figure.tight_layout(pad=2.0)
-        self.monthly_chart_canvas.draw()
-
-    def _update_daily_performance_chart(self, df):
-        """Aggiorna il grafico delle performance giornaliere basato sui dati attuali."""
-        # Pulisci la figura esistente
-        self.cumulative_profit_canvas.figure.clear()
-        ax = self.cumulative_profit_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.cumulative_profit_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        if len(df) == 0:
-            ax.text(0.5, 0.5, "Nessun dato da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=14, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.cumulative_profit_canvas.draw()
-            return
-
-        # Aggiungi il giorno della settimana (0=Lunedì, 6=Domenica)
-        df['DayOfWeek'] = df['DATA'].dt.dayofweek
-        df['DayName'] = df['DATA'].dt.day_name()
-
-        # CALCOLO CORRETTO della media uscite giornaliera
-        # Considera solo i giorni che hanno effettivamente uscite, non tutti i giorni del periodo
-        uscite_df = df[df['IMPORTO NETTO'] < 0].copy()
-        if len(uscite_df) > 0:
-            # Raggruppa per data e somma le uscite giornaliere
-            uscite_per_giorno = uscite_df.groupby(uscite_df['DATA'].dt.date)['IMPORTO NETTO'].sum().abs()
-            media_uscite_giornaliera = uscite_per_giorno.mean()
-        else:
-            media_uscite_giornaliera = 0
-
-        # Filtra solo le entrate (importi positivi) 
-        entrate_df = df[df['IMPORTO NETTO'] > 0].copy()
-
-        if len(entrate_df) == 0:
-            ax.text(0.5, 0.5, "Nessuna entrata da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=14, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.cumulative_profit_canvas.draw()
-            return
-
-        # ANALISI PERFORMANCE PER GIORNO DELLA SETTIMANA
-        # 1. Raggruppa le entrate per giorno specifico e giorno della settimana
-        entrate_per_giorno = entrate_df.groupby([entrate_df['DATA'].dt.date, 'DayOfWeek'])['IMPORTO NETTO'].sum().reset_index()
-        
-        # 2. Calcola la media delle entrate per ogni giorno della settimana
-        # Questo ci dice quanto si guadagna in media ogni lunedì, martedì, ecc.
-        performance_settimanale = entrate_per_giorno.groupby('DayOfWeek')['IMPORTO NETTO'].mean().reset_index()
-        
-        # 3. Mappa i numeri dei giorni ai nomi in italiano
-        giorni_map = {
-            0: 'Lunedì', 
-            1: 'Martedì', 
-            2: 'Mercoledì', 
-            3: 'Giovedì', 
-            4: 'Venerdì', 
-            5: 'Sabato', 
-            6: 'Domenica'
-        }
-        performance_settimanale['DayName'] = performance_settimanale['DayOfWeek'].map(giorni_map)
-        
-        # 4. Ordina per giorno della settimana (Lunedì = 0, Domenica = 6)
-        performance_settimanale = performance_settimanale.sort_values('DayOfWeek')
-        
-        if len(performance_settimanale) == 0:
-            ax.text(0.5, 0.5, "Nessun dato per l'analisi settimanale", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=14, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.cumulative_profit_canvas.draw()
-            return
-
-        # Crea il grafico a barre per giorni della settimana
-        bars = ax.bar(performance_settimanale['DayName'], performance_settimanale['IMPORTO NETTO'], 
-                     color='#27AE60', alpha=0.8, edgecolor='white', linewidth=2)
-
-        # Aggiungi valori sopra le barre
-        for bar, value in zip(bars, performance_settimanale['IMPORTO NETTO']):
-            height = bar.get_height()
-            ax.annotate(f'€{value:,.0f}',
-                       xy=(bar.get_x() + bar.get_width() / 2, height),
-                       xytext=(0, 5),  # 5 points vertical offset
-                       textcoords="offset points",
-                       ha='center', va='bottom',
-                       fontsize=10, fontweight='bold', color='#333333')
-
-        # Calcola il range appropriato per l'asse Y
-        max_entrate = performance_settimanale['IMPORTO NETTO'].max()
-        min_entrate = performance_settimanale['IMPORTO NETTO'].min()
-        
-        # Imposta i limiti dell'asse Y per rendere visibili le barre
-        # Usa un range che mostri bene sia le entrate che la linea obiettivo
-        y_max = max(max_entrate * 1.15, media_uscite_giornaliera * 1.1) if media_uscite_giornaliera > 0 else max_entrate * 1.2
-        y_min = min(0, min_entrate * 0.9)  # Inizia da 0 o poco sotto il minimo
-        ax.set_ylim(y_min, y_max)
-        
-        # Aggiungi la linea rossa orizzontale per la media uscite (obiettivo di pareggio)
-        if media_uscite_giornaliera > 0:
-            ax.axhline(y=media_uscite_giornaliera, color='#E74C3C', linestyle='--', 
-                      linewidth=2, alpha=0.8, label=f'Obiettivo Pareggio: €{media_uscite_giornaliera:,.0f}')
-
-        # Styling moderno
-        ax.set_ylabel('Media Entrate Giornaliere (€)', fontsize=12, color='#34495E', fontweight='bold')
-        ax.set_xlabel('Giorno della Settimana', fontsize=12, color='#34495E', fontweight='bold')
-
-        # Formattazione assi
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        # Ruota le etichette dell'asse X per una migliore leggibilità
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right", color='#2C3E50', fontsize=11)
-
-        # Griglia elegante
-        ax.grid(axis='y', linestyle='--', alpha=0.3, color='#BDC3C7')
-        ax.set_axisbelow(True)
-
-        # Rimuovi bordi superiore e destro
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#BDC3C7')
-        ax.spines['bottom'].set_color('#BDC3C7')
-
-        # Legenda per la linea obiettivo
-        if media_uscite_giornaliera > 0:
-            legend = ax.legend(loc='upper left', frameon=True, fancybox=True, shadow=True, 
-                             fontsize=8, borderpad=0.1, handlelength=0.8)
-            legend.get_frame().set_facecolor('#F8F9FA')
-            legend.get_frame().set_edgecolor('#BDC3C7')
-            legend.get_frame().set_alpha(0.9)
-
-        # Aumenta il margine inferiore per le etichette inclinate
-        self.cumulative_profit_canvas.figure.subplots_adjust(bottom=0.15)
-        self.cumulative_profit_canvas.figure.tight_layout(pad=2.0)
-        self.cumulative_profit_canvas.draw()
-
     def _reset_view(self):
         """Resetta la vista quando non ci sono dati."""
         # Reset delle metriche utilizzando le utility functions
@@ -546,12 +516,4 @@ Questo grafico risulta estremamente utile per capire quali sono i giorni della s
         
         # Reset dei grafici con stile moderno
         for canvas in [self.monthly_chart_canvas, self.cumulative_profit_canvas]:
-            canvas.figure.clear()
-            canvas.figure.patch.set_facecolor('#FAFAFA')
-            ax = canvas.figure.add_subplot(111)
-            ax.set_facecolor('#FFFFFF')
-            ax.text(0.5, 0.5, "Nessun dato da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=14, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            canvas.draw()
+            canvas.render_chart(build_message_chart, "Nessun dato da visualizzare", '#666666', 14)
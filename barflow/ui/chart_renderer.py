@@ -0,0 +1,331 @@
+"""
+Rendering dei grafici matplotlib fuori dal thread della GUI.
+
+Ogni grafico è un ChartImageWidget: possiede una Figure matplotlib (backend Agg,
+senza pyplot) che viene creata, costruita e disegnata in un worker del
+QThreadPool. Il worker restituisce l'immagine già renderizzata e il widget si
+limita a dipingerla: il thread della GUI non chiama mai matplotlib, quindi non
+attende mai matplotlib_lock. Un grafico nascosto (es. in un tab non selezionato)
+viene solo segnato da aggiornare e renderizzato quando diventa visibile; fino ad
+allora l'ultima immagine resta in cache.
+
+Limite: matplotlib non è thread-safe (cache dei font e del layout del testo,
+rcParams), quindi costruzione e disegno delle figure avvengono sotto
+matplotlib_lock e i grafici vengono di fatto renderizzati uno alla volta anche
+se il pool ha più worker. In parallelo avvengono solo la copia del buffer e la
+conversione in QImage. Un rendering davvero parallelo richiederebbe un pool di
+processi, incompatibile con le figure persistenti (PersistentChart) che restano
+in memoria tra un aggiornamento e l'altro.
+
+Le funzioni che costruiscono i grafici ricevono la figura come primo argomento:
+    widget.render_chart(build_monthly_chart, df)
+Non devono modificare i dati ricevuti (più grafici leggono lo stesso DataFrame
+contemporaneamente).
+
+I builder possono mantenere gli artisti tra un aggiornamento e l'altro con
+PersistentChart: la figura viene ricostruita solo quando cambia la struttura del
+grafico e, se i limiti degli assi non cambiano, il rendering è un blit dei soli
+artisti dinamici sullo sfondo salvato.
+"""
+import logging
+import os
+import threading
+import traceback
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, QSize, Qt, Signal
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtWidgets import QWidget
+
+logger = logging.getLogger(__name__)
+
+# Risoluzione logica delle figure (come FigureCanvasQTAgg)
+CHART_DPI = 100
+
+# Attesa dopo un ridimensionamento prima di renderizzare di nuovo (ms)
+RESIZE_DEBOUNCE_MS = 150
+
+_render_pool = None
+
+# Accesso esclusivo a matplotlib tra i worker (la GUI non lo usa mai)
+matplotlib_lock = threading.RLock()
+
+# Stile dei grafici applicato una sola volta dal primo worker (vedi set_chart_style)
+_chart_style = None
+_chart_style_applied = False
+
+
+def get_render_pool():
+    """Pool di thread condiviso per il rendering dei grafici."""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = QThreadPool()
+        _render_pool.setMaxThreadCount(max(2, min(4, os.cpu_count() or 2)))
+    return _render_pool
+
+
+def set_chart_style(setup):
+    """
+    Registra la funzione che imposta lo stile di matplotlib (rcParams).
+
+    Viene eseguita una sola volta in un worker, sotto matplotlib_lock, prima di
+    creare la prima figura.
+    """
+    global _chart_style
+    _chart_style = setup
+
+
+def _ensure_chart_style():
+    """Applica lo stile registrato se non è già stato fatto (da chiamare sotto matplotlib_lock)."""
+    global _chart_style_applied
+    if _chart_style_applied or _chart_style is None:
+        return
+    _chart_style()
+    _chart_style_applied = True
+
+
+class PersistentChart:
+    """
+    Artisti di un grafico mantenuti tra un aggiornamento e l'altro.
+
+    Il builder crea assi, stile e artisti solo quando PersistentChart.get()
+    restituisce None (prima volta o struttura diversa, es. nuove categorie);
+    altrimenti aggiorna i dati degli artisti esistenti (set_height, set_data, ...)
+    e chiama update_view() con lo stato della vista (limiti degli assi, ...).
+    Gli artisti dinamici sono "animated": se la vista non è cambiata il renderer
+    ripristina lo sfondo salvato e ridisegna solo loro.
+    """
+
+    def __init__(self, figure, ax, kind, structure):
+        self.figure = figure
+        self.ax = ax
+        self.kind = kind
+        self.structure = structure
+        self.artists = {}
+        self.dynamic = []
+        self.is_new = True
+        self._view = None
+        self._blit_ready = False
+        self._background = None
+        self._background_size = None
+        figure._persistent_chart = self
+
+    @staticmethod
+    def get(figure, kind, structure):
+        """Restituisce il grafico persistente della figura se compatibile, altrimenti None."""
+        chart = get_persistent_chart(figure)
+        if chart is None or chart.kind != kind or chart.structure != structure:
+            return None
+        chart.is_new = False
+        return chart
+
+    def set_dynamic(self, artists):
+        """Imposta gli artisti ridisegnati a ogni aggiornamento (nell'ordine di disegno)."""
+        for artist in artists:
+            artist.set_animated(True)
+        self.dynamic = list(artists)
+
+    def update_view(self, view, pad=1.5):
+        """
+        Registra lo stato della vista dopo l'aggiornamento dei dati.
+
+        Se è invariato (e la figura non è nuova) basta il blit; altrimenti il
+        layout viene ricalcolato e la figura ridisegnata.
+        """
+        self._blit_ready = not self.is_new and view == self._view and self._background is not None
+        self._view = view
+        if not self._blit_ready:
+            self.figure.tight_layout(pad=pad)
+
+    def render(self, canvas):
+        """Disegna la figura sul canvas Agg, con il blit quando possibile."""
+        size = canvas.get_width_height()
+        if self._blit_ready and self._background_size == size:
+            canvas.restore_region(self._background)
+        else:
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+            self._background_size = size
+        for artist in self.dynamic:
+            if artist.get_visible():
+                self.figure.draw_artist(artist)
+        self._blit_ready = False
+
+
+def get_persistent_chart(figure):
+    """Grafico persistente associato alla figura, se ancora presente negli assi."""
+    chart = getattr(figure, '_persistent_chart', None)
+    if chart is None or chart.ax not in figure.axes:
+        return None
+    return chart
+
+
+class _RenderSignals(QObject):
+    """Segnali del task di rendering (QRunnable non è un QObject)."""
+    finished = Signal(int, object, object, float)
+
+
+class _ChartRenderTask(QRunnable):
+    """Crea (se serve), costruisce e disegna una figura in un worker, restituendo l'immagine."""
+
+    def __init__(self, figure, figure_options, generation, size_px, device_pixel_ratio, builder, args):
+        super().__init__()
+        self.figure = figure
+        self.figure_options = figure_options
+        self.generation = generation
+        self.size_px = size_px
+        self.device_pixel_ratio = device_pixel_ratio
+        self.builder = builder
+        self.args = args
+        self.signals = _RenderSignals()
+
+    def run(self):
+        image = None
+        try:
+            with matplotlib_lock:
+                canvas = self._render()
+            # La figura è usata solo da questo task: il buffer si legge fuori dal lock
+            image = self._to_image(canvas)
+        except Exception as e:
+            logger.error(f"Errore nel rendering del grafico: {e}")
+            traceback.print_exc()
+        self.signals.finished.emit(self.generation, image, self.figure, self.device_pixel_ratio)
+
+    def _render(self):
+        if self.figure is None:
+            _ensure_chart_style()
+            self.figure = Figure(dpi=CHART_DPI, **self.figure_options)
+            FigureCanvasAgg(self.figure)
+        width, height = self.size_px
+        self.figure.set_dpi(CHART_DPI * self.device_pixel_ratio)
+        self.figure.set_size_inches(
+            width / CHART_DPI, height / CHART_DPI, forward=False
+        )
+        self.builder(self.figure, *self.args)
+        canvas = self.figure.canvas
+        chart = get_persistent_chart(self.figure)
+        if chart is not None:
+            chart.render(canvas)
+        else:
+            canvas.draw()
+        return canvas
+
+    def _to_image(self, canvas):
+        buffer = np.asarray(canvas.buffer_rgba())
+        height, width = buffer.shape[:2]
+        # Copia: il buffer dell'Agg viene riutilizzato al disegno successivo
+        image = QImage(buffer.data, width, height, width * 4, QImage.Format_RGBA8888).copy()
+        image.setDevicePixelRatio(self.device_pixel_ratio)
+        return image
+
+
+class ChartImageWidget(QWidget):
+    """Widget leggero che mostra un grafico renderizzato in background."""
+
+    def __init__(self, figsize=(8, 3), facecolor=None, parent=None):
+        super().__init__(parent)
+        # La figura viene creata dal primo rendering, nel worker
+        self.figure = None
+        self._figure_options = {'figsize': figsize, 'facecolor': facecolor}
+        self._size_hint = QSize(int(figsize[0] * CHART_DPI), int(figsize[1] * CHART_DPI))
+        self._image = None
+        self._builder = None
+        self._args = ()
+        self._generation = 0
+        self._rendering = False
+        self._pending = False
+        self._dirty = False
+        self._rendered_size = None
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self._resize_timer.timeout.connect(self._request_render)
+        self.setAttribute(Qt.WA_StyledBackground, True)
+        self.setMinimumSize(100, 80)
+
+    def sizeHint(self):
+        return self._size_hint
+
+    def render_chart(self, builder, *args):
+        """
+        Richiede il rendering del grafico con la funzione builder(figure, *args).
+
+        Se un rendering è già in corso la richiesta viene accodata: conta solo l'ultima.
+        Se il widget non è visibile il grafico viene solo segnato da aggiornare.
+        """
+        self._builder = builder
+        self._args = args
+        self._dirty = True
+        self._request_render()
+
+    def _render_size(self):
+        """Dimensione in pixel logici della figura da renderizzare e rapporto pixel del display."""
+        size = self.size()
+        ratio = self.devicePixelRatioF()
+        return (max(size.width(), 1), max(size.height(), 1)), ratio
+
+    def _request_render(self):
+        if self._builder is None:
+            return
+        if not self.isVisible():
+            # Renderizzato alla prossima visualizzazione (vedi showEvent)
+            self._dirty = True
+            self._pending = False
+            return
+        if self._rendering:
+            # La figura è in uso nel worker: il nuovo rendering parte al termine
+            self._pending = True
+            return
+        self._rendering = True
+        self._pending = False
+        self._dirty = False
+        self._generation += 1
+        size_px, ratio = self._render_size()
+        self._rendered_size = (size_px, ratio)
+        task = _ChartRenderTask(
+            self.figure, self._figure_options, self._generation, size_px, ratio, self._builder, self._args
+        )
+        task.signals.finished.connect(self._on_rendered)
+        get_render_pool().start(task)
+
+    def _on_rendered(self, generation, image, figure, device_pixel_ratio):
+        self._rendering = False
+        if figure is not None:
+            self.figure = figure
+        if image is not None and generation == self._generation:
+            self._image = image
+            self.update()
+        if self._pending:
+            self._request_render()
+
+    def is_rendering(self):
+        """True se c'è un rendering in corso o in attesa."""
+        return self._rendering or self._pending
+
+    def is_dirty(self):
+        """True se il grafico è da renderizzare alla prossima visualizzazione."""
+        return self._dirty
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Dati cambiati o dimensione diversa mentre il grafico era nascosto
+        if self._builder is not None and (self._dirty or self._render_size() != self._rendered_size):
+            self._request_render()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._builder is None:
+            return
+        if self.isVisible():
+            self._resize_timer.start()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._image is None:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        # Durante un ridimensionamento l'ultima immagine viene scalata fino al nuovo rendering
+        painter.drawImage(self.rect(), self._image)
+        painter.end()
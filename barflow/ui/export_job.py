@@ -0,0 +1,64 @@
+"""
+Esecuzione delle esportazioni in background.
+
+L'esportazione gira in un worker del QThreadPool e comunica con la GUI solo
+tramite segnali (avanzamento, completamento, annullamento, errore), così la
+finestra resta reattiva anche durante l'esportazione di uno storico grande.
+"""
+import logging
+import threading
+import traceback
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from barflow.export import ExportCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class _ExportSignals(QObject):
+    """Segnali del job di esportazione (QRunnable non è un QObject)."""
+    progress = Signal(int, int)
+    finished = Signal(int)
+    cancelled = Signal()
+    failed = Signal(str)
+
+
+class ExportJob(QRunnable):
+    """
+    Job che esegue export_function(*args, progress=..., is_cancelled=...).
+
+    I segnali vanno collegati a metodi di QObject della GUI, così i gestori
+    vengono eseguiti nel thread principale.
+    """
+
+    def __init__(self, export_function, *args):
+        super().__init__()
+        # Il job resta referenziato da chi lo avvia (per cancel()): Qt non deve eliminarlo
+        self.setAutoDelete(False)
+        self.export_function = export_function
+        self.args = args
+        self.signals = _ExportSignals()
+        self._cancel_event = threading.Event()
+
+    def start(self):
+        """Avvia il job nel pool di thread globale."""
+        QThreadPool.globalInstance().start(self)
+
+    def cancel(self):
+        """Richiede l'annullamento: il job si ferma al blocco di righe successivo."""
+        self._cancel_event.set()
+
+    def run(self):
+        try:
+            count = self.export_function(
+                *self.args,
+                progress=self.signals.progress.emit,
+                is_cancelled=self._cancel_event.is_set,
+            )
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            logger.error(f"Errore durante l'esportazione: {e}")
+            traceback.print_exc()
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(count)
@@ -4,27 +4,588 @@ Widget per l'analisi dei dati storici dal database.
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QTabWidget
 from PySide6.QtCore import Qt
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.artist import setp
 import numpy as np
-from barflow.data.db_manager import DatabaseManager
+from barflow.data.db_manager import HISTORY_TABLE, DatabaseManager
+from .chart_renderer import PersistentChart
 from .analysis_utils import (
     create_metric_box, 
     create_chart_canvas, 
-    style_empty_chart, 
-    parse_date_robust,
+    prepare_chart_axes,
+    build_message_chart,
+    create_bar_annotations,
+    update_bar_values,
+    downsample_series,
     update_metric_box_value,
-    create_info_button
+    compute_net_totals,
+    create_info_button,
+    EURO_FORMATTER
 )
 
+# ---------------------------------------------------------------------------
+# Costruzione dei grafici: funzioni pure eseguite nei worker di rendering.
+# Ricevono la figura da disegnare e non modificano il DataFrame passato.
+# ---------------------------------------------------------------------------
+
+# Nomi italiani dei giorni della settimana (0=Lunedì, 6=Domenica)
+GIORNI_SETTIMANA = {
+    0: 'Lunedì', 
+    1: 'Martedì', 
+    2: 'Mercoledì', 
+    3: 'Giovedì', 
+    4: 'Venerdì', 
+    5: 'Sabato', 
+    6: 'Domenica'
+}
+
+# Oltre questo numero di punti la linea del profitto cumulativo è disegnata senza marker
+MAX_LINE_MARKERS = 120
+
+def _style_axes(ax, grid_axis='y'):
+    """Applica griglia e bordi standard dei grafici storici."""
+    # Griglia elegante
+    if grid_axis == 'both':
+        ax.grid(True, linestyle='--', alpha=0.3, color='#BDC3C7')
+    else:
+        ax.grid(axis=grid_axis, linestyle='--', alpha=0.3, color='#BDC3C7')
+    ax.set_axisbelow(True)
+    
+    # Rimuovi bordi superiore e destro
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color('#BDC3C7')
+    ax.spines['bottom'].set_color('#BDC3C7')
+
+def _style_legend(legend):
+    """Applica lo stile standard alla legenda."""
+    legend.get_frame().set_facecolor('#F8F9FA')
+    legend.get_frame().set_edgecolor('#BDC3C7')
+    legend.get_frame().set_alpha(0.9)
+
+def _create_monthly_chart(figure, mese_labels):
+    """Crea assi, stile e artisti del grafico mensile storico (barre a zero)."""
+    ax = prepare_chart_axes(figure)
+
+    # Colori moderni
+    colors_entrate = '#27AE60'
+    colors_uscite = '#E74C3C'
+    
+    bar_width = 0.35
+    index = np.arange(len(mese_labels))
+    zeros = np.zeros(len(mese_labels))
+
+    # Barre con effetti ombra
+    bars1 = ax.bar(index - bar_width/2, zeros, bar_width, 
+                  label='Entrate', color=colors_entrate, alpha=0.9,
+                  edgecolor='white', linewidth=1)
+    bars2 = ax.bar(index + bar_width/2, zeros, bar_width, 
+                  label='Uscite', color=colors_uscite, alpha=0.9,
+                  edgecolor='white', linewidth=1)
+
+    # Etichette dei valori sopra le barre
+    labels1 = create_bar_annotations(ax, bars1)
+    labels2 = create_bar_annotations(ax, bars2)
+
+    # Styling moderno
+    ax.set_ylabel('IMPORTO NETTO (€)', fontsize=10, color='#34495E', fontweight='bold')
+    ax.set_xlabel('Mese', fontsize=10, color='#34495E', fontweight='bold')
+    
+    ax.set_xticks(index)
+    ax.set_xticklabels(mese_labels, rotation=45, ha="right", 
+                      fontsize=9, color='#2C3E50')
+    
+    # Legenda compatta
+    legend = ax.legend(loc='upper left', 
+                      frameon=True, fancybox=True, shadow=True, 
+                      fontsize=8, borderpad=0.1, handlelength=0.8)
+    _style_legend(legend)
+    
+    _style_axes(ax)
+    
+    # Formattazione assi
+    ax.yaxis.set_major_formatter(EURO_FORMATTER)
+    ax.tick_params(colors='#2C3E50', which='both')
+
+    chart = PersistentChart(figure, ax, 'historical_monthly', mese_labels)
+    chart.artists.update(entrate=bars1, uscite=bars2, entrate_labels=labels1, uscite_labels=labels2)
+    chart.set_dynamic([*bars1, *bars2, *labels1, *labels2, legend])
+    return chart
+
+def build_monthly_chart(figure, df):
+    """Costruisce (o aggiorna) il grafico a barre mensile storico."""
+    mesi = df['DATA'].dt.to_period('M').rename('Mese')
+    monthly_summary = df.groupby(mesi)['IMPORTO NETTO'].agg(
+        entrate=lambda x: x[x > 0].sum(),
+        uscite=lambda x: abs(x[x < 0].sum())
+    ).reset_index()
+
+    if len(monthly_summary) == 0:
+        build_message_chart(figure, "Nessun dato mensile storico da visualizzare")
+        return
+
+    # Converti il periodo in datetime per formattazione consistente
+    mese_labels = tuple(monthly_summary['Mese'].dt.to_timestamp().dt.strftime('%b %Y'))
+
+    # Stessi mesi dell'ultimo aggiornamento: si aggiornano solo le barre
+    chart = PersistentChart.get(figure, 'historical_monthly', mese_labels)
+    if chart is None:
+        chart = _create_monthly_chart(figure, mese_labels)
+
+    update_bar_values(chart.artists['entrate'], chart.artists['entrate_labels'], monthly_summary['entrate'])
+    update_bar_values(chart.artists['uscite'], chart.artists['uscite_labels'], monthly_summary['uscite'])
+    chart.ax.relim()
+    chart.ax.autoscale_view()
+    chart.update_view(chart.ax.get_ylim(), pad=1.5)
+
+def _create_cumulative_profit_chart(figure):
+    """Crea assi, stile e artisti (vuoti) del grafico del profitto cumulativo."""
+    ax = prepare_chart_axes(figure)
+    ax.xaxis.axis_date()
+
+    # Linea principale
+    line, = ax.plot([], [], 
+            linewidth=2.5, color='#3498DB', alpha=0.9, 
+            marker='o', markersize=4, markerfacecolor='#2980B9',
+            markeredgecolor='white', markeredgewidth=1,
+            label='Profitto Cumulativo Storico')
+    
+    # Linea dello zero
+    ax.axhline(y=0, color='#95A5A6', linestyle='--', linewidth=1.5, alpha=0.7)
+    
+    # Styling moderno
+    ax.set_ylabel('Profitto (€)', fontsize=10, color='#34495E', fontweight='bold')
+    ax.set_xlabel('Data', fontsize=10, color='#34495E', fontweight='bold')
+    
+    _style_axes(ax, grid_axis='both')
+    
+    # Formattazione asse Y
+    ax.yaxis.set_major_formatter(EURO_FORMATTER)
+    ax.tick_params(colors='#2C3E50', which='both')
+
+    chart = PersistentChart(figure, ax, 'historical_cumulative', None)
+    chart.artists.update(line=line, area=None, labels=[])
+    return chart
+
+def _update_cumulative_line(chart, x, y, color):
+    """Aggiorna linea e area con la serie ridotta alla larghezza in pixel del grafico (LTTB)."""
+    width_px = max(int(chart.ax.bbox.width), 3)
+    x_plot, y_plot = downsample_series(x, y, width_px)
+
+    line = chart.artists['line']
+    line.set_data(x_plot, y_plot)
+    # I marker restano solo se i punti sono pochi: con migliaia di punti coprono la linea
+    line.set_marker('o' if len(x_plot) <= MAX_LINE_MARKERS else 'None')
+    # L'area (PolyCollection) non ha set_data nelle versioni di matplotlib supportate: viene ricreata
+    if chart.artists['area'] is not None:
+        chart.artists['area'].remove()
+    chart.artists['area'] = chart.ax.fill_between(x_plot, y_plot, 0, alpha=0.2, color=color)
+
+def build_cumulative_profit_chart(figure, df):
+    """Costruisce (o aggiorna) il grafico a linee del profitto cumulativo storico."""
+    if len(df) == 0:
+        build_message_chart(figure, "Nessun dato storico da visualizzare")
+        return
+
+    chart = PersistentChart.get(figure, 'historical_cumulative', None)
+    if chart is None:
+        chart = _create_cumulative_profit_chart(figure)
+    ax = chart.ax
+
+    df_sorted = df.sort_values('DATA')
+    date = df_sorted['DATA']
+    profitto_cumulativo = df_sorted['IMPORTO NETTO'].cumsum().to_numpy(dtype=np.float64)
+
+    # Serie completa (date come numeri matplotlib); linea e area usano la serie ridotta,
+    # con l'area colorata in base al valore finale
+    date_num = mdates.date2num(date.to_numpy())
+    area_color = '#27AE60' if profitto_cumulativo[-1] >= 0 else '#E74C3C'
+    _update_cumulative_line(chart, date_num, profitto_cumulativo, area_color)
+    area = chart.artists['area']
+    
+    # Aggiungi valori sui punti (circa 10) per evitare sovrapposizioni:
+    # il loro numero varia con i dati, quindi vengono ricreati
+    for label in chart.artists['labels']:
+        label.remove()
+    labels = []
+    step = max(1, len(df_sorted) // 10)  # Mostra circa 10 valori
+    for i in range(0, len(df_sorted), step):
+        value = profitto_cumulativo[i]
+        labels.append(ax.annotate(f'€{value:,.0f}',
+                   xy=(date_num[i], value),
+                   xytext=(0, 8),  # 8 points vertical offset
+                   textcoords="offset points",
+                   ha='center', va='bottom',
+                   fontsize=7, fontweight='bold', color='#333333',
+                   bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8, edgecolor='none')))
+    chart.artists['labels'] = labels
+    chart.set_dynamic([area, chart.artists['line'], *labels])
+    
+    # Formattazione date
+    total_days = (date.max() - date.min()).days
+    
+    if total_days <= 31:
+        date_scale = 'week'
+        ax.xaxis.set_major_locator(mdates.WeekdayLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
+    elif total_days <= 90:
+        date_scale = 'two_weeks'
+        ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=2))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
+    else:
+        date_scale = 'month'
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
+    
+    ax.relim()
+    ax.autoscale_view()
+    # Le etichette vanno ruotate dopo il ricalcolo dei tick
+    setp(ax.get_xticklabels(), rotation=45, ha="right", color='#2C3E50')
+    
+    chart.update_view((ax.get_xlim(), ax.get_ylim(), date_scale), pad=1.5)
+
+def _create_daily_performance_chart(figure, day_names, has_target):
+    """Crea assi, stile e artisti del grafico per giorno della settimana (barre a zero)."""
+    ax = prepare_chart_axes(figure)
+
+    # Crea il grafico a barre per giorni della settimana
+    bars = ax.bar(day_names, np.zeros(len(day_names)), 
+                 color='#27AE60', alpha=0.8, edgecolor='white', linewidth=2)
+
+    # Etichette dei valori sopra le barre
+    labels = create_bar_annotations(ax, bars, fontsize=10)
+    dynamic = [*bars, *labels]
+
+    # Linea rossa orizzontale per la media uscite (valore impostato all'aggiornamento)
+    if has_target:
+        target_line = ax.axhline(y=0, color='#E74C3C', linestyle='--', 
+                                linewidth=2, alpha=0.8, label='Obiettivo Pareggio')
+        dynamic.append(target_line)
+    else:
+        target_line = None
+
+    # Styling moderno
+    ax.set_ylabel('Media Entrate Giornaliere (€)', fontsize=10, color='#34495E', fontweight='bold')
+    ax.set_xlabel('Giorno della Settimana', fontsize=10, color='#34495E', fontweight='bold')
+
+    # Formattazione assi
+    ax.yaxis.set_major_formatter(EURO_FORMATTER)
+    ax.tick_params(colors='#2C3E50', which='both')
+    
+    # Ruota le etichette dell'asse X
+    setp(ax.get_xticklabels(), rotation=45, ha="right", color='#2C3E50', fontsize=9)
+
+    _style_axes(ax)
+
+    # Legenda per la linea obiettivo
+    legend = None
+    if has_target:
+        legend = ax.legend(loc='upper left', frameon=True, fancybox=True, shadow=True, 
+                         fontsize=8, borderpad=0.1, handlelength=0.8)
+        _style_legend(legend)
+        dynamic.append(legend)
+
+    chart = PersistentChart(figure, ax, 'historical_daily', (day_names, has_target))
+    chart.artists.update(bars=bars, labels=labels, target_line=target_line, legend=legend)
+    chart.set_dynamic(dynamic)
+    return chart
+
+def build_daily_performance_chart(figure, df):
+    """Costruisce (o aggiorna) il grafico delle performance medie per giorno della settimana."""
+    try:
+        if len(df) == 0:
+            build_message_chart(figure, "Nessun dato da visualizzare")
+            return
+
+        # CALCOLO CORRETTO della media uscite giornaliera
+        # Considera solo i giorni che hanno effettivamente uscite, non tutti i giorni del periodo
+        uscite_df = df[df['IMPORTO NETTO'] < 0]
+        if len(uscite_df) > 0:
+            # Raggruppa per data e somma le uscite giornaliere
+            uscite_per_giorno = uscite_df.groupby(uscite_df['DATA'].dt.date)['IMPORTO NETTO'].sum().abs()
+            media_uscite_giornaliera = uscite_per_giorno.mean()
+        else:
+            media_uscite_giornaliera = 0
+
+        # Filtra solo le entrate (importi positivi) 
+        entrate_df = df[df['IMPORTO NETTO'] > 0]
+
+        if len(entrate_df) == 0:
+            build_message_chart(figure, "Nessuna entrata da visualizzare")
+            return
+
+        # ANALISI PERFORMANCE PER GIORNO DELLA SETTIMANA (METODOLOGIA CORRETTA)
+        # 1. Raggruppa le entrate per giorno specifico e giorno della settimana (0=Lunedì, 6=Domenica)
+        entrate_per_giorno = entrate_df.groupby([
+            entrate_df['DATA'].dt.date.rename('Giorno'),
+            entrate_df['DATA'].dt.dayofweek.rename('DayOfWeek')
+        ])['IMPORTO NETTO'].sum().reset_index()
+        
+        # 2. Calcola la media delle entrate per ogni giorno della settimana
+        # Questo ci dice quanto si guadagna in media ogni lunedì, martedì, ecc.
+        performance_settimanale = entrate_per_giorno.groupby('DayOfWeek')['IMPORTO NETTO'].mean().reset_index()
+        
+        # 3. Mappa i numeri dei giorni ai nomi in italiano
+        performance_settimanale['DayName'] = performance_settimanale['DayOfWeek'].map(GIORNI_SETTIMANA)
+        
+        # 4. Ordina per giorno della settimana (Lunedì = 0, Domenica = 6)
+        performance_settimanale = performance_settimanale.sort_values('DayOfWeek')
+        
+        if len(performance_settimanale) == 0:
+            build_message_chart(figure, "Nessun dato per l'analisi settimanale")
+            return
+
+        day_names = tuple(performance_settimanale['DayName'])
+        has_target = media_uscite_giornaliera > 0
+        chart = PersistentChart.get(figure, 'historical_daily', (day_names, has_target))
+        if chart is None:
+            chart = _create_daily_performance_chart(figure, day_names, has_target)
+
+        update_bar_values(chart.artists['bars'], chart.artists['labels'], performance_settimanale['IMPORTO NETTO'])
+
+        # Calcola il range appropriato per l'asse Y
+        max_entrate = performance_settimanale['IMPORTO NETTO'].max()
+        min_entrate = performance_settimanale['IMPORTO NETTO'].min()
+        
+        # Imposta i limiti dell'asse Y per rendere visibili le barre
+        # Usa un range che mostri bene sia le entrate che la linea obiettivo
+        y_max = max(max_entrate * 1.15, media_uscite_giornaliera * 1.1) if has_target else max_entrate * 1.2
+        y_min = min_entrate * 0.9
+        chart.ax.set_ylim(y_min, y_max)
+        
+        # Aggiorna la linea della media uscite e la sua voce in legenda
+        if has_target:
+            target_label = f'Obiettivo Pareggio: €{media_uscite_giornaliera:,.0f}'
+            chart.artists['target_line'].set_ydata([media_uscite_giornaliera, media_uscite_giornaliera])
+            chart.artists['target_line'].set_label(target_label)
+            chart.artists['legend'].get_texts()[0].set_text(target_label)
+
+        chart.update_view(chart.ax.get_ylim(), pad=1.5)
+
+    except Exception as e:
+        print(f"Errore nell'aggiornamento del grafico performance giornaliera: {e}")
+        build_message_chart(figure, "Errore nel caricamento dati", color='#E74C3C')
+
+def build_average_performance_chart(figure, df):
+    """Costruisce il grafico delle performance medie cumulative dell'ultimo anno."""
+    try:
+        if len(df) == 0:
+            build_message_chart(figure, "Nessun dato da visualizzare")
+            return
+
+        # Ottieni l'anno più recente dai dati
+        latest_year = df['DATA'].max().year
+        
+        # Filtra i dati per l'anno più recente
+        df_year = df[df['DATA'].dt.year == latest_year]
+        
+        if len(df_year) == 0:
+            build_message_chart(figure, f"Nessun dato per l'anno {latest_year}")
+            return
+
+        # Raggruppa per mese e calcola entrate, uscite e profitti mensili
+        mesi = df_year['DATA'].dt.to_period('M').rename('Mese')
+        monthly_summary = df_year.groupby(mesi)['IMPORTO NETTO'].agg([
+            ('entrate_mensili', lambda x: x[x > 0].sum()),
+            ('uscite_mensili', lambda x: abs(x[x < 0].sum())),
+            ('profitto_mensile', 'sum')
+        ]).reset_index()
+        
+        # Ordina per mese
+        monthly_summary = monthly_summary.sort_values('Mese')
+        
+        # Calcola le medie cumulative
+        monthly_summary['media_entrate'] = monthly_summary['entrate_mensili'].expanding().mean()
+        monthly_summary['media_uscite'] = monthly_summary['uscite_mensili'].expanding().mean()
+        monthly_summary['media_profitti'] = monthly_summary['profitto_mensile'].expanding().mean()
+        
+        # Converti i mesi in etichette leggibili
+        monthly_summary['Mese_label'] = monthly_summary['Mese'].dt.strftime('%b')
+        
+        ax = prepare_chart_axes(figure)
+        
+        # Colori coordinati con i box delle metriche
+        color_entrate = '#27AE60'  # Verde (uguale al box TOTALE ENTRATE)
+        color_uscite = '#C0392B'   # Rosso (uguale al box TOTALE USCITE) 
+        color_profitti = '#2980B9' # Blu (uguale al box PROFITTO)
+        
+        # Crea le linee del grafico
+        x_pos = range(len(monthly_summary))
+        
+        ax.plot(x_pos, monthly_summary['media_entrate'], 
+                linewidth=2.5, color=color_entrate, alpha=0.9,
+                marker='o', markersize=5, markerfacecolor=color_entrate,
+                markeredgecolor='white', markeredgewidth=1,
+                label='Media Entrate')
+        
+        ax.plot(x_pos, monthly_summary['media_uscite'], 
+                linewidth=2.5, color=color_uscite, alpha=0.9,
+                marker='s', markersize=5, markerfacecolor=color_uscite,
+                markeredgecolor='white', markeredgewidth=1,
+                label='Media Uscite')
+        
+        ax.plot(x_pos, monthly_summary['media_profitti'], 
+                linewidth=2.5, color=color_profitti, alpha=0.9,
+                marker='^', markersize=5, markerfacecolor=color_profitti,
+                markeredgecolor='white', markeredgewidth=1,
+                label='Media Profitti')
+        
+        # Aggiungi valori sui punti dell'ultima linea (ogni 2 punti per leggibilità)
+        step = max(1, len(x_pos) // 6)  # Mostra circa 6 valori
+        for i in range(0, len(x_pos), step):
+            # Valori per Media Entrate
+            ax.annotate(f'€{monthly_summary["media_entrate"].iloc[i]:,.0f}',
+                       xy=(x_pos[i], monthly_summary['media_entrate'].iloc[i]),
+                       xytext=(0, 8),  # 8 points vertical offset
+                       textcoords="offset points",
+                       ha='center', va='bottom',
+                       fontsize=6, fontweight='bold', color=color_entrate)
+            
+            # Valori per Media Uscite
+            ax.annotate(f'€{monthly_summary["media_uscite"].iloc[i]:,.0f}',
+                       xy=(x_pos[i], monthly_summary['media_uscite'].iloc[i]),
+                       xytext=(0, -12),  # Offset negativo per posizionare sotto
+                       textcoords="offset points",
+                       ha='center', va='top',
+                       fontsize=6, fontweight='bold', color=color_uscite)
+            
+            # Valori per Media Profitti (solo se valore significativo)
+            if abs(monthly_summary['media_profitti'].iloc[i]) > 50:
+                ax.annotate(f'€{monthly_summary["media_profitti"].iloc[i]:,.0f}',
+                           xy=(x_pos[i], monthly_summary['media_profitti'].iloc[i]),
+                           xytext=(10, 0),  # Offset orizzontale
+                           textcoords="offset points",
+                           ha='left', va='center',
+                           fontsize=6, fontweight='bold', color=color_profitti)
+        
+        # Linea dello zero per riferimento
+        ax.axhline(y=0, color='#95A5A6', linestyle='--', linewidth=1, alpha=0.5)
+        
+        # Styling moderno
+        ax.set_ylabel('IMPORTO NETTO Medio (€)', fontsize=10, color='#34495E', fontweight='bold')
+        ax.set_xlabel('Mese', fontsize=10, color='#34495E', fontweight='bold')
+        
+        # Imposta le etichette dell'asse X
+        ax.set_xticks(x_pos)
+        ax.set_xticklabels(monthly_summary['Mese_label'], 
+                          color='#2C3E50', fontsize=9)
+        
+        # Legenda compatta
+        legend = ax.legend(loc='upper left', 
+                          frameon=True, fancybox=True, shadow=True, 
+                          fontsize=8, borderpad=0.3, handlelength=1.0,
+                          ncol=1)
+        _style_legend(legend)
+        
+        _style_axes(ax, grid_axis='both')
+        
+        # Formattazione asse Y
+        ax.yaxis.set_major_formatter(EURO_FORMATTER)
+        ax.tick_params(colors='#2C3E50', which='both')
+        
+        figure.tight_layout(pad=1.5)
+
+    except Exception as e:
+        print(f"Errore nell'aggiornamento del grafico performance medie: {e}")
+        build_message_chart(figure, "Errore nel caricamento dati", color='#E74C3C')
+
+def _create_supplier_bars(figure, kind, supplier_names, color, xlabel):
+    """Crea assi, stile e artisti di un grafico a barre orizzontali per fornitore."""
+    ax = prepare_chart_axes(figure)
+
+    # Tronca i nomi dei fornitori se troppo lunghi
+    tick_labels = [name[:30] + '...' if len(name) > 30 else name for name in supplier_names]
+    positions = range(len(supplier_names))
+    
+    # Crea il grafico a barre orizzontali
+    bars = ax.barh(positions, np.zeros(len(supplier_names)), 
+                  color=color, alpha=0.8, edgecolor='white', linewidth=1)
+
+    # Valori alla fine delle barre (posizione e testo impostati all'aggiornamento)
+    texts = [ax.text(0, bar.get_y() + bar.get_height()/2, '', ha='left', va='center', 
+                     fontsize=9, fontweight='bold', color='#333333')
+             for bar in bars]
+
+    # Styling moderno
+    ax.set_ylabel('Fornitore', fontsize=10, color='#34495E', fontweight='bold')
+    ax.set_xlabel(xlabel, fontsize=10, color='#34495E', fontweight='bold')
+    
+    # Imposta le etichette dell'asse Y
+    ax.set_yticks(positions)
+    ax.set_yticklabels(tick_labels, fontsize=8, color='#2C3E50')
+    
+    _style_axes(ax, grid_axis='x')
+    ax.tick_params(colors='#2C3E50', which='both')
+
+    chart = PersistentChart(figure, ax, kind, supplier_names)
+    chart.artists.update(bars=bars, texts=texts)
+    chart.set_dynamic([*bars, *texts])
+    return chart
+
+def _build_supplier_bars(figure, kind, values, color, value_format, xlabel, empty_message):
+    """Costruisce (o aggiorna) un grafico a barre orizzontali per i fornitori (top 10)."""
+    if len(values) == 0:
+        build_message_chart(figure, empty_message)
+        return None
+
+    supplier_names = tuple(values.index)
+    chart = PersistentChart.get(figure, kind, supplier_names)
+    if chart is None:
+        chart = _create_supplier_bars(figure, kind, supplier_names, color, xlabel)
+
+    # Aggiorna le barre e i valori alla loro fine
+    offset = max(values.values) * 0.01
+    for bar, text, value in zip(chart.artists['bars'], chart.artists['texts'], values.values):
+        bar.set_width(value)
+        text.set_position((value + offset, bar.get_y() + bar.get_height()/2))
+        text.set_text(value_format(value))
+    chart.ax.relim()
+    chart.ax.autoscale_view()
+    return chart
+
+def build_top_suppliers_chart(figure, expenses_df):
+    """Costruisce il grafico dei top fornitori per spesa totale."""
+    # Spesa totale per fornitore (valore assoluto), top 10
+    supplier_totals = expenses_df.groupby('FORNITORE')['IMPORTO NETTO'].sum().abs().sort_values(ascending=True)
+    top_suppliers = supplier_totals.tail(10)
+    
+    chart = _build_supplier_bars(figure, 'top_suppliers', top_suppliers, '#E74C3C',
+                                 lambda value: f'€{value:,.0f}',
+                                 'Spesa Totale (€)', "Nessun dato sui fornitori")
+    if chart is not None:
+        # Formattazione asse X
+        chart.ax.xaxis.set_major_formatter(EURO_FORMATTER)
+        chart.update_view(chart.ax.get_xlim(), pad=1.5)
+
+def build_supplier_frequency_chart(figure, expenses_df):
+    """Costruisce il grafico della frequenza degli ordini per fornitore."""
+    # Numero di transazioni per fornitore, top 10
+    supplier_frequency = expenses_df['FORNITORE'].value_counts().sort_values(ascending=True)
+    top_frequency = supplier_frequency.tail(10)
+    
+    chart = _build_supplier_bars(figure, 'supplier_frequency', top_frequency, '#3498DB',
+                                 lambda value: f'{value}',
+                                 'Numero di Ordini', "Nessun dato sulla frequenza ordini")
+    if chart is not None:
+        chart.update_view(chart.ax.get_xlim(), pad=1.5)
+
 class HistoricalAnalysisWidget(QWidget):
     """Widget per l'analisi dei dati storici."""
     
     def __init__(self):
         super().__init__()
         self.db_manager = DatabaseManager()
+        # Versione dei dati storici mostrata da metriche e grafici
+        self._shown_version = None
         self.init_ui()
+        # Le modifiche allo storico aggiornano l'analisi se è visibile
+        self.db_manager.change_bus.subscribe(self._on_history_changed, HISTORY_TABLE)
+
+    def _on_history_changed(self, change):
+        """Aggiorna metriche e grafici dopo una modifica allo storico (solo se visibili)."""
+        # Altrimenti l'aggiornamento avviene alla prossima apertura del tab
+        if self.isVisible():
+            self.update_data()
 
     def init_ui(self):
         """Inizializza l'interfaccia utente del widget."""
@@ -346,43 +907,52 @@ Risulta dunque un grafico molto interessante per capire se il piano di business
         layout.addWidget(top_suppliers_container)
         layout.addWidget(supplier_frequency_container)
 
+    def _chart_canvases(self):
+        """Tutti i grafici del widget."""
+        return [self.monthly_chart_canvas, self.cumulative_profit_canvas, 
+                self.daily_performance_canvas, self.average_performance_canvas,
+                self.top_suppliers_canvas, self.supplier_frequency_canvas]
+
     def update_data(self):
         """Aggiorna i dati caricando le transazioni storiche dal database."""
         try:
-            # Carica tutti i dati storici dal database
-            historical_data = self.db_manager.load_all_transactions()
+            # Dati invariati dall'ultimo aggiornamento: metriche e grafici sono già corretti
+            version = self.db_manager.get_data_version()
+            if version == self._shown_version:
+                return
+            self._shown_version = None
+
+            # Carica tutti i dati storici dal database (DATA è già in formato datetime64)
+            df = self.db_manager.load_all_transactions_df()
             
-            if not historical_data:
+            if df.empty:
                 self._reset_view()
+                self._shown_version = version
                 return
 
-            df = pd.DataFrame(historical_data)
             df['IMPORTO NETTO'] = pd.to_numeric(df['IMPORTO NETTO'], errors='coerce')
-            
-            # Applica parsing robusto delle date usando la utility function
-            df['DATA'] = df['DATA'].apply(parse_date_robust)
             df = df.dropna(subset=['IMPORTO NETTO', 'DATA'])
 
             if len(df) == 0:
                 self._reset_view()
+                self._shown_version = version
                 return
 
             # Calcola le metriche
-            total_gains = df[df['IMPORTO NETTO'] > 0]['IMPORTO NETTO'].sum()
-            total_expenses = abs(df[df['IMPORTO NETTO'] < 0]['IMPORTO NETTO'].sum())
-            profit = total_gains - total_expenses
+            total_gains, total_expenses, profit = compute_net_totals(df)
 
             # Aggiorna i label utilizzando le utility functions
             update_metric_box_value(self.total_gains_label, f"{total_gains:,.2f} €")
             update_metric_box_value(self.total_expenses_label, f"{total_expenses:,.2f} €")
             update_metric_box_value(self.profit_label, f"{profit:,.2f} €")
 
-            # Aggiorna i grafici
-            self._update_monthly_chart(df)
-            self._update_cumulative_profit_chart(df)
-            self._update_daily_performance_chart()
-            self._update_average_performance_chart()
+            # Aggiorna i grafici: vengono costruiti e renderizzati in parallelo fuori dalla GUI
+            self.monthly_chart_canvas.render_chart(build_monthly_chart, df)
+            self.cumulative_profit_canvas.render_chart(build_cumulative_profit_chart, df)
+            self.daily_performance_canvas.render_chart(build_daily_performance_chart, df)
+            self.average_performance_canvas.render_chart(build_average_performance_chart, df)
             self._update_supplier_charts(df)
+            self._shown_version = version
                 
         except Exception as e:
             print(f"Errore nell'aggiornamento dei dati storici: {e}")
@@ -394,540 +964,15 @@ Risulta dunque un grafico molto interessante per capire se il piano di business
             # Opzionalmente, mostra un messaggio di errore negli stessi grafici
             self._show_error_in_charts("Errore nel caricamento dati storici")
 
-    def _update_monthly_chart(self, df):
-        """Aggiorna il grafico a barre mensile storico."""
-        # Pulisci la figura esistente
-        self.monthly_chart_canvas.figure.clear()
-        ax = self.monthly_chart_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.monthly_chart_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        df['Mese'] = df['DATA'].dt.to_period('M')
-        monthly_summary = df.groupby('Mese')['IMPORTO NETTO'].agg(
-            entrate=lambda x: x[x > 0].sum(),
-            uscite=lambda x: abs(x[x < 0].sum())
-        ).reset_index()
-
-        # Converti il periodo in datetime per formattazione consistente
-        monthly_summary['Mese_dt'] = monthly_summary['Mese'].dt.to_timestamp()
-        monthly_summary['Mese_label'] = monthly_summary['Mese_dt'].dt.strftime('%b %Y')
-
-        if len(monthly_summary) == 0:
-            ax.text(0.5, 0.5, "Nessun dato mensile storico da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.monthly_chart_canvas.draw()
-            return
-
-        # Colori moderni
-        colors_entrate = '#27AE60'
-        colors_uscite = '#E74C3C'
-        
-        bar_width = 0.35
-        index = np.arange(len(monthly_summary['Mese_label']))
-
-        # Barre con effetti ombra
-        bars1 = ax.bar(index - bar_width/2, monthly_summary['entrate'], bar_width, 
-                      label='Entrate', color=colors_entrate, alpha=0.9,
-                      edgecolor='white', linewidth=1)
-        bars2 = ax.bar(index + bar_width/2, monthly_summary['uscite'], bar_width, 
-                      label='Uscite', color=colors_uscite, alpha=0.9,
-                      edgecolor='white', linewidth=1)
-
-        # Aggiungi valori sopra le barre
-        for bar, value in zip(bars1, monthly_summary['entrate']):
-            height = bar.get_height()
-            ax.annotate(f'€{value:,.0f}',
-                       xy=(bar.get_x() + bar.get_width() / 2, height),
-                       xytext=(0, 3),  # 3 points vertical offset
-                       textcoords="offset points",
-                       ha='center', va='bottom',
-                       fontsize=8, fontweight='bold', color='#333333')
-        
-        for bar, value in zip(bars2, monthly_summary['uscite']):
-            height = bar.get_height()
-            ax.annotate(f'€{value:,.0f}',
-                       xy=(bar.get_x() + bar.get_width() / 2, height),
-                       xytext=(0, 3),  # 3 points vertical offset
-                       textcoords="offset points",
-                       ha='center', va='bottom',
-                       fontsize=8, fontweight='bold', color='#333333')
-
-        # Styling moderno
-        ax.set_ylabel('IMPORTO NETTO (€)', fontsize=10, color='#34495E', fontweight='bold')
-        ax.set_xlabel('Mese', fontsize=10, color='#34495E', fontweight='bold')
-        
-        ax.set_xticks(index)
-        ax.set_xticklabels(monthly_summary['Mese_label'], rotation=45, ha="right", 
-                          fontsize=9, color='#2C3E50')
-        
-        # Legenda compatta
-        legend = ax.legend(loc='upper left', 
-                          frameon=True, fancybox=True, shadow=True, 
-                          fontsize=8, borderpad=0.1, handlelength=0.8)
-        legend.get_frame().set_facecolor('#F8F9FA')
-        legend.get_frame().set_edgecolor('#BDC3C7')
-        legend.get_frame().set_alpha(0.9)
-        
-        # Griglia elegante
-        ax.grid(axis='y', linestyle='--', alpha=0.3, color='#BDC3C7')
-        ax.set_axisbelow(True)
-        
-        # Rimuovi bordi superiore e destro
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#BDC3C7')
-        ax.spines['bottom'].set_color('#BDC3C7')
-        
-        # Formattazione assi
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        self.monthly_chart_canvas.figure.tight_layout(pad=1.5)
-        self.monthly_chart_canvas.draw()
-
-    def _update_cumulative_profit_chart(self, df):
-        """Aggiorna il grafico a linee del profitto cumulativo storico."""
-        # Pulisci la figura esistente
-        self.cumulative_profit_canvas.figure.clear()
-        ax = self.cumulative_profit_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.cumulative_profit_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        if len(df) == 0:
-            ax.text(0.5, 0.5, "Nessun dato storico da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.cumulative_profit_canvas.draw()
-            return
-
-        df_sorted = df.sort_values('DATA')
-        df_sorted['profitto_cumulativo'] = df_sorted['IMPORTO NETTO'].cumsum()
-
-        # Linea principale
-        line = ax.plot(df_sorted['DATA'], df_sorted['profitto_cumulativo'], 
-                      linewidth=2.5, color='#3498DB', alpha=0.9, 
-                      marker='o', markersize=4, markerfacecolor='#2980B9',
-                      markeredgecolor='white', markeredgewidth=1,
-                      label='Profitto Cumulativo Storico')
-        
-        # Aggiungi valori sui punti ogni 5 punti per evitare sovrapposizioni
-        step = max(1, len(df_sorted) // 10)  # Mostra circa 10 valori
-        for i in range(0, len(df_sorted), step):
-            value = df_sorted['profitto_cumulativo'].iloc[i]
-            date = df_sorted['DATA'].iloc[i]
-            ax.annotate(f'€{value:,.0f}',
-                       xy=(date, value),
-                       xytext=(0, 8),  # 8 points vertical offset
-                       textcoords="offset points",
-                       ha='center', va='bottom',
-                       fontsize=7, fontweight='bold', color='#333333',
-                       bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8, edgecolor='none'))
-        
-        # Area sotto la curva
-        final_value = df_sorted['profitto_cumulativo'].iloc[-1]
-        area_color = '#27AE60' if final_value >= 0 else '#E74C3C'
-        ax.fill_between(df_sorted['DATA'], df_sorted['profitto_cumulativo'], 0, 
-                       alpha=0.2, color=area_color)
-        
-        # Linea dello zero
-        ax.axhline(y=0, color='#95A5A6', linestyle='--', linewidth=1.5, alpha=0.7)
-        
-        # Styling moderno
-        ax.set_ylabel('Profitto (€)', fontsize=10, color='#34495E', fontweight='bold')
-        ax.set_xlabel('Data', fontsize=10, color='#34495E', fontweight='bold')
-        
-        # Griglia elegante
-        ax.grid(True, linestyle='--', alpha=0.3, color='#BDC3C7')
-        ax.set_axisbelow(True)
-        
-        # Rimuovi bordi superiore e destro
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#BDC3C7')
-        ax.spines['bottom'].set_color('#BDC3C7')
-        
-        # Formattazione date
-        total_days = (df_sorted['DATA'].max() - df_sorted['DATA'].min()).days
-        
-        if total_days <= 31:
-            ax.xaxis.set_major_locator(mdates.WeekdayLocator())
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
-        elif total_days <= 90:
-            ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=2))
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
-        else:
-            ax.xaxis.set_major_locator(mdates.MonthLocator())
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
-        
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right", color='#2C3E50')
-        
-        # Formattazione asse Y
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        self.cumulative_profit_canvas.figure.tight_layout(pad=1.5)
-        self.cumulative_profit_canvas.draw()
-
-    def _update_daily_performance_chart(self):
-        """Aggiorna il grafico delle performance giornaliere."""
-        # Pulisci la figura esistente
-        self.daily_performance_canvas.figure.clear()
-        ax = self.daily_performance_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.daily_performance_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        try:
-            # Carica tutti i dati storici dal database
-            historical_data = self.db_manager.load_all_transactions()
-            
-            if not historical_data:
-                ax.text(0.5, 0.5, "Nessun dato da visualizzare", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.daily_performance_canvas.draw()
-                return
-
-            df = pd.DataFrame(historical_data)
-            df['IMPORTO NETTO'] = pd.to_numeric(df['IMPORTO NETTO'], errors='coerce')
-            
-            # Applica parsing robusto delle date usando la utility function
-            df['DATA'] = df['DATA'].apply(parse_date_robust)
-            df = df.dropna(subset=['IMPORTO NETTO', 'DATA'])
-
-            if len(df) == 0:
-                ax.text(0.5, 0.5, "Nessun dato valido da visualizzare", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.daily_performance_canvas.draw()
-                return
-
-            # Aggiungi il giorno della settimana (0=Lunedì, 6=Domenica)
-            df['DayOfWeek'] = df['DATA'].dt.dayofweek
-            df['DayName'] = df['DATA'].dt.day_name()
-
-            # CALCOLO CORRETTO della media uscite giornaliera
-            # Considera solo i giorni che hanno effettivamente uscite, non tutti i giorni del periodo
-            uscite_df = df[df['IMPORTO NETTO'] < 0].copy()
-            if len(uscite_df) > 0:
-                # Raggruppa per data e somma le uscite giornaliere
-                uscite_per_giorno = uscite_df.groupby(uscite_df['DATA'].dt.date)['IMPORTO NETTO'].sum().abs()
-                media_uscite_giornaliera = uscite_per_giorno.mean()
-            else:
-                media_uscite_giornaliera = 0
-
-            # Filtra solo le entrate (importi positivi) 
-            entrate_df = df[df['IMPORTO NETTO'] > 0].copy()
-
-            if len(entrate_df) == 0:
-                ax.text(0.5, 0.5, "Nessuna entrata da visualizzare", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.daily_performance_canvas.draw()
-                return
-
-            # ANALISI PERFORMANCE PER GIORNO DELLA SETTIMANA (METODOLOGIA CORRETTA)
-            # 1. Raggruppa le entrate per giorno specifico e giorno della settimana
-            entrate_per_giorno = entrate_df.groupby([entrate_df['DATA'].dt.date, 'DayOfWeek'])['IMPORTO NETTO'].sum().reset_index()
-            
-            # 2. Calcola la media delle entrate per ogni giorno della settimana
-            # Questo ci dice quanto si guadagna in media ogni lunedì, martedì, ecc.
-            performance_settimanale = entrate_per_giorno.groupby('DayOfWeek')['IMPORTO NETTO'].mean().reset_index()
-            
-            # 3. Mappa i numeri dei giorni ai nomi in italiano
-            giorni_map = {
-                0: 'Lunedì', 
-                1: 'Martedì', 
-                2: 'Mercoledì', 
-                3: 'Giovedì', 
-                4: 'Venerdì', 
-                5: 'Sabato', 
-                6: 'Domenica'
-            }
-            performance_settimanale['DayName'] = performance_settimanale['DayOfWeek'].map(giorni_map)
-            
-            # 4. Ordina per giorno della settimana (Lunedì = 0, Domenica = 6)
-            performance_settimanale = performance_settimanale.sort_values('DayOfWeek')
-            
-            if len(performance_settimanale) == 0:
-                ax.text(0.5, 0.5, "Nessun dato per l'analisi settimanale", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.daily_performance_canvas.draw()
-                return
-
-            # Crea il grafico a barre per giorni della settimana
-            bars = ax.bar(performance_settimanale['DayName'], performance_settimanale['IMPORTO NETTO'], 
-                         color='#27AE60', alpha=0.8, edgecolor='white', linewidth=2)
-
-            # Aggiungi valori sopra le barre
-            for bar, value in zip(bars, performance_settimanale['IMPORTO NETTO']):
-                height = bar.get_height()
-                ax.annotate(f'€{value:,.0f}',
-                           xy=(bar.get_x() + bar.get_width() / 2, height),
-                           xytext=(0, 3),  # 3 points vertical offset
-                           textcoords="offset points",
-                           ha='center', va='bottom',
-                           fontsize=10, fontweight='bold', color='#333333')
-
-            # Calcola il range appropriato per l'asse Y
-            max_entrate = performance_settimanale['IMPORTO NETTO'].max()
-            min_entrate = performance_settimanale['IMPORTO NETTO'].min()
-            
-            # Imposta i limiti dell'asse Y per rendere visibili le barre
-            # Usa un range che mostri bene sia le entrate che la linea obiettivo
-            y_max = max(max_entrate * 1.15, media_uscite_giornaliera * 1.1) if media_uscite_giornaliera > 0 else max_entrate * 1.2
-            y_min = min_entrate * 0.9
-            ax.set_ylim(y_min, y_max)
-            
-            # Aggiungi la linea rossa orizzontale per la media uscite
-            if media_uscite_giornaliera > 0:
-                ax.axhline(y=media_uscite_giornaliera, color='#E74C3C', linestyle='--', 
-                          linewidth=2, alpha=0.8, label=f'Obiettivo Pareggio: €{media_uscite_giornaliera:,.0f}')
-
-            # Styling moderno
-            ax.set_ylabel('Media Entrate Giornaliere (€)', fontsize=10, color='#34495E', fontweight='bold')
-            ax.set_xlabel('Giorno della Settimana', fontsize=10, color='#34495E', fontweight='bold')
-
-            # Formattazione assi
-            ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-            ax.tick_params(colors='#2C3E50', which='both')
-            
-            # Ruota le etichette dell'asse X
-            plt.setp(ax.get_xticklabels(), rotation=45, ha="right", color='#2C3E50', fontsize=9)
-
-            # Griglia elegante
-            ax.grid(axis='y', linestyle='--', alpha=0.3, color='#BDC3C7')
-            ax.set_axisbelow(True)
-
-            # Rimuovi bordi superiore e destro
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_color('#BDC3C7')
-            ax.spines['bottom'].set_color('#BDC3C7')
-
-            # Legenda per la linea obiettivo
-            if media_uscite_giornaliera > 0:
-                legend = ax.legend(loc='upper left', frameon=True, fancybox=True, shadow=True, 
-                                 fontsize=8, borderpad=0.1, handlelength=0.8)
-                legend.get_frame().set_facecolor('#F8F9FA')
-                legend.get_frame().set_edgecolor('#BDC3C7')
-                legend.get_frame().set_alpha(0.9)
-
-            self.daily_performance_canvas.figure.tight_layout(pad=1.5)
-            self.daily_performance_canvas.draw()
-
-        except Exception as e:
-            print(f"Errore nell'aggiornamento del grafico performance giornaliera: {e}")
-            ax.text(0.5, 0.5, "Errore nel caricamento dati", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#E74C3C', weight='bold')
-            style_empty_chart(ax)
-            self.daily_performance_canvas.draw()
-
-    def _update_average_performance_chart(self):
-        """Aggiorna il grafico delle performance medie cumulative."""
-        # Pulisci la figura esistente
-        self.average_performance_canvas.figure.clear()
-        ax = self.average_performance_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.average_performance_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        try:
-            # Carica tutti i dati storici dal database
-            historical_data = self.db_manager.load_all_transactions()
-            
-            if not historical_data:
-                ax.text(0.5, 0.5, "Nessun dato da visualizzare", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.average_performance_canvas.draw()
-                return
-
-            df = pd.DataFrame(historical_data)
-            df['IMPORTO NETTO'] = pd.to_numeric(df['IMPORTO NETTO'], errors='coerce')
-            
-            # Applica parsing robusto delle date usando la utility function
-            df['DATA'] = df['DATA'].apply(parse_date_robust)
-            df = df.dropna(subset=['IMPORTO NETTO', 'DATA'])
-
-            if len(df) == 0:
-                ax.text(0.5, 0.5, "Nessun dato valido da visualizzare", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.average_performance_canvas.draw()
-                return
-
-            # Ottieni l'anno più recente dai dati
-            latest_year = df['DATA'].max().year
-            
-            # Filtra i dati per l'anno più recente
-            df_year = df[df['DATA'].dt.year == latest_year].copy()
-            
-            if len(df_year) == 0:
-                ax.text(0.5, 0.5, f"Nessun dato per l'anno {latest_year}", 
-                       ha='center', va='center', transform=ax.transAxes,
-                       fontsize=12, color='#666666', weight='bold')
-                style_empty_chart(ax)
-                self.average_performance_canvas.draw()
-                return
-
-            # Aggiungi colonna mese-anno
-            df_year['Mese'] = df_year['DATA'].dt.to_period('M')
-            
-            # Raggruppa per mese e calcola entrate, uscite e profitti mensili
-            monthly_summary = df_year.groupby('Mese')['IMPORTO NETTO'].agg([
-                ('entrate_mensili', lambda x: x[x > 0].sum()),
-                ('uscite_mensili', lambda x: abs(x[x < 0].sum())),
-                ('profitto_mensile', 'sum')
-            ]).reset_index()
-            
-            # Ordina per mese
-            monthly_summary = monthly_summary.sort_values('Mese')
-            
-            # Calcola le medie cumulative
-            monthly_summary['media_entrate'] = monthly_summary['entrate_mensili'].expanding().mean()
-            monthly_summary['media_uscite'] = monthly_summary['uscite_mensili'].expanding().mean()
-            monthly_summary['media_profitti'] = monthly_summary['profitto_mensile'].expanding().mean()
-            
-            # Converti i mesi in etichette leggibili
-            monthly_summary['Mese_label'] = monthly_summary['Mese'].dt.strftime('%b')
-            
-            # Colori coordinati con i box delle metriche
-            color_entrate = '#27AE60'  # Verde (uguale al box TOTALE ENTRATE)
-            color_uscite = '#C0392B'   # Rosso (uguale al box TOTALE USCITE) 
-            color_profitti = '#2980B9' # Blu (uguale al box PROFITTO)
-            
-            # Crea le linee del grafico
-            x_pos = range(len(monthly_summary))
-            
-            line1 = ax.plot(x_pos, monthly_summary['media_entrate'], 
-                           linewidth=2.5, color=color_entrate, alpha=0.9,
-                           marker='o', markersize=5, markerfacecolor=color_entrate,
-                           markeredgecolor='white', markeredgewidth=1,
-                           label='Media Entrate')
-            
-            line2 = ax.plot(x_pos, monthly_summary['media_uscite'], 
-                           linewidth=2.5, color=color_uscite, alpha=0.9,
-                           marker='s', markersize=5, markerfacecolor=color_uscite,
-                           markeredgecolor='white', markeredgewidth=1,
-                           label='Media Uscite')
-            
-            line3 = ax.plot(x_pos, monthly_summary['media_profitti'], 
-                           linewidth=2.5, color=color_profitti, alpha=0.9,
-                           marker='^', markersize=5, markerfacecolor=color_profitti,
-                           markeredgecolor='white', markeredgewidth=1,
-                           label='Media Profitti')
-            
-            # Aggiungi valori sui punti dell'ultima linea (ogni 2 punti per leggibilità)
-            step = max(1, len(x_pos) // 6)  # Mostra circa 6 valori
-            for i in range(0, len(x_pos), step):
-                # Valori per Media Entrate
-                ax.annotate(f'€{monthly_summary["media_entrate"].iloc[i]:,.0f}',
-                           xy=(x_pos[i], monthly_summary['media_entrate'].iloc[i]),
-                           xytext=(0, 8),  # 8 points vertical offset
-                           textcoords="offset points",
-                           ha='center', va='bottom',
-                           fontsize=6, fontweight='bold', color=color_entrate)
-                
-                # Valori per Media Uscite
-                ax.annotate(f'€{monthly_summary["media_uscite"].iloc[i]:,.0f}',
-                           xy=(x_pos[i], monthly_summary['media_uscite'].iloc[i]),
-                           xytext=(0, -12),  # Offset negativo per posizionare sotto
-                           textcoords="offset points",
-                           ha='center', va='top',
-                           fontsize=6, fontweight='bold', color=color_uscite)
-                
-                # Valori per Media Profitti (solo se valore significativo)
-                if abs(monthly_summary['media_profitti'].iloc[i]) > 50:
-                    ax.annotate(f'€{monthly_summary["media_profitti"].iloc[i]:,.0f}',
-                               xy=(x_pos[i], monthly_summary['media_profitti'].iloc[i]),
-                               xytext=(10, 0),  # Offset orizzontale
-                               textcoords="offset points",
-                               ha='left', va='center',
-                               fontsize=6, fontweight='bold', color=color_profitti)
-            
-            # Linea dello zero per riferimento
-            ax.axhline(y=0, color='#95A5A6', linestyle='--', linewidth=1, alpha=0.5)
-            
-            # Styling moderno
-            ax.set_ylabel('IMPORTO NETTO Medio (€)', fontsize=10, color='#34495E', fontweight='bold')
-            ax.set_xlabel('Mese', fontsize=10, color='#34495E', fontweight='bold')
-            
-            # Imposta le etichette dell'asse X
-            ax.set_xticks(x_pos)
-            ax.set_xticklabels(monthly_summary['Mese_label'], 
-                              color='#2C3E50', fontsize=9)
-            
-            # Legenda compatta
-            legend = ax.legend(loc='upper left', 
-                              frameon=True, fancybox=True, shadow=True, 
-                              fontsize=8, borderpad=0.3, handlelength=1.0,
-                              ncol=1)
-            legend.get_frame().set_facecolor('#F8F9FA')
-            legend.get_frame().set_edgecolor('#BDC3C7')
-            legend.get_frame().set_alpha(0.9)
-            
-            # Griglia elegante
-            ax.grid(True, linestyle='--', alpha=0.3, color='#BDC3C7')
-            ax.set_axisbelow(True)
-            
-            # Rimuovi bordi superiore e destro
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_color('#BDC3C7')
-            ax.spines['bottom'].set_color('#BDC3C7')
-            
-            # Formattazione asse Y
-            ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-            ax.tick_params(colors='#2C3E50', which='both')
-            
-            self.average_performance_canvas.figure.tight_layout(pad=1.5)
-            self.average_performance_canvas.draw()
-
-        except Exception as e:
-            print(f"Errore nell'aggiornamento del grafico performance medie: {e}")
-            ax.text(0.5, 0.5, "Errore nel caricamento dati", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#E74C3C', weight='bold')
-            style_empty_chart(ax)
-            self.average_performance_canvas.draw()
-
     def _show_error_in_charts(self, error_message):
         """Mostra un messaggio di errore in tutti i grafici."""
-        for canvas in [self.monthly_chart_canvas, self.cumulative_profit_canvas, 
-                      self.daily_performance_canvas, self.average_performance_canvas,
-                      self.top_suppliers_canvas, self.supplier_frequency_canvas]:
-            canvas.figure.clear()
-            canvas.figure.patch.set_facecolor('#FAFAFA')
-            ax = canvas.figure.add_subplot(111)
-            ax.set_facecolor('#FFFFFF')
-            ax.text(0.5, 0.5, error_message, 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#E74C3C', weight='bold')
-            style_empty_chart(ax)
-            canvas.draw()
+        for canvas in self._chart_canvases():
+            canvas.render_chart(build_message_chart, error_message, '#E74C3C')
 
     def _update_supplier_charts(self, df):
         """Aggiorna i grafici di analisi per fornitore."""
         # Filtra solo le spese (importi negativi) con fornitori
-        expenses_df = df[(df['IMPORTO NETTO'] < 0) & (df['FORNITORE'].notna()) & (df['FORNITORE'] != '')].copy()
+        expenses_df = df[(df['IMPORTO NETTO'] < 0) & (df['FORNITORE'].notna()) & (df['FORNITORE'] != '')]
         
         if len(expenses_df) == 0:
             # Se non ci sono dati sui fornitori, mostra grafici vuoti
@@ -935,146 +980,13 @@ Risulta dunque un grafico molto interessante per capire se il piano di business
             return
         
         # Aggiorna entrambi i grafici
-        self._update_top_suppliers_chart(expenses_df)
-        self._update_supplier_frequency_chart(expenses_df)
-
-    def _update_top_suppliers_chart(self, expenses_df):
-        """Aggiorna il grafico dei top fornitori per spesa totale."""
-        # Pulisci la figura esistente
-        self.top_suppliers_canvas.figure.clear()
-        ax = self.top_suppliers_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.top_suppliers_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        # Calcola la spesa totale per fornitore (valore assoluto)
-        supplier_totals = expenses_df.groupby('FORNITORE')['IMPORTO NETTO'].sum().abs().sort_values(ascending=True)
-        
-        # Prendi i top 10 fornitori
-        top_suppliers = supplier_totals.tail(10)
-        
-        if len(top_suppliers) == 0:
-            ax.text(0.5, 0.5, "Nessun dato sui fornitori", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.top_suppliers_canvas.draw()
-            return
-
-        # Tronca i nomi dei fornitori se troppo lunghi
-        supplier_names = [name[:30] + '...' if len(name) > 30 else name for name in top_suppliers.index]
-        
-        # Crea il grafico a barre orizzontali
-        bars = ax.barh(range(len(top_suppliers)), top_suppliers.values, 
-                      color='#E74C3C', alpha=0.8, edgecolor='white', linewidth=1)
-
-        # Aggiungi valori alla fine delle barre
-        for i, (bar, value) in enumerate(zip(bars, top_suppliers.values)):
-            width = bar.get_width()
-            ax.text(width + (max(top_suppliers.values) * 0.01), bar.get_y() + bar.get_height()/2,
-                   f'€{value:,.0f}', ha='left', va='center', 
-                   fontsize=9, fontweight='bold', color='#333333')
-
-        # Styling moderno
-        ax.set_ylabel('Fornitore', fontsize=10, color='#34495E', fontweight='bold')
-        ax.set_xlabel('Spesa Totale (€)', fontsize=10, color='#34495E', fontweight='bold')
-        
-        # Imposta le etichette dell'asse Y
-        ax.set_yticks(range(len(top_suppliers)))
-        ax.set_yticklabels(supplier_names, fontsize=8, color='#2C3E50')
-        
-        # Griglia elegante
-        ax.grid(axis='x', linestyle='--', alpha=0.3, color='#BDC3C7')
-        ax.set_axisbelow(True)
-        
-        # Rimuovi bordi superiore e destro
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#BDC3C7')
-        ax.spines['bottom'].set_color('#BDC3C7')
-        
-        # Formattazione asse X
-        ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        self.top_suppliers_canvas.figure.tight_layout(pad=1.5)
-        self.top_suppliers_canvas.draw()
-
-    def _update_supplier_frequency_chart(self, expenses_df):
-        """Aggiorna il grafico della frequenza degli ordini per fornitore."""
-        # Pulisci la figura esistente
-        self.supplier_frequency_canvas.figure.clear()
-        ax = self.supplier_frequency_canvas.figure.add_subplot(111)
-        
-        # Imposta colore di sfondo
-        self.supplier_frequency_canvas.figure.patch.set_facecolor('#FAFAFA')
-        ax.set_facecolor('#FFFFFF')
-
-        # Conta il numero di transazioni per fornitore
-        supplier_frequency = expenses_df['FORNITORE'].value_counts().sort_values(ascending=True)
-        
-        # Prendi i top 10 fornitori per frequenza
-        top_frequency = supplier_frequency.tail(10)
-        
-        if len(top_frequency) == 0:
-            ax.text(0.5, 0.5, "Nessun dato sulla frequenza ordini", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            self.supplier_frequency_canvas.draw()
-            return
-
-        # Tronca i nomi dei fornitori se troppo lunghi
-        supplier_names = [name[:30] + '...' if len(name) > 30 else name for name in top_frequency.index]
-        
-        # Crea il grafico a barre orizzontali
-        bars = ax.barh(range(len(top_frequency)), top_frequency.values, 
-                      color='#3498DB', alpha=0.8, edgecolor='white', linewidth=1)
-
-        # Aggiungi valori alla fine delle barre
-        for i, (bar, value) in enumerate(zip(bars, top_frequency.values)):
-            width = bar.get_width()
-            ax.text(width + (max(top_frequency.values) * 0.01), bar.get_y() + bar.get_height()/2,
-                   f'{value}', ha='left', va='center', 
-                   fontsize=9, fontweight='bold', color='#333333')
-
-        # Styling moderno
-        ax.set_ylabel('Fornitore', fontsize=10, color='#34495E', fontweight='bold')
-        ax.set_xlabel('Numero di Ordini', fontsize=10, color='#34495E', fontweight='bold')
-        
-        # Imposta le etichette dell'asse Y
-        ax.set_yticks(range(len(top_frequency)))
-        ax.set_yticklabels(supplier_names, fontsize=8, color='#2C3E50')
-        
-        # Griglia elegante
-        ax.grid(axis='x', linestyle='--', alpha=0.3, color='#BDC3C7')
-        ax.set_axisbelow(True)
-        
-        # Rimuovi bordi superiore e destro
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_color('#BDC3C7')
-        ax.spines['bottom'].set_color('#BDC3C7')
-        
-        # Formattazione asse X
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        self.supplier_frequency_canvas.figure.tight_layout(pad=1.5)
-        self.supplier_frequency_canvas.draw()
+        self.top_suppliers_canvas.render_chart(build_top_suppliers_chart, expenses_df)
+        self.supplier_frequency_canvas.render_chart(build_supplier_frequency_chart, expenses_df)
 
     def _reset_supplier_charts(self):
         """Resetta i grafici dei fornitori quando non ci sono dati."""
         for canvas in [self.top_suppliers_canvas, self.supplier_frequency_canvas]:
-            canvas.figure.clear()
-            canvas.figure.patch.set_facecolor('#FAFAFA')
-            ax = canvas.figure.add_subplot(111)
-            ax.set_facecolor('#FFFFFF')
-            ax.text(0.5, 0.5, "Nessun dato sui fornitori", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            canvas.draw()
+            canvas.render_chart(build_message_chart, "Nessun dato sui fornitori")
 
     def _reset_view(self):
         """Resetta la vista quando non ci sono dati."""
@@ -1084,15 +996,5 @@ Risulta dunque un grafico molto interessante per capire se il piano di business
         update_metric_box_value(self.profit_label, "0.00 €")
         
         # Reset di tutti i grafici
-        for canvas in [self.monthly_chart_canvas, self.cumulative_profit_canvas, 
-                      self.daily_performance_canvas, self.average_performance_canvas,
-                      self.top_suppliers_canvas, self.supplier_frequency_canvas]:
-            canvas.figure.clear()
-            canvas.figure.patch.set_facecolor('#FAFAFA')
-            ax = canvas.figure.add_subplot(111)
-            ax.set_facecolor('#FFFFFF')
-            ax.text(0.5, 0.5, "Nessun dato da visualizzare", 
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=12, color='#666666', weight='bold')
-            style_empty_chart(ax)
-            canvas.draw()
+        for canvas in self._chart_canvases():
+            canvas.render_chart(build_message_chart, "Nessun dato da visualizzare")
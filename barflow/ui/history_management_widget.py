@@ -7,9 +7,10 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
                               QComboBox, QSizePolicy, QGridLayout)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
-import sqlite3
 from pathlib import Path
-from barflow.data.db_manager import DatabaseManager
+import pandas as pd
+from barflow.data.db_manager import HISTORY_TABLE, DatabaseManager
+from barflow.data.record_codec import period_bounds, to_cents
 
 class HistoryManagementWidget(QWidget):
     """Widget per visualizzare e gestire le transazioni storiche."""
@@ -21,6 +22,13 @@ class HistoryManagementWidget(QWidget):
         self.data_loaded = False  # Flag per tracciare se i dati sono stati caricati
         self.init_ui()
         # Non caricare i dati automaticamente - solo quando l'utente accede alla sezione
+        self.db_manager.change_bus.subscribe(self._on_history_changed, HISTORY_TABLE)
+
+    def _on_history_changed(self, change):
+        """Ricarica la tabella dopo una modifica allo storico (subito se visibile, altrimenti all'apertura)."""
+        self.data_loaded = False
+        if self.isVisible():
+            self.load_historical_data(show_popup=False)
 
     def init_ui(self):
         """Inizializza l'interfaccia utente."""
@@ -434,8 +442,9 @@ class HistoryManagementWidget(QWidget):
 
         for row, record in enumerate(data):
             try:
-                # Data
-                data_item = QTableWidgetItem(str(record.get('DATA', '')))
+                # Data (già tipizzata dal database, NaT se non valida)
+                data_value = record.get('DATA')
+                data_item = QTableWidgetItem('' if pd.isna(data_value) else str(data_value))
                 data_item.setTextAlignment(Qt.AlignCenter)
                 
                 # Sorgente
@@ -473,7 +482,7 @@ class HistoryManagementWidget(QWidget):
                 
                 # Importo lordo POS
                 importo_lordo = record.get('IMPORTO LORDO POS')
-                if importo_lordo is not None:
+                if pd.notna(importo_lordo):
                     try:
                         importo_lordo_str = f"{float(importo_lordo):.2f} €"
                     except (ValueError, TypeError):
@@ -485,7 +494,7 @@ class HistoryManagementWidget(QWidget):
                 
                 # Commissione POS
                 commissione = record.get('COMMISSIONE POS')
-                if commissione is not None:
+                if pd.notna(commissione):
                     try:
                         commissione_str = f"{float(commissione):.2f} €"
                     except (ValueError, TypeError):
@@ -540,12 +549,20 @@ class HistoryManagementWidget(QWidget):
         # Filtro data
         date_text = self.date_filter.text().strip()
         if date_text:
-            if len(date_text) == 7:  # YYYY-MM
+            try:
+                # Filtra su data_ts così il giorno include anche le transazioni con orario
+                if len(date_text) == 7:  # YYYY-MM
+                    month_start = pd.Timestamp(f"{date_text}-01")
+                    month_end = month_start + pd.offsets.MonthEnd(0)
+                    bounds = period_bounds(month_start.date(), month_end.date())
+                else:  # Data completa
+                    bounds = period_bounds(date_text, date_text)
+                conditions.append("data_ts >= ? AND data_ts < ?")
+                params.extend(bounds)
+            except ValueError:
+                # Testo non interpretabile come data: confronto testuale
                 conditions.append("data LIKE ?")
                 params.append(f"{date_text}%")
-            else:  # Data completa
-                conditions.append("data = ?")
-                params.append(date_text)
 
         # Filtro sorgente
         if self.source_filter.currentText():
@@ -582,15 +599,17 @@ class HistoryManagementWidget(QWidget):
         
         if min_amount:
             try:
-                conditions.append("importo_netto >= ?")
-                params.append(float(min_amount))
+                min_cents = to_cents(float(min_amount))
+                conditions.append("importo_netto_cents >= ?")
+                params.append(min_cents)
             except ValueError:
                 pass
                 
         if max_amount:
             try:
-                conditions.append("importo_netto <= ?")
-                params.append(float(max_amount))
+                max_cents = to_cents(float(max_amount))
+                conditions.append("importo_netto_cents <= ?")
+                params.append(max_cents)
             except ValueError:
                 pass
 
@@ -606,37 +625,27 @@ class HistoryManagementWidget(QWidget):
             return
 
         try:
-            # Usa lo stesso database del DatabaseManager
-            from barflow.data.db_manager import get_db_path
-            db_path = get_db_path()
-            
-            with sqlite3.connect(db_path) as conn:
-                where_clause = " AND ".join(conditions)
-                count_query = f"SELECT COUNT(*) FROM transactions WHERE {where_clause}"
-                count = conn.execute(count_query, params).fetchone()[0]
-
-                if count == 0:
-                    QMessageBox.information(self, "Nessun record", 
-                                          "Nessun record corrisponde ai filtri specificati.")
-                    return
-
-                # Conferma eliminazione
-                reply = QMessageBox.question(self, "Conferma eliminazione", 
-                    f"Sei sicuro di voler eliminare {count} record che corrispondono ai filtri?\n\n"
-                    "⚠️ Questa operazione non può essere annullata!",
-                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-
-                if reply == QMessageBox.Yes:
-                    # Elimina i record
-                    delete_query = f"DELETE FROM transactions WHERE {where_clause}"
-                    conn.execute(delete_query, params)
-                    conn.commit()
-
-                    QMessageBox.information(self, "Eliminazione completata", 
-                                          f"Eliminati {count} record dal database.")
-                    
-                    # Ricarica i dati
-                    self.load_historical_data()
+            # Conteggio ed eliminazione passano dal DatabaseManager (aggiorna anche l'indice dei duplicati)
+            count = self.db_manager.count_transactions_where(conditions, params)
+
+            if count == 0:
+                QMessageBox.information(self, "Nessun record", 
+                                      "Nessun record corrisponde ai filtri specificati.")
+                return
+
+            # Conferma eliminazione
+            reply = QMessageBox.question(self, "Conferma eliminazione", 
+                f"Sei sicuro di voler eliminare {count} record che corrispondono ai filtri?\n\n"
+                "⚠️ Questa operazione non può essere annullata!",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+
+            if reply == QMessageBox.Yes:
+                # Elimina i record
+                count = self.db_manager.delete_transactions_where(conditions, params)
+
+                # La tabella è già stata ricaricata dalla notifica di modifica
+                QMessageBox.information(self, "Eliminazione completata", 
+                                      f"Eliminati {count} record dal database.")
 
         except Exception as e:
             QMessageBox.critical(self, "Errore", f"Errore durante l'eliminazione: {e}")
@@ -662,20 +671,11 @@ class HistoryManagementWidget(QWidget):
 
         if reply2 == QMessageBox.Yes:
             try:
-                # Usa lo stesso database del DatabaseManager
-                from barflow.data.db_manager import get_db_path
-                db_path = get_db_path()
-                
-                with sqlite3.connect(db_path) as conn:
-                    count = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
-                    conn.execute("DELETE FROM transactions")
-                    conn.commit()
+                count = self.db_manager.delete_all_transactions()
 
+                # La tabella è già stata ricaricata dalla notifica di modifica
                 QMessageBox.information(self, "Database svuotato", 
                                       f"Eliminati tutti i {count} record dal database storico.")
-                
-                # Ricarica i dati (ora vuoti)
-                self.load_historical_data()
 
             except Exception as e:
                 QMessageBox.critical(self, "Errore", f"Errore durante l'eliminazione: {e}")
@@ -4,21 +4,24 @@ Finestra principale dell'applicazione AccountFlow
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                               QHBoxLayout, QLabel, QMessageBox, QFileDialog,
                               QListWidget, QListWidgetItem, 
-                              QFrame, QStackedWidget, QApplication)
-from PySide6.QtCore import Qt
+                              QFrame, QStackedWidget, QApplication, QProgressDialog,
+                              QInputDialog)
+from PySide6.QtCore import Qt, QThreadPool
 from PySide6.QtGui import QIcon
-import pandas as pd
 from datetime import datetime
 import os
 import sys
 import platform
-from .import_widget import ImportWidget
-from .transactions_widget import TransactionsWidget
 from .welcome_widget import WelcomeWidget
-from .analysis_widget import AnalysisWidget
-from .history_management_widget import HistoryManagementWidget
+from .export_job import ExportJob
 from barflow.data.db_manager import DatabaseManager
-from barflow.data.temporary_db_manager import TemporaryDatabaseManager
+from barflow.data.change_bus import DataChange
+from barflow.data.temporary_db_manager import TEMP_TABLE, TemporaryDatabaseManager
+from barflow.utils.startup_trace import startup_trace
+
+# I moduli delle sezioni (pandas, matplotlib) e delle esportazioni vengono
+# importati alla prima apertura della sezione o al primo export: all'avvio
+# serve solo la pagina di benvenuto.
 
 class MainWindow(QMainWindow):
     """Finestra principale dell'applicazione AccountFlow"""
@@ -27,10 +30,12 @@ class MainWindow(QMainWindow):
         super().__init__()
         
         # Imposta l'icona della finestra
-        self.set_window_icon()
+        with startup_trace.phase("window_icon"):
+            self.set_window_icon()
         
         # Inizializza database manager
-        self.db_manager = DatabaseManager()
+        with startup_trace.phase("DatabaseManager"):
+            self.db_manager = DatabaseManager()
         
         # Inizializza database temporaneo manager
         try:
@@ -44,7 +49,8 @@ class MainWindow(QMainWindow):
             print(f"   - Directory dati: {get_data_directory()}")
             print(f"   - Directory app data: {get_app_data_directory()}")
             
-            self.temp_db_manager = TemporaryDatabaseManager()
+            with startup_trace.phase("TemporaryDatabaseManager"):
+                self.temp_db_manager = TemporaryDatabaseManager()
             print(f"✓ Database temporaneo inizializzato: {self.temp_db_manager.db_path}")
             
             # Verifica che il database sia accessibile
@@ -59,12 +65,25 @@ class MainWindow(QMainWindow):
                                f"Impossibile inizializzare il database temporaneo:\n{e}\n\nL'applicazione verrà chiusa.")
             sys.exit(1)
         
-        # Inizializza UI
-        self.init_ui()
-        self.setup_connections()
+        # Versione dei dati temporanei mostrata da ciascuna vista ("transactions", "analysis")
+        self._view_versions = {}
+        # Ultima versione dei dati temporanei vista dalla finestra (per gli aggiornamenti incrementali)
+        self._temp_version = None
         
-        # Inizializza le viste vuote
-        self._refresh_all_views()
+        # Esportazione in background in corso (una alla volta)
+        self._export_job = None
+        self._export_file_path = None
+        self._export_dialog = None
+        
+        # Inizializza UI
+        with startup_trace.phase("init_ui"):
+            self.init_ui()
+        with startup_trace.phase("setup_connections"):
+            self.setup_connections()
+        
+        # Le modifiche ai dati temporanei aggiornano solo la vista visibile
+        # (le viste delle sezioni vengono create e caricate alla prima apertura)
+        self.temp_db_manager.change_bus.subscribe(self._on_temp_data_changed, TEMP_TABLE)
     
     def init_ui(self):
         """Inizializza l'interfaccia utente"""
@@ -164,12 +183,16 @@ class MainWindow(QMainWindow):
             ("💸 Transazioni", "transactions"),
             ("📊 Analisi", "analysis"),
             ("⚙️ Gestione Dati Storici", "historical_data_management"),
-            ("📤 Esporta Storico", "export")
+            ("📤 Esporta Storico", "export"),
+            ("🆕 Esporta Nuove Transazioni", "export_delta")
         ]
         
+        # Riga della sidebar di ogni sezione
+        self._nav_rows = {}
         for text, key in nav_items:
             item = QListWidgetItem(text)
             item.setData(Qt.UserRole, key)
+            self._nav_rows[key] = self.nav_list.count()
             self.nav_list.addItem(item)
         
         sidebar_layout.addWidget(self.nav_list)
@@ -196,25 +219,51 @@ class MainWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         content_layout.addWidget(self.stacked_widget)
         
-        # Crea i widget delle diverse sezioni
+        # Solo la pagina di benvenuto viene creata subito: le altre sezioni
+        # vengono create alla prima apertura (vedi _section_widget)
         self.welcome_widget = WelcomeWidget()
-        self.import_widget = ImportWidget()
-        self.transactions_widget = TransactionsWidget()
-        self.analysis_widget = AnalysisWidget()
-        self.history_management_widget = HistoryManagementWidget()
+        self.import_widget = None
+        self.transactions_widget = None
+        self.analysis_widget = None
+        self.history_management_widget = None
+        self._sections = {"home": self.welcome_widget}
+        self._current_section = "home"
         
-        # Aggiungi i widget allo stacked widget
         self.stacked_widget.addWidget(self.welcome_widget)
-        self.stacked_widget.addWidget(self.import_widget)
-        self.stacked_widget.addWidget(self.transactions_widget)
-        self.stacked_widget.addWidget(self.analysis_widget)
-        self.stacked_widget.addWidget(self.history_management_widget)
 
         # Imposta il widget di benvenuto come predefinito
         self.stacked_widget.setCurrentWidget(self.welcome_widget)
         
         parent_layout.addWidget(content_widget)
     
+    def _section_widget(self, key):
+        """Restituisce il widget della sezione, creandolo (e importandone il modulo) alla prima apertura."""
+        widget = self._sections.get(key)
+        if widget is not None:
+            return widget
+        
+        if key == "import":
+            from .import_widget import ImportWidget
+            widget = self.import_widget = ImportWidget()
+            widget.data_imported.connect(self.handle_data_import)
+        elif key == "transactions":
+            from .transactions_widget import TransactionsWidget
+            widget = self.transactions_widget = TransactionsWidget()
+            widget.save_requested.connect(self.save_and_update_history)
+            widget.clear_temp_requested.connect(self.clear_temporary_data)
+        elif key == "analysis":
+            from .analysis_widget import AnalysisWidget
+            widget = self.analysis_widget = AnalysisWidget()
+        elif key == "historical_data_management":
+            from .history_management_widget import HistoryManagementWidget
+            widget = self.history_management_widget = HistoryManagementWidget()
+        else:
+            raise KeyError(f"Sezione sconosciuta: {key}")
+        
+        self._sections[key] = widget
+        self.stacked_widget.addWidget(widget)
+        return widget
+    
     def apply_styles(self):
         """Applica gli stili globali"""
         self.setStyleSheet("""
@@ -225,10 +274,8 @@ class MainWindow(QMainWindow):
     
     def setup_connections(self):
         """Configura le connessioni dei segnali"""
+        # I segnali dei widget delle sezioni vengono collegati alla loro creazione
         self.nav_list.currentRowChanged.connect(self.change_section)
-        self.import_widget.data_imported.connect(self.handle_data_import)
-        self.transactions_widget.save_requested.connect(self.save_and_update_history)
-        self.transactions_widget.clear_temp_requested.connect(self.clear_temporary_data)
         # Deseleziona qualsiasi elemento all'avvio per mostrare la pagina di benvenuto
         self.nav_list.setCurrentRow(-1)
 
@@ -240,62 +287,96 @@ class MainWindow(QMainWindow):
             
         key = item.data(Qt.UserRole)
         
-        if key == "home":
-            self.stacked_widget.setCurrentWidget(self.welcome_widget)
-        elif key == "import":
-            self.stacked_widget.setCurrentWidget(self.import_widget)
-        elif key == "transactions":
-            self.stacked_widget.setCurrentWidget(self.transactions_widget)
-            # Carica sempre i dati dal database temporaneo con gestione errori
-            try:
-                temp_data = self.temp_db_manager.load_all_temporary_transactions()
-                print(f"✓ Caricati {len(temp_data)} record dal database temporaneo per sezione Transazioni")
-                self.transactions_widget.update_table(temp_data)
-            except Exception as e:
-                print(f"✗ Errore nel caricamento dati temporanei per Transazioni: {e}")
-                import traceback
-                traceback.print_exc()
-                # Mostra tabella vuota per evitare crash
-                self.transactions_widget.update_table([])
-                QMessageBox.warning(self, "Errore Caricamento", 
-                                  f"Errore nel caricamento dei dati temporanei:\n{e}\n\nMostrando tabella vuota.")
+        if key in ("export", "export_delta"):
+            if key == "export":
+                self.export_results()
+            else:
+                self.export_new_transactions()
+            # Rimani sulla sezione corrente
+            self.nav_list.blockSignals(True)
+            self.nav_list.setCurrentRow(self._nav_rows[self._current_section])
+            self.nav_list.blockSignals(False)
+            return
+        
+        self.stacked_widget.setCurrentWidget(self._section_widget(key))
+        self._current_section = key
+        
+        if key == "transactions":
+            # Ricarica i dati temporanei (dalla cache) solo se sono cambiati
+            if not self._is_view_current("transactions"):
+                self._refresh_transactions_view()
         elif key == "analysis":
-            self.stacked_widget.setCurrentWidget(self.analysis_widget)
-            # Analisi Attuale usa i dati temporanei dal database con gestione errori
-            try:
-                temp_data = self.temp_db_manager.load_all_temporary_transactions()
-                print(f"✓ Caricati {len(temp_data)} record dal database temporaneo per Analisi")
-                self.analysis_widget.update_data(temp_data)
-            except Exception as e:
-                print(f"✗ Errore nel caricamento dati temporanei per Analisi: {e}")
-                import traceback
-                traceback.print_exc()
-                # Mostra analisi vuota per evitare crash
-                self.analysis_widget.update_data([])
-                QMessageBox.warning(self, "Errore Caricamento", 
-                                  f"Errore nel caricamento dei dati per l'analisi:\n{e}\n\nMostrando analisi vuota.")
+            # Analisi Attuale usa i dati temporanei e si aggiorna solo se sono cambiati
+            if not self._is_view_current("analysis"):
+                self._refresh_analysis_view()
         elif key == "historical_data_management":
-            self.stacked_widget.setCurrentWidget(self.history_management_widget)
             # Carica i dati solo se non sono ancora stati caricati
             self.history_management_widget.load_data_if_needed()
-        elif key == "export":
-            self.export_results()
-            # Rimani sulla sezione corrente
-            self.nav_list.blockSignals(True)
-            # Trova l'indice della vista corrente e reimpostalo
-            current_widget = self.stacked_widget.currentWidget()
-            if current_widget == self.welcome_widget:
-                self.nav_list.setCurrentRow(0)
-            elif current_widget == self.import_widget:
-                self.nav_list.setCurrentRow(1)
-            elif current_widget == self.transactions_widget:
-                self.nav_list.setCurrentRow(2)
-            elif current_widget == self.analysis_widget:
-                self.nav_list.setCurrentRow(3)
-            elif current_widget == self.history_management_widget:
-                self.nav_list.setCurrentRow(4)
-            self.nav_list.blockSignals(False)
 
+    def _refresh_transactions_view(self):
+        """Aggiorna la tabella delle transazioni con i dati temporanei correnti."""
+        try:
+            temp_data = self.temp_db_manager.load_all_temporary_transactions()
+            print(f"✓ Caricati {len(temp_data)} record dal database temporaneo per sezione Transazioni")
+            self.transactions_widget.update_table(temp_data)
+            self._mark_views_current("transactions")
+        except Exception as e:
+            print(f"✗ Errore nel caricamento dati temporanei per Transazioni: {e}")
+            import traceback
+            traceback.print_exc()
+            # Mostra tabella vuota per evitare crash
+            self.transactions_widget.update_table([])
+            QMessageBox.warning(self, "Errore Caricamento", 
+                              f"Errore nel caricamento dei dati temporanei:\n{e}\n\nMostrando tabella vuota.")
+
+    def _refresh_analysis_view(self):
+        """Aggiorna l'analisi attuale con i dati temporanei correnti."""
+        try:
+            temp_data = self.temp_db_manager.load_all_temporary_transactions()
+            print(f"✓ Caricati {len(temp_data)} record dal database temporaneo per Analisi")
+            self.analysis_widget.update_data(temp_data)
+            self._mark_views_current("analysis")
+        except Exception as e:
+            print(f"✗ Errore nel caricamento dati temporanei per Analisi: {e}")
+            import traceback
+            traceback.print_exc()
+            # Mostra analisi vuota per evitare crash
+            self.analysis_widget.update_data([])
+            QMessageBox.warning(self, "Errore Caricamento", 
+                              f"Errore nel caricamento dei dati per l'analisi:\n{e}\n\nMostrando analisi vuota.")
+
+    def _on_temp_data_changed(self, change):
+        """
+        Aggiorna una sola volta la vista visibile dopo una modifica ai dati temporanei.
+        
+        Le righe appena importate vengono aggiunte alla tabella delle transazioni
+        (anche se non visibile) senza ricaricarla, purché la tabella fosse allineata
+        ai dati precedenti. Le altre viste non visibili restano indietro di versione
+        e vengono aggiornate quando l'utente le apre (vedi change_section).
+        """
+        previous_version = self._temp_version
+        self._temp_version = self.temp_db_manager.get_data_version()
+        current_widget = self.stacked_widget.currentWidget()
+        
+        if (change.kind == DataChange.INSERT and previous_version is not None
+                and self._view_versions.get("transactions") == previous_version):
+            self._append_transactions(change.row_ids)
+        elif current_widget == self.transactions_widget:
+            self._refresh_transactions_view()
+        
+        if current_widget == self.analysis_widget:
+            self._refresh_analysis_view()
+    
+    def _append_transactions(self, row_ids):
+        """Aggiunge alla tabella delle transazioni solo le righe inserite."""
+        try:
+            new_data = self.temp_db_manager.load_temporary_transactions_by_ids(row_ids)
+            self.transactions_widget.add_transactions(new_data)
+            self._mark_views_current("transactions")
+        except Exception as e:
+            print(f"✗ Errore nell'aggiunta delle nuove transazioni: {e}")
+            # Ricarica completa alla prossima apertura della sezione
+            self._view_versions.pop("transactions", None)
 
     def handle_data_import(self, source_type, data):
         """Gestisce i dati importati e li aggiunge al database temporaneo"""
@@ -315,29 +396,21 @@ class MainWindow(QMainWindow):
                 row['SORGENTE'] = sorgente_value
             
             # Salva i dati nel database temporaneo
-            added_count, duplicate_count = self.temp_db_manager.add_transactions(data, import_timestamp)
+            added_count, duplicate_count, _ = self.temp_db_manager.add_transactions(data, import_timestamp)
             print(f"✓ Aggiunte {added_count} transazioni al database temporaneo (saltati {duplicate_count} duplicati)")
             
             # Il popup di successo è ora gestito in ImportWidget
             
-            # Aggiorna la tabella delle transazioni se è la vista corrente
-            if self.stacked_widget.currentWidget() == self.transactions_widget:
-                temp_data = self.temp_db_manager.load_all_temporary_transactions()
-                self.transactions_widget.update_table(temp_data)
-            else:
-                # Passa alla vista transazioni per mostrare i dati aggiornati
-                # Trova l'indice corretto per "transactions"
+            # Le viste sono già state aggiornate dalla notifica del database temporaneo
+            # (le nuove righe aggiunte alla tabella): se la tabella delle transazioni
+            # non è visibile, passa a quella (change_section la ricarica solo se serve)
+            if self.stacked_widget.currentWidget() != self.transactions_widget:
                 for i in range(self.nav_list.count()):
                     item = self.nav_list.item(i)
                     if item.data(Qt.UserRole) == "transactions":
                         self.nav_list.setCurrentRow(i)
                         break
             
-            # Aggiorna le viste con i dati dal database temporaneo
-            temp_data = self.temp_db_manager.load_all_temporary_transactions()
-            self.transactions_widget.update_table(temp_data)
-            self.analysis_widget.update_data(temp_data)
-            
         except Exception as e:
             print(f"✗ Errore nella gestione dell'importazione dati: {e}")
             import traceback
@@ -347,113 +420,215 @@ class MainWindow(QMainWindow):
             # Aggiorna comunque le viste per mantenere consistenza
             self._refresh_all_views()
 
-    def export_results(self):
-        """Esporta tutto lo storico in un file XLSX"""
-        # Carica i dati storici
-        historical_data = self.db_manager.load_all_transactions()
+    def _can_start_export(self):
+        """Controlla che non ci sia un'esportazione in corso e che lo storico non sia vuoto."""
+        if self._export_job is not None:
+            QMessageBox.information(
+                self, 
+                "Esportazione in corso", 
+                "È già in corso un'esportazione dello storico.\nAttendi il completamento o annullala."
+            )
+            return False
         
-        # Controllo che ci siano dati storici
-        if not historical_data:
+        # Controllo che ci siano dati storici (conteggio dalla cache, senza caricare i record)
+        if self.db_manager.count_transactions_where([], []) == 0:
             QMessageBox.warning(
                 self, 
                 "Errore - Nessun dato storico", 
                 "Non ci sono dati storici da esportare.\nSalva prima dei dati utilizzando la sezione 'Transazioni' o 'Gestione Dati Storici'."
             )
+            return False
+        return True
+    
+    def export_results(self):
+        """
+        Esporta tutto lo storico in un file XLSX, CSV, JSON Lines o Parquet, oppure
+        il report Excel con aggregati e grafici (in background)
+        """
+        if not self._can_start_export():
             return
+        from barflow.export import available_export_formats, export_history, export_history_report
 
         # Genera il nome del file con timestamp
         today = datetime.now().strftime("%Y-%m-%d")
         default_filename = f"{today}_storico_accountflow.xlsx"
 
-        # Finestra di dialogo per scegliere dove salvare il file
-        file_path, _ = QFileDialog.getSaveFileName(
+        # Finestra di dialogo per scegliere dove salvare il file (e il formato)
+        file_filters = {
+            f"{description} (*.{extension})": (extension, export_history)
+            for extension, (description, _) in available_export_formats().items()
+        }
+        file_filters["Report Excel con grafici (*.xlsx)"] = ("xlsx", export_history_report)
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self, 
             "Esporta Storico - Scegli dove salvare", 
             default_filename, 
-            "File Excel (*.xlsx)"
+            ";;".join(file_filters)
         )
 
         if file_path:
-            try:
-                df_hist = pd.DataFrame(historical_data)
-                df_hist['IMPORTO NETTO'] = pd.to_numeric(df_hist['IMPORTO NETTO'], errors='coerce')
-                df_hist['DATA_PARSED'] = pd.to_datetime(df_hist['DATA'], errors='coerce')
-                df_hist = df_hist.dropna(subset=['IMPORTO NETTO'])
-                
-                # Prepara il foglio "Transazioni Storico"
-                transazioni_storiche_df = df_hist.copy()
-                
-                # Formatta le date storiche
-                def format_hist_date(row):
-                    if pd.notna(row['DATA_PARSED']):
-                        return row['DATA_PARSED'].strftime('%d-%m-%Y')
-                    else:
-                        original_date = str(row['DATA']) if pd.notna(row['DATA']) else ''
-                        if original_date.strip() == '' or original_date.lower() == 'nan':
-                            return "Data non disponibile"
-                        else:
-                            return f"Data non valida: {original_date}"
-                
-                transazioni_storiche_df['DATA'] = transazioni_storiche_df.apply(format_hist_date, axis=1)
-                transazioni_storiche_df['IMPORTO NETTO'] = transazioni_storiche_df['IMPORTO NETTO'].apply(lambda x: f"{x:,.2f}" if pd.notna(x) else "0.00")
-                
-                # Rimuovi colonna temporanea
-                if 'DATA_PARSED' in transazioni_storiche_df.columns:
-                    transazioni_storiche_df = transazioni_storiche_df.drop('DATA_PARSED', axis=1)
-                
-                # Riordina le colonne disponibili nel database
-                available_columns = list(transazioni_storiche_df.columns)
-                colonne_ordinate = []
-                
-                # Aggiungi le colonne nell'ordine preferito se esistono
-                preferred_order = ["DATA", "SORGENTE", "DESCRIZIONE", "FORNITORE", "NUMERO FORNITORE", 
-                                 "NUMERO OPERAZIONE POS", "IMPORTO LORDO POS", "COMMISSIONE POS", "IMPORTO NETTO"]
-                
-                for col in preferred_order:
-                    if col in available_columns:
-                        colonne_ordinate.append(col)
-                
-                # Aggiungi eventuali colonne rimanenti
-                for col in available_columns:
-                    if col not in colonne_ordinate:
-                        colonne_ordinate.append(col)
-                
-                transazioni_storiche_df = transazioni_storiche_df[colonne_ordinate]
-
-                # Esporta in Excel con un solo foglio
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    # Foglio "Transazioni Storico" con tutti i dati storici
-                    transazioni_storiche_df.to_excel(writer, index=False, sheet_name='Transazioni Storico')
-
-                QMessageBox.information(
-                    self, 
-                    "Esportazione completata", 
-                    f"File storico salvato con successo in:\n{file_path}\n\nIl file contiene {len(transazioni_storiche_df)} transazioni storiche."
-                )
-            except Exception as e:
-                QMessageBox.critical(
-                    self, 
-                    "Errore durante l'esportazione", 
-                    f"Si è verificato un errore durante il salvataggio del file:\n\n{str(e)}"
-                )
+            extension, export_function = file_filters.get(selected_filter, ("xlsx", export_history))
+            # Senza un'estensione riconosciuta usa quella del formato selezionato
+            # (il report è sempre un file Excel, qualunque estensione sia stata scritta)
+            file_extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+            if file_extension != extension and (
+                export_function is export_history_report or file_extension not in available_export_formats()
+            ):
+                file_path = f"{file_path}.{extension}"
+            self._start_export(file_path, export_function)
+    
+    def export_new_transactions(self):
+        """
+        Esporta solo le transazioni salvate dopo l'ultima esportazione nella stessa
+        cartella e formato, in un file delta datato (in background).
+        """
+        if not self._can_start_export():
+            return
+        from barflow.export import (available_export_formats, count_new_transactions,
+                                    delta_file_path, export_history_delta)
+        
+        directory = QFileDialog.getExistingDirectory(
+            self, 
+            "Esporta Nuove Transazioni - Scegli la cartella di destinazione"
+        )
+        if not directory:
+            return
+        
+        # CSV come primo formato proposto: i file del giorno vengono estesi, non duplicati
+        formats = available_export_formats()
+        extensions = sorted(formats, key=lambda extension: extension != 'csv')
+        labels = [f"{formats[extension][0]} (.{extension})" for extension in extensions]
+        label, ok = QInputDialog.getItem(
+            self, 
+            "Esporta Nuove Transazioni", 
+            "Formato dei file delta:", 
+            labels, 0, False
+        )
+        if not ok:
+            return
+        extension = extensions[labels.index(label)]
+        
+        new_count = count_new_transactions(self.db_manager.db_path, directory, extension)
+        if new_count == 0:
+            QMessageBox.information(
+                self, 
+                "Nessuna nuova transazione", 
+                "Non ci sono transazioni nuove dall'ultima esportazione in questa cartella."
+            )
+            return
+        
+        self._start_export(delta_file_path(directory, extension), export_history_delta)
+    
+    def _start_export(self, file_path, export_function):
+        """Avvia l'esportazione in background mostrando avanzamento e pulsante Annulla."""
+        # Le righe passano in streaming dal database al file, con date e importi nativi
+        job = ExportJob(export_function, self.db_manager.db_path, file_path)
+        job.signals.progress.connect(self._on_export_progress)
+        job.signals.finished.connect(self._on_export_finished)
+        job.signals.cancelled.connect(self._on_export_cancelled)
+        job.signals.failed.connect(self._on_export_failed)
+        
+        # Finestra modale solo per l'applicazione: la GUI resta reattiva, ma non si
+        # possono modificare i dati storici mentre vengono letti
+        dialog = QProgressDialog("Preparazione dell'esportazione...", "Annulla", 0, 0, self)
+        dialog.setWindowTitle("Esporta Storico")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(job.cancel)
+        
+        self._export_job = job
+        self._export_file_path = file_path
+        self._export_dialog = dialog
+        dialog.show()
+        job.start()
+    
+    def _on_export_progress(self, written, total):
+        """Aggiorna la barra di avanzamento dell'esportazione."""
+        if self._export_dialog is None or self._export_dialog.wasCanceled():
+            return
+        self._export_dialog.setMaximum(total)
+        self._export_dialog.setValue(written)
+        self._export_dialog.setLabelText(f"Esportate {written} di {total} transazioni...")
+    
+    def _finish_export(self):
+        """Chiude la finestra di avanzamento e libera il job terminato."""
+        if self._export_dialog is not None:
+            self._export_dialog.close()
+            self._export_dialog.deleteLater()
+        self._export_dialog = None
+        self._export_job = None
+    
+    def _on_export_finished(self, exported_count):
+        self._finish_export()
+        QMessageBox.information(
+            self, 
+            "Esportazione completata", 
+            f"File storico salvato con successo in:\n{self._export_file_path}\n\nEsportate {exported_count} transazioni storiche."
+        )
+    
+    def _on_export_cancelled(self):
+        self._finish_export()
+        QMessageBox.information(
+            self, 
+            "Esportazione annullata", 
+            "L'esportazione è stata annullata e il file parziale è stato eliminato."
+        )
+    
+    def _on_export_failed(self, message):
+        self._finish_export()
+        QMessageBox.critical(
+            self, 
+            "Errore durante l'esportazione", 
+            f"Si è verificato un errore durante il salvataggio del file:\n\n{message}"
+        )
+    
+    def closeEvent(self, event):
+        """Alla chiusura annulla un'esportazione in corso e attende che il file parziale sia eliminato."""
+        if self._export_job is not None:
+            self._export_job.cancel()
+            QThreadPool.globalInstance().waitForDone()
+        super().closeEvent(event)
     
     def _refresh_all_views(self):
-        """Aggiorna tutte le viste con i dati correnti dal database temporaneo."""
+        """Aggiorna le viste già create con i dati correnti dal database temporaneo."""
+        # Le viste non ancora create verranno caricate alla prima apertura
+        if self.transactions_widget is None and self.analysis_widget is None:
+            return
         try:
             temp_data = self.temp_db_manager.load_all_temporary_transactions()
             print(f"✓ Refresh viste: caricati {len(temp_data)} record dal database temporaneo")
-            self.transactions_widget.update_table(temp_data)
-            self.analysis_widget.update_data(temp_data)
+            if self.transactions_widget is not None:
+                self.transactions_widget.update_table(temp_data)
+                self._mark_views_current("transactions")
+            if self.analysis_widget is not None:
+                self.analysis_widget.update_data(temp_data)
+                self._mark_views_current("analysis")
         except Exception as e:
             print(f"✗ Errore nel refresh delle viste: {e}")
             import traceback
             traceback.print_exc()
             # Inizializza con dati vuoti per evitare crash
-            self.transactions_widget.update_table([])
-            self.analysis_widget.update_data([])
+            self._view_versions.clear()
+            if self.transactions_widget is not None:
+                self.transactions_widget.update_table([])
+            if self.analysis_widget is not None:
+                self.analysis_widget.update_data([])
             QMessageBox.warning(self, "Errore Refresh", 
                               f"Errore nell'aggiornamento delle viste:\n{e}\n\nMostrando dati vuoti.")
     
+    def _is_view_current(self, view_key):
+        """True se la vista mostra già la versione corrente dei dati temporanei."""
+        return self._view_versions.get(view_key) == self.temp_db_manager.get_data_version()
+    
+    def _mark_views_current(self, *view_keys):
+        """Registra che le viste mostrano la versione corrente dei dati temporanei."""
+        version = self.temp_db_manager.get_data_version()
+        self._temp_version = version
+        for view_key in view_keys:
+            self._view_versions[view_key] = version
+    
     def save_and_update_history(self):
         """Salva le transazioni temporanee nello storico e svuota il database temporaneo."""
         temp_count = self.temp_db_manager.get_temporary_transactions_count()
@@ -467,10 +642,12 @@ class MainWindow(QMainWindow):
             # Carica tutte le transazioni temporanee
             temp_transactions = self.temp_db_manager.load_all_temporary_transactions()
             
-            # Rimuovi il campo _IMPORT_TIMESTAMP prima di salvare nello storico
-            for transaction in temp_transactions:
-                if '_IMPORT_TIMESTAMP' in transaction:
-                    del transaction['_IMPORT_TIMESTAMP']
+            # Escludi il campo _IMPORT_TIMESTAMP prima di salvare nello storico
+            # (copie: i record in cache non vanno modificati)
+            temp_transactions = [
+                {key: value for key, value in transaction.items() if key != '_IMPORT_TIMESTAMP'}
+                for transaction in temp_transactions
+            ]
             
             # Salva le transazioni temporanee nel database storico
             saved, duplicates = self.db_manager.save_transactions(
@@ -479,11 +656,9 @@ class MainWindow(QMainWindow):
             )
             
             # Pulisce completamente il database temporaneo dopo il salvataggio
+            # (la notifica di svuotamento aggiorna la vista visibile)
             self.temp_db_manager.clear_all_temporary_transactions()
             
-            # Aggiorna le viste (ora vuote per la tabella temporanea)
-            self._refresh_all_views()
-            
             stats = self.db_manager.get_database_stats()
             
             QMessageBox.information(self, "Salvataggio completato", 
@@ -518,11 +693,9 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             try:
                 # Pulisce completamente il database temporaneo
+                # (la notifica di svuotamento aggiorna la vista visibile)
                 self.temp_db_manager.clear_all_temporary_transactions()
                 
-                # Aggiorna le viste (ora vuote)
-                self._refresh_all_views()
-                
                 QMessageBox.information(self, "Eliminazione completata", 
                     "Tutte le transazioni temporanee sono state eliminate.\n"
                     "Il database temporaneo è stato pulito completamente.")
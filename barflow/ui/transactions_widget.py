@@ -1,10 +1,171 @@
 """
 Widget per la visualizzazione delle transazioni
 """
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-                              QTableWidgetItem, QHeaderView, QPushButton, QSizePolicy)
-from PySide6.QtCore import Qt, Signal
+from bisect import bisect_right
+from operator import itemgetter
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, 
+                              QAbstractItemView, QHeaderView, QPushButton, QSizePolicy)
+from PySide6.QtCore import Qt, Signal, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QColor
+import pandas as pd
+
+COLUMNS = [
+    "DATA", "SORGENTE", "DESCRIZIONE", "FORNITORE", "NUMERO FORNITORE", 
+    "NUMERO OPERAZIONE POS", "IMPORTO LORDO POS", "COMMISSIONE POS", "IMPORTO NETTO"
+]
+
+# Lunghezza massima dei testi lunghi (il testo completo è nel tooltip)
+TRUNCATED_COLUMNS = {"DESCRIZIONE": 25, "FORNITORE": 20}
+
+# Ruoli e valori Qt letti una sola volta: data() viene chiamato per ogni cella
+# e ogni ruolo, e l'accesso agli enum di Qt ha un costo non trascurabile
+_DISPLAY_ROLE = Qt.DisplayRole
+_ALIGNMENT_ROLE = Qt.TextAlignmentRole
+_FOREGROUND_ROLE = Qt.ForegroundRole
+_TOOLTIP_ROLE = Qt.ToolTipRole
+_HANDLED_ROLES = frozenset((_DISPLAY_ROLE, _ALIGNMENT_ROLE, _FOREGROUND_ROLE, _TOOLTIP_ROLE))
+_CENTER_ALIGNMENT = int(Qt.AlignCenter)
+_NEGATIVE_COLOR = QColor("red")
+_POSITIVE_COLOR = QColor("green")
+
+# Oltre questo numero di blocchi da inserire il modello viene ricostruito con un
+# unico reset: ogni blocco sposta le righe successive e notifica la vista
+MAX_INSERT_RUNS = 32
+
+
+def _sort_key(transaction):
+    """
+    Chiave di ordinamento crescente equivalente all'ordine del database temporaneo
+    (import più recente prima, poi data più recente, date mancanti in fondo).
+    """
+    data_value = transaction.get('DATA')
+    data_key = float('inf') if pd.isna(data_value) else -pd.Timestamp(data_value).value
+    return (-(transaction.get('_IMPORT_TIMESTAMP') or 0), data_key)
+
+
+def _format_cell(transaction, column):
+    """Testo mostrato in una cella della tabella."""
+    value = transaction.get(column)
+    if column == "DATA":
+        # Già tipizzata dal database, NaT se non valida
+        return '' if pd.isna(value) else str(value)
+    if column in ("IMPORTO LORDO POS", "COMMISSIONE POS"):
+        return f"{float(value):.2f} €" if pd.notna(value) else ""
+    if column == "IMPORTO NETTO":
+        try:
+            return f"{float(value if value is not None else 0):.2f} €"
+        except (ValueError, TypeError):
+            return str(value)
+    text = str(value or '')
+    max_length = TRUNCATED_COLUMNS.get(column)
+    if max_length and len(text) > max_length:
+        text = text[:max_length - 3] + "..."
+    return text
+
+
+class TransactionsTableModel(QAbstractTableModel):
+    """
+    Modello delle transazioni temporanee, mantenuto ordinato come il database.
+    
+    Le celle vengono formattate solo quando la vista le disegna, e le transazioni
+    appena importate vengono inserite nella loro posizione senza ricostruire il
+    resto della tabella.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._keys = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+    
+    def headerData(self, section, orientation, role=_DISPLAY_ROLE):
+        if orientation == Qt.Horizontal and role == _DISPLAY_ROLE:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+    
+    def data(self, index, role=_DISPLAY_ROLE):
+        if role not in _HANDLED_ROLES or not index.isValid():
+            return None
+        if role == _ALIGNMENT_ROLE:
+            return _CENTER_ALIGNMENT
+        transaction = self._rows[index.row()]
+        column = COLUMNS[index.column()]
+        try:
+            if role == _DISPLAY_ROLE:
+                return _format_cell(transaction, column)
+            if role == _FOREGROUND_ROLE and column == "IMPORTO NETTO":
+                # Colore solo per importo netto
+                netto_val = float(transaction.get('IMPORTO NETTO', 0))
+                return _NEGATIVE_COLOR if netto_val < 0 else _POSITIVE_COLOR
+            if role == _TOOLTIP_ROLE and column in TRUNCATED_COLUMNS and transaction.get(column):
+                return str(transaction.get(column))
+        except Exception as e:
+            # Cella vuota per evitare il crash
+            print(f"Errore nella visualizzazione della riga {index.row()}: {e}")
+            return "" if role == _DISPLAY_ROLE else None
+        return None
+    
+    def set_transactions(self, transactions_data):
+        """Sostituisce tutte le transazioni del modello."""
+        self.beginResetModel()
+        # Ordinamento stabile: i dati arrivano già ordinati dal database
+        self._rows = sorted(transactions_data, key=_sort_key)
+        self._keys = [_sort_key(transaction) for transaction in self._rows]
+        self.endResetModel()
+    
+    def insert_transactions(self, transactions_data):
+        """
+        Inserisce nuove transazioni nella loro posizione di ordinamento.
+        
+        Le transazioni che cadono nello stesso punto della tabella formano un
+        blocco inserito con un solo beginInsertRows (un nuovo import finisce di
+        solito tutto in cima). Se i blocchi sono troppi il modello viene
+        ricostruito con un reset.
+        """
+        new_rows = sorted(transactions_data, key=_sort_key)
+        if not new_rows:
+            return
+        new_keys = [_sort_key(transaction) for transaction in new_rows]
+        # Blocchi (riga di destinazione, inizio, fine) nelle nuove transazioni
+        runs = []
+        row = 0
+        for index, key in enumerate(new_keys):
+            row = bisect_right(self._keys, key, row)
+            if runs and runs[-1][0] == row:
+                runs[-1][2] = index + 1
+            else:
+                runs.append([row, index, index + 1])
+        if len(runs) > MAX_INSERT_RUNS:
+            self._merge_transactions(new_rows, new_keys)
+            return
+        # Dall'ultimo blocco al primo: le righe di destinazione precedenti restano valide
+        for row, start, end in reversed(runs):
+            self.beginInsertRows(QModelIndex(), row, row + end - start - 1)
+            self._rows[row:row] = new_rows[start:end]
+            self._keys[row:row] = new_keys[start:end]
+            self.endInsertRows()
+    
+    def _merge_transactions(self, new_rows, new_keys):
+        """Unisce le nuove transazioni (già ordinate) a quelle del modello con un reset."""
+        self.beginResetModel()
+        # Due sequenze già ordinate: l'ordinamento stabile le unisce in tempo lineare,
+        # a parità di chiave le righe già presenti restano prima delle nuove
+        merged = sorted(
+            zip(self._keys + new_keys, self._rows + new_rows), key=itemgetter(0)
+        )
+        self._keys = [key for key, _ in merged]
+        self._rows = [transaction for _, transaction in merged]
+        self.endResetModel()
+    
+    def clear(self):
+        """Rimuove tutte le transazioni dal modello."""
+        self.set_transactions([])
+
 
 class TransactionsWidget(QWidget):
     """Widget per visualizzare le transazioni importate."""
@@ -22,12 +183,12 @@ class TransactionsWidget(QWidget):
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(10, 10, 10, 10)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels([
-            "DATA", "SORGENTE", "DESCRIZIONE", "FORNITORE", "NUMERO FORNITORE", 
-            "NUMERO OPERAZIONE POS", "IMPORTO LORDO POS", "COMMISSIONE POS", "IMPORTO NETTO"
-        ])
+        self.model = TransactionsTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Righe di altezza uniforme: la vista non misura il contenuto di ogni riga
+        self.table.verticalHeader().setDefaultSectionSize(32)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         
         # Configurazione header responsive
         header = self.table.horizontalHeader()
@@ -62,11 +223,11 @@ class TransactionsWidget(QWidget):
         
         self.table.setAlternatingRowColors(False)
         self.table.setGridStyle(Qt.NoPen)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setShowGrid(False)
 
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #FFFFFF;
                 color: #333333;
                 border: 1px solid #E0E0E0;
@@ -81,11 +242,11 @@ class TransactionsWidget(QWidget):
                 font-weight: bold;
                 font-size: 10pt;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #F0F0F0;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #E6F2FF;
                 color: #333333;
             }
@@ -150,153 +311,23 @@ class TransactionsWidget(QWidget):
         main_layout.addLayout(buttons_layout)
 
     def update_table(self, transactions_data):
-        """Aggiorna la tabella con i dati delle transazioni in modo ottimizzato."""
+        """Aggiorna la tabella con tutti i dati delle transazioni."""
         print(f"🔄 Aggiornamento tabella con {len(transactions_data)} transazioni...")
-        
-        # OTTIMIZZAZIONE 1: Disabilita temporaneamente il rendering per migliorare performance
-        self.table.setUpdatesEnabled(False)
-        
-        try:
-            # OTTIMIZZAZIONE 2: Pulisci completamente la tabella esistente
-            self.table.clearContents()
-            self.table.setRowCount(0)
-            
-            # Se non ci sono dati, esci subito
-            if not transactions_data:
-                print("✓ Tabella vuota")
-                return
-            
-            # OTTIMIZZAZIONE 3: Ordina i dati (limitiamo a max 1000 record per performance)
-            sorted_data = sorted(transactions_data, 
-                               key=lambda x: x.get('_IMPORT_TIMESTAMP', 0), 
-                               reverse=True)
-            
-            # Limita a 1000 record per evitare freeze dell'interfaccia
-            if len(sorted_data) > 1000:
-                sorted_data = sorted_data[:1000]
-                print(f"⚠️ Mostrati solo i primi 1000 record di {len(transactions_data)} per performance")
-            
-            # OTTIMIZZAZIONE 4: Imposta la dimensione della tabella una sola volta
-            self.table.setRowCount(len(sorted_data))
-
-            # OTTIMIZZAZIONE 5: Disabilita il ridimensionamento automatico durante il popolamento
-            header = self.table.horizontalHeader()
-            header.setSectionResizeMode(QHeaderView.Fixed)
+        # Il modello formatta solo le celle visibili: nessun limite al numero di righe
+        self.model.set_transactions(transactions_data)
+        if transactions_data:
+            print(f"✓ Tabella popolata con {len(transactions_data)} righe")
+        else:
+            print("✓ Tabella vuota")
+        print("✓ Aggiornamento tabella completato")
 
-            for row, transaction in enumerate(sorted_data):
-                # Mostra progresso ogni 100 righe per debug
-                if row % 100 == 0 and row > 0:
-                    print(f"  Elaborando riga {row}/{len(sorted_data)}...")
-                
-                try:
-                    # OTTIMIZZAZIONE 6: Creazione item più diretta, meno formattazione
-                    items = []
-                    
-                    # DATA
-                    items.append(QTableWidgetItem(str(transaction.get('DATA', ''))))
-                    
-                    # SORGENTE  
-                    items.append(QTableWidgetItem(str(transaction.get('SORGENTE', ''))))
-                    
-                    # DESCRIZIONE (truncata)
-                    desc_text = str(transaction.get('DESCRIZIONE', '') or '')
-                    if len(desc_text) > 25:
-                        desc_text = desc_text[:22] + "..."
-                    desc_item = QTableWidgetItem(desc_text)
-                    if transaction.get('DESCRIZIONE'):
-                        desc_item.setToolTip(str(transaction.get('DESCRIZIONE', '')))
-                    items.append(desc_item)
-                    
-                    # FORNITORE (truncato)
-                    forn_text = str(transaction.get('FORNITORE', '') or '')
-                    if len(forn_text) > 20:
-                        forn_text = forn_text[:17] + "..."
-                    forn_item = QTableWidgetItem(forn_text)
-                    if transaction.get('FORNITORE'):
-                        forn_item.setToolTip(str(transaction.get('FORNITORE', '')))
-                    items.append(forn_item)
-                    
-                    # NUMERO FORNITORE
-                    items.append(QTableWidgetItem(str(transaction.get('NUMERO FORNITORE', '') or '')))
-                    
-                    # NUMERO OPERAZIONE POS
-                    pos_num = transaction.get('NUMERO OPERAZIONE POS', '')
-                    items.append(QTableWidgetItem(str(pos_num) if pos_num else ''))
-                    
-                    # IMPORTO LORDO POS
-                    lordo = transaction.get('IMPORTO LORDO POS')
-                    lordo_str = f"{float(lordo):.2f} €" if lordo is not None else ""
-                    items.append(QTableWidgetItem(lordo_str))
-                    
-                    # COMMISSIONE POS
-                    comm = transaction.get('COMMISSIONE POS')
-                    comm_str = f"{float(comm):.2f} €" if comm is not None else ""
-                    items.append(QTableWidgetItem(comm_str))
-                    
-                    # IMPORTO NETTO
-                    try:
-                        netto_val = float(transaction.get('IMPORTO NETTO', 0))
-                        netto_item = QTableWidgetItem(f"{netto_val:.2f} €")
-                        # Colore solo per importo netto
-                        if netto_val < 0:
-                            netto_item.setForeground(QColor("red"))
-                        else:
-                            netto_item.setForeground(QColor("green"))
-                        items.append(netto_item)
-                    except (ValueError, TypeError):
-                        items.append(QTableWidgetItem(str(transaction.get('IMPORTO NETTO', '0.00'))))
-                    
-                    # OTTIMIZZAZIONE 7: Imposta tutti gli item in una volta e allineamento minimo
-                    for col, item in enumerate(items):
-                        item.setTextAlignment(Qt.AlignCenter)
-                        self.table.setItem(row, col, item)
-                        
-                except Exception as e:
-                    print(f"Errore nella creazione della riga {row}: {e}")
-                    # Crea celle vuote per evitare il crash
-                    for col in range(9):
-                        empty_item = QTableWidgetItem("")
-                        empty_item.setTextAlignment(Qt.AlignCenter)
-                        self.table.setItem(row, col, empty_item)
-            
-            print(f"✓ Tabella popolata con {len(sorted_data)} righe")
-            
-        finally:
-            # OTTIMIZZAZIONE 8: Riabilita il ridimensionamento solo alla fine
-            header = self.table.horizontalHeader()
-            header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # DATA
-            header.setSectionResizeMode(1, QHeaderView.ResizeToContents)  # SORGENTE  
-            header.setSectionResizeMode(2, QHeaderView.Interactive)  # DESCRIZIONE
-            header.setSectionResizeMode(3, QHeaderView.Interactive)  # FORNITORE
-            header.setSectionResizeMode(4, QHeaderView.ResizeToContents)  # NUMERO FORNITORE
-            header.setSectionResizeMode(5, QHeaderView.ResizeToContents)  # NUMERO POS
-            header.setSectionResizeMode(6, QHeaderView.ResizeToContents)  # LORDO
-            header.setSectionResizeMode(7, QHeaderView.ResizeToContents)  # COMMISSIONE
-            header.setSectionResizeMode(8, QHeaderView.ResizeToContents)  # NETTO
-            
-            # OTTIMIZZAZIONE 9: Riabilita gli aggiornamenti alla fine
-            self.table.setUpdatesEnabled(True)
-            
-            print("✓ Aggiornamento tabella completato")
+    def add_transactions(self, transactions_data):
+        """Aggiunge alla tabella solo le transazioni appena importate, senza ricostruirla."""
+        self.model.insert_transactions(transactions_data)
+        print(f"✓ Aggiunte {len(transactions_data)} righe alla tabella ({self.model.rowCount()} totali)")
 
     def clear_table(self):
         """Pulisce la tabella riportandola allo stato iniziale vuoto."""
         print("🔄 Pulizia tabella...")
-        self.table.setUpdatesEnabled(False)
-        try:
-            self.table.clearContents()
-            self.table.setRowCount(0)
-            print("✓ Tabella pulita")
-        finally:
-            self.table.setUpdatesEnabled(True)
-    
-    def resizeEvent(self, event):
-        """Gestisce il ridimensionamento del widget per ottimizzare la tabella."""
-        super().resizeEvent(event)
-        # OTTIMIZZAZIONE: Rimosso il resize automatico per migliorare performance
-        # Il ridimensionamento è ora gestito direttamente in update_table()
-        pass
-        pass
-    
-    # RIMOSSO: _optimize_column_widths() per migliorare performance
-    # Il ridimensionamento è ora gestito direttamente nel metodo update_table()
\ No newline at end of file
+        self.model.clear()
+        print("✓ Tabella pulita")
@@ -6,6 +6,7 @@ o utilizzino directory dati utente appropriate quando necessario.
 import sys
 import os
 from pathlib import Path
+from .startup_trace import startup_trace
 
 
 def is_frozen_app() -> bool:
@@ -39,6 +40,7 @@ def is_writable_directory(path: Path) -> bool:
         return False
 
 
+@startup_trace.traced("app_paths.get_application_directory")
 def get_application_directory() -> Path:
     """
     Ottiene la directory base dell'applicazione.
@@ -76,6 +78,7 @@ def get_application_directory() -> Path:
         return Path(__file__).parent.parent.parent
 
 
+@startup_trace.traced("app_paths.get_user_data_directory")
 def get_user_data_directory() -> Path:
     """
     Ottiene la directory dati utente appropriata per il sistema operativo.
@@ -93,6 +96,7 @@ def get_user_data_directory() -> Path:
     return app_data_dir
 
 
+@startup_trace.traced("app_paths.get_data_directory")
 def get_data_directory() -> Path:
     """
     Ottiene la directory per i dati dell'applicazione.
@@ -118,6 +122,7 @@ def get_data_directory() -> Path:
     return data_dir
 
 
+@startup_trace.traced("app_paths.get_app_data_directory")
 def get_app_data_directory() -> Path:
     """
     Ottiene la directory per i dati persistenti dell'applicazione.
@@ -143,6 +148,7 @@ def get_app_data_directory() -> Path:
     return app_data_dir
 
 
+@startup_trace.traced("app_paths.get_resources_directory")
 def get_resources_directory() -> Path:
     """
     Ottiene la directory delle risorse dell'applicazione.
@@ -172,6 +178,7 @@ def get_resources_directory() -> Path:
     return possible_resource_paths[0]
 
 
+@startup_trace.traced("app_paths.get_output_directory")
 def get_output_directory() -> Path:
     """
     Ottiene la directory per i file di output dell'applicazione.
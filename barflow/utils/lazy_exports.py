@@ -0,0 +1,36 @@
+"""
+Ri-esportazioni pigre dei package (PEP 562).
+
+I package di BarFlow ri-esportano classi e funzioni dei loro moduli (es.
+`from barflow.ui import MainWindow`). Con lazy_exports il modulo che definisce
+un nome viene importato solo al primo accesso a quel nome: importare un package
+non carica pandas, matplotlib o widget che all'avvio non servono ancora.
+"""
+import importlib
+import sys
+
+
+def lazy_exports(package_name, exports):
+    """
+    Crea __getattr__ e __dir__ per un package che ri-esporta i nomi dei suoi moduli.
+
+    Args:
+        package_name: __name__ del package
+        exports: dict {nome esportato: modulo relativo che lo definisce (es. '.main_window')}
+
+    Returns:
+        Tupla (__getattr__, __dir__) da assegnare a livello di modulo nel package
+    """
+    def __getattr__(name):
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, package_name), name)
+        # Gli accessi successivi trovano il nome direttamente nel package
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package_name])) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,263 @@
+"""
+Tracciamento dei tempi di avvio.
+
+Registra quanto durano le fasi dell'avvio (migrazione del database, ricerca
+dei percorsi, inizializzazione di Qt, costruzione della finestra) e gli import
+eseguiti in ciascuna fase, e salva tutto in un report JSON.
+
+Si attiva con l'opzione --startup-trace[=PERCORSO] di main.py o con la
+variabile d'ambiente BARFLOW_STARTUP_TRACE=PERCORSO (con "1" il report va nella
+cartella temporanea di sistema). Con --startup-trace-exit o
+BARFLOW_STARTUP_TRACE_EXIT=1 l'applicazione si chiude appena scritto il
+report: è così che lo usa benchmarks/startup_time.py.
+
+Quando il tracciamento non è attivo, phase() e i metodi decorati con traced()
+costano un solo controllo. Il modulo usa solo la libreria standard e importa
+json, platform e simili solo quando il tracciamento è attivo, quindi può essere
+importato prima di qualunque altra cosa.
+"""
+import builtins
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Variabili d'ambiente e opzioni da riga di comando
+TRACE_ENV = "BARFLOW_STARTUP_TRACE"
+TRACE_EXIT_ENV = "BARFLOW_STARTUP_TRACE_EXIT"
+TRACE_OPTION = "--startup-trace"
+TRACE_EXIT_OPTION = "--startup-trace-exit"
+
+# Nome del report quando non viene indicato un percorso
+DEFAULT_REPORT_NAME = "barflow_startup_trace.json"
+
+# Versione del formato del report
+REPORT_VERSION = 1
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class StartupTrace:
+    """Raccoglie le fasi e gli import dell'avvio e li salva in un report JSON."""
+
+    def __init__(self):
+        self.enabled = False
+        self.exit_after_report = False
+        self.report_path = None
+        self._start = None
+        self._started_at = None
+        self._thread_id = None
+        self._phases = []
+        self._phase_stack = []
+        self._marks = []
+        self._imports = []
+        self._import_stack = []
+        self._original_import = None
+        self._resolve_name = None
+
+    def configure(self, argv, environ=None):
+        """
+        Attiva il tracciamento se richiesto da riga di comando o dall'ambiente.
+
+        Args:
+            argv: Argomenti del processo (es. sys.argv)
+            environ: Variabili d'ambiente (default os.environ)
+
+        Returns:
+            Gli argomenti senza le opzioni del tracciamento, da passare a QApplication
+        """
+        environ = os.environ if environ is None else environ
+        report_path = environ.get(TRACE_ENV) or None
+        exit_after_report = environ.get(TRACE_EXIT_ENV, "") not in ("", "0")
+
+        remaining = []
+        for arg in argv:
+            if arg == TRACE_OPTION:
+                report_path = report_path or "1"
+            elif arg.startswith(TRACE_OPTION + "="):
+                report_path = arg.split("=", 1)[1] or "1"
+            elif arg == TRACE_EXIT_OPTION:
+                exit_after_report = True
+            else:
+                remaining.append(arg)
+
+        if report_path is not None:
+            if report_path == "1":
+                import tempfile
+                report_path = Path(tempfile.gettempdir()) / DEFAULT_REPORT_NAME
+            self.start(report_path, exit_after_report)
+        return remaining
+
+    def start(self, report_path, exit_after_report=False):
+        """Inizia il tracciamento: da qui partono i tempi e vengono misurati gli import."""
+        if self.enabled:
+            return
+        from importlib.util import resolve_name
+        self._resolve_name = resolve_name
+        self.enabled = True
+        self.exit_after_report = exit_after_report
+        self.report_path = Path(report_path)
+        self._start = time.perf_counter()
+        self._started_at = time.time()
+        self._thread_id = threading.get_ident()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _elapsed(self):
+        return time.perf_counter() - self._start
+
+    def phase(self, name):
+        """
+        Context manager che misura una fase dell'avvio.
+
+        Le fasi possono essere annidate: nel report ognuna riporta il percorso
+        delle fasi che la contengono (es. "MainWindow/init_ui").
+        """
+        if not self.enabled:
+            return _NO_PHASE
+        return self._phase(name)
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        self._phase_stack.append(name)
+        path = "/".join(self._phase_stack)
+        modules_before = len(sys.modules)
+        start = self._elapsed()
+        try:
+            yield
+        finally:
+            self._phase_stack.pop()
+            # Le fasi terminate dopo finish() non entrano nel report
+            if self.enabled:
+                self._phases.append({
+                    "name": name,
+                    "path": path,
+                    "depth": path.count("/"),
+                    "start_ms": _ms(start),
+                    "duration_ms": _ms(self._elapsed() - start),
+                    "modules_loaded": len(sys.modules) - modules_before,
+                })
+
+    def traced(self, name):
+        """Decoratore che misura ogni chiamata della funzione come una fase."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self._phase(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def mark(self, name):
+        """Registra un istante dell'avvio (es. la prima finestra disegnata)."""
+        if self.enabled:
+            self._marks.append({"name": name, "at_ms": _ms(self._elapsed())})
+
+    def _pending_module(self, name, globals, fromlist, level):
+        """Modulo che l'import caricherà, o None se è già stato importato."""
+        if level:
+            package = globals.get("__package__") if globals else None
+            if not package:
+                return None
+            try:
+                name = self._resolve_name("." * level + name, package)
+            except (ImportError, ValueError):
+                return None
+        module = sys.modules.get(name)
+        if module is None:
+            return name
+        # "from package import modulo": il sottomodulo può non essere ancora caricato.
+        # Non si usa hasattr, che caricherebbe i nomi pigri fuori dalla misura.
+        for item in fromlist or ():
+            if item != "*" and item not in vars(module):
+                return f"{name}.{item}"
+        return None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if not self.enabled or threading.get_ident() != self._thread_id:
+            return original(name, globals, locals, fromlist, level)
+        module_name = self._pending_module(name, globals, fromlist, level)
+        if module_name is None:
+            return original(name, globals, locals, fromlist, level)
+
+        # Tempo dei sotto-import, per ricavare il tempo proprio del modulo
+        self._import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._import_stack.pop()
+            if self._import_stack:
+                self._import_stack[-1] += elapsed
+            self._imports.append({
+                "module": module_name,
+                "depth": len(self._import_stack),
+                "phase": "/".join(self._phase_stack),
+                "cumulative_ms": _ms(elapsed),
+                "self_ms": _ms(elapsed - children),
+            })
+
+    def report(self):
+        """Report del tracciamento fino a questo momento, come dizionario."""
+        import platform
+        from datetime import datetime
+        totals = {}
+        for phase in self._phases:
+            total = totals.setdefault(phase["name"], {"calls": 0, "total_ms": 0.0})
+            total["calls"] += 1
+            total["total_ms"] = round(total["total_ms"] + phase["duration_ms"], 3)
+        top_level_imports = [item for item in self._imports if item["depth"] == 0]
+        return {
+            "version": REPORT_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            # Istante di inizio del tracciamento (time.time()), per confrontarlo
+            # con l'avvio del processo misurato da fuori
+            "started_at_epoch": self._started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "argv": sys.argv,
+            "total_ms": _ms(self._elapsed()),
+            "import_total_ms": round(sum(item["cumulative_ms"] for item in top_level_imports), 3),
+            "modules_loaded": len(sys.modules),
+            "phases": sorted(self._phases, key=lambda phase: phase["start_ms"]),
+            "phase_totals": totals,
+            "marks": self._marks,
+            "imports": self._imports,
+        }
+
+    def finish(self):
+        """
+        Termina il tracciamento e scrive il report JSON.
+
+        Returns:
+            Il report scritto, o None se il tracciamento non era attivo
+        """
+        if not self.enabled:
+            return None
+        builtins.__import__ = self._original_import
+        import json
+        report = self.report()
+        self.enabled = False
+        try:
+            self.report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.report_path, "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, indent=2)
+            print(f"⏱️  Avvio in {report['total_ms']:.0f} ms, report salvato in: {self.report_path}")
+        except OSError as e:
+            print(f"⚠️  Impossibile salvare il report di avvio: {e}")
+        return report
+
+
+# Istanza condivisa usata da main.py e dai moduli tracciati
+startup_trace = StartupTrace()
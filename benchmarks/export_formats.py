@@ -0,0 +1,93 @@
+"""
+Benchmark dei formati di esportazione dello storico.
+
+Crea un database storico temporaneo con transazioni sintetiche, lo esporta in
+ogni formato disponibile (più il report Excel con aggregati e grafici) e
+riporta tempo, righe al secondo e dimensione dei file, sia per l'esportazione
+completa sia per un filtro su periodo e sorgente.
+
+Uso (dalla cartella del progetto):
+    python benchmarks/export_formats.py [--rows 200000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from barflow.data.db_manager import DatabaseManager  # noqa: E402
+from barflow.data.py_sqlite_migrator import PySQLiteMigrator  # noqa: E402
+from barflow.export import available_export_formats, export_history_report  # noqa: E402
+
+FORNITORI = ["Caffè Rossi", "Birra Spa", "Pane & Co", "Latteria Bianchi", "Acme Forniture"]
+
+
+def make_transactions(count, seed=0):
+    """Transazioni sintetiche: 70% incassi POS, 30% pagamenti a fornitori."""
+    rnd = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    transactions = []
+    for i in range(count):
+        date = start + timedelta(minutes=rnd.randint(0, 60 * 24 * 365 * 3))
+        if rnd.random() < 0.7:
+            netto = round(rnd.uniform(1, 80), 2)
+            transactions.append({
+                'DATA': date.strftime('%Y-%m-%d %H:%M:%S'), 'SORGENTE': 'pos',
+                'DESCRIZIONE': None, 'FORNITORE': None, 'NUMERO FORNITORE': None,
+                'NUMERO OPERAZIONE POS': str(i), 'IMPORTO LORDO POS': round(netto * 1.01, 2),
+                'COMMISSIONE POS': round(netto * 0.01, 2), 'IMPORTO NETTO': netto,
+            })
+        else:
+            transactions.append({
+                'DATA': date.strftime('%Y-%m-%d'), 'SORGENTE': 'fornitore',
+                'DESCRIZIONE': f"Fattura {i}", 'FORNITORE': rnd.choice(FORNITORI),
+                'NUMERO FORNITORE': str(rnd.randint(1, 9999)), 'NUMERO OPERAZIONE POS': None,
+                'IMPORTO LORDO POS': None, 'COMMISSIONE POS': None,
+                'IMPORTO NETTO': -round(rnd.uniform(10, 900), 2),
+            })
+    return transactions
+
+
+def create_history_db(db_path, count):
+    """Crea un database storico migrato con count transazioni sintetiche."""
+    db_manager = DatabaseManager(db_path)
+    PySQLiteMigrator(str(db_path), "barflow.migrations").apply_migrations()
+    db_manager.save_transactions(make_transactions(count), file_origin="benchmark")
+
+
+def run(db_path, output_dir, label, **filters):
+    print(f"\n{label}")
+    print(f"{'formato':<10}{'righe':>10}{'secondi':>10}{'righe/s':>12}{'MB':>9}")
+    exporters = [(extension, extension, export_function)
+                 for extension, (_, export_function) in available_export_formats().items()]
+    exporters.append(("report", "xlsx", export_history_report))
+    for name, extension, export_function in exporters:
+        file_path = output_dir / f"{name}_{label.split()[0].lower()}.{extension}"
+        start = time.perf_counter()
+        rows = export_function(db_path, file_path, **filters)
+        elapsed = time.perf_counter() - start
+        size_mb = file_path.stat().st_size / 1e6
+        print(f"{name:<10}{rows:>10}{elapsed:>10.2f}{rows / elapsed:>12.0f}{size_mb:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000, help="Transazioni sintetiche da esportare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        db_path = tmp / "barflow_history.db"
+        print(f"Creazione di {args.rows} transazioni sintetiche...")
+        create_history_db(db_path, args.rows)
+        run(db_path, tmp, "Completo")
+        run(db_path, tmp, "Filtrato (2023, solo POS)",
+            start_date="2023-01-01", end_date="2023-12-31", sources=["pos"])
+
+
+if __name__ == "__main__":
+    main()
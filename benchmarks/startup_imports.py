@@ -0,0 +1,131 @@
+"""
+Budget di avvio: import fino alla prima finestra misurati con -X importtime.
+
+Avvia in un processo separato la stessa sequenza di main.py (migrazione del
+database, QApplication, MainWindow mostrata) con i dati in una cartella
+temporanea, e controlla che:
+    - il tempo totale degli import resti entro il budget (--budget-ms);
+    - i moduli pesanti (pandas, numpy, matplotlib, ...) non vengano importati
+      prima della prima finestra: servono solo alle sezioni, create alla
+      prima apertura.
+Esce con codice 1 se uno dei controlli fallisce, così può essere usato come
+verifica automatica.
+
+Uso (dalla cartella del progetto):
+    python benchmarks/startup_imports.py [--budget-ms 600] [--top 15]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Moduli che non devono essere importati prima della prima finestra
+DEFERRED_MODULES = ("pandas", "numpy", "matplotlib", "xlsxwriter", "openpyxl", "pyarrow")
+
+# Budget predefinito per il tempo totale degli import (millisecondi)
+DEFAULT_BUDGET_MS = 600
+
+# Stessa sequenza di main.py, con le cartelle dei dati reindirizzate
+_STARTUP_SCRIPT = """
+import sys
+import time
+from pathlib import Path
+start = time.perf_counter()
+sys.path.insert(0, {project_dir!r})
+
+import barflow.utils
+import barflow.utils.app_paths
+data_dir = Path({data_dir!r})
+for module in (barflow.utils, barflow.utils.app_paths):
+    module.get_app_data_directory = lambda: data_dir
+    module.get_data_directory = lambda: data_dir
+
+from barflow.data.db_manager import initialize_and_migrate_db
+initialize_and_migrate_db()
+from PySide6.QtWidgets import QApplication
+from barflow.ui.main_window import MainWindow
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+elapsed = time.perf_counter() - start
+
+import json
+print("STARTUP_RESULT " + json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Legge l'output di -X importtime.
+
+    Returns:
+        Lista di (modulo, cumulativo_us) degli import di primo livello, cioè
+        quelli eseguiti direttamente dall'avvio (i loro tempi includono i sotto-import)
+    """
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # I sotto-import sono indentati di due spazi per livello
+        if name.startswith("  "):
+            continue
+        top_level.append((name.strip(), int(cumulative)))
+    return top_level
+
+
+def measure_startup():
+    """Esegue l'avvio in un processo separato e restituisce (import di primo livello, risultato)."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ)
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        script = _STARTUP_SCRIPT.format(project_dir=str(PROJECT_DIR), data_dir=data_dir)
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            capture_output=True, text=True, env=env, cwd=data_dir
+        )
+    result_lines = [line for line in completed.stdout.splitlines() if line.startswith("STARTUP_RESULT ")]
+    if completed.returncode != 0 or not result_lines:
+        raise RuntimeError(f"Avvio non riuscito:\n{completed.stdout}\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr), json.loads(result_lines[-1][len("STARTUP_RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Tempo massimo totale degli import fino alla prima finestra")
+    parser.add_argument("--top", type=int, default=15, help="Import più lenti da mostrare")
+    args = parser.parse_args()
+
+    imports, result = measure_startup()
+    total_ms = sum(cumulative for _, cumulative in imports) / 1000
+    loaded = set(result["modules"])
+    deferred_loaded = [name for name in DEFERRED_MODULES if name in loaded]
+
+    print(f"Prima finestra in {result['seconds'] * 1000:.0f} ms (con l'overhead di -X importtime)")
+    print(f"Import: {total_ms:.0f} ms in totale, budget {args.budget_ms:.0f} ms\n")
+    print(f"{'modulo':<45}{'ms':>10}")
+    for name, cumulative in sorted(imports, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<45}{cumulative / 1000:>10.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import oltre il budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+    if deferred_loaded:
+        failures.append(f"moduli da importare solo dopo l'avvio: {', '.join(deferred_loaded)}")
+    print()
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Avvio entro il budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark dell'avvio a freddo e a caldo, con il tracciamento di avvio di main.py.
+
+Avvia più volte main.py in processi separati con --startup-trace e
+--startup-trace-exit (l'applicazione si chiude appena mostrata la prima
+finestra) e riassume i report JSON:
+    - a freddo: ogni avvio ha una cartella dati nuova (database creato dal
+      template e migrato da zero) e una cache del bytecode vuota;
+    - a caldo: stessa cartella dati e stessa cache, dopo un avvio di prova.
+Per ogni fase vengono mostrati mediana, minimo e massimo. Con --output i
+risultati vengono salvati in JSON; con --baseline vengono confrontati con un
+salvataggio precedente, così le regressioni sono visibili.
+
+Le cartelle dei dati vengono reindirizzate a cartelle temporanee: il database
+reale non viene toccato (le funzioni dei percorsi dei dati sono sostituite,
+quindi nel report la loro ricerca costa quasi zero).
+
+Uso (dalla cartella del progetto):
+    python benchmarks/startup_time.py [--runs 5] [--output avvio.json] [--baseline avvio.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Avvia main.py con le cartelle dei dati reindirizzate
+_BOOTSTRAP_SCRIPT = """
+import runpy
+import sys
+from pathlib import Path
+sys.path.insert(0, {project_dir!r})
+
+import barflow.utils
+import barflow.utils.app_paths
+from barflow.utils.startup_trace import startup_trace
+data_dir = Path({data_dir!r})
+for name in ("get_app_data_directory", "get_data_directory"):
+    redirected = startup_trace.traced("app_paths." + name)(lambda: data_dir)
+    setattr(barflow.utils, name, redirected)
+    setattr(barflow.utils.app_paths, name, redirected)
+
+sys.argv = ["main.py", "--startup-trace=" + {report_path!r}, "--startup-trace-exit"]
+runpy.run_path({main_path!r})["main"]()
+"""
+
+
+def run_startup(data_dir, report_path, pycache_dir):
+    """
+    Esegue un avvio completo in un processo separato.
+
+    Returns:
+        Dizionario {misura: millisecondi} ricavato dal report di avvio
+    """
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # Cache del bytecode separata per modalità: a freddo viene ricompilato tutto
+    env["PYTHONPYCACHEPREFIX"] = str(pycache_dir)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.pop("BARFLOW_STARTUP_TRACE", None)
+    script = _BOOTSTRAP_SCRIPT.format(
+        project_dir=str(PROJECT_DIR), data_dir=str(data_dir),
+        report_path=str(report_path), main_path=str(PROJECT_DIR / "main.py")
+    )
+    spawned_at = time.time()
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                               text=True, env=env, cwd=data_dir)
+    process_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0 or not Path(report_path).exists():
+        raise RuntimeError(f"Avvio non riuscito:\n{completed.stdout}\n{completed.stderr[-2000:]}")
+
+    with open(report_path, encoding="utf-8") as report_file:
+        report = json.load(report_file)
+    marks = {mark["name"]: mark["at_ms"] for mark in report["marks"]}
+    # Interprete e import precedenti al tracciamento
+    before_trace_ms = (report["started_at_epoch"] - spawned_at) * 1000
+    measures = {
+        "processo (fino all'uscita)": process_ms,
+        "prima finestra dal lancio": before_trace_ms + marks.get("first_window", report["total_ms"]),
+        "prima del tracciamento": before_trace_ms,
+        "import tracciati": report["import_total_ms"],
+    }
+    for phase in report["phases"]:
+        if phase["depth"] <= 1 and not phase["name"].startswith("app_paths."):
+            label = phase["path"]
+            measures[label] = measures.get(label, 0) + phase["duration_ms"]
+    measures["app_paths (totale)"] = sum(
+        total["total_ms"] for name, total in report["phase_totals"].items() if name.startswith("app_paths.")
+    )
+    return measures
+
+
+def benchmark(mode, runs):
+    """Esegue runs avvii a freddo o a caldo e restituisce {misura: [millisecondi]}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        if mode == "caldo":
+            # Un avvio di prova crea il database e la cache del bytecode
+            run_startup(_new_dir(work_dir, "dati"), work_dir / "prova.json", _new_dir(work_dir, "pycache"))
+        for run in range(runs):
+            if mode == "freddo":
+                data_dir = _new_dir(work_dir, f"dati_{run}")
+                pycache_dir = _new_dir(work_dir, f"pycache_{run}")
+            else:
+                data_dir = work_dir / "dati"
+                pycache_dir = work_dir / "pycache"
+            measures = run_startup(data_dir, work_dir / f"avvio_{run}.json", pycache_dir)
+            for name, value in measures.items():
+                results.setdefault(name, []).append(value)
+    return results
+
+
+def _new_dir(parent, name):
+    path = parent / name
+    path.mkdir()
+    return path
+
+
+def summarize(results):
+    """Mediana, minimo e massimo di ogni misura."""
+    return {
+        name: {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        for name, values in results.items()
+    }
+
+
+def print_summary(mode, summary, baseline=None):
+    print(f"\nAvvio a {mode}")
+    header = f"{'misura':<55}{'mediana':>10}{'min':>10}{'max':>10}"
+    if baseline is not None:
+        header += f"{'Δ mediana':>12}"
+    print(header)
+    for name, values in summary.items():
+        line = f"{name:<55}{values['median']:>10.1f}{values['min']:>10.1f}{values['max']:>10.1f}"
+        if baseline is not None:
+            previous = baseline.get(name)
+            line += f"{values['median'] - previous['median']:>+12.1f}" if previous else f"{'-':>12}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Avvii misurati per ogni modalità")
+    parser.add_argument("--output", help="Salva i risultati in questo file JSON")
+    parser.add_argument("--baseline", help="Confronta con i risultati salvati in precedenza con --output")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print(f"Tempi in millisecondi, {args.runs} avvii per modalità")
+    summaries = {}
+    for mode in ("freddo", "caldo"):
+        summaries[mode] = summarize(benchmark(mode, args.runs))
+        print_summary(mode, summaries[mode], baseline.get(mode) if args.baseline else None)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(summaries, output_file, indent=2)
+        print(f"\nRisultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
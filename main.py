@@ -13,24 +13,33 @@ logging.basicConfig(
 
 def main():
     """Funzione principale dell'applicazione AccountFlow"""
+    # Tracciamento dei tempi di avvio (--startup-trace o BARFLOW_STARTUP_TRACE)
+    from barflow.utils.startup_trace import startup_trace
+    argv = startup_trace.configure(sys.argv)
+    
     try:
         # Inizializza il database prima di tutto
-        from barflow.data.db_manager import initialize_and_migrate_db
-        initialize_and_migrate_db()
+        with startup_trace.phase("initialize_and_migrate_db"):
+            from barflow.data.db_manager import initialize_and_migrate_db
+            initialize_and_migrate_db()
         
         # Importa e avvia l'interfaccia grafica
-        from PySide6.QtWidgets import QApplication
-        from barflow.ui.main_window import MainWindow
+        with startup_trace.phase("import_qt"):
+            from PySide6.QtWidgets import QApplication
+        with startup_trace.phase("import_main_window"):
+            from barflow.ui.main_window import MainWindow
         
         # Crea l'applicazione Qt
-        app = QApplication(sys.argv)
-        app.setApplicationName("AccountFlow")
-        app.setApplicationVersion("1.0.0")
-        app.setOrganizationName("AccountFlow Team")
-        app.setStyle("Fusion")
+        with startup_trace.phase("QApplication"):
+            app = QApplication(argv)
+            app.setApplicationName("AccountFlow")
+            app.setApplicationVersion("1.0.0")
+            app.setOrganizationName("AccountFlow Team")
+            app.setStyle("Fusion")
         
         # Crea e mostra la finestra principale
-        window = MainWindow()
+        with startup_trace.phase("MainWindow"):
+            window = MainWindow()
         
         # Centra la finestra
         screen = app.primaryScreen()
@@ -41,7 +50,21 @@ def main():
             window_geometry.moveCenter(center_point)
             window.move(window_geometry.topLeft())
         
-        window.show()
+        with startup_trace.phase("show"):
+            window.show()
+        
+        if startup_trace.enabled:
+            # Il report viene scritto al primo giro del ciclo degli eventi,
+            # quando la finestra è stata mostrata
+            from PySide6.QtCore import QTimer
+            
+            def first_window():
+                startup_trace.mark("first_window")
+                startup_trace.finish()
+                if startup_trace.exit_after_report:
+                    app.quit()
+            
+            QTimer.singleShot(0, first_window)
         
         print("🚀 BarFlow avviato con successo!")
         sys.exit(app.exec())
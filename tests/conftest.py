@@ -0,0 +1,35 @@
+"""
+Configurazione comune dei test.
+
+Le cartelle dei dati dell'applicazione vengono reindirizzate a una cartella
+temporanea per ogni test: il database reale non viene mai toccato.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Cartella dei dati temporanea al posto di quella dell'applicazione."""
+    import barflow.utils
+    import barflow.utils.app_paths
+    from barflow.data import db_manager
+    for module in (barflow.utils, barflow.utils.app_paths):
+        monkeypatch.setattr(module, "get_app_data_directory", lambda: tmp_path)
+        monkeypatch.setattr(module, "get_data_directory", lambda: tmp_path)
+    monkeypatch.setattr(db_manager, "get_app_data_directory", lambda: tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def history_db(data_dir):
+    """DatabaseManager su un database storico nuovo e migrato."""
+    from barflow.data.db_manager import DatabaseManager, initialize_and_migrate_db
+    initialize_and_migrate_db()
+    return DatabaseManager()
@@ -0,0 +1,100 @@
+"""Archivio a freddo degli anni chiusi (barflow.data.archive)."""
+import json
+
+import pytest
+
+from barflow.data import archive
+from barflow.data.partitions import ReadOnlyPartitionError, year_bounds
+from barflow.export.history_rows import iter_export_batches
+
+RECORDS = [
+    {'DATA': f'{year}-{month:02d}-{day:02d} 10:00:00', 'SORGENTE': source,
+     'FORNITORE': None if source == 'pos' else 'Fornitore A', 'IMPORTO NETTO': amount}
+    for year in (2022, 2023)
+    for month in range(1, 13)
+    for day, source, amount in ((3, 'pos', 12.5), (17, 'fornitore', -40.0))
+]
+
+
+def _sorted_df(db):
+    return db.load_all_transactions_df().sort_values(['DATA', 'SORGENTE']).reset_index(drop=True)
+
+
+@pytest.fixture
+def archived_db(history_db):
+    history_db.save_transactions(RECORDS)
+    history_db.before_archive = _sorted_df(history_db)
+    archive.archive_year(history_db.db_path, 2022)
+    return history_db
+
+
+@pytest.fixture
+def archive_reads(monkeypatch):
+    """Anni letti dai file dell'archivio durante il test."""
+    years = []
+    read_archived_columns = archive.read_archived_columns
+
+    def spy(db_path, entry, columns, period=None):
+        years.append(int(entry['path']))
+        return read_archived_columns(db_path, entry, columns, period)
+
+    monkeypatch.setattr(archive, "read_archived_columns", spy)
+    return years
+
+
+def _archive_file(db_path, year):
+    """Un file dell'anno archiviato necessario a ogni lettura (data_ts)."""
+    directory = archive.get_archive_directory(db_path) / str(year)
+    parquet = directory / archive.PARQUET_FILE
+    return parquet if parquet.exists() else directory / "data_ts.npz"
+
+
+def test_archived_year_reads_like_database(archived_db):
+    assert _sorted_df(archived_db).equals(archived_db.before_archive)
+    assert archived_db.count_transactions_where([], []) == len(RECORDS)
+    assert archived_db.check_stats() == []
+    assert archived_db.save_transactions(RECORDS) == (0, len(RECORDS))
+    with pytest.raises(ReadOnlyPartitionError):
+        archived_db.delete_transactions_where(["sorgente = ?"], ["pos"])
+
+
+def test_filtered_count_and_delete_skip_years_outside_period(archived_db, archive_reads):
+    start, end = year_bounds(2023)
+
+    assert archived_db.count_transactions_where(["data_ts >= ? AND data_ts < ?"], [start, end]) == 24
+    assert archived_db.delete_transactions_where(["data_ts >= ?", "sorgente = ?"], [start, "pos"]) == 12
+    assert archive_reads == []
+
+    start, end = year_bounds(2022)
+    assert archived_db.count_transactions_where(["data_ts >= ? AND data_ts < ?"], [start, end]) == 24
+    assert archive_reads == [2022]
+
+
+def test_export_loads_archive_once(archived_db, archive_reads):
+    progress = []
+    rows = sum(len(batch) for batch in iter_export_batches(
+        archived_db.db_path, progress=lambda written, total: progress.append((written, total))
+    ))
+
+    assert rows == len(RECORDS)
+    assert progress[-1] == (len(RECORDS), len(RECORDS))
+    assert archive_reads == [2022]
+
+
+def test_missing_archive_file_raises(archived_db):
+    _archive_file(archived_db.db_path, 2022).unlink()
+
+    with pytest.raises(archive.ArchiveError, match="2022"):
+        archived_db.load_all_transactions_df()
+    with pytest.raises(archive.ArchiveError):
+        sum(len(batch) for batch in iter_export_batches(archived_db.db_path))
+
+
+def test_archive_row_count_mismatch_raises(archived_db):
+    manifest_path = archive.get_archive_directory(archived_db.db_path) / archive.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["years"]["2022"]["rows"] += 1
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    with pytest.raises(archive.ArchiveError, match="righe"):
+        archived_db.load_transactions_by_period_df('2022-01-01', '2022-12-31')
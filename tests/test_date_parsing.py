@@ -0,0 +1,56 @@
+"""parse_dates_vectorized deve restituire le stesse date di parse_date_robust."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("PySide6")
+
+from barflow.ui.analysis_utils import parse_date_robust, parse_dates_vectorized
+
+MIXED_VALUES = [
+    '2024-01-05 10:20:30', '2024-01-05', ' 2024-01-05 ', '2024-01-05T10:20:30',
+    '2024-01-05 10:20', '2024/01/05', '05/01/2024', '20240105', 'Jan 5 2024',
+    '5 January 2024 08:00',
+    # Date inesistenti e testi non validi: NaT
+    '2024-02-30', '2024-13-45', 'not a date', '',
+    None, np.nan,
+    pd.Timestamp('2023-07-01 12:00'), datetime.date(2023, 7, 2), datetime.datetime(2023, 7, 3, 9),
+]
+
+
+def _expected(values):
+    return [parse_date_robust(value) for value in values]
+
+
+def _assert_same_dates(parsed, expected):
+    assert len(parsed) == len(expected)
+    for value, got, want in zip(MIXED_VALUES * (len(parsed) // len(MIXED_VALUES)), parsed, expected):
+        if pd.isna(want):
+            assert pd.isna(got), value
+        else:
+            assert got == want, value
+
+
+def test_vectorized_matches_robust_parser():
+    values = pd.Series(MIXED_VALUES, dtype=object)
+    parsed = parse_dates_vectorized(values)
+
+    assert pd.api.types.is_datetime64_any_dtype(parsed)
+    assert parsed.index.equals(values.index)
+    _assert_same_dates(list(parsed), _expected(MIXED_VALUES))
+
+
+def test_invalid_strings_are_nat():
+    parsed = parse_dates_vectorized(['not a date', '', '2024-13-45', None])
+    assert parsed.isna().all()
+
+
+def test_repeated_values_keep_positions():
+    # Valori ripetuti: il parsing avviene una volta per valore distinto
+    values = pd.Series(MIXED_VALUES * 3, dtype=object, index=range(10, 10 + 3 * len(MIXED_VALUES)))
+    parsed = parse_dates_vectorized(values)
+
+    assert parsed.index.equals(values.index)
+    _assert_same_dates(list(parsed), _expected(MIXED_VALUES * 3))
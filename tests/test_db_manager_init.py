@@ -0,0 +1,18 @@
+"""Creazione del database storico da DatabaseManager."""
+import sqlite3
+
+from barflow.data.db_manager import DatabaseManager, SCHEMA_VERSION, is_schema_current
+
+
+def test_new_db_path_is_migrated_to_current_schema(data_dir):
+    db_path = data_dir / "altro" / "storico.db"
+    db = DatabaseManager(db_path=db_path)
+
+    assert is_schema_current(db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    saved, duplicates = db.save_transactions(
+        [{'DATA': '2024-01-02 10:00:00', 'SORGENTE': 'pos', 'IMPORTO NETTO': 3.5}]
+    )
+    assert (saved, duplicates) == (1, 0)
+    assert len(db.load_all_transactions_df()) == 1
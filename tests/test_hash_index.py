@@ -0,0 +1,125 @@
+"""HashIndex: ricerca esatta dei duplicati e ricostruzione quando la tabella cambia."""
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from barflow.data.hash_index import HashIndex, get_hash_index_path
+
+
+@pytest.fixture
+def table(tmp_path):
+    db_path = tmp_path / "hashes.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, hash_record INTEGER)")
+    conn.executemany("INSERT INTO records (hash_record) VALUES (?)",
+                     [(value,) for value in (-2 ** 63, -5, 0, 7, 2 ** 63 - 1)])
+    conn.commit()
+    yield db_path, conn
+    conn.close()
+
+
+def _external_insert(db_path, value):
+    with sqlite3.connect(db_path) as other:
+        other.execute("INSERT INTO records (hash_record) VALUES (?)", (value,))
+    other.close()
+
+
+def test_contains_hits_and_misses(table):
+    db_path, conn = table
+    index = HashIndex(db_path, "records")
+    index.ensure_current(conn)
+
+    found = index.contains([7, 8, -2 ** 63, 2 ** 63 - 1, -6, 2 ** 62])
+    assert found.tolist() == [True, False, True, True, False, False]
+    assert index.contains([]).tolist() == []
+    assert get_hash_index_path(db_path).exists()
+
+
+def test_saved_index_reused_when_signature_matches(table, monkeypatch):
+    db_path, conn = table
+    HashIndex(db_path, "records").ensure_current(conn)
+
+    index = HashIndex(db_path, "records")
+    monkeypatch.setattr(index, "_rebuild", lambda *args: pytest.fail("indice ricostruito inutilmente"))
+    index.ensure_current(conn)
+    assert index.contains([0]).tolist() == [True]
+
+
+def test_external_insert_triggers_rebuild(table):
+    db_path, conn = table
+    index = HashIndex(db_path, "records")
+    index.ensure_current(conn)
+
+    _external_insert(db_path, 123)
+
+    # Sia l'istanza già caricata sia una nuova (che trova il file salvato) vedono il nuovo hash
+    index.ensure_current(conn)
+    assert index.contains([123]).tolist() == [True]
+    fresh = HashIndex(db_path, "records")
+    fresh.ensure_current(conn)
+    assert fresh.contains([123]).tolist() == [True]
+
+
+def test_external_delete_triggers_rebuild(table):
+    db_path, conn = table
+    index = HashIndex(db_path, "records")
+    index.ensure_current(conn)
+
+    with sqlite3.connect(db_path) as other:
+        other.execute("DELETE FROM records WHERE hash_record = 7")
+    other.close()
+
+    index.ensure_current(conn)
+    assert index.contains([7, 0]).tolist() == [False, True]
+
+
+@pytest.mark.parametrize("content", [b"", b"not a zip file", None])
+def test_corrupt_or_missing_file_rebuilds(table, content):
+    db_path, conn = table
+    HashIndex(db_path, "records").ensure_current(conn)
+    index_path = get_hash_index_path(db_path)
+    if content is None:
+        index_path.unlink()
+    else:
+        index_path.write_bytes(content)
+
+    index = HashIndex(db_path, "records")
+    index.ensure_current(conn)
+
+    assert index.contains([7, 8]).tolist() == [True, False]
+    # Il file è stato riscritto valido
+    with np.load(index_path) as saved:
+        assert len(saved["hashes"]) == 5
+
+
+def test_file_without_signature_rebuilds(table):
+    db_path, conn = table
+    np.savez(get_hash_index_path(db_path), hashes=np.array([1, 2, 3], dtype=np.int64))
+
+    index = HashIndex(db_path, "records")
+    index.ensure_current(conn)
+    assert index.contains([1, 7]).tolist() == [False, True]
+
+
+def test_add_remove_and_clear(table):
+    db_path, conn = table
+    index = HashIndex(db_path, "records")
+    index.ensure_current(conn)
+
+    conn.execute("INSERT INTO records (hash_record) VALUES (42)")
+    index.add(conn, [42])
+    conn.execute("DELETE FROM records WHERE hash_record = 0")
+    index.remove(conn, [0])
+    conn.commit()
+    assert index.contains([42, 0]).tolist() == [True, False]
+
+    # Le modifiche sono già nel file: una nuova istanza lo riusa senza ricostruire
+    fresh = HashIndex(db_path, "records")
+    fresh.ensure_current(conn)
+    assert fresh.contains([42, 0]).tolist() == [True, False]
+
+    index.clear()
+    assert not get_hash_index_path(db_path).exists()
+    assert index.contains([42]).tolist() == [False]
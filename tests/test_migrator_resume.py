@@ -0,0 +1,157 @@
+"""Le migrazioni a blocchi interrotte riprendono dal punto salvato in _migration_log."""
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from barflow.data.py_sqlite_migrator import (MigrationInterrupted, MigrationRun, PySQLiteMigrator,
+                                             get_user_version)
+from barflow.migrations import SCHEMA_VERSION
+
+ROW_COUNT = 230
+BATCH_SIZE = 40
+
+# Struttura di base creata da initialize_and_migrate_db prima delle migrazioni
+_BASE_TABLE = """
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data TEXT NOT NULL,
+        sorgente TEXT NOT NULL,
+        descrizione TEXT,
+        fornitore TEXT,
+        numero_fornitore TEXT,
+        numero_operazione_pos TEXT,
+        importo_lordo_pos REAL,
+        commissione_pos REAL,
+        importo_netto REAL NOT NULL,
+        hash_record TEXT UNIQUE,
+        data_inserimento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        file_origine TEXT
+    )
+"""
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    """Database alla versione iniziale con ROW_COUNT righe e id non consecutivi."""
+    db_path = tmp_path / "storico.db"
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute(_BASE_TABLE)
+        conn.executemany(
+            "INSERT INTO transactions (id, data, sorgente, numero_operazione_pos, importo_netto, hash_record) "
+            "VALUES (?, ?, 'pos', ?, ?, ?)",
+            [(number * 3 + 1, f"2024-01-{number % 28 + 1:02d} 10:{number % 60:02d}:00", str(number),
+              number + 0.25, f"hash-{number}") for number in range(ROW_COUNT)]
+        )
+    return db_path
+
+
+def _migrator(db_path):
+    return PySQLiteMigrator(str(db_path), "barflow.migrations")
+
+
+def _interrupted_log(db_path):
+    with closing(sqlite3.connect(db_path)) as conn:
+        return conn.execute(
+            "SELECT version, status, checkpoint, rows_copied FROM _migration_log WHERE status != 'done'"
+        ).fetchall()
+
+
+def _copied_ids(db_path):
+    """Id già presenti nella tabella di destinazione della copia interrotta."""
+    with closing(sqlite3.connect(db_path)) as conn:
+        target = next(name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('transactions_new', 'transactions_temp')"
+        ))
+        return [row_id for (row_id,) in conn.execute(f"SELECT id FROM {target} ORDER BY id")]
+
+
+def _resume(db_path):
+    """Riesegue il migratore registrando le righe già copiate all'inizio di ogni copia."""
+    starts = []
+
+    def progress(name, copied, total):
+        if not starts or starts[-1][0] != name:
+            starts.append((name, copied, total))
+
+    version = _migrator(db_path).apply_migrations(progress=progress, batch_size=BATCH_SIZE)
+    return version, starts
+
+
+def _assert_fully_migrated(db_path):
+    with closing(sqlite3.connect(db_path)) as conn:
+        assert get_user_version(conn) == SCHEMA_VERSION
+        ids = [row_id for (row_id,) in conn.execute("SELECT id FROM transactions ORDER BY id")]
+        assert ids == [number * 3 + 1 for number in range(ROW_COUNT)]
+        cents = [value for (value,) in conn.execute("SELECT importo_netto_cents FROM transactions ORDER BY id")]
+        assert cents == [number * 100 + 25 for number in range(ROW_COUNT)]
+        statuses = {status for (status,) in conn.execute("SELECT status FROM _migration_log")}
+        assert statuses == {"done"}
+
+
+# Controlli di is_cancelled per ogni copia: un blocco ogni BATCH_SIZE righe più il controllo finale
+_CHECKS_PER_COPY = -(-ROW_COUNT // BATCH_SIZE) + 1
+
+
+@pytest.mark.parametrize("copy_number, expected_version", [(0, 6), (1, 9), (2, 10)])
+def test_cancelled_copy_resumes_from_checkpoint(old_db, copy_number, expected_version):
+    checks = []
+
+    def is_cancelled():
+        # Interruzione prima del quarto blocco della copia: tre blocchi già confermati
+        checks.append(None)
+        return len(checks) == copy_number * _CHECKS_PER_COPY + 4
+
+    with pytest.raises(MigrationInterrupted):
+        _migrator(old_db).apply_migrations(is_cancelled=is_cancelled, batch_size=BATCH_SIZE)
+
+    [(version, status, checkpoint, rows_copied)] = _interrupted_log(old_db)
+    assert (version, status) == (expected_version, "interrupted")
+    assert rows_copied == 3 * BATCH_SIZE
+    copied_ids = _copied_ids(old_db)
+    assert len(copied_ids) == rows_copied and copied_ids[-1] == checkpoint
+    with closing(sqlite3.connect(old_db)) as conn:
+        assert get_user_version(conn) < version
+
+    final_version, starts = _resume(old_db)
+
+    assert final_version == SCHEMA_VERSION
+    # La copia interrotta riparte dalle righe già copiate, non da zero
+    assert starts[0][1:] == (rows_copied, ROW_COUNT)
+    _assert_fully_migrated(old_db)
+
+
+def test_failure_inside_batch_rolls_back_only_that_batch(old_db, monkeypatch):
+    save_checkpoint = MigrationRun._save_checkpoint
+    calls = []
+
+    def failing_save_checkpoint(self, checkpoint, copied):
+        # Chiamata 1: inizio della copia; 2-3: primi due blocchi; 4: errore a metà del terzo
+        calls.append(checkpoint)
+        if len(calls) == 4:
+            raise RuntimeError("interruzione simulata a metà blocco")
+        save_checkpoint(self, checkpoint, copied)
+
+    monkeypatch.setattr(MigrationRun, "_save_checkpoint", failing_save_checkpoint)
+    with pytest.raises(RuntimeError):
+        _migrator(old_db).apply_migrations(batch_size=BATCH_SIZE)
+    monkeypatch.setattr(MigrationRun, "_save_checkpoint", save_checkpoint)
+
+    [(_, status, checkpoint, rows_copied)] = _interrupted_log(old_db)
+    assert status == "failed"
+    # Le righe del blocco interrotto sono state annullate insieme al punto raggiunto
+    assert rows_copied == 2 * BATCH_SIZE
+    copied_ids = _copied_ids(old_db)
+    assert len(copied_ids) == rows_copied and copied_ids[-1] == checkpoint
+
+    final_version, starts = _resume(old_db)
+
+    assert final_version == SCHEMA_VERSION
+    assert starts[0][1:] == (rows_copied, ROW_COUNT)
+    _assert_fully_migrated(old_db)
+
+
+def test_rerun_after_completion_is_noop(old_db):
+    assert _migrator(old_db).apply_migrations(batch_size=BATCH_SIZE) == SCHEMA_VERSION
+    assert _resume(old_db) == (SCHEMA_VERSION, [])
+    _assert_fully_migrated(old_db)
@@ -0,0 +1,93 @@
+"""Partizioni per anno dello storico (barflow.data.partitions)."""
+import gc
+import os
+from pathlib import Path
+
+import pytest
+
+from barflow.data import partitions
+
+RECORDS = [
+    {'DATA': f'{year}-{month:02d}-05 10:00:00', 'SORGENTE': 'pos', 'IMPORTO NETTO': float(month)}
+    for year in (2022, 2023) for month in range(1, 13)
+]
+
+
+def _open_database_files(directory):
+    """File .db della cartella aperti dal processo (descrittori in /proc/self/fd)."""
+    opened = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+        if target.startswith(str(directory)) and target.endswith(".db"):
+            opened.append(Path(target).name)
+    return sorted(opened)
+
+
+@pytest.fixture
+def partitioned_db(history_db):
+    history_db.save_transactions(RECORDS)
+    partitions.split_year(history_db.db_path, 2022)
+    partitions.split_year(history_db.db_path, 2023)
+    return history_db
+
+
+def test_split_keeps_history(partitioned_db):
+    df = partitioned_db.load_all_transactions_df()
+
+    assert len(df) == len(RECORDS)
+    assert partitioned_db.check_stats() == []
+    assert partitioned_db.save_transactions(RECORDS) == (0, len(RECORDS))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="serve /proc/self/fd")
+def test_operations_close_partition_connections(partitioned_db, data_dir):
+    db = partitioned_db
+    # Le connessioni non chiuse restano in cicli di riferimenti: senza gc restano aperte
+    gc.collect()
+    gc.disable()
+    try:
+        db.result_cache.reset()
+        db.save_transactions(RECORDS + [{'DATA': '2023-12-20 10:00:00', 'SORGENTE': 'pos', 'IMPORTO NETTO': 2.0}])
+        db.load_all_transactions_df()
+        db.count_transactions_where(["sorgente = ?"], ["pos"])
+        db.get_database_stats()
+        db.check_stats()
+        db.rebuild_stats()
+        db.delete_transactions_where(["data_ts < ?"], [0])
+        partitions.set_read_only(db.db_path, 2022, True)
+        db.result_cache.reset()
+
+        assert _open_database_files(data_dir) == []
+    finally:
+        gc.enable()
+
+
+def test_split_refused_beyond_attach_limit(history_db):
+    from barflow.data import archive
+    db = history_db
+    first_year = 2010
+    years = range(first_year, first_year + partitions.SQLITE_MAX_ATTACHED + 1)
+    db.save_transactions([
+        {'DATA': f'{year}-06-15 10:00:00', 'SORGENTE': 'pos', 'IMPORTO NETTO': 1.0} for year in years
+    ])
+    for year in years[:-1]:
+        partitions.split_year(db.db_path, year)
+    extra_year = years[-1]
+    extra_path = partitions.get_partitions_directory(db.db_path) / f"{partitions.PARTITION_TABLE}_{extra_year}.db"
+
+    with pytest.raises(ValueError, match="barflow.data.archive archive"):
+        partitions.split_year(db.db_path, extra_year)
+
+    # Nulla è stato spostato e lo storico si legge ancora con tutte le partizioni collegate
+    assert not extra_path.exists()
+    assert len(db.load_all_transactions_df()) == len(years)
+    assert db.check_stats() == []
+
+    # Archiviato l'anno più vecchio, la partizione torna disponibile
+    archive.archive_year(db.db_path, first_year)
+    assert partitions.split_year(db.db_path, extra_year) == 1
+    db.result_cache.reset()
+    assert len(db.load_all_transactions_df()) == len(years)
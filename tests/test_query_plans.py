@@ -0,0 +1,56 @@
+"""
+Le query più frequenti sullo storico devono usare gli indici (migrazioni 007-010)
+e non leggere tutta la tabella.
+"""
+import sqlite3
+
+import pytest
+
+from barflow.data.db_manager import get_db_path
+
+HOT_QUERIES = {
+    "totali per periodo": (
+        "SELECT COALESCE(SUM(importo_netto_cents), 0) FROM transactions WHERE data_ts >= ? AND data_ts < ?",
+        (0, 1),
+    ),
+    "righe per periodo": (
+        "SELECT * FROM transactions WHERE data_ts >= ? AND data_ts < ? ORDER BY data_ts DESC",
+        (0, 1),
+    ),
+    "ricerca per hash": (
+        "SELECT hash_record FROM transactions WHERE hash_record IN (?, ?)",
+        (1, 2),
+    ),
+    "filtro per sorgente": (
+        "SELECT * FROM transactions WHERE sorgente = ? AND data_ts >= ? AND data_ts < ?",
+        ("pos", 0, 1),
+    ),
+    "periodo per sorgente": (
+        "SELECT MIN(data_ts), MAX(data_ts) FROM transactions WHERE sorgente = ?",
+        ("pos",),
+    ),
+    "totali per fornitore": (
+        "SELECT fornitore, -SUM(importo_netto_cents), COUNT(*) FROM transactions GROUP BY fornitore",
+        (),
+    ),
+}
+
+
+@pytest.fixture
+def migrated_conn(history_db):
+    conn = sqlite3.connect(get_db_path())
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(migrated_conn, name):
+    query, params = HOT_QUERIES[name]
+    details = [row[3] for row in migrated_conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    table_steps = [detail for detail in details if detail.split(" ")[1:2] == ["transactions"]]
+
+    assert table_steps, details
+    # Nessuna lettura completa della tabella: ogni accesso passa da un indice
+    assert "SCAN transactions" not in details, details
+    for detail in table_steps:
+        assert "USING INDEX" in detail or "USING COVERING INDEX" in detail, details
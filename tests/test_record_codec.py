@@ -0,0 +1,54 @@
+"""to_cents deve dare gli stessi centesimi per tutte le forme di un importo."""
+import math
+
+import pytest
+
+from barflow.data.record_codec import NET_CENTS_COLUMN, record_net_cents, to_cents
+
+
+@pytest.mark.parametrize("value", [10, 10.0, "10", "10.00", "10,00", " 10,0 "])
+def test_equivalent_amounts_same_cents(value):
+    assert to_cents(value) == 1000
+
+
+@pytest.mark.parametrize("value, cents", [
+    ("1.234,56", 123456),
+    ("1,234.56", 123456),
+    ("0,5", 50),
+])
+def test_thousands_separators(value, cents):
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize("value, cents", [
+    (1.005, 101),
+    (0.125, 13),
+    (2.675, 268),
+    ("2,345", 235),
+    (0.004, 0),
+])
+def test_half_cent_rounding(value, cents):
+    # ROUND_HALF_UP sulla rappresentazione decimale più breve del float
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize("value, cents", [
+    (-10, -1000),
+    (-1.005, -101),
+    ("-10,50", -1050),
+    (-0.125, -13),
+])
+def test_negative_amounts(value, cents):
+    # Il mezzo centesimo si arrotonda lontano da zero anche per le uscite
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize("value", [None, math.nan, float("inf"), "", "  ", "abc", "nan"])
+def test_missing_or_invalid_amounts(value):
+    assert to_cents(value) is None
+
+
+def test_record_net_cents_prefers_internal_column():
+    assert record_net_cents({'IMPORTO NETTO': 99.99, NET_CENTS_COLUMN: 1234}) == 1234
+    assert record_net_cents({'IMPORTO NETTO': "12,34", NET_CENTS_COLUMN: math.nan}) == 1234
+    assert record_net_cents({'IMPORTO NETTO': None}) is None
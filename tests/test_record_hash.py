@@ -0,0 +1,79 @@
+"""L'hash dei record deve dipendere solo dalla codifica canonica dei campi."""
+import datetime
+import math
+import random
+
+import pytest
+
+from barflow.data.record_codec import NET_CENTS_COLUMN
+from barflow.data.record_hash import hash_columns, record_hash, record_hashes
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _record(**fields):
+    record = {
+        'DATA': '2024-03-01 12:30:00',
+        'SORGENTE': 'POS',
+        'DESCRIZIONE': 'Caffè',
+        'FORNITORE': None,
+        'NUMERO FORNITORE': None,
+        'NUMERO OPERAZIONE POS': '0042',
+        'IMPORTO NETTO': 10.0,
+    }
+    record.update(fields)
+    return record
+
+
+@pytest.mark.parametrize("amount", [10, 10.0, "10,00", "10.00"])
+def test_equivalent_amounts_same_hash(amount):
+    assert record_hash(_record(**{'IMPORTO NETTO': amount})) == record_hash(_record())
+
+
+def test_internal_cents_column_same_hash():
+    assert record_hash(_record(**{NET_CENTS_COLUMN: 1000})) == record_hash(_record())
+
+
+def test_half_cent_and_negative_amounts():
+    assert record_hash(_record(**{'IMPORTO NETTO': 1.005})) == record_hash(_record(**{'IMPORTO NETTO': "1,01"}))
+    assert record_hash(_record(**{'IMPORTO NETTO': -10.5})) == record_hash(_record(**{'IMPORTO NETTO': "-10,50"}))
+    assert record_hash(_record(**{'IMPORTO NETTO': -10})) != record_hash(_record(**{'IMPORTO NETTO': 10}))
+
+
+@pytest.mark.parametrize("missing", [None, math.nan, "", "  "])
+def test_missing_fields_hash_alike(missing):
+    assert record_hash(_record(FORNITORE=missing)) == record_hash(_record())
+    assert record_hash(_record(**{'IMPORTO NETTO': missing})) == record_hash(_record(**{'IMPORTO NETTO': None}))
+
+
+def test_missing_amount_differs_from_zero():
+    assert record_hash(_record(**{'IMPORTO NETTO': None})) != record_hash(_record(**{'IMPORTO NETTO': 0}))
+
+
+def test_date_forms_hash_alike():
+    expected = record_hash(_record())
+    moment = datetime.datetime(2024, 3, 1, 12, 30)
+    seconds = int((moment - datetime.datetime(1970, 1, 1)).total_seconds())
+    for data in (moment, ' 2024-03-01 12:30:00 ', '2024-03-01T12:30:00', seconds):
+        assert record_hash(_record(DATA=data)) == expected, data
+
+
+def test_hash_columns_matches_records():
+    records = [_record(DESCRIZIONE=f'Articolo {i}', **{'IMPORTO NETTO': i / 7}) for i in range(50)]
+    columns = [[record[field] for record in records] for field in (
+        'DATA', 'SORGENTE', 'DESCRIZIONE', 'FORNITORE', 'NUMERO FORNITORE', 'NUMERO OPERAZIONE POS')]
+    cents = [round(record['IMPORTO NETTO'] * 100) for record in records]
+    assert hash_columns(*columns, cents) == record_hashes(records)
+
+
+def test_hash_is_signed_64_bit():
+    rng = random.Random(1234)
+    records = [
+        _record(DESCRIZIONE=f'Articolo {rng.random()}', **{'IMPORTO NETTO': rng.uniform(-1e6, 1e6)})
+        for _ in range(5000)
+    ]
+    hashes = record_hashes(records)
+    assert all(type(value) is int and INT64_MIN <= value <= INT64_MAX for value in hashes)
+    # Con 64 bit 5000 record distinti non devono collidere
+    assert len(set(hashes)) == len(hashes)
+    assert any(value < 0 for value in hashes) and any(value > 0 for value in hashes)
@@ -0,0 +1,79 @@
+"""ResultCache: i risultati in cache vengono invalidati da qualsiasi scrittura."""
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from barflow.data import db_manager
+from barflow.data.result_cache import ResultCache
+
+RECORDS = [
+    {'DATA': f'2024-01-{day:02d} 10:00:00', 'SORGENTE': 'pos', 'IMPORTO NETTO': float(day)}
+    for day in range(1, 11)
+]
+
+
+@pytest.fixture
+def counted_db(history_db, monkeypatch):
+    """Database con RECORDS e conteggio delle letture effettive (cache mancata)."""
+    history_db.save_transactions(RECORDS)
+    reads = []
+    open_history = db_manager.open_history
+
+    def counting_open_history(*args, **kwargs):
+        reads.append(args)
+        return open_history(*args, **kwargs)
+
+    monkeypatch.setattr(db_manager, "open_history", counting_open_history)
+    return history_db, reads
+
+
+def _count_pos(db):
+    return db.count_transactions_where(["sorgente = ?"], ["pos"])
+
+
+def test_repeated_count_served_from_cache(counted_db):
+    db, reads = counted_db
+
+    assert _count_pos(db) == 10
+    assert _count_pos(db) == 10
+    assert len(reads) == 1
+
+
+def test_write_from_other_connection_invalidates(counted_db):
+    db, reads = counted_db
+    assert _count_pos(db) == 10
+
+    with closing(sqlite3.connect(db.db_path)) as other, other:
+        other.execute("UPDATE transactions SET sorgente = 'bar' WHERE id = (SELECT MIN(id) FROM transactions)")
+
+    assert _count_pos(db) == 9
+    assert len(reads) == 2
+
+
+def test_writes_through_manager_invalidate(counted_db):
+    db, reads = counted_db
+    assert _count_pos(db) == 10
+
+    assert db.save_transactions([{'DATA': '2024-02-01 10:00:00', 'SORGENTE': 'pos', 'IMPORTO NETTO': 5.0}]) == (1, 0)
+    assert _count_pos(db) == 11
+
+    assert db.delete_transactions_where(["importo_netto_cents < ?"], [300]) == 2
+    assert _count_pos(db) == 9
+    assert len(reads) == 3
+
+
+def test_compute_not_cached_when_invalidated_meanwhile(tmp_path):
+    db_path = tmp_path / "cache.db"
+    sqlite3.connect(db_path).close()
+    cache = ResultCache(db_path)
+
+    def compute():
+        # Scrittura concorrente durante il calcolo: il risultato è già vecchio
+        cache.invalidate("t")
+        return "vecchio"
+
+    assert cache.get_or_compute("t", "k", compute) == "vecchio"
+    assert cache.get_or_compute("t", "k", lambda: "nuovo") == "nuovo"
+    assert cache.get_or_compute("t", "k", lambda: "non richiesto") == "nuovo"
+    cache.reset()
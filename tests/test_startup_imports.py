@@ -0,0 +1,78 @@
+"""
+All'avvio (fino alla prima finestra) i moduli pesanti non vengono importati:
+servono solo alle sezioni, create alla prima apertura (vedi lazy_exports).
+Il tempo degli import, misurato con -X importtime come in
+benchmarks/startup_imports.py, resta entro un budget.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from benchmarks.startup_imports import DEFAULT_BUDGET_MS, measure_startup
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Moduli che non devono essere importati prima della prima finestra
+DEFERRED_MODULES = ("pandas", "numpy", "matplotlib", "xlsxwriter", "openpyxl", "pyarrow")
+
+# Stessa sequenza di main.py, in un processo nuovo e con i dati in una cartella temporanea
+_STARTUP_SCRIPT = """
+import json
+import sys
+from pathlib import Path
+sys.path.insert(0, {project_dir!r})
+
+import barflow.utils
+import barflow.utils.app_paths
+data_dir = Path({data_dir!r})
+for module in (barflow.utils, barflow.utils.app_paths):
+    module.get_app_data_directory = lambda: data_dir
+    module.get_data_directory = lambda: data_dir
+
+from barflow.data.db_manager import initialize_and_migrate_db
+initialize_and_migrate_db()
+from PySide6.QtWidgets import QApplication
+from barflow.ui.main_window import MainWindow
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+print("STARTUP_MODULES " + json.dumps(sorted(sys.modules)))
+"""
+
+
+def test_startup_does_not_import_heavy_modules(tmp_path):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    script = _STARTUP_SCRIPT.format(project_dir=str(PROJECT_DIR), data_dir=str(tmp_path))
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                               text=True, env=env, cwd=tmp_path, timeout=120)
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    line = next(line for line in completed.stdout.splitlines() if line.startswith("STARTUP_MODULES "))
+    modules = json.loads(line.split(" ", 1)[1])
+    loaded = sorted({name.split(".")[0] for name in modules} & set(DEFERRED_MODULES))
+    assert loaded == []
+
+
+# Margini larghi rispetto al budget del benchmark: la macchina dei test può essere più lenta
+IMPORT_BUDGET_MS = 2 * DEFAULT_BUDGET_MS
+BARFLOW_IMPORT_BUDGET_MS = DEFAULT_BUDGET_MS / 2
+
+
+def test_startup_imports_within_budget():
+    # Prima esecuzione per compilare i .pyc: si misura la più veloce delle due
+    runs = [measure_startup()[0] for _ in range(2)]
+    imports = min(runs, key=lambda run: sum(cumulative for _, cumulative in run))
+    total_ms = sum(cumulative for _, cumulative in imports) / 1000
+    barflow_ms = sum(cumulative for name, cumulative in imports if name.split(".")[0] == "barflow") / 1000
+    slowest = sorted(imports, key=lambda item: item[1], reverse=True)[:10]
+
+    assert total_ms <= IMPORT_BUDGET_MS, slowest
+    assert barflow_ms <= BARFLOW_IMPORT_BUDGET_MS, slowest
@@ -0,0 +1,100 @@
+"""Statistiche delle transazioni mantenute dai trigger (barflow.data.table_stats)."""
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from barflow.data import table_stats, temporary_db_manager
+from barflow.data.db_manager import HISTORY_STATS_TABLE, HISTORY_TABLE
+
+RECORDS = [
+    {'DATA': f'2024-{month:02d}-{day:02d} 09:00:00', 'SORGENTE': sorgente,
+     'IMPORTO NETTO': (day + month / 10) * (-1 if sorgente == 'fornitore' else 1)}
+    for sorgente in ('pos', 'bar', 'fornitore') for month in (1, 2, 3) for day in (1, 10, 20)
+]
+
+
+def _stored_stats(db):
+    with closing(sqlite3.connect(db.db_path)) as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            f"SELECT sorgente, row_count, net_cents, min_ts, max_ts FROM {HISTORY_STATS_TABLE}"
+        )}
+
+
+def _computed_stats(db):
+    with closing(sqlite3.connect(db.db_path)) as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            f"SELECT sorgente, COUNT(*), SUM(importo_netto_cents), MIN(data_ts), MAX(data_ts) "
+            f"FROM {HISTORY_TABLE} GROUP BY sorgente"
+        )}
+
+
+def _assert_stats_match(db):
+    computed = _computed_stats(db)
+    assert _stored_stats(db) == computed
+    assert db.check_stats() == []
+    assert db.get_database_stats()['total_records'] == sum(values[0] for values in computed.values())
+
+
+def test_triggers_follow_inserts_updates_and_deletes(history_db):
+    db = history_db
+    assert db.save_transactions(RECORDS) == (len(RECORDS), 0)
+    _assert_stats_match(db)
+
+    # Eliminazione degli estremi del periodo: min e max vengono ricalcolati
+    assert db.delete_transactions_where(["sorgente = ?", "data LIKE ?"], ['pos', '2024-01-01%']) == 1
+    assert db.delete_transactions_where(["sorgente = ?", "data LIKE ?"], ['bar', '2024-03-20%']) == 1
+    _assert_stats_match(db)
+
+    with closing(sqlite3.connect(db.db_path)) as conn, conn:
+        conn.execute(f"UPDATE {HISTORY_TABLE} SET sorgente = 'bar' WHERE sorgente = 'pos' AND data LIKE '2024-02%'")
+        conn.execute(f"UPDATE {HISTORY_TABLE} SET importo_netto_cents = importo_netto_cents * 2 "
+                     f"WHERE sorgente = 'fornitore'")
+    db.result_cache.invalidate(HISTORY_TABLE)
+    _assert_stats_match(db)
+
+    # Una sorgente eliminata del tutto sparisce dalle statistiche
+    assert db.delete_transactions_where(["sorgente = ?"], ['fornitore']) == 9
+    _assert_stats_match(db)
+    assert 'fornitore' not in _stored_stats(db)
+
+    db.delete_all_transactions()
+    assert _stored_stats(db) == {}
+    _assert_stats_match(db)
+
+
+def test_check_reports_drift_and_rebuild_repairs(history_db):
+    db = history_db
+    db.save_transactions(RECORDS)
+    with closing(sqlite3.connect(db.db_path)) as conn, conn:
+        # Modifiche fuori banda: statistiche alterate e una riga inserita senza trigger
+        conn.execute(f"UPDATE {HISTORY_STATS_TABLE} SET row_count = row_count + 5 WHERE sorgente = 'pos'")
+        table_stats.drop_stats_triggers(conn, HISTORY_TABLE)
+        conn.execute(f"INSERT INTO {HISTORY_TABLE} (data, data_ts, sorgente, importo_netto_cents) "
+                     f"VALUES ('2024-05-01 09:00:00', 1714554000, 'cassa', 100)")
+        table_stats.create_stats_triggers(conn, HISTORY_TABLE, HISTORY_STATS_TABLE)
+
+    differences = {sorgente: (stored, computed) for sorgente, stored, computed in db.check_stats()}
+    assert set(differences) == {'pos', 'cassa'}
+    assert differences['pos'][0][0] == differences['pos'][1][0] + 5
+    assert differences['cassa'] == (None, (1, 100, 1714554000, 1714554000))
+
+    db.rebuild_stats()
+    _assert_stats_match(db)
+
+
+def test_cli_exit_codes(history_db, data_dir, monkeypatch, capsys):
+    monkeypatch.setattr(temporary_db_manager, "get_data_directory", lambda: data_dir)
+    history_db.save_transactions(RECORDS)
+    with closing(sqlite3.connect(history_db.db_path)) as conn, conn:
+        conn.execute(f"UPDATE {HISTORY_STATS_TABLE} SET net_cents = 0 WHERE sorgente = 'bar'")
+
+    with pytest.raises(SystemExit) as exit_info:
+        table_stats.main([])
+    assert exit_info.value.code == 1
+    assert "bar" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exit_info:
+        table_stats.main(["--rebuild"])
+    assert exit_info.value.code == 0
+    assert history_db.check_stats() == []
@@ -0,0 +1,93 @@
+"""TransactionsTableModel: gli inserimenti incrementali mantengono l'ordine del database."""
+import random
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QCoreApplication
+
+from barflow.ui import transactions_widget
+from barflow.ui.transactions_widget import TransactionsTableModel, _sort_key
+
+
+@pytest.fixture(scope="module", autouse=True)
+def qt_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def _transactions(count, import_timestamps, seed):
+    rnd = random.Random(seed)
+    transactions = []
+    for number in range(count):
+        data = pd.Timestamp('2024-01-01') + pd.Timedelta(minutes=rnd.randint(0, 5000))
+        transactions.append({
+            'DATA': pd.NaT if rnd.random() < 0.05 else data,
+            '_IMPORT_TIMESTAMP': rnd.choice(import_timestamps),
+            'NUMERO OPERAZIONE POS': f'{seed}-{number}',
+        })
+    return transactions
+
+
+def _recording_model(transactions):
+    model = TransactionsTableModel()
+    model.set_transactions(transactions)
+    events = []
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("insert", first, last)))
+    model.modelReset.connect(lambda: events.append(("reset",)))
+    return model, events
+
+
+def _assert_sorted_like_full_sort(model, transactions):
+    # sorted è stabile: a parità di chiave le righe già presenti precedono le nuove
+    expected = sorted(transactions, key=_sort_key)
+    assert [row['NUMERO OPERAZIONE POS'] for row in model._rows] == \
+        [row['NUMERO OPERAZIONE POS'] for row in expected]
+    assert model._keys == [_sort_key(row) for row in expected]
+    assert model.rowCount() == len(expected)
+
+
+def test_new_import_inserted_as_one_block():
+    existing = _transactions(200, [1, 2], seed=1)
+    model, events = _recording_model(existing)
+    new = _transactions(50, [3], seed=2)
+
+    model.insert_transactions(new)
+
+    _assert_sorted_like_full_sort(model, existing + new)
+    assert events == [("insert", 0, 49)]
+
+
+def test_few_scattered_blocks_inserted_incrementally():
+    existing = _transactions(200, [1, 2], seed=3)
+    model, events = _recording_model(existing)
+    new = _transactions(10, [1, 2], seed=4)
+
+    model.insert_transactions(new)
+
+    _assert_sorted_like_full_sort(model, existing + new)
+    assert events and all(event[0] == "insert" for event in events)
+    assert sum(last - first + 1 for _, first, last in events) == len(new)
+
+
+def test_many_blocks_fall_back_to_reset():
+    existing = _transactions(500, [1, 2, 3], seed=5)
+    model, events = _recording_model(existing)
+    new = _transactions(transactions_widget.MAX_INSERT_RUNS * 4, [1, 2, 3], seed=6)
+
+    model.insert_transactions(new)
+
+    _assert_sorted_like_full_sort(model, existing + new)
+    assert events == [("reset",)]
+
+
+def test_insert_into_empty_model_and_empty_batch():
+    model, events = _recording_model([])
+    new = _transactions(20, [1, 2], seed=7)
+
+    model.insert_transactions(new)
+    model.insert_transactions([])
+
+    _assert_sorted_like_full_sort(model, new)
+    assert events == [("insert", 0, 19)]